@@ -0,0 +1,104 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+"""
+Benchmark of type-ahead completion over the labels and abbreviations of a
+synthetic catalog.
+
+Every entity has a label of two random words and a short abbreviation, and a
+random weight. The latency of completing each prefix of a few labels is
+measured, as if the labels were typed, along with the time to reload the
+catalog with 1% of its labels changed.
+
+Usage:
+
+    python3 benchmark/autocomplete_benchmark.py [entity count]
+
+"""
+
+from sosa.index.autocomplete import Autocomplete
+
+import numpy
+from qudt.ontology.qudt import QUDT
+from qudt.ontology.rdfs import RDFS
+import rdflib
+import sys
+import time
+from typing import List
+
+
+def create_graph(labels: List[str], abbreviations: List[str]) -> rdflib.Graph:
+    """
+    Create a graph of the labels and abbreviations of a synthetic catalog.
+    """
+    graph = rdflib.Graph()
+
+    label = rdflib.URIRef(RDFS.LABEL)
+    abbreviation = rdflib.URIRef(QUDT.ABBREVIATION)
+
+    for index, (label_text, abbreviation_text) in enumerate(zip(labels, abbreviations)):
+        subject = rdflib.URIRef(f'http://example.org/Feature{index}')
+        graph.add((subject, label, rdflib.Literal(label_text)))
+        graph.add((subject, abbreviation, rdflib.Literal(abbreviation_text)))
+
+    return graph
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+
+    rng = numpy.random.default_rng(0)
+
+    letters = numpy.array(list('abcdefghijklmnopqrstuvwxyz'))
+    words = [''.join(rng.choice(letters, rng.integers(3, 10))) for _ in range(5000)]
+
+    labels = [f'{words[first].capitalize()} {words[second]}' for first, second in rng.integers(0, len(words), (count, 2))]
+    abbreviations = [''.join(word[0] for word in label.split()).upper() + str(index % 100) for index, label in enumerate(labels)]
+    weights = {f'http://example.org/Feature{index}': float(weight) for index, weight in enumerate(rng.random(count))}
+
+    graph = create_graph(labels, abbreviations)
+
+    autocomplete = Autocomplete(lambda resource_iri, property_iri, text: weights[resource_iri])
+
+    start = time.perf_counter()
+    autocomplete.load_graph('catalog.ttl', graph)
+    load_seconds = time.perf_counter() - start
+
+    latencies: List[float] = list()
+    for label in labels[:20]:
+        for length in range(1, len(label) + 1):
+            start = time.perf_counter()
+            autocomplete.complete(label[:length], limit=10)
+            latencies.append(time.perf_counter() - start)
+
+    # Change 1% of the labels
+    changed = rng.choice(count, count // 100, replace=False)
+    for index in changed:
+        labels[index] = f'{labels[index]} revised'
+    reloaded = create_graph(labels, abbreviations)
+
+    start = time.perf_counter()
+    added, removed = autocomplete.load_graph('catalog.ttl', reloaded)
+    reload_seconds = time.perf_counter() - start
+
+    latencies_ms = numpy.array(latencies) * 1e3
+
+    print(f'Entities:           {count}')
+    print(f'Texts:              {len(autocomplete)}')
+    print(f'Load time:          {load_seconds:.2f} s')
+    print(f'Reload time:        {reload_seconds:.2f} s ({added} added, {removed} removed)')
+    print(f'Completions:        {len(latencies)}')
+    print(f'Median latency:     {numpy.median(latencies_ms):.3f} ms')
+    print(f'99th pct. latency:  {numpy.percentile(latencies_ms, 99):.3f} ms')
+    print(f'Max latency:        {latencies_ms.max():.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+"""
+Benchmark of observation chunk compression on synthetic sensor data.
+
+The data is sampled at 1 Hz with occasional timing jitter, and the results are
+a slowly drifting random walk quantized to the sensor's resolution. The
+compression ratio is reported against the raw datetime64 and float64 columns.
+
+Usage:
+
+    python3 benchmark/compression_benchmark.py [observation count] [chunk size]
+
+"""
+
+from sosa.storage.chunk import Chunk
+
+import numpy
+import sys
+import time
+from typing import List
+
+
+def create_chunks(count: int, chunk_size: int) -> List[Chunk]:
+    """
+    Create chunks of synthetic sensor data.
+    """
+    rng = numpy.random.default_rng(0)
+
+    # 1 Hz sampling, with 1% of the samples jittered by up to 50 ms
+    offsets = numpy.arange(count, dtype=numpy.int64) * 10 ** 9
+    jittered = rng.random(count) < 0.01
+    offsets[jittered] += rng.integers(-50, 50, int(jittered.sum())) * 10 ** 6
+
+    phenomenon_times = numpy.datetime64('2020-01-01T00:00:00', 'ns') + offsets.astype('timedelta64[ns]')
+    result_times = phenomenon_times + numpy.timedelta64(200, 'ms')
+
+    # Random walk with a resolution of 0.1
+    results = numpy.round(20.0 + numpy.cumsum(rng.normal(0.0, 0.02, count)), 1)
+
+    return [
+        Chunk(
+            phenomenon_times=phenomenon_times[start:start + chunk_size],
+            result_times=result_times[start:start + chunk_size],
+            results=results[start:start + chunk_size],
+        )
+        for start in range(0, count, chunk_size)
+    ]
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+
+    chunks = create_chunks(count, chunk_size)
+
+    start = time.perf_counter()
+    encoded = [chunk.encode() for chunk in chunks]
+    encode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for chunk in encoded:
+        chunk.decode()
+    decode_seconds = time.perf_counter() - start
+
+    raw_size = sum(
+        chunk.phenomenon_times.nbytes + chunk.result_times.nbytes + chunk.results.nbytes
+        for chunk in chunks
+    )
+    encoded_size = sum(len(chunk.data) for chunk in encoded)
+
+    print(f'Observations:      {count} in chunks of {chunk_size}')
+    print(f'Raw size:          {raw_size / 2 ** 20:.2f} MiB')
+    print(f'Encoded size:      {encoded_size / 2 ** 20:.2f} MiB')
+    print(f'Compression ratio: {raw_size / encoded_size:.1f}x')
+    print(f'Bytes/observation: {encoded_size / count:.2f}')
+    print(f'Encode throughput: {count / encode_seconds / 1e6:.2f} M observations/s')
+    print(f'Decode throughput: {count / decode_seconds / 1e6:.2f} M observations/s')
+
+
+if __name__ == '__main__':
+    main()
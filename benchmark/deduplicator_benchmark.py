@@ -0,0 +1,87 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+"""
+Benchmark of deduplicating a stream delivered as many small batches.
+
+Observations at 10 kHz are filtered in small batches, so each bucket of the
+deduplicator receives thousands of batches. The time per batch is reported
+as the window fills, and should stay flat rather than grow with the number
+of fingerprints held.
+
+Usage:
+
+    python3 benchmark/deduplicator_benchmark.py [batch count] [batch size]
+
+"""
+
+from sosa.ingest.deduplicator import Deduplicator
+from sosa.observation import ObservationBatch
+
+import numpy
+import sys
+import time
+
+
+# Time between observations
+INTERVAL = numpy.timedelta64(100, 'us')
+
+# Number of reports while the window fills
+REPORT_COUNT = 10
+
+
+def create_batch(start: int, size: int) -> ObservationBatch:
+    """
+    Create a batch of consecutive observations of a sensor.
+    """
+    offsets = numpy.arange(start, start + size)
+
+    return ObservationBatch(
+        sensor_iris=numpy.full(size, 'http://example.org/sensor/1', dtype=object),
+        property_iris=numpy.full(size, 'http://example.org/property/NitricOxide', dtype=object),
+        feature_iris=numpy.full(size, 'http://example.org/feature/Oakland', dtype=object),
+        procedure_iris=numpy.full(size, '', dtype=object),
+        phenomenon_times=numpy.datetime64('2020-01-01T00:00:00', 'ns') + offsets * INTERVAL,
+        result_times=numpy.full(size, numpy.datetime64('NaT', 'ns')),
+        results=offsets.astype(numpy.float64),
+    )
+
+
+def main() -> None:
+    batch_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    batches = [create_batch(index * batch_size, batch_size) for index in range(batch_count)]
+
+    deduplicator = Deduplicator()
+
+    print(f'Batches: {batch_count} of {batch_size} observations')
+
+    report_size = max(batch_count // REPORT_COUNT, 1)
+    for start in range(0, batch_count, report_size):
+        begin = time.perf_counter()
+        for batch in batches[start:start + report_size]:
+            deduplicator.filter(batch)
+        elapsed = time.perf_counter() - begin
+
+        print(f'  {start + report_size:>8} batches, {deduplicator.size:>9} fingerprints: {elapsed / report_size * 1e6:8.1f} us per batch')
+
+    # Retries are all detected
+    begin = time.perf_counter()
+    duplicates = deduplicator.duplicates
+    for batch in batches[-report_size:]:
+        deduplicator.filter(batch)
+    elapsed = time.perf_counter() - begin
+
+    print(f'Retries: {deduplicator.duplicates - duplicates} duplicates, {elapsed / report_size * 1e6:.1f} us per batch')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+"""
+Benchmark of multi-process ingest through shared memory ring buffers.
+
+Readings of 100 sensors observing 4 properties at 1 Hz are ingested into
+persistent observation stores with an increasing number of worker processes.
+Throughput is measured from the first reading until every worker has stored
+and committed its readings, so it includes process startup.
+
+Usage:
+
+    python3 benchmark/parallel_ingest_benchmark.py [reading count] [max workers]
+
+"""
+
+from sosa.ingest.parallel_ingest import ParallelIngest
+from sosa.ingest.ring_buffer import READING_DTYPE
+
+import numpy
+import os
+import sys
+import tempfile
+import time
+
+
+SENSOR_COUNT = 100
+PROPERTY_COUNT = 4
+
+# Number of readings put at a time by the front process
+PUT_SIZE = 65536
+
+
+def create_readings(count: int) -> numpy.ndarray:
+    """
+    Create readings of every sensor and property, in time order.
+    """
+    rng = numpy.random.default_rng(0)
+
+    series_count = SENSOR_COUNT * PROPERTY_COUNT
+    series = numpy.arange(count) % series_count
+
+    readings = numpy.zeros(count, dtype=READING_DTYPE)
+    readings['sensor'] = series // PROPERTY_COUNT
+    readings['property'] = series % PROPERTY_COUNT
+    readings['phenomenon_time'] = numpy.datetime64('2020-01-01T00:00:00', 'ns').astype(numpy.int64) + numpy.arange(count) // series_count * 10 ** 9
+    readings['result'] = numpy.round(20.0 + rng.normal(0.0, 1.0, count), 1)
+
+    return readings
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4000000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+
+    readings = create_readings(count)
+
+    sensor_iris = [f'http://example.org/sensor/{index}' for index in range(SENSOR_COUNT)]
+    property_iris = [f'http://example.org/property/{index}' for index in range(PROPERTY_COUNT)]
+    feature_iris = ['http://example.org/feature/Oakland']
+
+    print(f'Readings: {count} of {SENSOR_COUNT * PROPERTY_COUNT} series ({os.cpu_count()} CPUs)')
+
+    baseline = 0.0
+    worker_count = 1
+    while worker_count <= max_workers:
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+
+            with ParallelIngest(directory, sensor_iris, property_iris, feature_iris, worker_count=worker_count) as ingest:
+                for offset in range(0, count, PUT_SIZE):
+                    ingest.put(readings[offset:offset + PUT_SIZE])
+
+            seconds = time.perf_counter() - start
+
+        throughput = count / seconds
+        baseline = baseline or throughput
+
+        print(f'Workers: {worker_count:3d}  Throughput: {throughput / 1e6:.2f} M readings/s  Speedup: {throughput / baseline:.2f}x')
+
+        worker_count *= 2
+
+
+if __name__ == '__main__':
+    main()
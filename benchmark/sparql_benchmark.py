@@ -0,0 +1,163 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+"""
+Benchmark of SPARQL queries compiled onto the relationship store, compared to
+rdflib's query engine on the same graph.
+
+The graph is a synthetic catalog of platforms hosting sensors, each observing
+one of a few properties and having made a few observations. Each query is
+run to completion by both engines, and their solutions are checked to match.
+
+Usage:
+
+    python3 benchmark/sparql_benchmark.py [platform count]
+
+"""
+
+from sosa.ontology.sosa import SOSA
+from sosa.query.sparql_compiler import SparqlCompiler
+from sosa.relationship import RelationshipStore
+
+import rdflib
+import sys
+import time
+from typing import Dict
+from typing import List
+from typing import Set
+from typing import Tuple
+
+
+EXAMPLE_IRI = 'http://example.org/'
+NAMESPACES: Dict[str, str] = {
+    'sosa': 'http://www.w3.org/ns/sosa/',
+    'ex': EXAMPLE_IRI,
+}
+
+SENSORS_PER_PLATFORM = 10
+OBSERVATIONS_PER_SENSOR = 5
+PROPERTY_COUNT = 20
+
+QUERIES: List[Tuple[str, str]] = [
+    (
+        'Lookup',
+        'SELECT ?sensor WHERE { ex:Platform7 sosa:hosts ?sensor }',
+    ),
+    (
+        'Join',
+        'SELECT ?platform ?sensor WHERE { ?platform sosa:hosts ?sensor . ?sensor sosa:observes ex:Property3 }',
+    ),
+    (
+        'Three-way join',
+        'SELECT ?platform ?observation WHERE { '
+        '?platform sosa:hosts ?sensor . ?sensor sosa:observes ex:Property4 . '
+        '?sensor sosa:madeObservation ?observation }',
+    ),
+    (
+        'Filter',
+        'SELECT ?sensor ?property WHERE { ?sensor sosa:observes ?property '
+        'FILTER(?property IN (ex:Property7, ex:Property8) && STRENDS(STR(?sensor), "7")) }',
+    ),
+    (
+        'Optional',
+        'SELECT ?sensor ?observation WHERE { ex:Platform3 sosa:hosts ?sensor '
+        'OPTIONAL { ?sensor sosa:madeObservation ?observation } }',
+    ),
+    (
+        'Order and limit',
+        'SELECT DISTINCT ?property WHERE { ?sensor sosa:observes ?property } ORDER BY DESC(?property) LIMIT 5',
+    ),
+]
+
+
+def create_graph(platform_count: int) -> rdflib.Graph:
+    """
+    Create a synthetic catalog.
+    """
+    graph = rdflib.Graph()
+
+    hosts = rdflib.URIRef(SOSA.HOSTS)
+    observes = rdflib.URIRef(SOSA.OBSERVES)
+    made_observation = rdflib.URIRef(SOSA.MADE_OBSERVATION)
+
+    for platform_index in range(platform_count):
+        platform = rdflib.URIRef(f'{EXAMPLE_IRI}Platform{platform_index}')
+
+        for sensor_index in range(SENSORS_PER_PLATFORM):
+            index = platform_index * SENSORS_PER_PLATFORM + sensor_index
+            sensor = rdflib.URIRef(f'{EXAMPLE_IRI}Sensor{index}')
+
+            graph.add((platform, hosts, sensor))
+            graph.add((sensor, observes, rdflib.URIRef(f'{EXAMPLE_IRI}Property{index % PROPERTY_COUNT}')))
+
+            # Every other sensor has made observations
+            if index % 2 == 0:
+                for observation_index in range(OBSERVATIONS_PER_SENSOR):
+                    observation = rdflib.URIRef(f'{EXAMPLE_IRI}Observation{index}-{observation_index}')
+                    graph.add((sensor, made_observation, observation))
+
+    return graph
+
+
+def get_solutions(rows: List[Tuple[str, ...]]) -> Set[Tuple[str, ...]]:
+    """
+    Get the distinct solutions of a query, for comparing engines.
+    """
+    return set(rows)
+
+
+def main() -> None:
+    platform_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    graph = create_graph(platform_count)
+
+    start = time.perf_counter()
+    relationships = RelationshipStore()
+    relationships.load_graph(graph)
+    load_seconds = time.perf_counter() - start
+
+    compiler = SparqlCompiler(relationships)
+
+    print(f'Triples:           {len(graph)}')
+    print(f'Store load time:   {load_seconds * 1e3:.1f} ms')
+    print()
+    # Warm up the SPARQL parser shared by both engines
+    compiler.compile(QUERIES[0][1], NAMESPACES)
+    graph.query(QUERIES[0][1], initNs=NAMESPACES)
+
+    print(f'{"Query":<18}{"Rows":>8}{"rdflib (ms)":>14}{"pysosa (ms)":>14}{"Speedup":>10}')
+
+    for name, query in QUERIES:
+        start = time.perf_counter()
+        compiled = compiler.compile(query, NAMESPACES)
+        rows = [tuple(row.get(variable, '') for variable in compiled.variables) for row in compiled.execute()]
+        pysosa_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = [
+            tuple(str(value) if value is not None else '' for value in row)
+            for row in graph.query(query, initNs=NAMESPACES)
+        ]
+        rdflib_seconds = time.perf_counter() - start
+
+        if get_solutions(rows) != get_solutions(expected):
+            raise RuntimeError(f'Solutions of query "{name}" differ')
+
+        print(
+            f'{name:<18}{len(rows):>8}{rdflib_seconds * 1e3:>14.1f}{pysosa_seconds * 1e3:>14.1f}'
+            f'{rdflib_seconds / pysosa_seconds:>9.1f}x'
+        )
+
+    print()
+    print(compiler.compile(QUERIES[2][1], NAMESPACES).explain())
+
+
+if __name__ == '__main__':
+    main()
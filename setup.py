@@ -39,6 +39,7 @@ setuptools.setup(
     ],
     packages=setuptools.find_packages(exclude=['test', 'test.*']),
     install_requires=[
+        'numpy',
         'pyqudt',
         'rdflib',
         'rdflib-jsonld',
@@ -0,0 +1,368 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.aggregation.window import SessionWindow
+from sosa.aggregation.window import SlidingWindow
+from sosa.aggregation.window_aggregator import WindowAggregator
+from sosa.observation import ObservationCollection
+from sosa.observation import from_timestamp
+from sosa.observation import to_nanoseconds
+from sosa.observation import to_timestamp
+from sosa.storage.series import SeriesKey
+
+import dataclasses
+import datetime
+import heapq
+import numpy
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+
+# The watermark before any observation has been seen
+MIN_WATERMARK = int(numpy.iinfo(numpy.int64).min)
+
+
+@dataclasses.dataclass
+class _SeriesBuffer:
+    """
+    The buffered observations of a series, in phenomenon time order.
+    """
+
+    procedure_iri: str
+    """
+    The IRI of the Procedure of the series.
+    """
+
+    phenomenon_times: numpy.ndarray
+    """
+    The phenomenon times of the buffered observations, as nanoseconds since
+    the epoch.
+    """
+
+    results: numpy.ndarray
+    """
+    The results of the buffered observations.
+    """
+
+
+class StreamAggregator(object):
+    """
+    Aggregates an out-of-order stream of observations into windows, using the
+    event time of the observations.
+
+    The watermark is the latest phenomenon time seen, less the maximum delay.
+    Observations are assumed to arrive no later than the watermark, so a
+    window is emitted once the watermark passes its end.
+
+    Observations arriving after their windows were emitted, but within the
+    allowed lateness, cause the windows to be emitted again with corrected
+    results. Consumers should treat an aggregate observation as replacing any
+    earlier one of the same series and phenomenon time. The result time of an
+    aggregate observation is the end of its window, or for a correction, the
+    watermark at which the correction was made.
+
+    Windows whose end is older than the watermark by more than the allowed
+    lateness are final, and their observations are discarded, so that state
+    is bounded by the delay and lateness rather than the length of the stream.
+    Observations arriving for final windows are dropped.
+
+    Each series is only processed when it receives observations, or when the
+    watermark reaches the next time it has a window to close or observations
+    to discard, found from a heap of those times. Only the windows being
+    closed or corrected are aggregated, so the work per batch is proportional
+    to the windows it affects rather than to the observations buffered.
+    """
+
+    def __init__(self, aggregator: WindowAggregator, max_delay: datetime.timedelta = datetime.timedelta(), allowed_lateness: datetime.timedelta = datetime.timedelta()):
+        """
+        Create a stream aggregator.
+
+        :param aggregator: The window definition, statistics and aggregate
+                           properties. Session windows aren't supported, as a
+                           late observation can merge sessions that were
+                           already emitted.
+        :param max_delay: The delay of the watermark behind the latest
+                          phenomenon time
+        :param allowed_lateness: How long after the watermark passes a window
+                                 it can still be corrected
+        """
+        if isinstance(aggregator.window, SessionWindow):
+            raise ValueError('Session windows are not supported by streaming aggregation')
+
+        self._aggregator = aggregator
+        self._max_delay = to_nanoseconds(max_delay)
+        self._allowed_lateness = to_nanoseconds(allowed_lateness)
+
+        self._watermark = MIN_WATERMARK
+        self._buffers: Dict[SeriesKey, _SeriesBuffer] = dict()
+        self._dropped = 0
+
+        # Watermark at which each buffered series is next processed, and a
+        # heap of the same, where entries that no longer match are stale
+        self._due_times: Dict[SeriesKey, int] = dict()
+        self._schedule: List[Tuple[int, SeriesKey]] = list()
+
+    @property
+    def watermark(self) -> Optional[datetime.datetime]:
+        """
+        Get the current watermark, or None if no observation has been seen.
+        """
+        if self._watermark == MIN_WATERMARK:
+            return None
+
+        return from_timestamp(numpy.int64(self._watermark).view('datetime64[ns]'))
+
+    @property
+    def dropped(self) -> int:
+        """
+        Get the number of observations dropped for arriving too late.
+        """
+        return self._dropped
+
+    @property
+    def buffered(self) -> int:
+        """
+        Get the number of observations held for open windows.
+        """
+        return sum(len(buffer.results) for buffer in self._buffers.values())
+
+    def process(self, collection: ObservationCollection) -> List[ObservationCollection]:
+        """
+        Process a batch of observations of a series.
+
+        :param collection: The observations, in any order
+        :return: The aggregate observations of the windows closed or corrected
+                 by the batch, as a collection per series and statistic
+        """
+        if not len(collection):
+            return []
+
+        key = SeriesKey(collection.sensor_iri, collection.property_iri, collection.feature_iri)
+
+        times = collection.phenomenon_times.view(numpy.int64)
+        if numpy.any(numpy.isnat(collection.phenomenon_times)):
+            raise ValueError('Observations must have a phenomenon time')
+
+        # Drop observations whose windows are already final
+        late = self._get_last_end_times(times) <= self._get_horizon()
+        self._dropped += int(numpy.count_nonzero(late))
+
+        times = times[~late]
+        results = collection.results[~late]
+
+        if len(times):
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = self._buffers[key] = _SeriesBuffer(collection.procedure_iri, numpy.empty(0, dtype=numpy.int64), numpy.empty(0))
+
+            merged_times = numpy.concatenate([buffer.phenomenon_times, times])
+            order = numpy.argsort(merged_times, kind='stable')
+
+            buffer.phenomenon_times = merged_times[order]
+            buffer.results = numpy.concatenate([buffer.results, results])[order]
+
+        watermark = max(self._watermark, int(times.max()) - self._max_delay) if len(times) else self._watermark
+
+        return self._advance(watermark, {key: numpy.sort(times)})
+
+    def advance_watermark(self, time: datetime.datetime) -> List[ObservationCollection]:
+        """
+        Advance the watermark, such as when a stream is idle.
+
+        :param time: The new watermark. An older watermark has no effect.
+        :return: The aggregate observations of the windows closed
+        """
+        return self._advance(max(self._watermark, int(to_timestamp(time).astype(numpy.int64))), {})
+
+    def flush(self) -> List[ObservationCollection]:
+        """
+        Emit every open window, such as at the end of a stream.
+
+        :return: The aggregate observations of the windows closed
+        """
+        watermark = max([self._watermark] + [int(buffer.phenomenon_times[-1]) + self._get_window_length() for buffer in self._buffers.values()])
+
+        return self._advance(watermark, {})
+
+    def _advance(self, watermark: int, arrivals: Dict[SeriesKey, numpy.ndarray]) -> List[ObservationCollection]:
+        """
+        Emit the windows closed by a new watermark, and the emitted windows
+        corrected by new observations, then discard the observations of final
+        windows.
+
+        :param watermark: The new watermark
+        :param arrivals: The sorted times of new observations of each series
+        :return: The aggregate observations
+        """
+        previous = self._watermark
+        previous_horizon = self._get_horizon()
+
+        self._watermark = watermark
+        horizon = self._get_horizon()
+
+        # The series with new observations or reached by the watermark
+        keys: Set[SeriesKey] = set(arrivals)
+        while self._schedule and self._schedule[0][0] <= watermark:
+            due_time, key = heapq.heappop(self._schedule)
+            if self._due_times.get(key) == due_time:
+                keys.add(key)
+
+        emitted: List[ObservationCollection] = list()
+
+        for key in sorted(keys):
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                continue
+
+            times = arrivals.get(key)
+            has_arrivals = times is not None and len(times) > 0
+
+            # The observations of the windows ending after the last watermark,
+            # or after the last horizon if emitted windows can be corrected,
+            # and at or before the new watermark
+            first = numpy.searchsorted(buffer.phenomenon_times, self._get_first_open_start(previous_horizon if has_arrivals else previous))
+            last = numpy.searchsorted(buffer.phenomenon_times, watermark)
+
+            aggregates = self._aggregator.aggregate(ObservationCollection(
+                resource_iri='',
+                sensor_iri=key.sensor_iri,
+                property_iri=key.property_iri,
+                feature_iri=key.feature_iri,
+                procedure_iri=buffer.procedure_iri,
+                phenomenon_times=buffer.phenomenon_times[first:last].view('datetime64[ns]'),
+                results=buffer.results[first:last],
+            )) if first < last else dict()
+
+            if aggregates:
+                first_aggregate = next(iter(aggregates.values()))
+                start_times = first_aggregate.phenomenon_times.view(numpy.int64)
+                end_times = first_aggregate.result_times.view(numpy.int64)
+
+                closed = (end_times > previous) & (end_times <= watermark)
+
+                # Emitted windows containing a new observation. Final windows
+                # are excluded, as their observations may have been discarded.
+                corrected = numpy.zeros(len(start_times), dtype=bool)
+                if has_arrivals:
+                    corrected = (end_times > previous_horizon) & (end_times <= previous)
+                    corrected &= numpy.searchsorted(times, end_times) > numpy.searchsorted(times, start_times)
+
+                selected = closed | corrected
+                if numpy.any(selected):
+                    result_times = numpy.where(corrected, watermark, end_times)[selected].view('datetime64[ns]')
+
+                    for collection in aggregates.values():
+                        emitted.append(dataclasses.replace(
+                            collection,
+                            phenomenon_times=collection.phenomenon_times[selected],
+                            result_times=result_times,
+                            results=collection.results[selected],
+                        ))
+
+            # Keep the observations of windows that can still be corrected
+            keep = numpy.searchsorted(buffer.phenomenon_times, self._get_first_open_start(horizon))
+            if keep >= len(buffer.phenomenon_times):
+                del self._buffers[key]
+                self._due_times.pop(key, None)
+                continue
+            elif keep:
+                buffer.phenomenon_times = buffer.phenomenon_times[keep:]
+                buffer.results = buffer.results[keep:]
+
+            self._schedule_series(key, buffer)
+
+        return emitted
+
+    def _schedule_series(self, key: SeriesKey, buffer: _SeriesBuffer) -> None:
+        """
+        Schedule a series to be processed when the watermark reaches the end
+        of its next window, or the first of its observations can be discarded.
+        """
+        due_time = self._get_last_end_times(buffer.phenomenon_times[:1])[0] + self._allowed_lateness
+
+        next_end = self._get_next_end(buffer.phenomenon_times)
+        if next_end is not None:
+            due_time = min(due_time, next_end)
+
+        due_time = int(due_time)
+
+        if self._due_times.get(key) != due_time:
+            self._due_times[key] = due_time
+            heapq.heappush(self._schedule, (due_time, key))
+
+    def _get_next_end(self, times: numpy.ndarray) -> Optional[int]:
+        """
+        Get the end of the earliest window ending after the watermark that
+        contains one of the sorted times, or None if there is no such window.
+        """
+        length = self._get_window_length()
+        slide = self._get_slide()
+        offset = to_nanoseconds(self._aggregator.window.offset)
+
+        # Only times within a window length of the watermark are in windows
+        # ending after it
+        times = times[numpy.searchsorted(times, max(self._watermark - length, MIN_WATERMARK), side='right'):]
+        if not len(times):
+            return None
+
+        # The earliest window ending after both the time and the watermark
+        # contains the time, unless the time falls between hopping windows
+        bounds = numpy.maximum(times, self._watermark)
+        end_times = ((bounds - offset - length) // slide + 1) * slide + offset + length
+        end_times = end_times[end_times - length <= times]
+
+        return int(end_times.min()) if len(end_times) else None
+
+    def _get_horizon(self) -> int:
+        """
+        Get the time at or before which windows are final.
+        """
+        return max(self._watermark - self._allowed_lateness, MIN_WATERMARK)
+
+    def _get_window_length(self) -> int:
+        """
+        Get the window size, in nanoseconds.
+        """
+        return to_nanoseconds(self._aggregator.window.size)
+
+    def _get_slide(self) -> int:
+        """
+        Get the time between window starts, in nanoseconds.
+        """
+        window = self._aggregator.window
+        return to_nanoseconds(window.slide if isinstance(window, SlidingWindow) else window.size)
+
+    def _get_last_end_times(self, times: numpy.ndarray) -> numpy.ndarray:
+        """
+        Get the end time of the latest window containing each time.
+        """
+        slide = self._get_slide()
+        offset = to_nanoseconds(self._aggregator.window.offset)
+
+        return (times - offset) // slide * slide + offset + self._get_window_length()
+
+    def _get_first_open_start(self, horizon: int) -> int:
+        """
+        Get the start time of the earliest window that isn't final.
+        """
+        if horizon == MIN_WATERMARK:
+            return MIN_WATERMARK
+
+        slide = self._get_slide()
+        offset = to_nanoseconds(self._aggregator.window.offset)
+
+        # The earliest window ending after the horizon
+        index = (horizon - self._get_window_length() - offset) // slide + 1
+
+        return index * slide + offset
+
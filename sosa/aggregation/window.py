@@ -0,0 +1,185 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.observation import to_nanoseconds
+
+import dataclasses
+import datetime
+import numpy
+from typing import NamedTuple
+from typing import Union
+
+
+class WindowBounds(NamedTuple):
+    """
+    The non-empty windows over a time-ordered column of observations.
+
+    Each window covers the observations in the index range [begin, end).
+    Windows are ordered by start time, and may overlap.
+    """
+
+    start_times: numpy.ndarray
+    """
+    The start time of each window, as int64 nanoseconds since the epoch.
+    """
+
+    end_times: numpy.ndarray
+    """
+    The end time (exclusive) of each window, as int64 nanoseconds since the
+    epoch.
+    """
+
+    begins: numpy.ndarray
+    """
+    The index of the first observation of each window.
+    """
+
+    ends: numpy.ndarray
+    """
+    The index after the last observation of each window.
+    """
+
+    def __len__(self) -> int:
+        """
+        Return the number of windows.
+        """
+        return len(self.begins)
+
+
+@dataclasses.dataclass
+class TumblingWindow:
+    """
+    Fixed-length, non-overlapping windows aligned to the epoch.
+    """
+
+    size: datetime.timedelta
+    """
+    The length of each window.
+    """
+
+    offset: datetime.timedelta = datetime.timedelta()
+    """
+    The offset of the window boundaries from the epoch.
+    """
+
+    def get_windows(self, times: numpy.ndarray) -> WindowBounds:
+        """
+        Assign observations to windows.
+
+        :param times: The observation times, in order, as int64 nanoseconds
+        :return: The non-empty windows
+        """
+        size = to_nanoseconds(self.size)
+        offset = to_nanoseconds(self.offset)
+
+        if size <= 0:
+            raise ValueError('Window size must be positive')
+
+        ids = (times - offset) // size
+
+        begins = numpy.flatnonzero(numpy.diff(ids)) + 1
+        begins = numpy.concatenate([numpy.zeros(min(len(ids), 1), dtype=numpy.int64), begins])
+        ends = numpy.append(begins[1:], len(ids))[:len(begins)]
+
+        start_times = ids[begins] * size + offset
+
+        return WindowBounds(start_times, start_times + size, begins, ends)
+
+
+@dataclasses.dataclass
+class SlidingWindow:
+    """
+    Fixed-length windows that start at every multiple of the slide, so that
+    windows overlap if the slide is shorter than the size.
+    """
+
+    size: datetime.timedelta
+    """
+    The length of each window.
+    """
+
+    slide: datetime.timedelta
+    """
+    The time between the starts of consecutive windows.
+    """
+
+    offset: datetime.timedelta = datetime.timedelta()
+    """
+    The offset of the window boundaries from the epoch.
+    """
+
+    def get_windows(self, times: numpy.ndarray) -> WindowBounds:
+        """
+        Assign observations to windows.
+
+        :param times: The observation times, in order, as int64 nanoseconds
+        :return: The non-empty windows
+        """
+        size = to_nanoseconds(self.size)
+        slide = to_nanoseconds(self.slide)
+        offset = to_nanoseconds(self.offset)
+
+        if size <= 0 or slide <= 0:
+            raise ValueError('Window size and slide must be positive')
+
+        # The latest window starting at or before each distinct slide
+        latest = numpy.unique((times - offset) // slide)
+
+        # An observation belongs to at most this many windows
+        count = -(-size // slide)
+
+        ids = numpy.unique((latest[:, numpy.newaxis] - numpy.arange(count)).ravel())
+        start_times = ids * slide + offset
+        end_times = start_times + size
+
+        begins = numpy.searchsorted(times, start_times)
+        ends = numpy.searchsorted(times, end_times)
+
+        # Candidates may be empty if the slide is longer than the size
+        nonempty = begins < ends
+
+        return WindowBounds(start_times[nonempty], end_times[nonempty], begins[nonempty], ends[nonempty])
+
+
+@dataclasses.dataclass
+class SessionWindow:
+    """
+    Windows of activity separated by gaps without observations.
+
+    A session starts at its first observation and ends a gap after its last
+    observation.
+    """
+
+    gap: datetime.timedelta
+    """
+    The inactivity that closes a session.
+    """
+
+    def get_windows(self, times: numpy.ndarray) -> WindowBounds:
+        """
+        Assign observations to windows.
+
+        :param times: The observation times, in order, as int64 nanoseconds
+        :return: The non-empty windows
+        """
+        gap = to_nanoseconds(self.gap)
+
+        if gap <= 0:
+            raise ValueError('Session gap must be positive')
+
+        begins = numpy.flatnonzero(numpy.diff(times) >= gap) + 1
+        begins = numpy.concatenate([numpy.zeros(min(len(times), 1), dtype=numpy.int64), begins])
+        ends = numpy.append(begins[1:], len(times))[:len(begins)]
+
+        return WindowBounds(times[begins], times[ends - 1] + gap, begins, ends)
+
+
+# Type definitions
+Window = Union[TumblingWindow, SlidingWindow, SessionWindow]
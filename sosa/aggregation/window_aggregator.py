@@ -0,0 +1,207 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.aggregation.window import Window
+from sosa.aggregation.window import WindowBounds
+from sosa.observation import ObservationCollection
+from sosa.procedure import Procedure
+
+import numpy
+from typing import Dict
+from typing import List
+from typing import Optional
+
+
+# Statistics supported in addition to percentiles, which are named by a "p"
+# followed by the percentage, such as "p50" or "p99.9"
+STATISTICS = ['mean', 'min', 'max', 'sum', 'count', 'stddev']
+
+
+def aggregate(times: numpy.ndarray, results: numpy.ndarray, window: Window, statistics: List[str]) -> Dict[str, numpy.ndarray]:
+    """
+    Aggregate observations into windows.
+
+    Observations without a result (NaN) are ignored, and windows without any
+    results are omitted.
+
+    :param times: The phenomenon times, in order, as datetime64[ns] values
+    :param results: The results, as float64 values
+    :param window: The window definition
+    :param statistics: The statistics to compute
+    :return: The start and end time of each window as datetime64[ns], under the
+             keys 'start_time' and 'end_time', and the value of each statistic
+    """
+    percentiles = {statistic: _get_percentile(statistic) for statistic in statistics if statistic not in STATISTICS}
+
+    valid = ~numpy.isnan(results)
+    times = times.view(numpy.int64)[valid]
+    results = results[valid]
+
+    windows = window.get_windows(times)
+
+    aggregates: Dict[str, numpy.ndarray] = {
+        'start_time': windows.start_times.view('datetime64[ns]'),
+        'end_time': windows.end_times.view('datetime64[ns]'),
+    }
+
+    counts = (windows.ends - windows.begins).astype(numpy.float64)
+    sums = _reduce(numpy.add, results, windows)
+
+    for statistic in statistics:
+        if statistic == 'mean':
+            aggregates[statistic] = sums / counts
+        elif statistic == 'min':
+            aggregates[statistic] = _reduce(numpy.minimum, results, windows)
+        elif statistic == 'max':
+            aggregates[statistic] = _reduce(numpy.maximum, results, windows)
+        elif statistic == 'sum':
+            aggregates[statistic] = sums
+        elif statistic == 'count':
+            aggregates[statistic] = counts
+
+    # Statistics that need every value of a window, which are expanded so
+    # that overlapping windows each get a copy of their values
+    if 'stddev' in statistics or percentiles:
+        lengths = windows.ends - windows.begins
+        offsets = numpy.cumsum(lengths) - lengths
+        expanded = WindowBounds(windows.start_times, windows.end_times, offsets, offsets + lengths)
+
+        groups = numpy.repeat(numpy.arange(len(windows)), lengths)
+        values = results[numpy.arange(len(groups)) + (windows.begins - offsets)[groups]]
+
+        if 'stddev' in statistics:
+            # Two passes avoid the cancellation of a sum of squares
+            deviations = values - (sums / counts)[groups]
+            aggregates['stddev'] = numpy.sqrt(_reduce(numpy.add, deviations * deviations, expanded) / counts)
+
+        if percentiles:
+            values = values[numpy.lexsort((values, groups))]
+
+            for statistic, percentile in percentiles.items():
+                # Linear interpolation between the closest ranks
+                positions = offsets + (lengths - 1) * (percentile / 100.0)
+                lows = numpy.floor(positions).astype(numpy.int64)
+                highs = numpy.minimum(lows + 1, expanded.ends - 1)
+                aggregates[statistic] = values[lows] + (values[highs] - values[lows]) * (positions - lows)
+
+    return aggregates
+
+
+class WindowAggregator(object):
+    """
+    Derives aggregate observations from windows of observations.
+
+    Each statistic is produced as a collection of observations of an aggregate
+    property, made by the same Sensor of the same Feature of Interest using the
+    aggregation Procedure. The phenomenon time of an aggregate observation is
+    the start of its window, and its result time is the end of its window.
+    """
+
+    def __init__(self, window: Window, statistics: List[str], procedure: Optional[Procedure] = None, property_iris: Optional[Dict[str, str]] = None):
+        """
+        Create an aggregator.
+
+        :param window: The window definition
+        :param statistics: The statistics to compute
+        :param procedure: The aggregation Procedure, used by the aggregate
+                          observations
+        :param property_iris: The IRI of the aggregate property of each
+                              statistic. Statistics without an IRI use the IRI
+                              of the raw property with the statistic appended
+                              as a path segment.
+        """
+        for statistic in statistics:
+            if statistic not in STATISTICS:
+                _get_percentile(statistic)
+
+        self._window = window
+        self._statistics = list(statistics)
+        self._procedure = procedure
+        self._property_iris = dict(property_iris or {})
+
+    @property
+    def window(self) -> Window:
+        """
+        Get the window definition.
+        """
+        return self._window
+
+    @property
+    def statistics(self) -> List[str]:
+        """
+        Get the statistics computed by the aggregator.
+        """
+        return list(self._statistics)
+
+    def get_property_iri(self, property_iri: str, statistic: str) -> str:
+        """
+        Get the IRI of the aggregate property of a statistic.
+
+        :param property_iri: The IRI of the raw property
+        :param statistic: The statistic
+        :return: The IRI of the aggregate property
+        """
+        return self._property_iris.get(statistic, f'{property_iri}/{statistic}')
+
+    def aggregate(self, collection: ObservationCollection) -> Dict[str, ObservationCollection]:
+        """
+        Aggregate a collection of observations.
+
+        :param collection: The observations, in phenomenon time order
+        :return: The aggregate observations of each statistic
+        """
+        aggregates = aggregate(collection.phenomenon_times, collection.results, self._window, self._statistics)
+
+        return {
+            statistic: ObservationCollection(
+                resource_iri='',
+                sensor_iri=collection.sensor_iri,
+                property_iri=self.get_property_iri(collection.property_iri, statistic),
+                feature_iri=collection.feature_iri,
+                procedure_iri=self._procedure.resource_iri if self._procedure is not None else '',
+                phenomenon_times=aggregates['start_time'],
+                result_times=aggregates['end_time'],
+                results=aggregates[statistic],
+            ) for statistic in self._statistics
+        }
+
+
+def _reduce(ufunc: numpy.ufunc, values: numpy.ndarray, windows: WindowBounds) -> numpy.ndarray:
+    """
+    Helper function to reduce the values of each window.
+
+    Windows may overlap, so each range is reduced by a single reduceat over the
+    interleaved begin and end indices, discarding the reductions between
+    windows.
+    """
+    if not len(windows):
+        return numpy.empty(0)
+
+    indices = numpy.empty(2 * len(windows), dtype=numpy.int64)
+    indices[0::2] = windows.begins
+    indices[1::2] = windows.ends
+
+    # Pad the values so that the last end index is in range
+    return ufunc.reduceat(numpy.append(values, 0.0), indices)[0::2]
+
+
+def _get_percentile(statistic: str) -> float:
+    """
+    Helper function to parse the percentage of a percentile statistic.
+    """
+    try:
+        if statistic.startswith('p'):
+            percentile = float(statistic[1:])
+            if 0.0 <= percentile <= 100.0:
+                return percentile
+    except ValueError:
+        pass
+
+    raise ValueError(f'Unknown statistic: {statistic}')
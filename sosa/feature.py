@@ -22,7 +22,10 @@ Reference:
 
 """
 
+from sosa.unit_converter import convert_results
+
 import dataclasses
+import numpy
 from qudt.unit import Unit
 from qudt.units.dimensionless import DimensionlessUnit
 
@@ -114,3 +117,14 @@ class Property:
         display.
         """
         return self.label
+
+    def convert_results(self, results: numpy.ndarray, unit: Unit) -> numpy.ndarray:
+        """
+        Convert results of the Property from its unit to another unit.
+
+        :param results: The results, as float64 values
+        :param unit: The unit to convert to
+        :return: A new array of converted results
+        :raises ValueError: If the unit has a different type than the Property's
+        """
+        return convert_results(results, self.unit, unit)
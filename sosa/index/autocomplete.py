@@ -0,0 +1,352 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+import bisect
+import heapq
+import numpy
+from qudt.ontology.qudt import QUDT
+from qudt.ontology.rdfs import RDFS
+import rdflib
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Set
+from typing import Tuple
+
+
+# Type definitions
+WeightFunction = Callable[[str, str, str], float]
+_Entry = Tuple[str, str, str, str]
+
+
+# The text properties that are completed
+COMPLETION_PROPERTIES: List[str] = [
+    QUDT.ABBREVIATION,
+    RDFS.LABEL,
+]
+
+# Character greater than any in a key, for finding the end of a prefix range
+_MAX_CHARACTER = chr(0x10FFFF)
+
+
+def get_default_weight(resource_iri: str, property_iri: str, text: str) -> float:
+    """
+    Weight every completion equally, so that they're ranked alphabetically.
+
+    :param resource_iri: The IRI of the entity
+    :param property_iri: The IRI of the text property
+    :param text: The text
+    :return: The weight of the completion
+    """
+    return 1.0
+
+
+def normalize(text: str) -> str:
+    """
+    Normalize a text for prefix matching, by lowercasing it and collapsing
+    runs of whitespace. A trailing space is kept, so that a query for "nitric "
+    matches "Nitric oxide" but not "Nitrica".
+
+    :param text: The text
+    :return: The normalized text
+    """
+    normalized = ' '.join(text.lower().split())
+
+    if normalized and text[-1:].isspace():
+        normalized += ' '
+
+    return normalized
+
+
+class Completion(NamedTuple):
+    """
+    An entity whose text completes a prefix.
+    """
+
+    resource_iri: str
+    """
+    The IRI of the entity.
+    """
+
+    text: str
+    """
+    The text that was completed, such as the entity's label.
+    """
+
+    weight: float
+    """
+    The weight of the completion.
+    """
+
+
+class Autocomplete(object):
+    """
+    Type-ahead completion of the labels and abbreviations of the entities of
+    a catalog, such as "Nitric oxide" and "NO".
+
+    The completions are stored as a flattened trie: a sorted array of
+    normalized texts, in which the completions of a prefix are a contiguous
+    range found by binary search. A segment tree over the weights of the
+    array finds the heaviest completion of any range in O(log n), so the top
+    k completions of a prefix take O(k log n), however many texts share the
+    prefix. Unlike a trie of nodes, the structure takes a few words per text.
+
+    Completions are grouped by the source they were loaded from, such as a
+    repo file. Reloading a source applies the difference from its previous
+    contents, splicing the changed texts into the sorted array instead of
+    sorting it again.
+    """
+
+    def __init__(self, weight_function: WeightFunction = get_default_weight):
+        """
+        Create an empty autocomplete index.
+
+        :param weight_function: Function of an entity's IRI, the text property
+                                and the text giving the weight of a completion
+        """
+        self._weight_function = weight_function
+
+        # Entries of each source
+        self._sources: Dict[str, Set[_Entry]] = dict()
+
+        # Sorted normalized texts, and the source, entity IRI, property IRI
+        # and text of each
+        self._keys: List[str] = list()
+        self._entries: List[_Entry] = list()
+
+        # Weight of each entry, and a segment tree of the index of the
+        # heaviest entry of each range
+        self._weights = numpy.array([], dtype=numpy.float64)
+        self._tree = numpy.array([], dtype=numpy.int64)
+        self._size = 0
+
+    def __len__(self) -> int:
+        """
+        Return the number of texts in the index.
+        """
+        return len(self._keys)
+
+    def load_graph(self, source: str, graph: rdflib.Graph) -> Tuple[int, int]:
+        """
+        Load the labels and abbreviations of a graph, replacing those
+        previously loaded from the same source.
+
+        :param source: The source of the graph, such as its file path
+        :param graph: The graph
+        :return: The number of texts added and removed
+        """
+        entries: Set[_Entry] = {
+            (source, str(subject), property_iri, str(obj))
+            for property_iri in COMPLETION_PROPERTIES
+            for (subject, _, obj) in graph.triples((None, rdflib.URIRef(property_iri), None))
+            if isinstance(obj, rdflib.Literal) and normalize(str(obj))
+        }
+
+        return self._update_source(source, entries)
+
+    def unload(self, source: str) -> int:
+        """
+        Remove the texts loaded from a source.
+
+        :param source: The source
+        :return: The number of texts removed
+        """
+        _, removed = self._update_source(source, set())
+
+        return removed
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Completion]:
+        """
+        Get the heaviest completions of a prefix.
+
+        :param prefix: The prefix, such as "nitr"
+        :param limit: The maximum number of completions, each of a different
+                      entity
+        :return: The completions, heaviest first, and alphabetically among
+                 completions of equal weight
+        """
+        key = normalize(prefix)
+        if not key or limit <= 0:
+            return []
+
+        start = bisect.bisect_left(self._keys, key)
+        stop = bisect.bisect_left(self._keys, key + _MAX_CHARACTER, start)
+        if start >= stop:
+            return []
+
+        completions: List[Completion] = list()
+        seen: Set[str] = set()
+
+        # Ranges of completions left, keyed by their heaviest entry
+        ranges: List[Tuple[float, int, int, int]] = list()
+        self._push_range(ranges, start, stop)
+
+        while ranges and len(completions) < limit:
+            negative_weight, index, range_start, range_stop = heapq.heappop(ranges)
+
+            _, resource_iri, _, text = self._entries[index]
+            if resource_iri not in seen:
+                seen.add(resource_iri)
+                completions.append(Completion(resource_iri=resource_iri, text=text, weight=-negative_weight))
+
+            self._push_range(ranges, range_start, index)
+            self._push_range(ranges, index + 1, range_stop)
+
+        return completions
+
+    def _push_range(self, ranges: List[Tuple[float, int, int, int]], start: int, stop: int) -> None:
+        """
+        Add a range of entries to the heap of ranges, if it isn't empty.
+        """
+        if start < stop:
+            index = self._get_heaviest(start, stop)
+            heapq.heappush(ranges, (-float(self._weights[index]), index, start, stop))
+
+    def _get_heaviest(self, start: int, stop: int) -> int:
+        """
+        Get the index of the heaviest entry of a range, preferring the first
+        of entries of equal weight.
+        """
+        weights = self._weights
+        tree = self._tree
+
+        best = -1
+
+        start += self._size
+        stop += self._size
+
+        while start < stop:
+            if start & 1:
+                best = self._choose(weights, best, int(tree[start]))
+                start += 1
+            if stop & 1:
+                stop -= 1
+                best = self._choose(weights, best, int(tree[stop]))
+            start >>= 1
+            stop >>= 1
+
+        return best
+
+    def _update_source(self, source: str, entries: Set[_Entry]) -> Tuple[int, int]:
+        """
+        Apply the difference between the new and previous entries of a source.
+
+        :return: The number of entries added and removed
+        """
+        previous = self._sources.pop(source, set())
+        if entries:
+            self._sources[source] = entries
+
+        added = entries - previous
+        removed = previous - entries
+
+        if not added and not removed:
+            return 0, 0
+
+        # Remove the entries, copying the runs of entries between them
+        positions = sorted(self._find(normalize(entry[3]), entry) for entry in removed)
+        self._keys = self._splice(self._keys, positions, [])
+        self._entries = self._splice(self._entries, positions, [])
+        weights = numpy.delete(self._weights, numpy.array(positions, dtype=numpy.int64))
+
+        # Insert the entries, in order, before the first entry that sorts
+        # after each
+        rows = sorted((normalize(entry[3]), entry) for entry in added)
+        positions = [self._find(key, entry) for key, entry in rows]
+        self._keys = self._splice(self._keys, positions, [key for key, _ in rows])
+        self._entries = self._splice(self._entries, positions, [entry for _, entry in rows])
+        self._weights = numpy.insert(
+            weights,
+            numpy.array(positions, dtype=numpy.int64),
+            numpy.array([self._weight_function(entry[1], entry[2], entry[3]) for _, entry in rows], dtype=numpy.float64),
+        )
+        self._build_tree()
+
+        return len(added), len(removed)
+
+    def _find(self, key: str, entry: _Entry) -> int:
+        """
+        Get the index of an entry in the sorted array, or the index at which
+        it's inserted to keep the array sorted.
+        """
+        return bisect.bisect_left(self._entries, entry, *self._get_key_range(key))
+
+    def _get_key_range(self, key: str) -> Tuple[int, int]:
+        """
+        Get the range of the entries of a normalized text.
+        """
+        start = bisect.bisect_left(self._keys, key)
+        stop = bisect.bisect_right(self._keys, key, start)
+
+        return start, stop
+
+    def _build_tree(self) -> None:
+        """
+        Build the segment tree of the weights, one level at a time.
+        """
+        count = len(self._weights)
+
+        size = 1
+        while size < count:
+            size *= 2
+
+        padded = numpy.full(size, -numpy.inf, dtype=numpy.float64)
+        padded[:count] = self._weights
+
+        tree = numpy.zeros(2 * size, dtype=numpy.int64)
+        tree[size:] = numpy.arange(size)
+
+        level = size
+        while level > 1:
+            left = tree[level:2 * level:2]
+            right = tree[level + 1:2 * level:2]
+            tree[level // 2:level] = numpy.where(padded[left] >= padded[right], left, right)
+            level //= 2
+
+        self._tree = tree
+        self._size = size
+
+    @staticmethod
+    def _splice(values: List[Any], positions: List[int], inserted: List[Any]) -> List[Any]:
+        """
+        Helper function to copy a list, removing the values at the sorted
+        positions, or if values are inserted, inserting each before the value
+        at its position.
+        """
+        spliced: List[Any] = list()
+        start = 0
+
+        for index, position in enumerate(positions):
+            spliced.extend(values[start:position])
+            if inserted:
+                spliced.append(inserted[index])
+                start = position
+            else:
+                start = position + 1
+
+        spliced.extend(values[start:])
+
+        return spliced
+
+    @staticmethod
+    def _choose(weights: numpy.ndarray, first: int, second: int) -> int:
+        """
+        Helper function to choose the heavier of two entries, preferring the
+        one that sorts first if they weigh the same
+        """
+        if first < 0:
+            return second
+
+        if weights[second] > weights[first] or (weights[second] == weights[first] and second < first):
+            return second
+
+        return first
@@ -0,0 +1,271 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.observation import ObservationBatch
+from sosa.observation import to_timestamp
+from sosa.system import Deployment
+
+import datetime
+import heapq
+import numpy
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+
+# Bounds of deployments without a start or end time, in nanoseconds
+_MIN_TIME = numpy.iinfo(numpy.int64).min
+_MAX_TIME = numpy.iinfo(numpy.int64).max
+
+
+class DeploymentColumns(NamedTuple):
+    """
+    The deployment of each row of an observation batch.
+    """
+
+    deployment_iris: numpy.ndarray
+    """
+    The IRI of the active Deployment of the row's Sensor, as an object array
+    of str, or empty if there is none.
+    """
+
+    platform_iris: numpy.ndarray
+    """
+    The IRI of the Platform of the Deployment, as an object array of str, or
+    empty if there is none.
+    """
+
+
+class _DeploymentTable(NamedTuple):
+    """
+    The deployments of a System, flattened into consecutive intervals that
+    each have at most one active deployment.
+    """
+
+    start_times: numpy.ndarray
+    """
+    The start time of each interval, in nanoseconds since the epoch. Each
+    interval ends when the next one starts.
+    """
+
+    deployment_iris: numpy.ndarray
+    """
+    The IRI of the Deployment active in each interval, or empty if there is
+    none.
+    """
+
+    platform_iris: numpy.ndarray
+    """
+    The IRI of the Platform of the Deployment active in each interval, or
+    empty if there is none.
+    """
+
+
+class DeploymentIndex(object):
+    """
+    An index of which Deployment each System was in over time.
+
+    The deployments of each System are flattened into a sorted table of
+    disjoint intervals, so the deployment active at a time is found with one
+    binary search, in O(log n). If deployments of a System overlap, the one
+    that started last is active. A whole observation batch is joined with its
+    deployments by one vectorized search per Sensor.
+
+    Tables are rebuilt on the next lookup after the deployments of their
+    System change.
+    """
+
+    def __init__(self):
+        """
+        Create an empty deployment index.
+        """
+        self._deployments: Dict[str, Deployment] = dict()
+
+        # Deployment IRIs of each System, in the order they were added
+        self._system_deployments: Dict[str, List[str]] = dict()
+
+        # Flattened tables of the Systems, built on demand
+        self._tables: Dict[str, _DeploymentTable] = dict()
+
+    def __len__(self) -> int:
+        """
+        Return the number of deployments in the index.
+        """
+        return len(self._deployments)
+
+    def add(self, deployment: Deployment) -> None:
+        """
+        Add a deployment, replacing any deployment with the same IRI.
+
+        :param deployment: The deployment
+        :raises ValueError: If the deployment ends before it starts
+        """
+        if deployment.start_time is not None and deployment.end_time is not None:
+            if deployment.end_time < deployment.start_time:
+                raise ValueError(f'Deployment {deployment.resource_iri} ends before it starts')
+
+        self.remove(deployment.resource_iri)
+
+        self._deployments[deployment.resource_iri] = deployment
+
+        for system_iri in deployment.system_iris:
+            self._system_deployments.setdefault(system_iri, list()).append(deployment.resource_iri)
+            self._tables.pop(system_iri, None)
+
+    def remove(self, resource_iri: str) -> bool:
+        """
+        Remove a deployment.
+
+        :param resource_iri: The IRI of the deployment
+        :return: True if the deployment was removed, False if it wasn't indexed
+        """
+        deployment = self._deployments.pop(resource_iri, None)
+        if deployment is None:
+            return False
+
+        for system_iri in deployment.system_iris:
+            self._system_deployments[system_iri].remove(resource_iri)
+            self._tables.pop(system_iri, None)
+
+        return True
+
+    def get_deployments(self, system_iri: str) -> List[Deployment]:
+        """
+        Get every deployment of a System.
+
+        :param system_iri: The IRI of the System, such as a Sensor
+        :return: The deployments, in the order they were added
+        """
+        return [self._deployments[iri] for iri in self._system_deployments.get(system_iri, [])]
+
+    def get_active(self, system_iri: str, time: datetime.datetime) -> Optional[Deployment]:
+        """
+        Get the deployment of a System that was active at a time.
+
+        :param system_iri: The IRI of the System, such as a Sensor
+        :param time: The time, such as an observation's phenomenon time
+        :return: The deployment, or None if the System wasn't deployed
+        """
+        if system_iri not in self._system_deployments:
+            return None
+
+        table = self._get_table(system_iri)
+
+        index = int(numpy.searchsorted(table.start_times, to_timestamp(time).astype(numpy.int64), side='right')) - 1
+        if index < 0 or not table.deployment_iris[index]:
+            return None
+
+        return self._deployments[table.deployment_iris[index]]
+
+    def join(self, batch: ObservationBatch) -> DeploymentColumns:
+        """
+        Get the deployment of each observation's Sensor at the observation's
+        phenomenon time, as-of join style.
+
+        :param batch: The observations
+        :return: The deployment and platform of each observation
+        """
+        deployment_iris = numpy.full(len(batch), '', dtype=object)
+        platform_iris = numpy.full(len(batch), '', dtype=object)
+
+        if not len(batch):
+            return DeploymentColumns(deployment_iris, platform_iris)
+
+        times = batch.phenomenon_times.astype('datetime64[ns]')
+        has_time = ~numpy.isnat(times)
+        times = times.view(numpy.int64)
+
+        # Group the rows by Sensor
+        sensor_iris, inverse = numpy.unique(batch.sensor_iris, return_inverse=True)
+        order = numpy.argsort(inverse, kind='stable')
+        bounds = numpy.cumsum(numpy.bincount(inverse, minlength=len(sensor_iris)))
+
+        begin = 0
+        for sensor_iri, end in zip(sensor_iris, bounds):
+            rows = order[begin:end]
+            begin = end
+
+            rows = rows[has_time[rows]]
+            if sensor_iri not in self._system_deployments or not len(rows):
+                continue
+
+            table = self._get_table(sensor_iri)
+
+            indices = numpy.searchsorted(table.start_times, times[rows], side='right') - 1
+            found = indices >= 0
+
+            deployment_iris[rows[found]] = table.deployment_iris[indices[found]]
+            platform_iris[rows[found]] = table.platform_iris[indices[found]]
+
+        return DeploymentColumns(deployment_iris, platform_iris)
+
+    def _get_table(self, system_iri: str) -> _DeploymentTable:
+        """
+        Get the flattened table of a System, building it if needed.
+        """
+        table = self._tables.get(system_iri)
+
+        if table is None:
+            table = self._build_table(self.get_deployments(system_iri))
+            self._tables[system_iri] = table
+
+        return table
+
+    @staticmethod
+    def _build_table(deployments: List[Deployment]) -> _DeploymentTable:
+        """
+        Helper function to flatten deployments into disjoint intervals
+        """
+        intervals: List[Tuple[int, int, int]] = sorted(
+            (
+                _MIN_TIME if deployment.start_time is None else int(to_timestamp(deployment.start_time).astype(numpy.int64)),
+                _MAX_TIME if deployment.end_time is None else int(to_timestamp(deployment.end_time).astype(numpy.int64)),
+                index,
+            )
+            for index, deployment in enumerate(deployments)
+        )
+
+        boundaries = sorted({time for start, end, _ in intervals for time in (start, end)})
+
+        start_times: List[int] = list()
+        active_indices: List[int] = list()
+
+        # Active deployments, latest start first
+        active: List[Tuple[int, int, int]] = list()
+
+        position = 0
+        for boundary in boundaries:
+            while position < len(intervals) and intervals[position][0] <= boundary:
+                start, end, index = intervals[position]
+                heapq.heappush(active, (-start, -index, end))
+                position += 1
+
+            # Drop the deployments that have ended
+            while active and active[0][2] <= boundary:
+                heapq.heappop(active)
+
+            active_index = -active[0][1] if active else -1
+            if not active_indices or active_indices[-1] != active_index:
+                start_times.append(boundary)
+                active_indices.append(active_index)
+
+        return _DeploymentTable(
+            start_times=numpy.array(start_times, dtype=numpy.int64),
+            deployment_iris=numpy.array(
+                [deployments[index].resource_iri if index >= 0 else '' for index in active_indices],
+                dtype=object,
+            ),
+            platform_iris=numpy.array(
+                [deployments[index].platform_iri if index >= 0 else '' for index in active_indices],
+                dtype=object,
+            ),
+        )
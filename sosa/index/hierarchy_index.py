@@ -0,0 +1,242 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.ontology.inverse_properties import get_canonical_property
+from sosa.ontology.sosa import SOSA
+from sosa.ontology.ssn import SSN
+from sosa.relationship import RelationshipStore
+
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Set
+from typing import Tuple
+
+
+# The properties relating an entity to the entities nested under it
+HIERARCHY_PROPERTIES: List[str] = [
+    SOSA.HOSTS,
+    SSN.HAS_SUBSYSTEM,
+]
+
+
+class HierarchyIndex(object):
+    """
+    The transitive closure of the hosting and subsystem hierarchies, such as
+    every Sensor anywhere under a vehicle Platform.
+
+    The ancestors and descendants of every entity are cached as sets, so
+    testing whether an entity is nested under another is O(1), and listing
+    the entities under another is linear in their number. The hierarchies are
+    usually shallow, so the sets take memory proportional to the number of
+    entities times the depth.
+
+    The index listens to its relationship store, and updates the closure of
+    the entities under an edge when the edge is added or removed. An entity
+    may have several parents. Edges that would make an entity nested under
+    itself are ignored, and are reconsidered when an edge is removed. If the
+    hierarchy is acyclic, the index is the same however it was built. While
+    it has a cycle, which of the cycle's edges is ignored depends on the order
+    the edges were added.
+    """
+
+    def __init__(self, relationships: RelationshipStore, predicate_iris: Iterable[str] = HIERARCHY_PROPERTIES):
+        """
+        Index the hierarchies of a relationship store, and keep the index up to
+        date as the store changes.
+
+        :param relationships: The relationship store
+        :param predicate_iris: The IRIs of the properties relating a parent to
+                               its children, or a child to its parent
+        """
+        self._relationships = relationships
+
+        # Canonical properties, and True if their subject is the child
+        self._predicates: List[Tuple[str, bool]] = [get_canonical_property(iri) for iri in predicate_iris]
+
+        # Closure, keyed by entity ID
+        self._ancestors: Dict[int, Set[int]] = dict()
+        self._descendants: Dict[int, Set[int]] = dict()
+
+        # Entities with a parent edge that was ignored because it would make
+        # them nested under themselves
+        self._ignored: Set[int] = set()
+
+        self._update(set(range(relationships.entity_count)))
+
+        relationships.add_listener(self._on_edge)
+
+    def close(self) -> None:
+        """
+        Stop updating the index when the relationship store changes.
+        """
+        self._relationships.remove_listener(self._on_edge)
+
+    def is_ancestor(self, ancestor_iri: str, descendant_iri: str) -> bool:
+        """
+        Check if an entity is nested under another, at any depth.
+
+        :param ancestor_iri: The IRI of the outer entity, such as a Platform
+        :param descendant_iri: The IRI of the nested entity, such as a Sensor
+        :return: True if the entity is nested under the other
+        """
+        ancestor_id = self._relationships.find_id(ancestor_iri)
+        descendant_id = self._relationships.find_id(descendant_iri)
+        if ancestor_id is None or descendant_id is None:
+            return False
+
+        return self.is_ancestor_id(ancestor_id, descendant_id)
+
+    def is_ancestor_id(self, ancestor_id: int, descendant_id: int) -> bool:
+        """
+        Check if an entity is nested under another, by ID.
+
+        :param ancestor_id: The ID of the outer entity
+        :param descendant_id: The ID of the nested entity
+        :return: True if the entity is nested under the other
+        """
+        return ancestor_id in self._ancestors.get(descendant_id, ())
+
+    def get_ancestors(self, resource_iri: str) -> List[str]:
+        """
+        Get the entities an entity is nested under, at any depth.
+
+        :param resource_iri: The IRI of the entity
+        :return: The IRIs of the outer entities, in no particular order
+        """
+        entity_id = self._relationships.find_id(resource_iri)
+        if entity_id is None:
+            return []
+
+        return [self._relationships.get_iri(ancestor_id) for ancestor_id in self._ancestors.get(entity_id, ())]
+
+    def get_descendants(self, resource_iri: str) -> List[str]:
+        """
+        Get the entities nested under an entity, at any depth.
+
+        :param resource_iri: The IRI of the entity
+        :return: The IRIs of the nested entities, in no particular order
+        """
+        entity_id = self._relationships.find_id(resource_iri)
+        if entity_id is None:
+            return []
+
+        return [self._relationships.get_iri(descendant_id) for descendant_id in self.get_descendant_ids(entity_id)]
+
+    def get_descendant_ids(self, entity_id: int) -> List[int]:
+        """
+        Get the IDs of the entities nested under an entity, at any depth.
+
+        :param entity_id: The ID of the entity
+        :return: The IDs of the nested entities, in no particular order
+        """
+        return list(self._descendants.get(entity_id, ()))
+
+    def _on_edge(self, subject_id: int, predicate_iri: str, object_id: int, added: bool) -> None:
+        """
+        Update the closure when an edge of the relationship store changes.
+        """
+        for canonical_iri, swapped in self._predicates:
+            if predicate_iri == canonical_iri:
+                parent_id, child_id = (object_id, subject_id) if swapped else (subject_id, object_id)
+
+                descendants = self._descendants.get(child_id, set())
+                if added and (parent_id == child_id or parent_id in descendants):
+                    # The edge would make the entity nested under itself
+                    self._ignored.add(child_id)
+                    return
+
+                # Only the closure of the child and its descendants changes
+                affected = {child_id} | descendants
+
+                # Ignored edges may no longer make an entity nested under itself
+                if not added:
+                    for ignored_id in self._ignored:
+                        affected.add(ignored_id)
+                        affected |= self._descendants.get(ignored_id, set())
+
+                self._update(affected)
+                return
+
+    def _get_parent_ids(self, entity_id: int) -> List[int]:
+        """
+        Get the IDs of the direct parents of an entity.
+        """
+        parent_ids: List[int] = list()
+
+        for canonical_iri, swapped in self._predicates:
+            if swapped:
+                parent_ids.extend(self._relationships.get_object_ids(entity_id, canonical_iri))
+            else:
+                parent_ids.extend(self._relationships.get_subject_ids(canonical_iri, entity_id))
+
+        return parent_ids
+
+    def _update(self, entity_ids: Set[int]) -> None:
+        """
+        Recompute the ancestors of a set of entities, which must include every
+        descendant of each entity, and update the descendants of the ancestors
+        that were gained or lost.
+
+        :param entity_ids: The IDs of the entities
+        """
+        previous = {entity_id: self._ancestors.pop(entity_id, set()) for entity_id in entity_ids}
+        self._ignored -= entity_ids
+
+        for entity_id in entity_ids:
+            self._compute_ancestors(entity_id)
+
+        for entity_id in entity_ids:
+            ancestors = self._ancestors[entity_id]
+
+            for ancestor_id in previous[entity_id] - ancestors:
+                self._descendants[ancestor_id].discard(entity_id)
+            for ancestor_id in ancestors - previous[entity_id]:
+                self._descendants.setdefault(ancestor_id, set()).add(entity_id)
+
+    def _compute_ancestors(self, entity_id: int) -> None:
+        """
+        Compute the ancestors of an entity, after those of its parents.
+
+        :param entity_id: The ID of the entity
+        """
+        stack: List[Tuple[int, bool]] = [(entity_id, False)]
+        visiting: Set[int] = set()
+
+        while stack:
+            current_id, expanded = stack.pop()
+
+            if current_id in self._ancestors:
+                continue
+
+            parent_ids = self._get_parent_ids(current_id)
+
+            if not expanded:
+                # Visit the parents whose ancestors aren't known yet first
+                visiting.add(current_id)
+                stack.append((current_id, True))
+                for parent_id in parent_ids:
+                    if parent_id not in self._ancestors and parent_id not in visiting:
+                        stack.append((parent_id, False))
+                continue
+
+            ancestors: Set[int] = set()
+            for parent_id in parent_ids:
+                parent_ancestors = self._ancestors.get(parent_id)
+                if parent_ancestors is None or current_id in parent_ancestors or parent_id == current_id:
+                    # The edge would make the entity nested under itself
+                    self._ignored.add(current_id)
+                    continue
+
+                ancestors.add(parent_id)
+                ancestors |= parent_ancestors
+
+            self._ancestors[current_id] = ancestors
+            visiting.discard(current_id)
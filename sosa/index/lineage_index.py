@@ -0,0 +1,264 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.ontology.sosa import SOSA
+from sosa.relationship import RelationshipStore
+
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+
+
+class LineageIndex(object):
+    """
+    The lineage of Samples derived from other Samples, such as a core sliced
+    into slices that are split into aliquots.
+
+    The parent of a Sample is its original sample (sosa:hasOriginalSample),
+    or else the Feature it is a sample of (sosa:isSampleOf) if that is a
+    Sample itself. A Sample is an entity that is derived from another or is
+    the original sample of another. Its root is its furthest ancestor.
+
+    A malformed lineage may contain a cycle, such as a Sample that is both a
+    sample of and the original sample of another. The root of every Sample in
+    or derived from a cycle is then the Sample in the cycle with the lowest
+    entity ID, so it doesn't depend on the order of lookups.
+
+    Parents and roots are memoized, and finding a root compresses the path to
+    it, so repeated lookups across a large lineage take near-constant time.
+    Adding a new leaf Sample only invalidates the leaf, while other changes to
+    the lineage invalidate every memoized lookup.
+    """
+
+    def __init__(self, relationships: RelationshipStore):
+        """
+        Index the Sample lineage of a relationship store, and keep the index up
+        to date as the store changes.
+
+        :param relationships: The relationship store
+        """
+        self._relationships = relationships
+
+        # Memoized parent and root of each entity, keyed by entity ID, with -1
+        # for entities that aren't Samples or have no parent
+        self._parents: Dict[int, int] = dict()
+        self._roots: Dict[int, int] = dict()
+
+        relationships.add_listener(self._on_edge)
+
+    def close(self) -> None:
+        """
+        Stop updating the index when the relationship store changes.
+        """
+        self._relationships.remove_listener(self._on_edge)
+
+    def get_root(self, sample_iri: str) -> Optional[str]:
+        """
+        Get the Sample that a Sample was ultimately derived from.
+
+        :param sample_iri: The IRI of the Sample
+        :return: The IRI of the root Sample, which is the Sample itself if it
+                 has no parent, or None if the entity isn't a Sample
+        """
+        sample_id = self._relationships.find_id(sample_iri)
+        if sample_id is None:
+            return None
+
+        root_id = self.get_root_id(sample_id)
+
+        return self._relationships.get_iri(root_id) if root_id >= 0 else None
+
+    def get_ancestors(self, sample_iri: str) -> List[str]:
+        """
+        Get the chain of Samples that a Sample was derived from.
+
+        :param sample_iri: The IRI of the Sample
+        :return: The IRIs of the ancestors, from the parent to the root
+        """
+        sample_id = self._relationships.find_id(sample_iri)
+        if sample_id is None:
+            return []
+
+        return [self._relationships.get_iri(ancestor_id) for ancestor_id in self.get_ancestor_ids(sample_id)]
+
+    def get_descendants(self, sample_iri: str) -> List[str]:
+        """
+        Get the Samples derived from a Sample, at any depth.
+
+        :param sample_iri: The IRI of the Sample
+        :return: The IRIs of the descendants, breadth first
+        """
+        sample_id = self._relationships.find_id(sample_iri)
+        if sample_id is None:
+            return []
+
+        return [self._relationships.get_iri(descendant_id) for descendant_id in self.get_descendant_ids(sample_id)]
+
+    def get_parent_id(self, entity_id: int) -> int:
+        """
+        Get the Sample that a Sample was directly derived from.
+
+        :param entity_id: The ID of the Sample
+        :return: The ID of the parent, or -1 if it has none
+        """
+        parent_id = self._parents.get(entity_id)
+
+        if parent_id is None:
+            parent_id = -1
+
+            original_ids = self._relationships.get_object_ids(entity_id, SOSA.HAS_ORIGINAL_SAMPLE)
+            if original_ids:
+                parent_id = original_ids[0]
+            else:
+                for feature_id in self._relationships.get_object_ids(entity_id, SOSA.IS_SAMPLE_OF):
+                    if self._is_sample(feature_id):
+                        parent_id = feature_id
+                        break
+
+            self._parents[entity_id] = parent_id
+
+        return parent_id
+
+    def get_root_id(self, entity_id: int) -> int:
+        """
+        Get the Sample that a Sample was ultimately derived from, by ID.
+
+        :param entity_id: The ID of the Sample
+        :return: The ID of the root, or -1 if the entity isn't a Sample
+        """
+        root_id = self._roots.get(entity_id)
+        if root_id is not None:
+            return root_id
+
+        # Walk up to a memoized root, or to the root itself
+        path: List[int] = list()
+        seen: Set[int] = set()
+
+        current_id = entity_id
+        while True:
+            root_id = self._roots.get(current_id)
+            if root_id is not None:
+                break
+
+            path.append(current_id)
+            seen.add(current_id)
+
+            parent_id = self.get_parent_id(current_id)
+            if parent_id < 0:
+                root_id = current_id if self._is_sample(current_id) else -1
+                break
+
+            if parent_id in seen:
+                root_id = min(path[path.index(parent_id):])
+                break
+
+            current_id = parent_id
+
+        # Compress the path
+        for path_id in path:
+            self._roots[path_id] = root_id
+
+        return root_id
+
+    def get_ancestor_ids(self, entity_id: int) -> List[int]:
+        """
+        Get the chain of Samples that a Sample was derived from, by ID.
+
+        :param entity_id: The ID of the Sample
+        :return: The IDs of the ancestors, from the parent to the root, or if
+                 the lineage has a cycle, until a Sample would repeat
+        """
+        ancestor_ids: List[int] = list()
+
+        parent_id = self.get_parent_id(entity_id)
+        while parent_id >= 0 and parent_id != entity_id and parent_id not in ancestor_ids:
+            ancestor_ids.append(parent_id)
+            parent_id = self.get_parent_id(parent_id)
+
+        return ancestor_ids
+
+    def get_descendant_ids(self, entity_id: int) -> List[int]:
+        """
+        Get the Samples derived from a Sample, at any depth, by ID.
+
+        :param entity_id: The ID of the Sample
+        :return: The IDs of the descendants, breadth first
+        """
+        descendant_ids: List[int] = list()
+        seen = {entity_id}
+
+        queue = [entity_id]
+        for parent_id in queue:
+            for child_id in self._get_child_ids(parent_id):
+                if child_id not in seen and self.get_parent_id(child_id) == parent_id:
+                    seen.add(child_id)
+                    descendant_ids.append(child_id)
+                    queue.append(child_id)
+
+        return descendant_ids
+
+    def _get_child_ids(self, entity_id: int) -> List[int]:
+        """
+        Get the IDs of the entities that may be derived from an entity.
+        """
+        return (
+            self._relationships.get_subject_ids(SOSA.HAS_ORIGINAL_SAMPLE, entity_id) +
+            self._relationships.get_subject_ids(SOSA.IS_SAMPLE_OF, entity_id)
+        )
+
+    def _is_sample(self, entity_id: int) -> bool:
+        """
+        Check if an entity is a Sample, by being derived from another entity
+        or being the original sample of another.
+        """
+        return bool(
+            self._relationships.get_object_ids(entity_id, SOSA.HAS_ORIGINAL_SAMPLE) or
+            self._relationships.get_object_ids(entity_id, SOSA.IS_SAMPLE_OF) or
+            self._relationships.get_subject_ids(SOSA.HAS_ORIGINAL_SAMPLE, entity_id)
+        )
+
+    def _was_sample(self, entity_id: int) -> bool:
+        """
+        Check if an entity that was just made the original sample of another
+        was already a Sample.
+        """
+        return bool(
+            self._relationships.get_object_ids(entity_id, SOSA.HAS_ORIGINAL_SAMPLE) or
+            self._relationships.get_object_ids(entity_id, SOSA.IS_SAMPLE_OF) or
+            len(self._relationships.get_subject_ids(SOSA.HAS_ORIGINAL_SAMPLE, entity_id)) > 1
+        )
+
+    def _on_edge(self, subject_id: int, predicate_iri: str, object_id: int, added: bool) -> None:
+        """
+        Invalidate the memoized lookups when the lineage changes.
+        """
+        if predicate_iri == SOSA.HAS_ORIGINAL_SAMPLE:
+            child_id, parent_id = subject_id, object_id
+        elif predicate_iri == SOSA.HAS_SAMPLE:
+            # Stored as the inverse of sosa:isSampleOf
+            child_id, parent_id = object_id, subject_id
+        else:
+            return
+
+        # A new leaf doesn't change the lineage of other entities, unless it
+        # makes its parent a Sample
+        is_new_leaf = (
+            added and
+            not self._get_child_ids(child_id) and
+            (predicate_iri != SOSA.HAS_ORIGINAL_SAMPLE or self._was_sample(parent_id))
+        )
+
+        if is_new_leaf:
+            self._parents.pop(child_id, None)
+            self._roots.pop(child_id, None)
+        else:
+            self._parents.clear()
+            self._roots.clear()
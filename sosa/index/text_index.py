@@ -0,0 +1,358 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.ontology.schema import SCHEMA
+
+import bisect
+import heapq
+import math
+from qudt.ontology.qudt import QUDT
+from qudt.ontology.rdfs import RDFS
+import rdflib
+import re
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Set
+
+
+# The text properties that are indexed, and the weight of a token in each
+TEXT_PROPERTIES: Dict[str, float] = {
+    QUDT.ABBREVIATION: 3.0,
+    RDFS.LABEL: 2.0,
+    SCHEMA.DESCRIPTION: 1.0,
+}
+
+# Factor of the score of a token that completes a prefix, relative to a token
+# that matches exactly
+_COMPLETION_FACTOR = 0.5
+
+# Typical number of distinct tokens of an entity, for estimating the cost of
+# scanning the tokens of entities
+_AVERAGE_TOKENS = 16
+
+# Pattern of the tokens of a text
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into lowercase tokens of letters and digits.
+
+    :param text: The text
+    :return: The tokens, in the order they appear
+    """
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class SearchResult(NamedTuple):
+    """
+    An entity matching a search.
+    """
+
+    resource_iri: str
+    """
+    The IRI of the entity.
+    """
+
+    score: float
+    """
+    The relevance of the entity, higher for better matches.
+    """
+
+
+class TextIndex(object):
+    """
+    An inverted index over the labels, descriptions and abbreviations of the
+    entities of a catalog, for searching them by name.
+
+    Texts are split into case-insensitive tokens, and each token maps to the
+    entities whose texts contain it. Tokens of abbreviations and labels weigh
+    more than tokens of descriptions, and a token weighs as much as its most
+    important occurrence in an entity.
+
+    An entity matches a query if it matches every token of the query, and the
+    last token also matches longer tokens it is a prefix of, so that results
+    can be shown as the query is typed. Matches are ranked by the weight of
+    the matched tokens, scaled by their inverse document frequency so that
+    rare tokens count more than common ones.
+
+    The sorted vocabulary for prefix queries is rebuilt on the first search
+    after tokens are added.
+    """
+
+    def __init__(self):
+        """
+        Create an empty text index.
+        """
+        # Entity IRIs by ID, and IDs by IRI
+        self._iris: List[str] = list()
+        self._ids: Dict[str, int] = dict()
+
+        # Postings of each token: the weight of the token in each entity
+        self._postings: Dict[str, Dict[int, float]] = dict()
+
+        # Tokens of each entity, for removing it
+        self._tokens: Dict[int, Set[str]] = dict()
+
+        # Sorted tokens, or None if tokens were added since they were sorted
+        self._vocabulary: Optional[List[str]] = list()
+
+    def __len__(self) -> int:
+        """
+        Return the number of entities in the index.
+        """
+        return len(self._tokens)
+
+    def add(self, resource_iri: str, property_iri: str, text: str) -> None:
+        """
+        Index a text of an entity.
+
+        :param resource_iri: The IRI of the entity
+        :param property_iri: The IRI of the text property, such as rdfs:label
+        :param text: The text
+        :raises ValueError: If the property isn't indexed
+        """
+        weight = TEXT_PROPERTIES.get(property_iri)
+        if weight is None:
+            raise ValueError(f'Unsupported text property: {property_iri}')
+
+        entity_id = self._ids.get(resource_iri)
+        if entity_id is None:
+            entity_id = len(self._iris)
+            self._iris.append(resource_iri)
+            self._ids[resource_iri] = entity_id
+
+        entity_tokens = self._tokens.setdefault(entity_id, set())
+
+        for token in tokenize(text):
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = dict()
+                self._vocabulary = None
+
+            # Repeating a token in a long description doesn't outweigh a label
+            postings[entity_id] = max(postings.get(entity_id, 0.0), weight)
+            entity_tokens.add(token)
+
+    def add_graph(self, graph: rdflib.Graph) -> int:
+        """
+        Index the texts of the entities of a graph.
+
+        :param graph: The graph
+        :return: The number of texts indexed
+        """
+        count = 0
+
+        for (subject, predicate, obj) in graph:
+            if str(predicate) in TEXT_PROPERTIES and isinstance(obj, rdflib.Literal):
+                self.add(str(subject), str(predicate), str(obj))
+                count += 1
+
+        return count
+
+    def remove(self, resource_iri: str) -> bool:
+        """
+        Remove every text of an entity.
+
+        :param resource_iri: The IRI of the entity
+        :return: True if the entity was removed, False if it wasn't indexed
+        """
+        entity_id = self._ids.get(resource_iri)
+        if entity_id is None or entity_id not in self._tokens:
+            return False
+
+        for token in self._tokens.pop(entity_id):
+            postings = self._postings[token]
+            del postings[entity_id]
+
+            if not postings:
+                del self._postings[token]
+                self._vocabulary = None
+
+        return True
+
+    def search(self, query: str, limit: int = 10, prefix: bool = True) -> List[SearchResult]:
+        """
+        Find the entities whose texts match a query.
+
+        :param query: The query, such as "nitric ox"
+        :param limit: The maximum number of results
+        :param prefix: True to also match the last token of the query as the
+                       prefix of longer tokens
+        :return: The best matches, most relevant first
+        """
+        tokens = tokenize(query)
+        if not tokens or limit <= 0:
+            return []
+
+        exact_tokens = tokens[:-1] if prefix else tokens
+        prefix_token = tokens[-1] if prefix else None
+
+        if exact_tokens:
+            totals = self._match_exact(exact_tokens)
+            if prefix_token is not None:
+                totals = self._match_prefix(totals, prefix_token)
+        else:
+            totals = self._match_completions(prefix_token, limit)
+
+        # Ties are ranked in the order the entities were indexed
+        best = heapq.nlargest(limit, totals.items(), key=lambda item: (item[1], -item[0]))
+
+        return [SearchResult(resource_iri=self._iris[entity_id], score=score) for entity_id, score in best]
+
+    def _match_exact(self, tokens: List[str]) -> Dict[int, float]:
+        """
+        Score the entities that contain every token.
+        """
+        postings_list: List[Dict[int, float]] = list()
+
+        for token in set(tokens):
+            postings = self._postings.get(token)
+            if postings is None:
+                return dict()
+            postings_list.append(postings)
+
+        # Intersect, starting from the rarest token
+        postings_list.sort(key=len)
+        idfs = [self._get_idf(len(postings)) for postings in postings_list]
+
+        entity_ids = postings_list[0].keys()
+        for postings in postings_list[1:]:
+            entity_ids = entity_ids & postings.keys()
+
+        return {
+            entity_id: sum(postings[entity_id] * idf for postings, idf in zip(postings_list, idfs))
+            for entity_id in entity_ids
+        }
+
+    def _match_prefix(self, totals: Dict[int, float], prefix: str) -> Dict[int, float]:
+        """
+        Add the score of the best token starting with a prefix to the scores
+        of entities, dropping the entities without such a token.
+        """
+        completions = self._get_completions(prefix)
+
+        # Intersect with the postings of the completions if they're fewer than
+        # the tokens of the entities
+        if sum(len(self._postings[token]) for token in completions) < len(totals) * _AVERAGE_TOKENS:
+            scores: Dict[int, float] = dict()
+
+            for token in completions:
+                factor = self._get_idf(len(self._postings[token])) * (1.0 if token == prefix else _COMPLETION_FACTOR)
+                for entity_id in self._postings[token].keys() & totals.keys():
+                    scores[entity_id] = max(scores.get(entity_id, 0.0), self._postings[token][entity_id] * factor)
+
+            return {entity_id: totals[entity_id] + score for entity_id, score in scores.items()}
+
+        matched: Dict[int, float] = dict()
+
+        for entity_id, total in totals.items():
+            best = 0.0
+
+            for token in self._tokens[entity_id]:
+                if token.startswith(prefix):
+                    best = max(best, self._get_score(token, prefix, entity_id))
+
+            if best > 0.0:
+                matched[entity_id] = total + best
+
+        return matched
+
+    def _match_completions(self, prefix: str, limit: int) -> Dict[int, float]:
+        """
+        Score the entities that contain a token starting with a prefix.
+
+        Completions are visited from the rarest, which scores highest, and the
+        search stops when no remaining completion can score high enough to
+        enter the best results. Short prefixes of common tokens would
+        otherwise visit most of the index.
+        """
+        completions = sorted(self._get_completions(prefix), key=lambda token: len(self._postings[token]))
+
+        # Exact matches rank above completions, so they're visited first
+        if prefix in self._postings:
+            completions.remove(prefix)
+            completions.insert(0, prefix)
+
+        max_weight = max(TEXT_PROPERTIES.values())
+
+        scores: Dict[int, float] = dict()
+
+        # The lowest score of the best results so far, or 0.0 if there aren't
+        # enough results. Scores only grow, so a stale threshold is a safe
+        # underestimate, and it's refreshed once enough postings were visited
+        # to amortize the cost.
+        threshold = 0.0
+        visited = 0
+
+        for token in completions:
+            postings = self._postings[token]
+
+            factor = self._get_idf(len(postings)) * (1.0 if token == prefix else _COMPLETION_FACTOR)
+
+            # The best score of this completion, and of every remaining one
+            bound = max_weight * factor
+
+            if visited >= len(scores) >= limit:
+                threshold = heapq.nlargest(limit, scores.values())[-1]
+                visited = 0
+
+            if threshold >= bound:
+                break
+
+            if not scores:
+                scores = {entity_id: weight * factor for entity_id, weight in postings.items()}
+            else:
+                for entity_id, weight in postings.items():
+                    score = weight * factor
+                    if score > scores.get(entity_id, 0.0):
+                        scores[entity_id] = score
+
+            visited += len(postings)
+
+        return scores
+
+    def _get_score(self, token: str, query_token: str, entity_id: int) -> float:
+        """
+        Get the score of an entity for a token matching a query token.
+        """
+        postings = self._postings[token]
+        score = postings[entity_id] * self._get_idf(len(postings))
+
+        # Exact matches rank above completions
+        if token != query_token:
+            score *= _COMPLETION_FACTOR
+
+        return score
+
+    def _get_idf(self, document_count: int) -> float:
+        """
+        Get the inverse document frequency of a token in a number of entities.
+        """
+        return math.log(1.0 + len(self._tokens) / document_count)
+
+    def _get_completions(self, prefix: str) -> List[str]:
+        """
+        Get the indexed tokens that start with a prefix.
+        """
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+
+        start = bisect.bisect_left(self._vocabulary, prefix)
+
+        completions: List[str] = list()
+        for token in self._vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            completions.append(token)
+
+        return completions
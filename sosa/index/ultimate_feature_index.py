@@ -0,0 +1,301 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.index.lineage_index import LineageIndex
+from sosa.observation import ObservationBatch
+from sosa.ontology.sosa import SOSA
+from sosa.relationship import RelationshipStore
+
+import numpy
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+
+
+# The properties that the ultimate feature of interest depends on, in their
+# canonical direction
+_FEATURE_PROPERTIES: Set[str] = {
+    SOSA.HAS_SAMPLED_FEATURE,
+    SOSA.HAS_ULTIMATE_FEATURE_OF_INTEREST,
+    SOSA.HAS_FEATURE_OF_INTEREST,
+}
+
+
+class UltimateFeatureIndex(object):
+    """
+    A materialized mapping from every Sample and Observation to its ultimate
+    feature of interest (sosa:hasUltimateFeatureOfInterest), so that it
+    doesn't take a walk up the chain of sosa:isSampleOf relations per
+    observation.
+
+    The ultimate feature of interest of an entity is, in order of precedence:
+
+        * The feature it is explicitly related to by
+          sosa:hasUltimateFeatureOfInterest
+        * For a Sample, its sosa:hasSampledFeature, else the ultimate feature
+          of its parent Sample, else the Feature it is a sample of
+        * For an Observation, the ultimate feature of its Feature of Interest
+          if that is a Sample, else the Feature of Interest itself
+
+    The mapping is kept up to date as the relationship store changes. Only the
+    lineage tree of the Samples under a changed edge, and the Observations of
+    those Samples, are recomputed, so adding a Sample takes time proportional
+    to the number of its relatives instead of the size of the store.
+    """
+
+    def __init__(self, relationships: RelationshipStore):
+        """
+        Index the ultimate features of interest of a relationship store, and
+        keep the index up to date as the store changes.
+
+        :param relationships: The relationship store
+        """
+        self._relationships = relationships
+
+        # Created before the listener is registered, so the lineage is updated
+        # before the mapping
+        self._lineage = LineageIndex(relationships)
+
+        # Ultimate feature of each Sample and Observation, keyed by entity ID,
+        # with -1 for entities whose ultimate feature is unknown
+        self._features: Dict[int, int] = dict()
+
+        self._update(range(relationships.entity_count))
+
+        relationships.add_listener(self._on_edge)
+
+    @property
+    def lineage(self) -> LineageIndex:
+        """
+        Return the lineage index that the mapping is derived from.
+        """
+        return self._lineage
+
+    def close(self) -> None:
+        """
+        Stop updating the index when the relationship store changes.
+        """
+        self._relationships.remove_listener(self._on_edge)
+        self._lineage.close()
+
+    def get_ultimate_feature(self, resource_iri: str) -> Optional[str]:
+        """
+        Get the ultimate feature of interest of a Sample or Observation.
+
+        :param resource_iri: The IRI of the Sample or Observation
+        :return: The IRI of the ultimate feature of interest, or None if it is
+                 unknown
+        """
+        entity_id = self._relationships.find_id(resource_iri)
+        if entity_id is None:
+            return None
+
+        feature_id = self._features.get(entity_id, -1)
+
+        return self._relationships.get_iri(feature_id) if feature_id >= 0 else None
+
+    def get_ultimate_feature_id(self, entity_id: int) -> int:
+        """
+        Get the ultimate feature of interest of a Sample or Observation, by ID.
+
+        :param entity_id: The ID of the Sample or Observation
+        :return: The ID of the ultimate feature of interest, or -1 if it is
+                 unknown
+        """
+        return self._features.get(entity_id, -1)
+
+    def lookup(self, feature_iris: numpy.ndarray) -> numpy.ndarray:
+        """
+        Get the ultimate feature of interest of a column of features of
+        interest.
+
+        Each distinct feature is looked up once. Features that aren't Samples
+        are their own ultimate feature.
+
+        :param feature_iris: The IRIs of the features of interest, as an object
+                             array of str
+        :return: The IRIs of the ultimate features, as an object array of str,
+                 with empty IRIs for Samples whose ultimate feature is unknown
+        """
+        if not len(feature_iris):
+            return numpy.array([], dtype=object)
+
+        unique_iris, inverse = numpy.unique(feature_iris, return_inverse=True)
+
+        ultimate_iris = numpy.array(
+            [self._get_feature(feature_iri) for feature_iri in unique_iris],
+            dtype=object,
+        )
+
+        return ultimate_iris[inverse]
+
+    def join(self, batch: ObservationBatch) -> numpy.ndarray:
+        """
+        Get the ultimate feature of interest of each observation of a batch.
+
+        Observations are resolved by their Feature of Interest, unless a named
+        member has an ultimate feature of its own.
+
+        :param batch: The observations
+        :return: The IRIs of the ultimate features, as an object array of str,
+                 with empty IRIs where the ultimate feature is unknown
+        """
+        ultimate_iris = self.lookup(batch.feature_iris)
+
+        if len(batch.member_iris) and len(batch):
+            member_iris, inverse = numpy.unique(batch.member_iris, return_inverse=True)
+
+            overrides = numpy.array([self._get_member_feature(member_iri) for member_iri in member_iris], dtype=object)
+            overrides = overrides[inverse]
+
+            has_override = overrides != ''
+            ultimate_iris[has_override] = overrides[has_override]
+
+        return ultimate_iris
+
+    def _get_feature(self, feature_iri: str) -> str:
+        """
+        Get the ultimate feature of a feature of interest, or an empty IRI if
+        it is a Sample whose ultimate feature is unknown.
+        """
+        feature_id = self._relationships.find_id(feature_iri)
+        if feature_id is None or feature_id not in self._features:
+            return feature_iri
+
+        ultimate_id = self._features[feature_id]
+
+        return self._relationships.get_iri(ultimate_id) if ultimate_id >= 0 else ''
+
+    def _get_member_feature(self, member_iri: str) -> str:
+        """
+        Get the explicit ultimate feature of a named observation, or an empty
+        IRI if it has none.
+        """
+        member_id = self._relationships.find_id(member_iri)
+        if member_id is None:
+            return ''
+
+        ultimate_ids = self._relationships.get_object_ids(member_id, SOSA.HAS_ULTIMATE_FEATURE_OF_INTEREST)
+
+        return self._relationships.get_iri(ultimate_ids[0]) if ultimate_ids else ''
+
+    def _on_edge(self, subject_id: int, predicate_iri: str, object_id: int, added: bool) -> None:
+        """
+        Recompute the mapping of the entities affected by a changed edge.
+        """
+        affected: Set[int] = set()
+
+        if predicate_iri in (SOSA.HAS_ORIGINAL_SAMPLE, SOSA.HAS_SAMPLE):
+            # Either end may have become or stopped being a Sample, changing
+            # the lineage of its other relatives, including the entities
+            # derived from it that are no longer in its tree
+            for entity_id in (subject_id, object_id):
+                affected.add(entity_id)
+                affected |= self._get_tree(entity_id)
+                for child_id in self._get_child_ids(entity_id):
+                    affected |= self._get_tree(child_id)
+        elif predicate_iri in _FEATURE_PROPERTIES:
+            affected.add(subject_id)
+            affected |= set(self._lineage.get_descendant_ids(subject_id))
+        else:
+            return
+
+        # Observations of the affected Samples
+        for sample_id in list(affected):
+            affected.update(self._relationships.get_subject_ids(SOSA.HAS_FEATURE_OF_INTEREST, sample_id))
+
+        self._update(affected)
+
+    def _get_child_ids(self, entity_id: int) -> List[int]:
+        """
+        Get the IDs of the entities that may be derived from an entity.
+        """
+        return (
+            self._relationships.get_subject_ids(SOSA.HAS_ORIGINAL_SAMPLE, entity_id) +
+            self._relationships.get_subject_ids(SOSA.IS_SAMPLE_OF, entity_id)
+        )
+
+    def _get_tree(self, entity_id: int) -> Set[int]:
+        """
+        Get the IDs of every Sample in the lineage tree of an entity.
+        """
+        root_id = self._lineage.get_root_id(entity_id)
+        if root_id < 0:
+            return {entity_id}
+
+        return {root_id, *self._lineage.get_descendant_ids(root_id)}
+
+    def _update(self, entity_ids: Iterable[int]) -> None:
+        """
+        Recompute the ultimate feature of a set of entities.
+
+        :param entity_ids: The IDs of the entities, which must include every
+                           relative whose ultimate feature depends on them
+        """
+        entity_ids = list(entity_ids)
+
+        for entity_id in entity_ids:
+            self._features.pop(entity_id, None)
+
+        for entity_id in entity_ids:
+            self._compute_feature(entity_id)
+
+    def _compute_feature(self, entity_id: int) -> None:
+        """
+        Compute the ultimate feature of an entity, after those of its
+        ancestors, if it is a Sample or Observation.
+
+        :param entity_id: The ID of the entity
+        """
+        if entity_id in self._features:
+            return
+
+        relationships = self._relationships
+
+        if self._lineage.get_root_id(entity_id) >= 0:
+            # Resolve the ancestors first, from the root down
+            for sample_id in [*reversed(self._lineage.get_ancestor_ids(entity_id)), entity_id]:
+                if sample_id in self._features:
+                    continue
+
+                feature_ids = (
+                    relationships.get_object_ids(sample_id, SOSA.HAS_ULTIMATE_FEATURE_OF_INTEREST) or
+                    relationships.get_object_ids(sample_id, SOSA.HAS_SAMPLED_FEATURE)
+                )
+
+                parent_id = self._lineage.get_parent_id(sample_id)
+                if feature_ids:
+                    feature_id = feature_ids[0]
+                elif parent_id >= 0:
+                    feature_id = self._features.get(parent_id, -1)
+                else:
+                    sampled_ids = relationships.get_object_ids(sample_id, SOSA.IS_SAMPLE_OF)
+                    feature_id = sampled_ids[0] if sampled_ids else -1
+
+                self._features[sample_id] = feature_id
+
+            return
+
+        feature_ids = relationships.get_object_ids(entity_id, SOSA.HAS_ULTIMATE_FEATURE_OF_INTEREST)
+        if feature_ids:
+            self._features[entity_id] = feature_ids[0]
+            return
+
+        foi_ids = relationships.get_object_ids(entity_id, SOSA.HAS_FEATURE_OF_INTEREST)
+        if foi_ids:
+            foi_id = foi_ids[0]
+
+            if self._lineage.get_root_id(foi_id) >= 0:
+                self._compute_feature(foi_id)
+                self._features[entity_id] = self._features[foi_id]
+            else:
+                self._features[entity_id] = foi_id
@@ -0,0 +1,401 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.feature import FeatureOfInterest
+from sosa.feature import Property
+from sosa.ingest.deduplicator import Deduplicator
+from sosa.observation import Observation
+from sosa.observation import ObservationBatch
+from sosa.ontology.ontology_factory import OntologyFactory
+from sosa.storage.observation_store import ObservationStore
+
+import asyncio
+import concurrent.futures
+import datetime
+import numpy
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+
+# Maximum number of observations accepted but not yet stored
+DEFAULT_MAX_IN_FLIGHT = 65536
+
+# Number of pending observations that triggers a flush
+DEFAULT_FLUSH_SIZE = 4096
+
+# Maximum time an observation waits before being flushed
+DEFAULT_FLUSH_INTERVAL = datetime.timedelta(seconds=1)
+
+
+class AsyncObservationIngest(object):
+    """
+    An asyncio interface for ingesting observations into a store.
+
+    Observations are buffered and flushed to the store as batches, when enough
+    are pending or when the flush interval elapses. The store and the catalog
+    are blocking, so writes and lookups run in a thread pool rather than on
+    the event loop.
+
+    Backpressure is applied by bounding the number of observations in flight,
+    meaning accepted but not yet stored. Producers wait in put() while the
+    bound is reached.
+
+    If the store raises an error, the error is raised to the caller of the
+    flush that failed, or for a background flush, to the next caller of
+    put(), flush() or close(). It is raised once, and later observations are
+    accepted again. The observations that weren't stored are kept until they
+    are taken with take_unwritten().
+
+    Usage:
+
+        async with AsyncObservationIngest(store) as ingest:
+            await ingest.put(observation)
+    """
+
+    def __init__(
+            self,
+            store: ObservationStore,
+            max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+            flush_size: int = DEFAULT_FLUSH_SIZE,
+            flush_interval: datetime.timedelta = DEFAULT_FLUSH_INTERVAL,
+            executor: Optional[concurrent.futures.Executor] = None,
+            deduplicator: Optional[Deduplicator] = None,
+    ):
+        """
+        Create an ingest interface. It must be started from a running event
+        loop.
+
+        :param store: The store receiving the observations
+        :param max_in_flight: The maximum number of observations in flight
+        :param flush_size: The number of pending observations that triggers a
+                           flush
+        :param flush_interval: The maximum time observations are pending
+        :param executor: The thread pool for blocking calls, or None to create
+                         one owned by the ingest interface
+        :param deduplicator: The deduplicator dropping observations already
+                             ingested, or None to store every observation
+        """
+        self._store = store
+        self._max_in_flight = max_in_flight
+        self._flush_size = flush_size
+        self._flush_interval = flush_interval.total_seconds()
+        self._deduplicator = deduplicator
+
+        self._executor = executor if executor is not None else concurrent.futures.ThreadPoolExecutor(thread_name_prefix='sosa-ingest')
+        self._owns_executor = executor is None
+
+        # Observations accepted and not yet handed to the store
+        self._pending: List[ObservationBatch] = list()
+        self._pending_observations: List[Observation] = list()
+        self._pending_count = 0
+
+        self._in_flight = 0
+
+        # Set up when started, as they must be created on the event loop
+        self._condition: Optional[asyncio.Condition] = None
+        self._flush_event: Optional[asyncio.Event] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # The first error raised by the store in a background flush, until it
+        # is reported to a caller
+        self._error: Optional[BaseException] = None
+
+        # Observations the store failed to store, until they are taken
+        self._unwritten: List[ObservationBatch] = list()
+
+        # Catalog lookups, cached by IRI
+        self._properties: Dict[str, Property] = dict()
+        self._features: Dict[str, FeatureOfInterest] = dict()
+
+    async def __aenter__(self) -> 'AsyncObservationIngest':
+        self.start()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Get the number of observations accepted but not yet stored.
+        """
+        return self._in_flight
+
+    def start(self) -> None:
+        """
+        Start flushing in the background.
+        """
+        if self._task is not None:
+            return
+
+        self._condition = asyncio.Condition()
+        self._flush_event = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def put(self, observation: Observation) -> None:
+        """
+        Accept an observation, waiting while too many are in flight.
+
+        :param observation: The observation
+        :raises ValueError: If the observation has no phenomenon time
+        """
+        if observation.phenomenon_time is None:
+            raise ValueError(f'Observation {observation.resource_iri} has no phenomenon time')
+
+        await self._reserve(1)
+
+        self._pending_observations.append(observation)
+        self._add_pending(1)
+
+    async def put_batch(self, batch: ObservationBatch) -> None:
+        """
+        Accept a batch of observations, waiting while too many are in flight.
+
+        A batch larger than the in-flight bound is accepted once nothing else
+        is in flight.
+
+        :param batch: The observations
+        """
+        if not len(batch):
+            return
+
+        await self._reserve(len(batch))
+
+        self._pending.append(batch)
+        self._add_pending(len(batch))
+
+    async def flush(self) -> None:
+        """
+        Store the pending observations and wait until they are durable.
+
+        :raises Exception: The error raised by the store, if this flush or a
+                           previous background flush failed
+        """
+        error = await self._write()
+        if error is not None:
+            raise error
+
+        self._check_error()
+
+    async def close(self) -> None:
+        """
+        Flush the pending observations and stop flushing in the background.
+
+        The store isn't closed.
+
+        :raises Exception: The error raised by the store, if a write failed
+        """
+        if self._task is not None:
+            self._closing = True
+            self._flush_event.set()
+
+            await self._task
+            self._task = None
+
+            # Observations accepted while the last flush ran
+            error = await self._write()
+            if error is not None and self._error is None:
+                self._error = error
+
+        if self._owns_executor:
+            self._executor.shutdown()
+
+        self._check_error()
+
+    def take_unwritten(self) -> ObservationBatch:
+        """
+        Take the observations that weren't stored because the store raised an
+        error, so that they can be repaired or stored elsewhere.
+
+        The observations were already seen by the deduplicator, if any, so
+        putting them again drops them as duplicates.
+
+        :return: The observations, which are no longer kept
+        """
+        batches = self._unwritten
+        self._unwritten = list()
+
+        return ObservationBatch.concatenate(batches)
+
+    async def get_properties(self, resource_iris: Iterable[str]) -> Dict[str, Property]:
+        """
+        Look up Properties in the catalog without blocking the event loop.
+
+        :param resource_iris: The properties' resource IRIs
+        :return: The properties, keyed by resource IRI
+        """
+        resource_iris = set(resource_iris)
+
+        unresolved = [resource_iri for resource_iri in resource_iris if resource_iri not in self._properties]
+        if unresolved:
+            loop = asyncio.get_running_loop()
+            self._properties.update(await loop.run_in_executor(self._executor, OntologyFactory.get_properties, unresolved))
+
+        return {resource_iri: self._properties[resource_iri] for resource_iri in resource_iris}
+
+    async def get_features_of_interest(self, resource_iris: Iterable[str]) -> Dict[str, FeatureOfInterest]:
+        """
+        Look up Features of Interest in the catalog without blocking the event
+        loop.
+
+        :param resource_iris: The features' resource IRIs
+        :return: The features, keyed by resource IRI
+        """
+        resource_iris = set(resource_iris)
+
+        unresolved = [resource_iri for resource_iri in resource_iris if resource_iri not in self._features]
+        if unresolved:
+            loop = asyncio.get_running_loop()
+            self._features.update(await loop.run_in_executor(self._executor, OntologyFactory.get_features_of_interest, unresolved))
+
+        return {resource_iri: self._features[resource_iri] for resource_iri in resource_iris}
+
+    async def _reserve(self, count: int) -> None:
+        """
+        Wait until observations can be accepted, and count them as in flight.
+        """
+        if self._condition is None:
+            raise ValueError('Ingest has not been started')
+
+        self._check_error()
+
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight == 0 or self._in_flight + count <= self._max_in_flight)
+
+            self._in_flight += count
+
+    def _add_pending(self, count: int) -> None:
+        """
+        Count accepted observations as pending, and flush if enough are.
+        """
+        self._pending_count += count
+
+        if self._pending_count >= self._flush_size:
+            self._flush_event.set()
+
+    async def _run(self) -> None:
+        """
+        Flush pending observations by size or time.
+        """
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self._flush_event.clear()
+
+            error = await self._write()
+            if error is not None and self._error is None:
+                self._error = error
+
+    async def _write(self) -> Optional[BaseException]:
+        """
+        Hand the pending observations to the store.
+
+        :return: The error raised by the store, or None if the observations
+                 were stored
+        """
+        if self._write_lock is None:
+            return None
+
+        # Writes are serialized so that observations are stored in order
+        async with self._write_lock:
+            batches = self._pending
+            if self._pending_observations:
+                batches.append(ObservationBatch.from_observations(self._pending_observations))
+
+            count = self._pending_count
+
+            self._pending = list()
+            self._pending_observations = list()
+            self._pending_count = 0
+
+            if not count:
+                return None
+
+            try:
+                loop = asyncio.get_running_loop()
+                unwritten, error = await loop.run_in_executor(self._executor, self._store_batch, ObservationBatch.concatenate(batches))
+            except Exception as store_error:
+                unwritten, error = None, store_error
+            finally:
+                async with self._condition:
+                    self._in_flight -= count
+                    self._condition.notify_all()
+
+            if unwritten is not None and len(unwritten):
+                self._unwritten.append(unwritten)
+
+            return error
+
+    def _store_batch(self, batch: ObservationBatch) -> Tuple[Optional[ObservationBatch], Optional[Exception]]:
+        """
+        Store a batch and make it durable. Runs in the thread pool.
+
+        If the store rejects a series, the series already stored are still
+        made durable.
+
+        :return: The observations that weren't stored and the error raised by
+                 the store, or None for both if the batch was stored
+        """
+        if self._deduplicator is not None:
+            batch = self._deduplicator.filter(batch)
+
+        stored: Set[Tuple[str, str, str, str]] = set()
+
+        for collection in batch.collections():
+            try:
+                self._store.extend(collection)
+            except Exception as error:
+                try:
+                    self._store.commit()
+                except Exception:
+                    # The first error is reported
+                    pass
+
+                return self._get_unwritten(batch, stored), error
+
+            stored.add((collection.sensor_iri, collection.property_iri, collection.feature_iri, collection.procedure_iri))
+
+        self._store.commit()
+
+        return None, None
+
+    @staticmethod
+    def _get_unwritten(batch: ObservationBatch, stored: Set[Tuple[str, str, str, str]]) -> ObservationBatch:
+        """
+        Helper function to select the observations of a batch that don't
+        belong to a stored series.
+        """
+        unwritten = numpy.array([
+            series not in stored
+            for series in zip(batch.sensor_iris, batch.property_iris, batch.feature_iris, batch.procedure_iris)
+        ], dtype=bool)
+
+        return batch.take(unwritten)
+
+    def _check_error(self) -> None:
+        """
+        Raise the error of a background flush that hasn't been reported yet,
+        if any.
+        """
+        error = self._error
+        if error is not None:
+            self._error = None
+            raise error
@@ -0,0 +1,107 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+import dataclasses
+from qudt.unit import Unit
+from typing import List
+from typing import Optional
+
+
+@dataclasses.dataclass
+class ColumnMapping:
+    """
+    A declarative mapping from the columns of sensor readings to observations.
+
+    The Sensor, Property and Feature of Interest IRIs are each given by a
+    template formatted with the value of a column, such as
+    'http://example.org/sensor/{}'. If no column is mapped, the template is
+    used as the IRI of every observation.
+    """
+
+    phenomenon_time_column: str
+    """
+    The column holding the phenomenon time.
+    """
+
+    result_column: str
+    """
+    The column holding the simple result. Empty values are missing results.
+    """
+
+    result_time_column: str = dataclasses.field(default_factory=str)
+    """
+    The column holding the result time, or empty if readings have no result
+    time.
+    """
+
+    sensor_column: str = dataclasses.field(default_factory=str)
+    """
+    The column identifying the Sensor, or empty to use a single Sensor.
+    """
+
+    sensor_iri: str = '{}'
+    """
+    The IRI template of the Sensor.
+    """
+
+    property_column: str = dataclasses.field(default_factory=str)
+    """
+    The column identifying the observed property, or empty to use a single
+    property.
+    """
+
+    property_iri: str = '{}'
+    """
+    The IRI template of the observed property.
+    """
+
+    feature_column: str = dataclasses.field(default_factory=str)
+    """
+    The column identifying the Feature of Interest, or empty to use a single
+    feature.
+    """
+
+    feature_iri: str = '{}'
+    """
+    The IRI template of the Feature of Interest.
+    """
+
+    procedure_iri: str = dataclasses.field(default_factory=str)
+    """
+    The IRI of the Procedure of every observation.
+    """
+
+    time_unit: str = dataclasses.field(default_factory=str)
+    """
+    The unit of numeric times since the epoch, as a NumPy datetime unit such as
+    's' or 'ms', or empty if times are ISO 8601 strings.
+    """
+
+    result_unit: Optional[Unit] = None
+    """
+    The unit of the results, or None if results are already in the unit of
+    their property. Results are converted to the unit of their property, as
+    given by the ontology.
+    """
+
+    def get_columns(self) -> List[str]:
+        """
+        Get the columns read by the mapping.
+
+        :return: The names of the mapped columns
+        """
+        return [column for column in (
+            self.phenomenon_time_column,
+            self.result_column,
+            self.result_time_column,
+            self.sensor_column,
+            self.property_column,
+            self.feature_column,
+        ) if column]
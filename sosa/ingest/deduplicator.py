@@ -0,0 +1,255 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.observation import ObservationBatch
+from sosa.observation import from_timestamp
+from sosa.observation import to_nanoseconds
+from sosa.storage.observation_store import ObservationStore
+
+import datetime
+import hashlib
+import numpy
+from typing import Dict
+from typing import List
+from typing import Optional
+
+
+# Default span of phenomenon time in which duplicates are detected in memory
+DEFAULT_DEDUP_WINDOW = datetime.timedelta(minutes=10)
+
+# Number of buckets the window is divided into
+_BUCKET_COUNT = 16
+
+
+class Deduplicator(object):
+    """
+    Drops observations that were already ingested, such as when an upstream
+    retries a delivery.
+
+    Observations are identified by their IRI, or for anonymous observations,
+    by their Sensor, Property, Feature of Interest, phenomenon time and
+    result. Each identity is reduced to a 64-bit fingerprint.
+
+    Fingerprints are held in buckets of phenomenon time, and a duplicate has
+    the same phenomenon time as the original, so only one bucket is searched.
+    Each bucket is a few sorted runs of geometrically decreasing size, so
+    adding a small batch doesn't copy the whole bucket.
+    Buckets older than the window before the latest phenomenon time are
+    discarded, so memory is bounded by the observation rate and the window
+    rather than the length of the stream.
+
+    Observations older than the window can optionally be checked against the
+    store, which compares their phenomenon times and results exactly. The
+    store doesn't keep observation IRIs, so this check is by content.
+    """
+
+    def __init__(self, window: datetime.timedelta = DEFAULT_DEDUP_WINDOW, store: Optional[ObservationStore] = None):
+        """
+        Create a deduplicator.
+
+        :param window: The span of phenomenon time held in memory
+        :param store: The store to check observations older than the window
+                      against, or None to accept them
+        """
+        self._window = to_nanoseconds(window)
+        self._bucket_width = max(self._window // _BUCKET_COUNT, 1)
+        self._store = store
+
+        # Fingerprints of each bucket, keyed by bucket index, as disjoint
+        # sorted runs from largest to smallest
+        self._buckets: Dict[int, List[numpy.ndarray]] = dict()
+
+        self._watermark = numpy.iinfo(numpy.int64).min
+        self._duplicates = 0
+
+    @property
+    def duplicates(self) -> int:
+        """
+        Get the number of duplicates dropped.
+        """
+        return self._duplicates
+
+    @property
+    def size(self) -> int:
+        """
+        Get the number of fingerprints held in memory.
+        """
+        return sum(len(run) for runs in self._buckets.values() for run in runs)
+
+    def filter(self, batch: ObservationBatch) -> ObservationBatch:
+        """
+        Drop the observations of a batch that were already seen.
+
+        :param batch: The observations
+        :return: The observations seen for the first time
+        """
+        unique = self.get_unique(batch)
+
+        return batch if numpy.all(unique) else batch.take(unique)
+
+    def get_unique(self, batch: ObservationBatch) -> numpy.ndarray:
+        """
+        Find the observations of a batch seen for the first time, and remember
+        them.
+
+        :param batch: The observations
+        :return: A boolean mask of the observations seen for the first time
+        """
+        unique = numpy.zeros(len(batch), dtype=bool)
+        if not len(batch):
+            return unique
+
+        times = batch.phenomenon_times.view(numpy.int64)
+        fingerprints = self._get_fingerprints(batch)
+
+        # Only the first occurrence within the batch is kept
+        unique[numpy.unique(fingerprints, return_index=True)[1]] = True
+
+        # Observations without a phenomenon time are left for the store to
+        # reject
+        valid = ~numpy.isnat(batch.phenomenon_times)
+
+        horizon = self._get_horizon()
+        recent = unique & valid & (times >= horizon)
+        old = unique & valid & (times < horizon)
+
+        indices = numpy.flatnonzero(recent)
+        buckets = times[indices] // self._bucket_width
+
+        order = numpy.argsort(buckets, kind='stable')
+        indices = indices[order]
+        buckets = buckets[order]
+
+        for members in numpy.split(indices, numpy.flatnonzero(numpy.diff(buckets)) + 1):
+            if not len(members):
+                continue
+
+            bucket = int(times[members[0]] // self._bucket_width)
+
+            runs = self._buckets.setdefault(bucket, [])
+            for run in runs:
+                positions = numpy.minimum(numpy.searchsorted(run, fingerprints[members]), len(run) - 1)
+                seen = run[positions] == fingerprints[members]
+                unique[members[seen]] = False
+                members = members[~seen]
+
+            if len(members):
+                self._add_run(runs, numpy.sort(fingerprints[members]))
+
+        if self._store is not None and numpy.any(old):
+            self._check_store(batch, numpy.flatnonzero(old), unique)
+
+        if numpy.any(valid):
+            self._watermark = max(self._watermark, int(times[valid].max()))
+
+        # Discard buckets that ended before the new horizon
+        horizon = self._get_horizon()
+        for bucket in [bucket for bucket in self._buckets if (bucket + 1) * self._bucket_width <= horizon]:
+            del self._buckets[bucket]
+
+        self._duplicates += len(batch) - int(numpy.count_nonzero(unique))
+
+        return unique
+
+    @staticmethod
+    def _add_run(runs: List[numpy.ndarray], run: numpy.ndarray) -> None:
+        """
+        Helper function to add new fingerprints to a bucket.
+
+        The new run is merged with the smaller runs until every run is more
+        than twice the size of the next. So a bucket has a logarithmic number
+        of runs, and each fingerprint is copied a logarithmic number of times,
+        rather than the whole bucket being copied for every batch.
+        """
+        while runs and len(runs[-1]) <= 2 * len(run):
+            run = numpy.union1d(runs.pop(), run)
+
+        runs.append(run)
+
+    def _check_store(self, batch: ObservationBatch, indices: numpy.ndarray, unique: numpy.ndarray) -> None:
+        """
+        Mark the observations that are already in the store as duplicates.
+        """
+        series: Dict[tuple, list] = dict()
+        for index in indices:
+            key = (batch.sensor_iris[index], batch.property_iris[index], batch.feature_iris[index])
+            series.setdefault(key, []).append(index)
+
+        for key, members in series.items():
+            members = numpy.array(members)
+
+            times = batch.phenomenon_times[members]
+            start_time = from_timestamp(times.min())
+            end_time = from_timestamp(times.max()) + datetime.timedelta(microseconds=1)
+
+            stored = self._store.query(*key, start_time=start_time, end_time=end_time)
+
+            existing = _get_content_fingerprints(stored.phenomenon_times, stored.results)
+            found = numpy.isin(_get_content_fingerprints(times, batch.results[members]), existing)
+
+            unique[members[found]] = False
+
+    def _get_horizon(self) -> int:
+        """
+        Get the phenomenon time before which duplicates aren't held in memory.
+        """
+        return max(self._watermark - self._window, numpy.iinfo(numpy.int64).min)
+
+    @staticmethod
+    def _get_fingerprints(batch: ObservationBatch) -> numpy.ndarray:
+        """
+        Helper function to get the fingerprint of each observation of a batch.
+        """
+        fingerprints = _get_content_fingerprints(batch.phenomenon_times, batch.results)
+
+        for iris in (batch.sensor_iris, batch.property_iris, batch.feature_iris):
+            fingerprints = _mix(fingerprints ^ _hash_strings(iris))
+
+        if len(batch.member_iris):
+            named = batch.member_iris != ''
+            fingerprints[named] = _mix(_hash_strings(batch.member_iris[named]))
+
+        return fingerprints
+
+
+def _get_content_fingerprints(phenomenon_times: numpy.ndarray, results: numpy.ndarray) -> numpy.ndarray:
+    """
+    Helper function to combine the phenomenon times and results of a series.
+    """
+    # Equal results must have equal bits, so -0.0 and NaNs are canonicalized
+    results = results + 0.0
+    results[numpy.isnan(results)] = numpy.nan
+
+    return _mix(phenomenon_times.view(numpy.uint64) ^ _mix(results.view(numpy.uint64)))
+
+
+def _hash_strings(values: numpy.ndarray) -> numpy.ndarray:
+    """
+    Helper function to hash a column of strings, hashing each distinct value
+    once.
+    """
+    distinct, inverse = numpy.unique(values, return_inverse=True)
+
+    hashes = numpy.array([
+        int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'little')
+        for value in distinct
+    ], dtype=numpy.uint64)
+
+    return hashes[inverse.reshape(-1)]
+
+
+def _mix(values: numpy.ndarray) -> numpy.ndarray:
+    """
+    Helper function to scramble 64-bit values (the SplitMix64 finalizer).
+    """
+    values = (values ^ (values >> numpy.uint64(30))) * numpy.uint64(0xbf58476d1ce4e5b9)
+    values = (values ^ (values >> numpy.uint64(27))) * numpy.uint64(0x94d049bb133111eb)
+
+    return values ^ (values >> numpy.uint64(31))
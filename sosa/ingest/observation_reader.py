@@ -0,0 +1,255 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.feature import create_unitless
+from sosa.ingest.column_mapping import ColumnMapping
+from sosa.observation import ObservationBatch
+from sosa.observation import to_timestamp
+from sosa.ontology.ontology_factory import OntologyFactory
+from sosa.unit_converter import convert_results
+
+import csv
+import datetime
+import itertools
+import json
+import numpy
+from qudt.unit import Unit
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Sequence
+
+
+# Number of readings per batch
+DEFAULT_BATCH_SIZE = 65536
+
+
+class ObservationReader(object):
+    """
+    Reads sensor readings from CSV or NDJSON files as a stream of observation
+    batches.
+
+    Files are read incrementally, so memory is bounded by the batch size
+    rather than the size of the input. Each batch is mapped with column
+    operations, and distinct values, such as the IRIs of a column, are only
+    processed once per batch.
+    """
+
+    def __init__(self, mapping: ColumnMapping, batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Create a reader.
+
+        :param mapping: The mapping from columns to observations
+        :param batch_size: The number of readings per batch
+        """
+        self._mapping = mapping
+        self._batch_size = batch_size
+
+        # Units of the properties seen so far, resolved through the ontology
+        self._units: Dict[str, Unit] = dict()
+
+    def read_csv(self, path: str) -> Iterator[ObservationBatch]:
+        """
+        Read a CSV file with a header row.
+
+        :param path: The path to the file
+        :return: The observation batches, in file order
+        :raises ValueError: If a mapped column is missing from the header, or
+                            a row is missing a mapped column
+        """
+        with open(path, newline='') as file:
+            reader = csv.reader(file)
+
+            header = next(reader, [])
+            columns = self._mapping.get_columns()
+
+            missing = [column for column in columns if column not in header]
+            if missing:
+                raise ValueError(f'Missing columns in {path}: {", ".join(missing)}')
+
+            indices = [header.index(column) for column in columns]
+
+            # Blank lines, such as a trailing line at the end of a dump, are
+            # skipped
+            values = (self._get_row(row, indices, path, reader.line_num) for row in reader if row)
+
+            while True:
+                rows = list(itertools.islice(values, self._batch_size))
+                if not rows:
+                    break
+
+                yield self.map_columns(dict(zip(columns, zip(*rows))))
+
+    def read_ndjson(self, path: str) -> Iterator[ObservationBatch]:
+        """
+        Read a newline-delimited JSON file of flat objects.
+
+        Missing keys are read as missing values.
+
+        :param path: The path to the file
+        :return: The observation batches, in file order
+        """
+        columns = self._mapping.get_columns()
+
+        with open(path) as file:
+            lines = (line for line in file if line.strip())
+
+            while True:
+                rows = [self._get_values(json.loads(line), columns) for line in itertools.islice(lines, self._batch_size)]
+                if not rows:
+                    break
+
+                yield self.map_columns(dict(zip(columns, zip(*rows))))
+
+    def map_columns(self, columns: Dict[str, Sequence[Any]]) -> ObservationBatch:
+        """
+        Map a batch of readings to observations.
+
+        :param columns: The values of each mapped column
+        :return: The observation batch
+        """
+        mapping = self._mapping
+
+        count = len(columns[mapping.result_column])
+
+        batch = ObservationBatch(
+            sensor_iris=self._get_iris(columns, mapping.sensor_column, mapping.sensor_iri, count),
+            property_iris=self._get_iris(columns, mapping.property_column, mapping.property_iri, count),
+            feature_iris=self._get_iris(columns, mapping.feature_column, mapping.feature_iri, count),
+            procedure_iris=numpy.full(count, mapping.procedure_iri, dtype=object),
+            phenomenon_times=self._get_times(columns[mapping.phenomenon_time_column]),
+            result_times=self._get_times(columns[mapping.result_time_column]) if mapping.result_time_column else numpy.full(count, numpy.datetime64('NaT', 'ns')),
+            results=self._get_results(columns[mapping.result_column]),
+        )
+
+        if mapping.result_unit is not None:
+            self._convert_results(batch, mapping.result_unit)
+
+        return batch
+
+    def _convert_results(self, batch: ObservationBatch, unit: Unit) -> None:
+        """
+        Convert results to the units of their properties, resolving the
+        properties not yet seen with a single ontology lookup.
+        """
+        property_iris, inverse = numpy.unique(batch.property_iris, return_inverse=True)
+
+        unresolved = [property_iri for property_iri in property_iris if property_iri not in self._units]
+        if unresolved:
+            for property_iri, prop in OntologyFactory.get_properties(unresolved).items():
+                self._units[property_iri] = prop.unit
+
+        unitless = create_unitless().resource_iri
+
+        for index, property_iri in enumerate(property_iris):
+            target = self._units[property_iri]
+
+            # Properties without a unit in the ontology keep their results
+            if target.resource_iri == unitless:
+                continue
+
+            members = inverse.reshape(-1) == index
+            batch.results[members] = convert_results(batch.results[members], unit, target)
+
+    @staticmethod
+    def _get_row(row: List[str], indices: List[int], path: str, line: int) -> List[str]:
+        """
+        Helper function to get the values of the mapped columns of a row.
+        """
+        if len(row) <= max(indices):
+            raise ValueError(f'Missing columns on line {line} of {path}')
+
+        return [row[index] for index in indices]
+
+    @staticmethod
+    def _get_values(record: Dict[str, Any], columns: List[str]) -> List[Any]:
+        """
+        Helper function to get the values of the mapped columns of a record.
+        """
+        return [record.get(column) for column in columns]
+
+    @staticmethod
+    def _get_iris(columns: Dict[str, Sequence[Any]], column: str, template: str, count: int) -> numpy.ndarray:
+        """
+        Helper function to format the IRIs of a column, formatting each
+        distinct value once.
+        """
+        if not column:
+            return numpy.full(count, template, dtype=object)
+
+        values, inverse = numpy.unique(numpy.array(['' if value is None else str(value) for value in columns[column]], dtype=object), return_inverse=True)
+
+        iris = numpy.array([template.format(value) for value in values], dtype=object)
+
+        return iris[inverse.reshape(-1)]
+
+    def _get_times(self, values: Sequence[Any]) -> numpy.ndarray:
+        """
+        Helper function to parse a column of times.
+        """
+        if self._mapping.time_unit:
+            return self._get_epoch_times(values, self._mapping.time_unit)
+
+        strings = numpy.array(['' if value is None else value for value in values], dtype=str)
+
+        # NumPy parses UTC times, but not UTC offsets, which are parsed in
+        # Python. The date is ten characters, so a sign after it is an offset.
+        offsets = (numpy.char.rfind(strings, '+') >= 10) | (numpy.char.rfind(strings, '-') >= 10)
+        strings = numpy.char.rstrip(strings, 'Z')
+        strings[offsets] = 'NaT'
+
+        times = strings.astype('datetime64[ns]')
+
+        for index in numpy.flatnonzero(offsets):
+            times[index] = to_timestamp(datetime.datetime.fromisoformat(str(values[index])))
+
+        return times
+
+    @classmethod
+    def _get_epoch_times(cls, values: Sequence[Any], time_unit: str) -> numpy.ndarray:
+        """
+        Helper function to parse a column of numeric times since the epoch.
+
+        A float64 can't represent every nanosecond since the epoch, so integer
+        times are scaled as integers, and only the fractional part of other
+        times is scaled as a float.
+        """
+        if not any(isinstance(value, float) for value in values):
+            try:
+                return numpy.array(values, dtype=numpy.int64).astype(f'datetime64[{time_unit}]').astype('datetime64[ns]')
+            except (TypeError, ValueError):
+                pass
+
+        times = cls._get_results(values)
+
+        missing = numpy.isnan(times)
+        times[missing] = 0.0
+
+        whole = numpy.floor(times)
+        scale = numpy.timedelta64(1, time_unit) / numpy.timedelta64(1, 'ns')
+
+        parsed = whole.astype(numpy.int64).astype(f'datetime64[{time_unit}]').astype('datetime64[ns]')
+        parsed += numpy.round((times - whole) * scale).astype('timedelta64[ns]')
+        parsed[missing] = numpy.datetime64('NaT', 'ns')
+
+        return parsed
+
+    @staticmethod
+    def _get_results(values: Iterable[Any]) -> numpy.ndarray:
+        """
+        Helper function to parse a column of numbers, where empty values are
+        missing.
+        """
+        results = numpy.array(list(values), dtype=object)
+        results[results == ''] = None
+
+        return results.astype(numpy.float64)
@@ -0,0 +1,311 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.feature import create_unitless
+from sosa.ingest.deduplicator import Deduplicator
+from sosa.ingest.ring_buffer import READING_DTYPE
+from sosa.ingest.ring_buffer import RingBuffer
+from sosa.observation import ObservationBatch
+from sosa.ontology.ontology_factory import OntologyFactory
+from sosa.storage.observation_store import DEFAULT_CHUNK_SIZE
+from sosa.storage.observation_store import ObservationStore
+from sosa.storage.series import SeriesKey
+from sosa.unit_converter import get_conversion_factors
+
+import datetime
+import multiprocessing
+import numpy
+import os
+from qudt.unit import Unit
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+import zlib
+
+
+# Number of slots in the ring buffer of each worker
+DEFAULT_SLOT_COUNT = 64
+
+# Maximum number of readings per slot
+DEFAULT_SLOT_SIZE = 8192
+
+
+def get_shard(key: SeriesKey, shard_count: int) -> int:
+    """
+    Get the shard storing a series.
+
+    :param key: The series key
+    :param shard_count: The number of shards, which is the number of workers
+    :return: The index of the shard
+    """
+    return zlib.crc32('\n'.join(key).encode('utf-8')) % shard_count
+
+
+def get_shard_directory(directory: str, shard: int) -> str:
+    """
+    Get the directory of the observation store of a shard.
+
+    :param directory: The directory of the sharded stores
+    :param shard: The index of the shard
+    :return: The directory of the shard's store
+    """
+    return os.path.join(directory, f'shard-{shard:04d}')
+
+
+class ParallelIngest(object):
+    """
+    Ingests readings with a pool of worker processes, to scale past the GIL.
+
+    The front process routes each reading to a worker by its series, and
+    copies it into the worker's shared memory ring buffer without pickling.
+    Each worker decodes its readings into observations, enriches them with the
+    IRIs and units of the catalog, and stores them in its own observation
+    store. A series is always stored by the same worker, so the store of a
+    series is found with get_shard() and get_shard_directory().
+
+    Readings are fixed-width records of READING_DTYPE. Sensors, properties
+    and features are given as indices into the IRI tables of the ingest.
+    """
+
+    def __init__(
+            self,
+            directory: str,
+            sensor_iris: List[str],
+            property_iris: List[str],
+            feature_iris: List[str],
+            procedure_iri: str = '',
+            result_unit: Optional[Unit] = None,
+            worker_count: Optional[int] = None,
+            slot_count: int = DEFAULT_SLOT_COUNT,
+            slot_size: int = DEFAULT_SLOT_SIZE,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            compress: bool = False,
+            dedup_window: Optional[datetime.timedelta] = None,
+    ):
+        """
+        Create a parallel ingest.
+
+        :param directory: The directory of the sharded stores
+        :param sensor_iris: The IRI of each sensor index
+        :param property_iris: The IRI of each property index
+        :param feature_iris: The IRI of each feature index
+        :param procedure_iri: The IRI of the Procedure of every observation
+        :param result_unit: The unit of the results, or None if results are
+                            already in the unit of their property
+        :param worker_count: The number of worker processes, or None for the
+                             number of CPUs
+        :param slot_count: The number of slots per ring buffer
+        :param slot_size: The maximum number of readings per slot
+        :param chunk_size: The chunk size of the stores
+        :param compress: True to compress the chunks of the stores
+        :param dedup_window: The span of phenomenon time in which workers drop
+                             duplicate readings, or None to store every reading
+        """
+        self._directory = directory
+        self._sensor_iris = list(sensor_iris)
+        self._property_iris = list(property_iris)
+        self._feature_iris = list(feature_iris)
+        self._procedure_iri = procedure_iri
+        self._result_unit = result_unit
+        self._worker_count = worker_count if worker_count else os.cpu_count() or 1
+        self._slot_count = slot_count
+        self._slot_size = slot_size
+        self._chunk_size = chunk_size
+        self._compress = compress
+        self._dedup_window = dedup_window
+
+        self._rings: List[RingBuffer] = list()
+        self._workers: List[multiprocessing.Process] = list()
+
+        # Shard of each series, by sensor, property and feature index
+        self._shards: Dict[Tuple[int, int, int], int] = dict()
+
+    def __enter__(self) -> 'ParallelIngest':
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def worker_count(self) -> int:
+        """
+        Get the number of worker processes.
+        """
+        return self._worker_count
+
+    def start(self) -> None:
+        """
+        Start the worker processes.
+
+        The units of the properties are resolved here rather than in the
+        workers, which don't share the loaded catalog unless they are forked.
+        """
+        scales, offsets = self._get_conversions()
+
+        for shard in range(self._worker_count):
+            ring = RingBuffer(self._slot_count, self._slot_size)
+
+            worker = multiprocessing.Process(
+                target=_run_worker,
+                args=(
+                    ring,
+                    get_shard_directory(self._directory, shard),
+                    self._sensor_iris,
+                    self._property_iris,
+                    self._feature_iris,
+                    self._procedure_iri,
+                    scales,
+                    offsets,
+                    self._chunk_size,
+                    self._compress,
+                    self._dedup_window,
+                ),
+                name=f'sosa-ingest-{shard}',
+                daemon=True,
+            )
+            worker.start()
+
+            self._rings.append(ring)
+            self._workers.append(worker)
+
+    def put(self, readings: numpy.ndarray) -> None:
+        """
+        Route readings to their workers, waiting while a worker's ring is full.
+
+        Readings of a series must be in phenomenon time order.
+
+        :param readings: The readings, of READING_DTYPE
+        :raises RuntimeError: If a worker has died
+        """
+        if not len(readings):
+            return
+
+        series, inverse = numpy.unique(readings[['sensor', 'property', 'feature']], return_inverse=True)
+
+        shards = numpy.array([self._get_shard(tuple(int(index) for index in key)) for key in series])[inverse.reshape(-1)]
+
+        for shard, ring in enumerate(self._rings):
+            ring.put(readings[shards == shard], self._workers[shard].is_alive)
+
+    def close(self) -> None:
+        """
+        Stop the workers once they have stored every reading, and free the
+        ring buffers.
+
+        :raises RuntimeError: If a worker failed
+        """
+        for worker, ring in zip(self._workers, self._rings):
+            if worker.is_alive():
+                ring.put_stop(worker.is_alive)
+
+        failed = list()
+        for shard, worker in enumerate(self._workers):
+            worker.join()
+            if worker.exitcode != 0:
+                failed.append(shard)
+
+        for ring in self._rings:
+            ring.close()
+
+        self._rings = list()
+        self._workers = list()
+
+        if failed:
+            raise RuntimeError(f'Ingest workers failed: {", ".join(str(shard) for shard in failed)}')
+
+    def _get_conversions(self) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Get the scale and offset converting the results of each property
+        index to the unit of its property.
+        """
+        scales = numpy.ones(len(self._property_iris))
+        offsets = numpy.zeros(len(self._property_iris))
+
+        if self._result_unit is not None:
+            catalog = OntologyFactory.get_properties(self._property_iris)
+            unitless = create_unitless().resource_iri
+
+            for index, property_iri in enumerate(self._property_iris):
+                unit = catalog[property_iri].unit
+                if unit.resource_iri != unitless:
+                    scales[index], offsets[index] = get_conversion_factors(self._result_unit, unit)
+
+        return scales, offsets
+
+    def _get_shard(self, indices: Tuple[int, int, int]) -> int:
+        """
+        Get the shard of a series by its sensor, property and feature index.
+        """
+        shard = self._shards.get(indices)
+
+        if shard is None:
+            sensor, prop, feature = indices
+            key = SeriesKey(self._sensor_iris[sensor], self._property_iris[prop], self._feature_iris[feature])
+
+            shard = self._shards[indices] = get_shard(key, self._worker_count)
+
+        return shard
+
+
+def _run_worker(
+        ring: RingBuffer,
+        directory: str,
+        sensor_iris: List[str],
+        property_iris: List[str],
+        feature_iris: List[str],
+        procedure_iri: str,
+        scales: numpy.ndarray,
+        offsets: numpy.ndarray,
+        chunk_size: int,
+        compress: bool,
+        dedup_window: Optional[datetime.timedelta],
+) -> None:
+    """
+    Decode, enrich and store the readings of a ring buffer until stopped.
+    Runs in a worker process.
+    """
+    store = ObservationStore(chunk_size=chunk_size, directory=directory, compress=compress)
+
+    deduplicator = Deduplicator(dedup_window) if dedup_window is not None else None
+
+    sensors = numpy.array(sensor_iris, dtype=object)
+    properties = numpy.array(property_iris, dtype=object)
+    features = numpy.array(feature_iris, dtype=object)
+
+    try:
+        while True:
+            readings = ring.get()
+            if readings is None:
+                break
+
+            codes = readings['property']
+
+            batch = ObservationBatch(
+                sensor_iris=sensors[readings['sensor']],
+                property_iris=properties[codes],
+                feature_iris=features[readings['feature']],
+                procedure_iris=numpy.full(len(readings), procedure_iri, dtype=object),
+                phenomenon_times=readings['phenomenon_time'].view('datetime64[ns]'),
+                result_times=numpy.full(len(readings), numpy.datetime64('NaT', 'ns')),
+                results=readings['result'] * scales[codes] + offsets[codes],
+            )
+
+            if deduplicator is not None:
+                batch = deduplicator.filter(batch)
+
+            for collection in batch.collections():
+                store.extend(collection)
+
+            store.commit()
+    finally:
+        store.close()
+        ring.close()
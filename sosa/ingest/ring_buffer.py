@@ -0,0 +1,178 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+import multiprocessing
+import multiprocessing.shared_memory
+import numpy
+import os
+from typing import Any
+from typing import Callable
+from typing import Optional
+from typing import Tuple
+
+
+# Fixed-width binary reading, as written by the front process
+READING_DTYPE = numpy.dtype([
+    ('sensor', '<u4'),
+    ('property', '<u4'),
+    ('feature', '<u4'),
+    ('phenomenon_time', '<i8'),
+    ('result', '<f8'),
+])
+
+# Seconds between checks that the consumer is alive while the ring is full
+_POLL_INTERVAL = 0.1
+
+# Slot header: the number of readings in the slot, or -1 to stop the consumer
+_HEADER_DTYPE = numpy.dtype('<i8')
+
+
+class RingBuffer(object):
+    """
+    A single-producer, single-consumer ring of reading slots in shared memory.
+
+    The producer copies readings into the next free slot and the consumer
+    reads them in place, so readings cross the process boundary without being
+    pickled. A pair of semaphores counts the free and filled slots, blocking
+    the producer while the ring is full and the consumer while it's empty.
+
+    The ring is created by the producer and passed to the consumer process,
+    which attaches to the shared memory by name.
+    """
+
+    def __init__(self, slot_count: int, slot_size: int):
+        """
+        Allocate a ring buffer.
+
+        :param slot_count: The number of slots
+        :param slot_size: The maximum number of readings per slot
+        """
+        self._slot_count = slot_count
+        self._slot_size = slot_size
+        self._slot_bytes = _HEADER_DTYPE.itemsize + slot_size * READING_DTYPE.itemsize
+
+        self._memory = multiprocessing.shared_memory.SharedMemory(create=True, size=slot_count * self._slot_bytes)
+
+        # Forked consumers share this object, so the memory is freed by the
+        # allocating process only
+        self._owner_pid = os.getpid()
+
+        self._free = multiprocessing.Semaphore(slot_count)
+        self._filled = multiprocessing.Semaphore(0)
+
+        # Index of the next slot to fill and to read
+        self._write_index = 0
+        self._read_index = 0
+
+    def __getstate__(self) -> Any:
+        """
+        Pickle the ring by the name of its shared memory, for the consumer
+        process.
+        """
+        return (self._slot_count, self._slot_size, self._memory.name, self._free, self._filled)
+
+    def __setstate__(self, state: Any) -> None:
+        """
+        Attach to the shared memory of a pickled ring.
+        """
+        self._slot_count, self._slot_size, name, self._free, self._filled = state
+        self._slot_bytes = _HEADER_DTYPE.itemsize + self._slot_size * READING_DTYPE.itemsize
+
+        self._memory = multiprocessing.shared_memory.SharedMemory(name=name)
+        self._owner_pid = 0
+
+        self._write_index = 0
+        self._read_index = 0
+
+    @property
+    def slot_size(self) -> int:
+        """
+        Get the maximum number of readings per slot.
+        """
+        return self._slot_size
+
+    def put(self, readings: numpy.ndarray, is_alive: Optional[Callable[[], bool]] = None) -> None:
+        """
+        Copy readings into the ring, waiting for free slots.
+
+        :param readings: The readings, of READING_DTYPE
+        :param is_alive: A function returning False if the consumer has died,
+                         checked while waiting so that a dead consumer doesn't
+                         block the producer forever
+        :raises RuntimeError: If the consumer died
+        """
+        for start in range(0, len(readings), self._slot_size):
+            slot = readings[start:start + self._slot_size]
+            self._put_slot(slot, len(slot), is_alive)
+
+    def put_stop(self, is_alive: Optional[Callable[[], bool]] = None) -> None:
+        """
+        Signal the consumer to stop after the readings already put.
+
+        :param is_alive: A function returning False if the consumer has died
+        :raises RuntimeError: If the consumer died
+        """
+        self._put_slot(None, -1, is_alive)
+
+    def get(self) -> Optional[numpy.ndarray]:
+        """
+        Wait for the next slot and copy out its readings.
+
+        :return: The readings, or None if the producer stopped
+        """
+        self._filled.acquire()
+
+        header, records = self._get_slot(self._read_index)
+        self._read_index = (self._read_index + 1) % self._slot_count
+
+        count = int(header[0])
+        readings = records[:count].copy() if count >= 0 else None
+
+        self._free.release()
+
+        return readings
+
+    def close(self) -> None:
+        """
+        Detach from the shared memory, and free it if this side allocated it.
+        """
+        self._memory.close()
+
+        if self._owner_pid == os.getpid():
+            self._memory.unlink()
+
+    def _put_slot(self, readings: Optional[numpy.ndarray], count: int, is_alive: Optional[Callable[[], bool]]) -> None:
+        """
+        Fill the next slot and hand it to the consumer.
+        """
+        while not self._free.acquire(timeout=_POLL_INTERVAL):
+            if is_alive is not None and not is_alive():
+                raise RuntimeError('The ring buffer consumer has stopped')
+
+        header, records = self._get_slot(self._write_index)
+        self._write_index = (self._write_index + 1) % self._slot_count
+
+        if readings is not None:
+            records[:count] = readings
+        header[0] = count
+
+        # Releasing the semaphore publishes the slot to the consumer
+        self._filled.release()
+
+    def _get_slot(self, index: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Get views of the header and readings of a slot.
+        """
+        offset = index * self._slot_bytes
+
+        header = numpy.ndarray(1, dtype=_HEADER_DTYPE, buffer=self._memory.buf, offset=offset)
+        records = numpy.ndarray(self._slot_size, dtype=READING_DTYPE, buffer=self._memory.buf, offset=offset + _HEADER_DTYPE.itemsize)
+
+        return header, records
@@ -16,6 +16,8 @@ This module introduces the following classes:
 
   * ObservableProperty
   * Observation
+  * ObservationCollection
+  * ObservationBatch
   * Sensor
 
 Reference:
@@ -27,6 +29,83 @@ Reference:
 from sosa.ontology.sosa import SOSA
 
 import dataclasses
+import datetime
+import numpy
+from qudt.ontology.rdf import RDF
+import rdflib
+from typing import Iterable
+from typing import List
+from typing import Optional
+
+
+# The origin of UTC timestamps
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def create_timestamps() -> numpy.ndarray:
+    """
+    Helper function to create an empty column of timestamps
+    """
+    return numpy.empty(0, dtype='datetime64[ns]')
+
+
+def create_results() -> numpy.ndarray:
+    """
+    Helper function to create an empty column of simple results
+    """
+    return numpy.empty(0, dtype=numpy.float64)
+
+
+def create_iris() -> numpy.ndarray:
+    """
+    Helper function to create an empty column of IRIs
+    """
+    return numpy.empty(0, dtype=object)
+
+
+def to_timestamp(value: Optional[datetime.datetime]) -> numpy.datetime64:
+    """
+    Convert a datetime to a UTC timestamp with nanosecond precision.
+
+    Naive datetimes are assumed to already be in UTC.
+
+    :param value: The datetime, or None for a missing time
+    :return: The timestamp, or NaT if the time is missing
+    """
+    if value is None:
+        return numpy.datetime64('NaT', 'ns')
+
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+    return numpy.datetime64(value, 'ns')
+
+
+def from_timestamp(value: numpy.datetime64) -> Optional[datetime.datetime]:
+    """
+    Convert a UTC timestamp to a timezone-aware datetime.
+
+    Precision beyond microseconds is truncated, as datetime can't express it.
+
+    :param value: The timestamp
+    :return: The datetime, or None if the timestamp is NaT
+    """
+    if numpy.isnat(value):
+        return None
+
+    microseconds = int(numpy.datetime64(value, 'us').astype(numpy.int64))
+
+    return _EPOCH + datetime.timedelta(microseconds=microseconds)
+
+
+def to_nanoseconds(value: datetime.timedelta) -> int:
+    """
+    Convert a duration to nanoseconds, the resolution of timestamps.
+
+    :param value: The duration
+    :return: The number of nanoseconds
+    """
+    return int(value / datetime.timedelta(microseconds=1)) * 1000
 
 
 @dataclasses.dataclass
@@ -82,6 +161,493 @@ class Observation:
     Additional information describing the resource in US English.
     """
 
+    sensor_iri: str = dataclasses.field(default_factory=str)
+    """
+    The IRI of the Sensor that made the observation (sosa:madeBySensor).
+    """
+
+    property_iri: str = dataclasses.field(default_factory=str)
+    """
+    The IRI of the property that was observed (sosa:observedProperty).
+    """
+
+    feature_iri: str = dataclasses.field(default_factory=str)
+    """
+    The IRI of the Feature of Interest whose property was observed
+    (sosa:hasFeatureOfInterest).
+    """
+
+    procedure_iri: str = dataclasses.field(default_factory=str)
+    """
+    The IRI of the Procedure used to make the observation
+    (sosa:usedProcedure).
+    """
+
+    phenomenon_time: Optional[datetime.datetime] = None
+    """
+    The time that the result applies to the Feature of Interest
+    (sosa:phenomenonTime).
+    """
+
+    result_time: Optional[datetime.datetime] = None
+    """
+    The time when the observation was completed (sosa:resultTime).
+    """
+
+    result: Optional[float] = None
+    """
+    The simple value of the observation (sosa:hasSimpleResult).
+    """
+
+
+@dataclasses.dataclass
+class ObservationCollection:
+    """
+    A collection of observations sharing the same Sensor, Property, Feature of
+    Interest and Procedure.
+
+    The shared values are stored once, and only the times and results of the
+    member observations are stored, as columns.
+    """
+
+    resource_iri: str
+    """
+    The Internationalized Resource Identifier (IRI) for the object.
+    """
+
+    type_iri: str = dataclasses.field(default_factory=str)
+    """
+    The IRI for the object's Resource Description Framework (RDF) type.
+    """
+
+    label: str = dataclasses.field(default_factory=str)
+    """
+    A human-readable name for the resource in US English.
+    """
+
+    description: str = dataclasses.field(default_factory=str)
+    """
+    Additional information describing the resource in US English.
+    """
+
+    sensor_iri: str = dataclasses.field(default_factory=str)
+    """
+    The IRI of the Sensor shared by all members.
+    """
+
+    property_iri: str = dataclasses.field(default_factory=str)
+    """
+    The IRI of the observed property shared by all members.
+    """
+
+    feature_iri: str = dataclasses.field(default_factory=str)
+    """
+    The IRI of the Feature of Interest shared by all members.
+    """
+
+    procedure_iri: str = dataclasses.field(default_factory=str)
+    """
+    The IRI of the Procedure shared by all members.
+    """
+
+    phenomenon_times: numpy.ndarray = dataclasses.field(default_factory=create_timestamps)
+    """
+    The phenomenon time of each member, as UTC datetime64[ns] values.
+    """
+
+    result_times: numpy.ndarray = dataclasses.field(default_factory=create_timestamps)
+    """
+    The result time of each member, as UTC datetime64[ns] values. NaT marks a
+    member without a result time.
+    """
+
+    results: numpy.ndarray = dataclasses.field(default_factory=create_results)
+    """
+    The simple result of each member, as float64 values.
+    """
+
+    member_iris: List[str] = dataclasses.field(default_factory=list)
+    """
+    The IRI of each member, or empty if the members are anonymous.
+    """
+
+    def __len__(self) -> int:
+        """
+        Return the number of member observations.
+        """
+        return len(self.results)
+
+    @classmethod
+    def from_observations(
+            cls,
+            resource_iri: str,
+            observations: Iterable[Observation],
+    ) -> 'ObservationCollection':
+        """
+        Factor a sequence of observations into a collection.
+
+        :param resource_iri: The IRI of the new collection
+        :param observations: The observations, which must share the same
+                             Sensor, Property, Feature of Interest and Procedure
+        :return: The collection
+        :raises ValueError: If the observations don't share their properties
+        """
+        observations = list(observations)
+
+        collection = cls(
+            resource_iri=resource_iri,
+            type_iri=SOSA.OBSERVATION_COLLECTION,
+        )
+
+        if observations:
+            first = observations[0]
+            collection.sensor_iri = first.sensor_iri
+            collection.property_iri = first.property_iri
+            collection.feature_iri = first.feature_iri
+            collection.procedure_iri = first.procedure_iri
+
+        shared = (
+            collection.sensor_iri,
+            collection.property_iri,
+            collection.feature_iri,
+            collection.procedure_iri,
+        )
+
+        for observation in observations:
+            if shared != (
+                    observation.sensor_iri,
+                    observation.property_iri,
+                    observation.feature_iri,
+                    observation.procedure_iri,
+            ):
+                raise ValueError(
+                    f'Observation {observation.resource_iri} does not share '
+                    f'the properties of collection {resource_iri}'
+                )
+
+        collection.phenomenon_times = numpy.array(
+            [to_timestamp(obs.phenomenon_time) for obs in observations],
+            dtype='datetime64[ns]',
+        )
+        collection.result_times = numpy.array(
+            [to_timestamp(obs.result_time) for obs in observations],
+            dtype='datetime64[ns]',
+        )
+        collection.results = numpy.array(
+            [numpy.nan if obs.result is None else obs.result for obs in observations],
+            dtype=numpy.float64,
+        )
+        collection.member_iris = [obs.resource_iri for obs in observations]
+
+        return collection
+
+    def get_observations(self) -> List[Observation]:
+        """
+        Expand the collection into its member observations.
+
+        :return: The member observations, in collection order
+        """
+        observations: List[Observation] = list()
+
+        for index in range(len(self)):
+            observations.append(Observation(
+                resource_iri=self.member_iris[index] if self.member_iris else '',
+                type_iri=SOSA.OBSERVATION,
+                sensor_iri=self.sensor_iri,
+                property_iri=self.property_iri,
+                feature_iri=self.feature_iri,
+                procedure_iri=self.procedure_iri,
+                phenomenon_time=from_timestamp(self.phenomenon_times[index]),
+                result_time=from_timestamp(self.result_times[index]),
+                result=float(self.results[index]) if not numpy.isnan(self.results[index]) else None,
+            ))
+
+        return observations
+
+    def to_graph(self) -> rdflib.Graph:
+        """
+        Serialize the collection to RDF.
+
+        The shared properties are stated once on the collection, and each
+        member is linked with sosa:hasMember and carries only its times and
+        result.
+
+        :return: The RDF graph
+        """
+        graph = rdflib.Graph()
+
+        collection = rdflib.URIRef(self.resource_iri)
+
+        graph.add((collection, rdflib.URIRef(RDF.TYPE), rdflib.URIRef(SOSA.OBSERVATION_COLLECTION)))
+        if self.label:
+            graph.add((collection, rdflib.RDFS.label, rdflib.Literal(self.label)))
+
+        for predicate, iri in [
+            (SOSA.MADE_BY_SENSOR, self.sensor_iri),
+            (SOSA.OBSERVED_PROPERTY, self.property_iri),
+            (SOSA.HAS_FEATURE_OF_INTEREST, self.feature_iri),
+            (SOSA.USED_PROCEDURE, self.procedure_iri),
+        ]:
+            if iri:
+                graph.add((collection, rdflib.URIRef(predicate), rdflib.URIRef(iri)))
+
+        for index in range(len(self)):
+            member_iri = self.member_iris[index] if self.member_iris else ''
+            member = rdflib.URIRef(member_iri) if member_iri else rdflib.BNode()
+
+            graph.add((collection, rdflib.URIRef(SOSA.HAS_MEMBER), member))
+            graph.add((member, rdflib.URIRef(RDF.TYPE), rdflib.URIRef(SOSA.OBSERVATION)))
+
+            phenomenon_time = from_timestamp(self.phenomenon_times[index])
+            if phenomenon_time is not None:
+                graph.add((
+                    member,
+                    rdflib.URIRef(SOSA.PHENOMENON_TIME),
+                    rdflib.Literal(phenomenon_time, datatype=rdflib.XSD.dateTime),
+                ))
+
+            result_time = from_timestamp(self.result_times[index])
+            if result_time is not None:
+                graph.add((
+                    member,
+                    rdflib.URIRef(SOSA.RESULT_TIME),
+                    rdflib.Literal(result_time, datatype=rdflib.XSD.dateTime),
+                ))
+
+            if not numpy.isnan(self.results[index]):
+                graph.add((
+                    member,
+                    rdflib.URIRef(SOSA.HAS_SIMPLE_RESULT),
+                    rdflib.Literal(float(self.results[index]), datatype=rdflib.XSD.double),
+                ))
+
+        return graph
+
+    @classmethod
+    def from_graph(cls, graph: rdflib.Graph, resource_iri: str) -> 'ObservationCollection':
+        """
+        Deserialize a collection from RDF.
+
+        Members are ordered by phenomenon time.
+
+        :param graph: The RDF graph containing the collection
+        :param resource_iri: The IRI of the collection
+        :return: The collection
+        """
+        subject = rdflib.URIRef(resource_iri)
+
+        collection = cls(
+            resource_iri=resource_iri,
+            type_iri=SOSA.OBSERVATION_COLLECTION,
+        )
+
+        for (predicate, obj) in graph.predicate_objects(subject):
+            predicate = str(predicate)
+            if predicate == str(rdflib.RDFS.label):
+                collection.label = str(obj)
+            elif predicate == SOSA.MADE_BY_SENSOR:
+                collection.sensor_iri = str(obj)
+            elif predicate == SOSA.OBSERVED_PROPERTY:
+                collection.property_iri = str(obj)
+            elif predicate == SOSA.HAS_FEATURE_OF_INTEREST:
+                collection.feature_iri = str(obj)
+            elif predicate == SOSA.USED_PROCEDURE:
+                collection.procedure_iri = str(obj)
+
+        members = list()
+        for member in graph.objects(subject, rdflib.URIRef(SOSA.HAS_MEMBER)):
+            phenomenon_time = graph.value(member, rdflib.URIRef(SOSA.PHENOMENON_TIME))
+            result_time = graph.value(member, rdflib.URIRef(SOSA.RESULT_TIME))
+            result = graph.value(member, rdflib.URIRef(SOSA.HAS_SIMPLE_RESULT))
+
+            members.append((
+                to_timestamp(phenomenon_time.toPython() if phenomenon_time is not None else None),
+                to_timestamp(result_time.toPython() if result_time is not None else None),
+                float(result) if result is not None else numpy.nan,
+                str(member) if isinstance(member, rdflib.URIRef) else '',
+            ))
+
+        members.sort(key=lambda member: member[0])
+
+        collection.phenomenon_times = numpy.array([m[0] for m in members], dtype='datetime64[ns]')
+        collection.result_times = numpy.array([m[1] for m in members], dtype='datetime64[ns]')
+        collection.results = numpy.array([m[2] for m in members], dtype=numpy.float64)
+        if any(m[3] for m in members):
+            collection.member_iris = [m[3] for m in members]
+
+        return collection
+
+
+@dataclasses.dataclass
+class ObservationBatch:
+    """
+    A batch of observations of any number of series, stored as columns.
+
+    Unlike an ObservationCollection, members don't share their Sensor,
+    Property, Feature of Interest or Procedure, so every member has its own
+    IRIs. Batches are the unit of bulk ingest, and are split into collections
+    for storage.
+    """
+
+    sensor_iris: numpy.ndarray = dataclasses.field(default_factory=create_iris)
+    """
+    The IRI of the Sensor of each member, as an object array of str.
+    """
+
+    property_iris: numpy.ndarray = dataclasses.field(default_factory=create_iris)
+    """
+    The IRI of the observed property of each member, as an object array of str.
+    """
+
+    feature_iris: numpy.ndarray = dataclasses.field(default_factory=create_iris)
+    """
+    The IRI of the Feature of Interest of each member, as an object array of
+    str.
+    """
+
+    procedure_iris: numpy.ndarray = dataclasses.field(default_factory=create_iris)
+    """
+    The IRI of the Procedure of each member, as an object array of str.
+    """
+
+    phenomenon_times: numpy.ndarray = dataclasses.field(default_factory=create_timestamps)
+    """
+    The phenomenon time of each member, as UTC datetime64[ns] values.
+    """
+
+    result_times: numpy.ndarray = dataclasses.field(default_factory=create_timestamps)
+    """
+    The result time of each member, as UTC datetime64[ns] values. NaT marks a
+    member without a result time.
+    """
+
+    results: numpy.ndarray = dataclasses.field(default_factory=create_results)
+    """
+    The simple result of each member, as float64 values.
+    """
+
+    member_iris: numpy.ndarray = dataclasses.field(default_factory=create_iris)
+    """
+    The IRI of each member as an object array of str, or empty if the members
+    are anonymous.
+    """
+
+    def __len__(self) -> int:
+        """
+        Return the number of member observations.
+        """
+        return len(self.results)
+
+    @classmethod
+    def from_observations(cls, observations: Iterable[Observation]) -> 'ObservationBatch':
+        """
+        Convert a sequence of observations of any series to columns.
+
+        :param observations: The observations
+        :return: The batch
+        """
+        observations = list(observations)
+
+        return cls(
+            sensor_iris=numpy.array([obs.sensor_iri for obs in observations], dtype=object),
+            property_iris=numpy.array([obs.property_iri for obs in observations], dtype=object),
+            feature_iris=numpy.array([obs.feature_iri for obs in observations], dtype=object),
+            procedure_iris=numpy.array([obs.procedure_iri for obs in observations], dtype=object),
+            phenomenon_times=numpy.array(
+                [to_timestamp(obs.phenomenon_time) for obs in observations],
+                dtype='datetime64[ns]',
+            ),
+            result_times=numpy.array(
+                [to_timestamp(obs.result_time) for obs in observations],
+                dtype='datetime64[ns]',
+            ),
+            results=numpy.array(
+                [numpy.nan if obs.result is None else obs.result for obs in observations],
+                dtype=numpy.float64,
+            ),
+            member_iris=numpy.array(
+                [obs.resource_iri for obs in observations] if any(obs.resource_iri for obs in observations) else [],
+                dtype=object,
+            ),
+        )
+
+    @staticmethod
+    def concatenate(batches: List['ObservationBatch']) -> 'ObservationBatch':
+        """
+        Concatenate batches into a single batch.
+
+        :param batches: The batches
+        :return: The combined batch
+        """
+        if not batches:
+            return ObservationBatch()
+
+        # Anonymous members get empty IRIs if any batch has member IRIs
+        member_iris = [
+            batch.member_iris if len(batch.member_iris) else numpy.full(len(batch), '', dtype=object)
+            for batch in batches
+        ] if any(len(batch.member_iris) for batch in batches) else [create_iris()]
+
+        return ObservationBatch(**{
+            field.name: numpy.concatenate(
+                member_iris if field.name == 'member_iris' else [getattr(batch, field.name) for batch in batches]
+            )
+            for field in dataclasses.fields(ObservationBatch)
+        })
+
+    def take(self, indices: numpy.ndarray) -> 'ObservationBatch':
+        """
+        Select members of the batch.
+
+        :param indices: The indices of the members, or a boolean mask
+        :return: A new batch of the selected members
+        """
+        return ObservationBatch(**{
+            field.name: getattr(self, field.name)[indices]
+            for field in dataclasses.fields(ObservationBatch)
+            if field.name != 'member_iris'
+        }, member_iris=self.member_iris[indices] if len(self.member_iris) else create_iris())
+
+    def collections(self) -> List[ObservationCollection]:
+        """
+        Split the batch into a collection per series.
+
+        :return: A collection for each distinct Sensor, Property, Feature of
+                 Interest and Procedure, with members in phenomenon time order
+        """
+        if not len(self):
+            return []
+
+        codes = numpy.stack([
+            numpy.unique(iris, return_inverse=True)[1].reshape(-1)
+            for iris in (self.sensor_iris, self.property_iris, self.feature_iris, self.procedure_iris)
+        ], axis=1)
+
+        groups = numpy.unique(codes, axis=0, return_inverse=True)[1].reshape(-1)
+
+        # Sort by series, then by time, so that each series is a contiguous run
+        order = numpy.lexsort((self.phenomenon_times, groups))
+        starts = numpy.flatnonzero(numpy.diff(groups[order])) + 1
+
+        collections: List[ObservationCollection] = list()
+
+        for indices in numpy.split(order, starts):
+            first = indices[0]
+            collections.append(ObservationCollection(
+                resource_iri='',
+                type_iri=SOSA.OBSERVATION_COLLECTION,
+                sensor_iri=self.sensor_iris[first],
+                property_iri=self.property_iris[first],
+                feature_iri=self.feature_iris[first],
+                procedure_iri=self.procedure_iris[first],
+                phenomenon_times=self.phenomenon_times[indices],
+                result_times=self.result_times[indices],
+                results=self.results[indices],
+                member_iris=list(self.member_iris[indices]) if len(self.member_iris) else [],
+            ))
+
+        return collections
+
 
 @dataclasses.dataclass
 class Sensor:
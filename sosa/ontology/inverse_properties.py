@@ -0,0 +1,139 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.ontology.sosa import SOSA
+from sosa.ontology.ssn import SSN
+
+import rdflib
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+
+# Type definitions
+Statement = Tuple[str, str, str]
+
+
+# Pairs of object properties declared as owl:inverseOf each other. The first
+# property of each pair is the canonical direction, in which relationships are
+# stored.
+INVERSE_PAIRS: List[Tuple[str, str]] = [
+    (SOSA.OBSERVES, SOSA.IS_OBSERVED_BY),
+    (SOSA.MADE_OBSERVATION, SOSA.MADE_BY_SENSOR),
+    (SOSA.ACTS_ON_PROPERTY, SOSA.IS_ACTED_ON_BY),
+    (SOSA.MADE_ACTUATION, SOSA.MADE_BY_ACTUATOR),
+    (SOSA.HAS_SAMPLE, SOSA.IS_SAMPLE_OF),
+    (SOSA.MADE_SAMPLING, SOSA.MADE_BY_SAMPLER),
+    (SOSA.HAS_FEATURE_OF_INTEREST, SOSA.IS_FEATURE_OF_INTEREST_OF),
+    (SOSA.HAS_RESULT, SOSA.IS_RESULT_OF),
+    (SOSA.HOSTS, SOSA.IS_HOSTED_BY),
+    (SSN.IMPLEMENTS, SSN.IS_IMPLEMENTED_BY),
+    (SSN.HAS_DEPLOYMENT, SSN.DEPLOYED_SYSTEM),
+    (SSN.IN_DEPLOYMENT, SSN.DEPLOYED_ON_PLATFORM),
+]
+
+# The inverse of every property in a pair, in both directions
+INVERSE_PROPERTIES: Dict[str, str] = {
+    **{first: second for first, second in INVERSE_PAIRS},
+    **{second: first for first, second in INVERSE_PAIRS},
+}
+
+# The non-canonical properties, mapped to their canonical inverse
+_CANONICAL_PROPERTIES: Dict[str, str] = {second: first for first, second in INVERSE_PAIRS}
+
+
+def get_inverse_property(property_iri: str) -> Optional[str]:
+    """
+    Get the inverse of an object property.
+
+    :param property_iri: The IRI of the object property
+    :return: The IRI of the inverse property, or None if it has no inverse
+    """
+    return INVERSE_PROPERTIES.get(property_iri)
+
+
+def get_canonical_property(property_iri: str) -> Tuple[str, bool]:
+    """
+    Get the direction an object property is stored in.
+
+    :param property_iri: The IRI of the object property
+    :return: The IRI of the property to store relationships as, and True if
+             its subject and object are swapped
+    """
+    canonical_iri = _CANONICAL_PROPERTIES.get(property_iri)
+
+    if canonical_iri is None:
+        return property_iri, False
+
+    return canonical_iri, True
+
+
+def find_unpaired_statements(graph: rdflib.Graph) -> List[Statement]:
+    """
+    Find the relationships of a graph that are asserted in only one direction,
+    when others are asserted in both.
+
+    Relationships should either all be asserted in both directions or all in
+    one, so unpaired relationships in a graph that pairs others are
+    inconsistencies, such as an inverse that was forgotten when a relationship
+    was edited.
+
+    :param graph: The graph
+    :return: The statements asserted without their inverse, or an empty list
+             if the graph doesn't assert any relationship in both directions
+    """
+    unpaired: List[Statement] = list()
+    has_pairs = False
+
+    for (subject, predicate, obj) in graph:
+        inverse_iri = INVERSE_PROPERTIES.get(str(predicate))
+        if inverse_iri is None or isinstance(obj, rdflib.Literal):
+            continue
+
+        if (obj, rdflib.URIRef(inverse_iri), subject) in graph:
+            has_pairs = True
+        else:
+            unpaired.append((str(subject), str(predicate), str(obj)))
+
+    return unpaired if has_pairs else []
+
+
+def remove_inverse_statements(graph: rdflib.Graph) -> int:
+    """
+    Remove the statements of a graph that are implied by the inverse of their
+    property, so that each relationship is only asserted in its canonical
+    direction.
+
+    Statements of a non-canonical property are removed. If the canonical
+    statement wasn't asserted, it is added in place of the removed statement,
+    so no relationship is lost.
+
+    :param graph: The graph
+    :return: The number of redundant statements removed
+    """
+    inverse_triples = [
+        (subject, predicate, obj)
+        for (subject, predicate, obj) in graph
+        if str(predicate) in _CANONICAL_PROPERTIES and not isinstance(obj, rdflib.Literal)
+    ]
+
+    removed = 0
+
+    for (subject, predicate, obj) in inverse_triples:
+        graph.remove((subject, predicate, obj))
+
+        canonical_triple = (obj, rdflib.URIRef(_CANONICAL_PROPERTIES[str(predicate)]), subject)
+        if canonical_triple in graph:
+            removed += 1
+        else:
+            graph.add(canonical_triple)
+
+    return removed
@@ -10,6 +10,11 @@
 
 from sosa.feature import FeatureOfInterest
 from sosa.feature import Property
+from sosa.index.autocomplete import Autocomplete
+from sosa.index.autocomplete import Completion
+from sosa.index.text_index import SearchResult
+from sosa.index.text_index import TEXT_PROPERTIES
+from sosa.index.text_index import TextIndex
 
 import os
 from qudt.ontology.ontology_reader import OntologyReader
@@ -21,14 +26,23 @@ import rdflib
 from sosa.ontology.schema import SCHEMA
 from typing import Any
 from typing import Callable
+from typing import Dict
+from typing import Iterable
 from typing import List
 from typing import Optional
+from typing import Set
 from typing import Tuple
 
 
 # Type definitions
 Statement = Tuple[str, str, rdflib.term.Identifier]
 Predicate = Callable[[str, str, rdflib.term.Identifier], bool]
+RepoKey = Tuple[str, str]
+
+
+# Kinds of repos, which are loaded separately even from the same file
+_FEATURE_REPO = 'feature'
+_PROPERTY_REPO = 'property'
 
 
 class OntologyFactory(object):
@@ -50,6 +64,16 @@ class OntologyFactory(object):
         self._feature_repos: List[rdflib.Graph] = list()
         self._property_repos: List[rdflib.Graph] = list()
 
+        # Repos by their kind and the file they were loaded from, for
+        # reloading and unloading them
+        self._repo_files: Dict[RepoKey, rdflib.Graph] = dict()
+
+        # Index of the labels, descriptions and abbreviations of the repos
+        self._text_index = TextIndex()
+
+        # Type-ahead completion of the labels and abbreviations of the repos
+        self._autocomplete = Autocomplete()
+
     @classmethod
     def _get_instance(cls) -> 'OntologyFactory':
         """
@@ -69,12 +93,14 @@ class OntologyFactory(object):
         of Interest.
 
         If the repo's file does not exist, this function has no effect and
-        returns 0.
+        returns 0. If the repo was loaded before, it is reloaded.
 
         :param repo_file: The path to the RDF triplet repo
         :return: The number of triplets loaded, or 0 if the file doesn't exist
         """
-        return cls._load_repo(repo_file, cls._get_instance()._feature_repos)
+        instance = cls._get_instance()
+
+        return instance._load_repo((_FEATURE_REPO, repo_file), instance._feature_repos)
 
     @classmethod
     def load_property_repo(cls, repo_file: str) -> int:
@@ -83,12 +109,40 @@ class OntologyFactory(object):
         and Actuatable Properties.
 
         If the repo's file does not exist, this function has no effect and
-        returns 0.
+        returns 0. If the repo was loaded before, it is reloaded.
 
         :param repo_file: The path to the RDF triplet repo
         :return: The number of triplets loaded, or 0 if the file doesn't exist
         """
-        return cls._load_repo(repo_file, cls._get_instance()._property_repos)
+        instance = cls._get_instance()
+
+        return instance._load_repo((_PROPERTY_REPO, repo_file), instance._property_repos)
+
+    @classmethod
+    def unload_feature_repo(cls, repo_file: str) -> int:
+        """
+        Unloads a repo of Features of Interest loaded by load_feature_repo().
+
+        :param repo_file: The path the repo was loaded from
+        :return: The number of triplets unloaded, or 0 if the repo wasn't
+                 loaded
+        """
+        instance = cls._get_instance()
+
+        return instance._unload_repo((_FEATURE_REPO, repo_file), instance._feature_repos)
+
+    @classmethod
+    def unload_property_repo(cls, repo_file: str) -> int:
+        """
+        Unloads a repo of Properties loaded by load_property_repo().
+
+        :param repo_file: The path the repo was loaded from
+        :return: The number of triplets unloaded, or 0 if the repo wasn't
+                 loaded
+        """
+        instance = cls._get_instance()
+
+        return instance._unload_repo((_PROPERTY_REPO, repo_file), instance._property_repos)
 
     @classmethod
     def get_feature_of_interest(cls, resource_iri: str) -> FeatureOfInterest:
@@ -110,20 +164,84 @@ class OntologyFactory(object):
         """
         return cls._get_instance()._get_property(resource_iri)
 
+    @classmethod
+    def get_features_of_interest(cls, resource_iris: Iterable[str]) -> Dict[str, FeatureOfInterest]:
+        """
+        Get Feature of Interest instances by their resource IRIs.
+
+        The repos are scanned once for the whole batch, rather than once per
+        feature.
+
+        :param resource_iris: The features' resource IRIs
+        :return: The features, keyed by resource IRI
+        """
+        return cls._get_instance()._get_features_of_interest(set(resource_iris))
+
+    @classmethod
+    def get_properties(cls, resource_iris: Iterable[str]) -> Dict[str, Property]:
+        """
+        Get Property instances by their resource IRIs.
+
+        The repos are scanned once for the whole batch, rather than once per
+        property.
+
+        :param resource_iris: The properties' resource IRIs
+        :return: The properties, keyed by resource IRI
+        """
+        return cls._get_instance()._get_properties(set(resource_iris))
+
+    @classmethod
+    def search(cls, query: str, limit: int = 10) -> List[SearchResult]:
+        """
+        Search the Features of Interest and Properties of the loaded repos by
+        their labels, descriptions and abbreviations.
+
+        The repos are indexed when they are loaded, so the search doesn't scan
+        them.
+
+        :param query: The query, whose last word may be incomplete
+        :param limit: The maximum number of results
+        :return: The IRIs of the best matches and their relevance, most
+                 relevant first
+        """
+        return cls._get_instance()._text_index.search(query, limit)
+
+    @classmethod
+    def complete(cls, prefix: str, limit: int = 10) -> List[Completion]:
+        """
+        Complete a prefix of the label or abbreviation of a Feature of
+        Interest or Property of the loaded repos, for type-ahead.
+
+        :param prefix: The prefix, such as "nitric o"
+        :param limit: The maximum number of completions
+        :return: The completions, best first
+        """
+        return cls._get_instance()._autocomplete.complete(prefix, limit)
+
     def _get_feature_of_interest(self, resource_iri: str) -> FeatureOfInterest:
         """
         Internal implementation of get_feature_of_interest().
         """
-        feature = FeatureOfInterest(
-            resource_iri=resource_iri,
-        )
+        return self._get_features_of_interest({resource_iri})[resource_iri]
+
+    def _get_features_of_interest(self, resource_iris: Set[str]) -> Dict[str, FeatureOfInterest]:
+        """
+        Internal implementation of get_features_of_interest().
+        """
+        features: Dict[str, FeatureOfInterest] = {
+            resource_iri: FeatureOfInterest(
+                resource_iri=resource_iri,
+            ) for resource_iri in resource_iris
+        }
 
         statements: List[Statement] = self._get_statements(
             self._feature_repos,
-            lambda subj, pred, obj: str(subj) == resource_iri,
+            lambda subj, pred, obj: str(subj) in resource_iris,
         )
 
         for (subject, predicate, obj) in statements:
+            feature = features[subject]
+
             if predicate == RDF.TYPE:
                 feature.type_iri = str(obj)
             if predicate == RDFS.LABEL:
@@ -133,22 +251,32 @@ class OntologyFactory(object):
             elif predicate == QUDT.ABBREVIATION:
                 feature.abbreviation = str(obj)
 
-        return feature
+        return features
 
     def _get_property(self, resource_iri: str) -> Property:
         """
         Internal implementation of get_property().
         """
-        prop = Property(
-            resource_iri=resource_iri,
-        )
+        return self._get_properties({resource_iri})[resource_iri]
+
+    def _get_properties(self, resource_iris: Set[str]) -> Dict[str, Property]:
+        """
+        Internal implementation of get_properties().
+        """
+        properties: Dict[str, Property] = {
+            resource_iri: Property(
+                resource_iri=resource_iri,
+            ) for resource_iri in resource_iris
+        }
 
         statements: List[Statement] = self._get_statements(
             self._property_repos,
-            lambda subj, pred, obj: str(subj) == resource_iri,
+            lambda subj, pred, obj: str(subj) in resource_iris,
         )
 
         for (subject, predicate, obj) in statements:
+            prop = properties[subject]
+
             if predicate == RDF.TYPE:
                 prop.type_iri = str(obj)
             if predicate == RDFS.LABEL:
@@ -158,20 +286,78 @@ class OntologyFactory(object):
             elif predicate == QUDT.UNIT:
                 prop.unit = UnitFactory.get_unit(str(obj))
 
-        return prop
+        return properties
 
-    @staticmethod
-    def _load_repo(repo_file: str, destination_list: List[rdflib.Graph]) -> int:
+    def _load_repo(self, repo_key: RepoKey, destination_list: List[rdflib.Graph]) -> int:
         """
-        Helper function to load RDF triplet repos into a destination list.
+        Helper function to load RDF triplet repos into a destination list, and
+        index their texts. A repo of the same kind loaded from the same file
+        before is replaced.
         """
+        _, repo_file = repo_key
+
         repo = OntologyReader.read(repo_file)
 
         if repo:
+            self._remove_repo(repo_key, destination_list)
+
             destination_list.append(repo)
+            self._repo_files[repo_key] = repo
+            self._text_index.add_graph(repo)
+
+            # Only the difference from the previous repo is applied
+            self._autocomplete.load_graph(self._get_source(repo_key), repo)
 
         return len(repo)
 
+    def _unload_repo(self, repo_key: RepoKey, destination_list: List[rdflib.Graph]) -> int:
+        """
+        Internal implementation of unload_feature_repo() and
+        unload_property_repo().
+        """
+        repo = self._remove_repo(repo_key, destination_list)
+        if repo is None:
+            return 0
+
+        self._autocomplete.unload(self._get_source(repo_key))
+
+        return len(repo)
+
+    def _remove_repo(self, repo_key: RepoKey, destination_list: List[rdflib.Graph]) -> Optional[rdflib.Graph]:
+        """
+        Helper function to remove a loaded repo from a destination list and
+        the text index, keeping the texts of its entities from other repos.
+        """
+        repo = self._repo_files.pop(repo_key, None)
+        if repo is None:
+            return None
+
+        destination_list[:] = [graph for graph in destination_list if graph is not repo]
+
+        resource_iris = {str(subject) for subject in repo.subjects()}
+
+        for resource_iri in resource_iris:
+            self._text_index.remove(resource_iri)
+
+        statements: List[Statement] = self._get_statements(
+            list(self._repo_files.values()),
+            lambda subj, pred, obj: str(subj) in resource_iris and str(pred) in TEXT_PROPERTIES,
+        )
+
+        for (subject, predicate, obj) in statements:
+            self._text_index.add(subject, predicate, str(obj))
+
+        return repo
+
+    @staticmethod
+    def _get_source(repo_key: RepoKey) -> str:
+        """
+        Helper function to get the autocomplete source of a repo.
+        """
+        repo_kind, repo_file = repo_key
+
+        return f'{repo_kind}:{repo_file}'
+
     @staticmethod
     def _get_statements(
             repos: List[rdflib.Graph],
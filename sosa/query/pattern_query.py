@@ -0,0 +1,341 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.relationship import RelationshipStore
+
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+
+# Type definitions
+TriplePattern = Tuple[str, str, str]
+Bindings = Dict[str, str]
+_Row = Dict[str, int]
+
+
+# Join methods
+JOIN_SCAN = 'scan'
+JOIN_INDEX = 'index'
+JOIN_HASH = 'hash'
+
+
+def is_variable(term: str) -> bool:
+    """
+    Check if a term of a triple pattern is a variable, such as ?sensor.
+
+    :param term: The term
+    :return: True if the term is a variable, False if it is an IRI
+    """
+    return term.startswith('?')
+
+
+def get_variables(pattern: TriplePattern) -> Set[str]:
+    """
+    Get the variables of a triple pattern.
+
+    :param pattern: The triple pattern
+    :return: The names of the variables, including the leading ?
+    """
+    return {term for term in (pattern[0], pattern[2]) if is_variable(term)}
+
+
+class PlanStep(NamedTuple):
+    """
+    A step of a query plan, joining the rows of the previous steps with the
+    relationships matching a triple pattern.
+    """
+
+    pattern: TriplePattern
+    """
+    The triple pattern matched by the step.
+    """
+
+    method: str
+    """
+    How the pattern is joined with the rows of the previous steps, one of:
+
+        * JOIN_SCAN, scanning every relationship of the property per row
+        * JOIN_INDEX, looking up the relationships of each row's bindings in
+          the adjacency indexes (an index nested-loop join)
+        * JOIN_HASH, scanning the relationships of the property once into a
+          hash table keyed by the join variables, and probing it per row
+    """
+
+    join_variables: List[str]
+    """
+    The variables of the pattern bound by the previous steps.
+    """
+
+    estimate: float
+    """
+    The estimated number of rows after the step.
+    """
+
+
+class PatternQuery(object):
+    """
+    A query engine for conjunctive triple patterns, such as:
+
+        ?platform sosa:hosts ?sensor .
+        ?sensor sosa:observes ?property .
+
+    evaluated against the adjacency indexes of a relationship store.
+
+    Patterns are joined in order of increasing estimated cardinality, using
+    the number of relationships of each property and the number of distinct
+    subjects and objects to estimate the fan-out of a lookup. Patterns sharing
+    a variable with the previous ones are preferred, to avoid cross products.
+
+    Each pattern is joined with an index nested-loop join, looking up the
+    bound terms in the adjacency lists, unless more rows are expected than
+    the property has relationships, in which case a hash join over one scan
+    of the property is cheaper.
+
+    Results are produced lazily, so only the rows that are consumed are
+    computed.
+    """
+
+    def __init__(self, relationships: RelationshipStore):
+        """
+        Create a query engine for a relationship store.
+
+        :param relationships: The relationship store
+        """
+        self._relationships = relationships
+
+    def plan(self, patterns: Iterable[TriplePattern], bound: Iterable[str] = ()) -> List[PlanStep]:
+        """
+        Order the triple patterns of a query and choose how to join them.
+
+        :param patterns: The triple patterns, with variables prefixed by ?
+        :param bound: The variables that are bound before the query runs
+        :return: The steps of the plan, in the order they are executed
+        :raises ValueError: If a predicate is a variable or isn't stored
+        """
+        remaining = list(patterns)
+        for pattern in remaining:
+            if is_variable(pattern[1]):
+                raise ValueError(f'Predicate variables are unsupported: {pattern[1]}')
+            self._relationships.count(pattern[1])
+
+        bound_variables: Set[str] = set(bound)
+        rows = 1.0
+
+        steps: List[PlanStep] = list()
+
+        while remaining:
+            # Prefer patterns joined with the previous ones by a variable
+            connected = [
+                pattern for pattern in remaining
+                if not steps or not get_variables(pattern) or get_variables(pattern) & bound_variables
+            ]
+
+            pattern = min(connected or remaining, key=lambda pattern: self._estimate(pattern, bound_variables))
+            remaining.remove(pattern)
+
+            join_variables = sorted(get_variables(pattern) & bound_variables)
+            fan_out = self._estimate(pattern, bound_variables)
+
+            if self._is_bound(pattern[0], bound_variables) or self._is_bound(pattern[2], bound_variables):
+                method = JOIN_INDEX
+                if join_variables and rows > self._estimate(pattern, set()):
+                    method = JOIN_HASH
+            else:
+                method = JOIN_SCAN
+
+            rows *= fan_out
+            bound_variables |= get_variables(pattern)
+
+            steps.append(PlanStep(pattern=pattern, method=method, join_variables=join_variables, estimate=rows))
+
+        return steps
+
+    def execute(self, patterns: Iterable[TriplePattern], bindings: Optional[Bindings] = None) -> Iterator[Bindings]:
+        """
+        Find the bindings of the variables that match every triple pattern.
+
+        :param patterns: The triple patterns, with variables prefixed by ?
+        :param bindings: Variables bound to IRIs before the query runs
+        :return: A lazy iterator over the bindings of each match
+        :raises ValueError: If a predicate is a variable or isn't stored
+        """
+        bindings = bindings or dict()
+
+        steps = self.plan(patterns, bindings.keys())
+
+        return self.execute_plan(steps, bindings)
+
+    def execute_plan(self, steps: List[PlanStep], bindings: Optional[Bindings] = None) -> Iterator[Bindings]:
+        """
+        Run the steps of a plan made by plan().
+
+        A plan can be run many times with different initial bindings, such as
+        once per row of an outer query. Variables that the plan expected to be
+        bound but aren't are matched like unbound variables, unless they are
+        the key of a hash join.
+
+        :param steps: The steps of the plan
+        :param bindings: Variables bound to IRIs before the plan runs
+        :return: A lazy iterator over the bindings of each match
+        """
+        return self._execute(steps, bindings or dict())
+
+    def _execute(self, steps: List[PlanStep], bindings: Bindings) -> Iterator[Bindings]:
+        """
+        Run the steps of a plan.
+        """
+        row: _Row = dict()
+
+        for variable, resource_iri in bindings.items():
+            entity_id = self._relationships.find_id(resource_iri)
+            if entity_id is None:
+                return
+            row[variable] = entity_id
+
+        # Constants that were never seen can't match anything
+        for step in steps:
+            for term in (step.pattern[0], step.pattern[2]):
+                if not is_variable(term) and self._relationships.find_id(term) is None:
+                    return
+
+        rows: Iterator[_Row] = iter([row])
+
+        for step in steps:
+            if step.method == JOIN_HASH:
+                rows = self._hash_join(rows, step)
+            else:
+                rows = self._index_join(rows, step)
+
+        get_iri = self._relationships.get_iri
+
+        for row in rows:
+            yield {variable: get_iri(entity_id) for variable, entity_id in row.items()}
+
+    def _index_join(self, rows: Iterator[_Row], step: PlanStep) -> Iterator[_Row]:
+        """
+        Join rows with a pattern by looking up each row's bindings.
+        """
+        for row in rows:
+            for subject_id, object_id in self._match(step.pattern, row):
+                extended = self._extend(row, step.pattern, subject_id, object_id)
+                if extended is not None:
+                    yield extended
+
+    def _hash_join(self, rows: Iterator[_Row], step: PlanStep) -> Iterator[_Row]:
+        """
+        Join rows with a pattern through a hash table of its matches, built on
+        the first row.
+        """
+        subject_term, _, object_term = step.pattern
+
+        table: Optional[Dict[Tuple[int, ...], List[Tuple[int, int]]]] = None
+
+        for row in rows:
+            if table is None:
+                table = dict()
+                for subject_id, object_id in self._match(step.pattern, dict()):
+                    match = {subject_term: subject_id, object_term: object_id}
+                    key = tuple(match[variable] for variable in step.join_variables)
+                    table.setdefault(key, list()).append((subject_id, object_id))
+
+            key = tuple(row[variable] for variable in step.join_variables)
+
+            for subject_id, object_id in table.get(key, ()):
+                extended = self._extend(row, step.pattern, subject_id, object_id)
+                if extended is not None:
+                    yield extended
+
+    def _match(self, pattern: TriplePattern, row: _Row) -> Iterator[Tuple[int, int]]:
+        """
+        Find the relationships matching a pattern, given the bindings of a row.
+
+        :return: The IDs of the subject and object of each relationship
+        """
+        subject_term, predicate_iri, object_term = pattern
+
+        subject_id = self._get_id(subject_term, row)
+        object_id = self._get_id(object_term, row)
+
+        if subject_id is not None and object_id is not None:
+            if object_id in self._relationships.get_object_ids(subject_id, predicate_iri):
+                yield subject_id, object_id
+        elif subject_id is not None:
+            for object_id in self._relationships.get_object_ids(subject_id, predicate_iri):
+                yield subject_id, object_id
+        elif object_id is not None:
+            for subject_id in self._relationships.get_subject_ids(predicate_iri, object_id):
+                yield subject_id, object_id
+        else:
+            yield from self._relationships.get_edge_ids(predicate_iri)
+
+    def _get_id(self, term: str, row: _Row) -> Optional[int]:
+        """
+        Get the ID bound to a term, or None if it is an unbound variable.
+        """
+        if is_variable(term):
+            return row.get(term)
+
+        return self._relationships.find_id(term)
+
+    def _estimate(self, pattern: TriplePattern, bound: Set[str]) -> float:
+        """
+        Estimate the number of matches of a pattern per row, given the bound
+        variables.
+        """
+        subject_term, predicate_iri, object_term = pattern
+
+        count = self._relationships.count(predicate_iri)
+        if count == 0:
+            return 0.0
+
+        subject_count = self._relationships.count_subjects(predicate_iri)
+        object_count = self._relationships.count_objects(predicate_iri)
+
+        subject_bound = self._is_bound(subject_term, bound)
+        object_bound = self._is_bound(object_term, bound)
+
+        if subject_bound and object_bound:
+            return count / (subject_count * object_count)
+        if subject_bound:
+            return count / subject_count
+        if object_bound:
+            return count / object_count
+
+        return float(count)
+
+    @staticmethod
+    def _is_bound(term: str, bound: Set[str]) -> bool:
+        """
+        Helper function to check if a term is an IRI or a bound variable
+        """
+        return not is_variable(term) or term in bound
+
+    @staticmethod
+    def _extend(row: _Row, pattern: TriplePattern, subject_id: int, object_id: int) -> Optional[_Row]:
+        """
+        Helper function to bind the variables of a matched pattern, or return
+        None if a variable repeated in the pattern would be bound twice
+        """
+        subject_term, _, object_term = pattern
+
+        extended = dict(row)
+
+        for term, entity_id in ((subject_term, subject_id), (object_term, object_id)):
+            if is_variable(term):
+                if extended.setdefault(term, entity_id) != entity_id:
+                    return None
+
+        return extended
@@ -0,0 +1,809 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+"""
+A compiler for a subset of SPARQL SELECT queries, producing plans that run
+against the indexes of a relationship store instead of the rdflib query
+engine.
+
+The supported subset is:
+
+    * Basic graph patterns whose predicates are stored object properties
+    * FILTER, with comparisons of bound IRIs to IRIs and literals, the
+      logical operators, IN and NOT IN, and the builtins BOUND, STR, LCASE,
+      UCASE, STRSTARTS, STRENDS, CONTAINS and REGEX
+    * OPTIONAL
+    * DISTINCT and REDUCED
+    * ORDER BY
+    * LIMIT and OFFSET
+
+Queries are parsed by rdflib, and its algebra is translated into a tree of
+plan nodes. Other features raise a ValueError when the query is compiled.
+"""
+
+from sosa.query.pattern_query import Bindings
+from sosa.query.pattern_query import PatternQuery
+from sosa.query.pattern_query import PlanStep
+from sosa.query.pattern_query import TriplePattern
+from sosa.relationship import RelationshipStore
+
+import abc
+import itertools
+import rdflib
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.parserutils import CompValue
+import re
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+
+# Type definitions
+_Value = Optional[rdflib.term.Node]
+_Evaluator = Callable[[Bindings], _Value]
+
+
+# Operators of relational expressions
+_COMPARISONS: Dict[str, Callable[[Any, Any], bool]] = {
+    '=': lambda left, right: left == right,
+    '!=': lambda left, right: left != right,
+    '<': lambda left, right: left < right,
+    '>': lambda left, right: left > right,
+    '<=': lambda left, right: left <= right,
+    '>=': lambda left, right: left >= right,
+}
+
+
+class _Node(abc.ABC):
+    """
+    A node of a compiled query plan.
+    """
+
+    # The variables that are bound in every row of the node
+    certain: Set[str] = set()
+
+    @abc.abstractmethod
+    def evaluate(self, bindings: Bindings) -> Iterator[Bindings]:
+        """
+        Produce the rows of the node, extending the bindings of an outer row.
+
+        :param bindings: The bindings of the outer row
+        :return: The rows, each including the outer bindings
+        """
+
+    @abc.abstractmethod
+    def explain(self) -> List[str]:
+        """
+        Describe the node and its children, one line per operation.
+
+        :return: The lines of the description
+        """
+
+    @staticmethod
+    def _indent(lines: List[str]) -> List[str]:
+        """
+        Helper function to nest the description of a child node.
+
+        :param lines: The lines of the child's description
+        :return: The lines, indented one level
+        """
+        return [f'  {line}' for line in lines]
+
+
+class _BgpNode(_Node):
+    """
+    A basic graph pattern, run as a plan of the pattern query engine.
+    """
+
+    def __init__(self, query: PatternQuery, steps: List[PlanStep]):
+        """
+        Create a basic graph pattern node.
+
+        :param query: The pattern query engine that runs the plan
+        :param steps: The planned steps of the pattern, in join order
+        """
+        self._query = query
+        self._steps = steps
+        self.certain = {term for step in steps for term in (step.pattern[0], step.pattern[2]) if term.startswith('?')}
+
+    def evaluate(self, bindings: Bindings) -> Iterator[Bindings]:
+        """
+        Run the planned steps, starting from the outer row.
+
+        :param bindings: The bindings of the outer row
+        :return: The rows, each including the outer bindings
+        """
+        return self._query.execute_plan(self._steps, bindings)
+
+    def explain(self) -> List[str]:
+        """
+        Describe the access method, join variables and row estimate of each
+        step.
+
+        :return: The lines of the description
+        """
+        lines = ['BGP']
+
+        for step in self._steps:
+            subject_term, predicate_iri, object_term = step.pattern
+            join = f' on {", ".join(step.join_variables)}' if step.join_variables else ''
+            lines.append(
+                f'  {step.method} {_format_term(subject_term)} <{predicate_iri}> {_format_term(object_term)}'
+                f'{join} (rows ~{step.estimate:g})'
+            )
+
+        return lines
+
+
+class _JoinNode(_Node):
+    """
+    A join of two groups, evaluating the right group once per row of the
+    left, with the left row's bindings.
+    """
+
+    def __init__(self, left: _Node, right: _Node):
+        """
+        Create a join node.
+
+        :param left: The group evaluated first
+        :param right: The group evaluated once per row of the left group
+        """
+        self._left = left
+        self._right = right
+        self.certain = left.certain | right.certain
+
+    def evaluate(self, bindings: Bindings) -> Iterator[Bindings]:
+        """
+        Produce every row of the right group for each row of the left group.
+
+        :param bindings: The bindings of the outer row
+        :return: The rows, each including the outer bindings
+        """
+        for row in self._left.evaluate(bindings):
+            yield from self._right.evaluate(row)
+
+    def explain(self) -> List[str]:
+        """
+        Describe the join and both of its groups.
+
+        :return: The lines of the description
+        """
+        return ['Join', *self._indent(self._left.explain()), *self._indent(self._right.explain())]
+
+
+class _LeftJoinNode(_Node):
+    """
+    An OPTIONAL group, keeping the rows of the left group that have no match.
+    """
+
+    def __init__(self, left: _Node, right: _Node, condition: Optional[Tuple[_Evaluator, str]]):
+        """
+        Create an OPTIONAL node.
+
+        :param left: The required group
+        :param right: The optional group
+        :param condition: The evaluator and text of the FILTER inside the optional
+                          group, or None if it has none
+        """
+        self._left = left
+        self._right = right
+        self._condition = condition
+        self.certain = left.certain
+
+    def evaluate(self, bindings: Bindings) -> Iterator[Bindings]:
+        """
+        Produce the rows of the left group, extended by every matching row of
+        the right group, or unextended if none match.
+
+        :param bindings: The bindings of the outer row
+        :return: The rows, each including the outer bindings
+        """
+        for row in self._left.evaluate(bindings):
+            matched = False
+
+            for extended in self._right.evaluate(row):
+                if self._condition is None or _is_true(self._condition[0](extended)):
+                    matched = True
+                    yield extended
+
+            if not matched:
+                yield row
+
+    def explain(self) -> List[str]:
+        """
+        Describe the optional join, its condition and both of its groups.
+
+        :return: The lines of the description
+        """
+        title = f'LeftJoin {self._condition[1]}' if self._condition is not None else 'LeftJoin'
+        return [title, *self._indent(self._left.explain()), *self._indent(self._right.explain())]
+
+
+class _FilterNode(_Node):
+    """
+    A FILTER, keeping the rows whose condition is true.
+    """
+
+    def __init__(self, child: _Node, condition: Tuple[_Evaluator, str]):
+        """
+        Create a FILTER node.
+
+        :param child: The node whose rows are filtered
+        :param condition: The evaluator and text of the condition
+        """
+        self._child = child
+        self._condition = condition
+        self.certain = child.certain
+
+    def evaluate(self, bindings: Bindings) -> Iterator[Bindings]:
+        """
+        Produce the rows of the child whose condition is true.
+
+        :param bindings: The bindings of the outer row
+        :return: The rows, each including the outer bindings
+        """
+        evaluator = self._condition[0]
+        return (row for row in self._child.evaluate(bindings) if _is_true(evaluator(row)))
+
+    def explain(self) -> List[str]:
+        """
+        Describe the condition and the child.
+
+        :return: The lines of the description
+        """
+        return [f'Filter {self._condition[1]}', *self._indent(self._child.explain())]
+
+
+class _OrderNode(_Node):
+    """
+    An ORDER BY, sorting every row of its child.
+    """
+
+    def __init__(self, child: _Node, conditions: List[Tuple[_Evaluator, bool, str]]):
+        """
+        Create an ORDER BY node.
+
+        :param child: The node whose rows are sorted
+        :param conditions: The evaluator, whether the order is descending, and the
+                           text of each condition, most significant first
+        """
+        self._child = child
+        self._conditions = conditions
+        self.certain = child.certain
+
+    def evaluate(self, bindings: Bindings) -> Iterator[Bindings]:
+        """
+        Produce every row of the child, sorted by the conditions.
+
+        :param bindings: The bindings of the outer row
+        :return: The rows, each including the outer bindings
+        """
+        rows = list(self._child.evaluate(bindings))
+
+        # Stable sorts, from the least significant condition
+        for evaluator, descending, _ in reversed(self._conditions):
+            rows.sort(key=lambda row: _get_sort_key(evaluator(row)), reverse=descending)
+
+        return iter(rows)
+
+    def explain(self) -> List[str]:
+        """
+        Describe the sort conditions and the child.
+
+        :return: The lines of the description
+        """
+        return [f'OrderBy {" ".join(text for _, _, text in self._conditions)}', *self._indent(self._child.explain())]
+
+
+class _ProjectNode(_Node):
+    """
+    The projection of each row to the selected variables.
+    """
+
+    def __init__(self, child: _Node, variables: List[str]):
+        """
+        Create a projection node.
+
+        :param child: The node whose rows are projected
+        :param variables: The selected variables, including the leading ?
+        """
+        self._child = child
+        self._variables = variables
+        self.certain = child.certain & set(variables)
+
+    def evaluate(self, bindings: Bindings) -> Iterator[Bindings]:
+        """
+        Produce the rows of the child, keeping only the selected variables.
+
+        :param bindings: The bindings of the outer row
+        :return: The rows, each including the outer bindings
+        """
+        for row in self._child.evaluate(bindings):
+            yield {variable: row[variable] for variable in self._variables if variable in row}
+
+    def explain(self) -> List[str]:
+        """
+        Describe the selected variables and the child.
+
+        :return: The lines of the description
+        """
+        return [f'Project {" ".join(self._variables)}', *self._indent(self._child.explain())]
+
+
+class _DistinctNode(_Node):
+    """
+    A DISTINCT, dropping rows that were already produced.
+    """
+
+    def __init__(self, child: _Node):
+        """
+        Create a DISTINCT node.
+
+        :param child: The node whose duplicate rows are dropped
+        """
+        self._child = child
+        self.certain = child.certain
+
+    def evaluate(self, bindings: Bindings) -> Iterator[Bindings]:
+        """
+        Produce the rows of the child, dropping rows that were already
+        produced.
+
+        :param bindings: The bindings of the outer row
+        :return: The rows, each including the outer bindings
+        """
+        seen: Set[Tuple[Tuple[str, str], ...]] = set()
+
+        for row in self._child.evaluate(bindings):
+            key = tuple(sorted(row.items()))
+            if key not in seen:
+                seen.add(key)
+                yield row
+
+    def explain(self) -> List[str]:
+        """
+        Describe the node and the child.
+
+        :return: The lines of the description
+        """
+        return ['Distinct', *self._indent(self._child.explain())]
+
+
+class _SliceNode(_Node):
+    """
+    An OFFSET and LIMIT, stopping its child once the rows are produced.
+    """
+
+    def __init__(self, child: _Node, offset: int, limit: Optional[int]):
+        """
+        Create an OFFSET and LIMIT node.
+
+        :param child: The node whose rows are sliced
+        :param offset: The number of rows to skip
+        :param limit: The maximum number of rows to produce, or None for no limit
+        """
+        self._child = child
+        self._offset = offset
+        self._limit = limit
+        self.certain = child.certain
+
+    def evaluate(self, bindings: Bindings) -> Iterator[Bindings]:
+        """
+        Produce the rows of the child after the offset, up to the limit.
+
+        :param bindings: The bindings of the outer row
+        :return: The rows, each including the outer bindings
+        """
+        stop = self._offset + self._limit if self._limit is not None else None
+        return itertools.islice(self._child.evaluate(bindings), self._offset, stop)
+
+    def explain(self) -> List[str]:
+        """
+        Describe the offset, limit and the child.
+
+        :return: The lines of the description
+        """
+        limit = f' limit {self._limit}' if self._limit is not None else ''
+        return [f'Slice offset {self._offset}{limit}', *self._indent(self._child.explain())]
+
+
+class CompiledQuery(object):
+    """
+    A SPARQL SELECT query compiled into a plan over a relationship store.
+
+    The plan, including the join order of each basic graph pattern, is chosen
+    when the query is compiled, from the statistics of the store at that time.
+    """
+
+    def __init__(self, root: _Node, variables: List[str]):
+        """
+        Create a compiled query. Use SparqlCompiler.compile() instead.
+
+        :param root: The root of the plan
+        :param variables: The selected variables
+        """
+        self._root = root
+        self._variables = variables
+
+    @property
+    def variables(self) -> List[str]:
+        """
+        The selected variables, including the leading ?.
+        """
+        return list(self._variables)
+
+    def execute(self) -> Iterator[Bindings]:
+        """
+        Run the query.
+
+        :return: A lazy iterator over the bindings of each solution, keyed by
+                 variable. Variables left unbound by an OPTIONAL are missing.
+        """
+        return self._root.evaluate(dict())
+
+    def explain(self) -> str:
+        """
+        Describe the plan of the query.
+
+        :return: The operations of the plan, one per line, with their inputs
+                 indented below them
+        """
+        return '\n'.join(self._root.explain())
+
+
+class SparqlCompiler(object):
+    """
+    A compiler of SPARQL SELECT queries into plans over a relationship store.
+
+    Basic graph patterns are planned by the pattern query engine. A group that
+    follows an OPTIONAL is joined by evaluating it once per row, with the
+    variables bound by the rows looked up in the adjacency indexes.
+    """
+
+    def __init__(self, relationships: RelationshipStore):
+        """
+        Create a compiler for a relationship store.
+
+        :param relationships: The relationship store
+        """
+        self._query = PatternQuery(relationships)
+
+    def compile(self, query: str, namespaces: Optional[Dict[str, str]] = None) -> CompiledQuery:
+        """
+        Compile a SPARQL SELECT query.
+
+        :param query: The text of the query
+        :param namespaces: Prefixes available to the query in addition to its
+                           PREFIX declarations, such as {'sosa': SOSA_IRI}
+        :return: The compiled query
+        :raises ValueError: If the query uses an unsupported feature
+        """
+        try:
+            prepared = prepareQuery(query, initNs=namespaces or dict())
+        except Exception as error:
+            raise ValueError(f'Invalid query: {error}')
+
+        algebra = prepared.algebra
+        if algebra.name != 'SelectQuery':
+            raise ValueError(f'Unsupported query form: {algebra.name}')
+
+        variables = [_get_variable_name(variable) for variable in algebra['PV']]
+
+        return CompiledQuery(self._compile_node(algebra['p'], set()), variables)
+
+    def _compile_node(self, algebra: CompValue, bound: Set[str]) -> _Node:
+        """
+        Translate a node of the rdflib algebra into a plan node.
+
+        :param algebra: The node of the algebra
+        :param bound: The variables bound in every outer row
+        :return: The plan node
+        """
+        name = algebra.name
+
+        if name == 'BGP':
+            patterns = [self._get_pattern(triple) for triple in algebra['triples']]
+            return _BgpNode(self._query, self._query.plan(patterns, bound))
+
+        if name == 'Join':
+            left = self._compile_node(algebra['p1'], bound)
+            return _JoinNode(left, self._compile_node(algebra['p2'], bound | left.certain))
+
+        if name == 'LeftJoin':
+            left = self._compile_node(algebra['p1'], bound)
+            right = self._compile_node(algebra['p2'], bound | left.certain)
+
+            condition = _get_argument(algebra, 'expr')
+            if isinstance(condition, CompValue) and condition.name == 'TrueFilter':
+                condition = None
+
+            return _LeftJoinNode(left, right, _compile_expression(condition) if condition is not None else None)
+
+        if name == 'Filter':
+            return _FilterNode(self._compile_node(algebra['p'], bound), _compile_expression(algebra['expr']))
+
+        if name == 'OrderBy':
+            conditions: List[Tuple[_Evaluator, bool, str]] = list()
+
+            for condition in algebra['expr']:
+                descending = False
+                if isinstance(condition, CompValue) and condition.name == 'OrderCondition':
+                    descending = condition['order'] == 'DESC'
+                    condition = condition['expr']
+
+                evaluator, text = _compile_expression(condition)
+                conditions.append((evaluator, descending, f'DESC({text})' if descending else f'ASC({text})'))
+
+            return _OrderNode(self._compile_node(algebra['p'], bound), conditions)
+
+        if name == 'Project':
+            variables = [_get_variable_name(variable) for variable in algebra['PV']]
+            return _ProjectNode(self._compile_node(algebra['p'], bound), variables)
+
+        if name in ('Distinct', 'Reduced'):
+            return _DistinctNode(self._compile_node(algebra['p'], bound))
+
+        if name == 'Slice':
+            return _SliceNode(self._compile_node(algebra['p'], bound), algebra['start'], _get_argument(algebra, 'length'))
+
+        raise ValueError(f'Unsupported query operation: {name}')
+
+    @staticmethod
+    def _get_pattern(triple: Tuple[rdflib.term.Node, rdflib.term.Node, rdflib.term.Node]) -> TriplePattern:
+        """
+        Helper function to translate a triple of the rdflib algebra into a
+        triple pattern
+        """
+        pattern: List[str] = list()
+
+        for term in triple:
+            if isinstance(term, rdflib.Variable):
+                pattern.append(_get_variable_name(term))
+            elif isinstance(term, rdflib.URIRef):
+                pattern.append(str(term))
+            else:
+                raise ValueError(f'Unsupported term in triple pattern: {term.n3()}')
+
+        return pattern[0], pattern[1], pattern[2]
+
+
+def _get_variable_name(variable: rdflib.Variable) -> str:
+    """
+    Get the name of a variable, including the leading ?.
+    """
+    return f'?{variable}'
+
+
+def _get_argument(value: CompValue, name: str) -> Any:
+    """
+    Get an optional argument of a parsed operation or expression, or None if
+    it is missing. CompValue.get() returns the name of a missing argument.
+    """
+    return value[name] if name in value else None
+
+
+def _format_term(term: str) -> str:
+    """
+    Format a term of a triple pattern for explain().
+    """
+    return term if term.startswith('?') else f'<{term}>'
+
+
+def _is_true(value: _Value) -> bool:
+    """
+    Get the effective boolean value of an expression, treating errors as false.
+    """
+    if isinstance(value, rdflib.Literal):
+        python_value = value.toPython()
+        if isinstance(python_value, (bool, int, float)):
+            return bool(python_value)
+        return bool(str(value))
+
+    return False
+
+
+def _get_sort_key(value: _Value) -> Tuple[int, int, Any]:
+    """
+    Get the key of a value for ORDER BY, placing unbound values before IRIs,
+    and IRIs before literals.
+    """
+    if value is None:
+        return 0, 0, ''
+
+    if isinstance(value, rdflib.Literal):
+        python_value = value.toPython()
+        if isinstance(python_value, (int, float)) and not isinstance(python_value, bool):
+            return 2, 0, python_value
+        return 2, 1, str(value)
+
+    return 1, 0, str(value)
+
+
+def _to_boolean(value: Optional[bool]) -> _Value:
+    """
+    Convert the result of a test to a literal, keeping errors as None.
+    """
+    return None if value is None else rdflib.Literal(value)
+
+
+def _get_boolean(value: _Value) -> Optional[bool]:
+    """
+    Get the effective boolean value of an expression, or None for an error.
+    """
+    if value is None or not isinstance(value, rdflib.Literal):
+        return None
+
+    return _is_true(value)
+
+
+def _compare(operator: str, left: _Value, right: _Value) -> _Value:
+    """
+    Compare two values, returning None if they aren't comparable.
+    """
+    if left is None or right is None:
+        return None
+
+    # Literals are compared by their value, and IRIs are only tested for
+    # equality
+    if isinstance(left, rdflib.Literal) and isinstance(right, rdflib.Literal):
+        left_value, right_value = left.toPython(), right.toPython()
+    elif operator not in ('=', '!='):
+        return None
+    elif isinstance(left, rdflib.URIRef) and isinstance(right, rdflib.URIRef):
+        left_value, right_value = str(left), str(right)
+    else:
+        # Terms of different kinds are never equal
+        return rdflib.Literal(operator == '!=')
+
+    try:
+        return rdflib.Literal(_COMPARISONS[operator](left_value, right_value))
+    except TypeError:
+        return None
+
+
+def _compile_expression(expression: Any) -> Tuple[_Evaluator, str]:
+    """
+    Compile an expression of the rdflib algebra into a function of a row.
+
+    :param expression: The expression
+    :return: The function, returning the value of the expression or None for
+             an error, and the text of the expression for explain()
+    :raises ValueError: If the expression uses an unsupported feature
+    """
+    if isinstance(expression, rdflib.Variable):
+        variable = _get_variable_name(expression)
+
+        def evaluate_variable(row: Bindings) -> _Value:
+            resource_iri = row.get(variable)
+            return rdflib.URIRef(resource_iri) if resource_iri is not None else None
+
+        return evaluate_variable, variable
+
+    if isinstance(expression, (rdflib.URIRef, rdflib.Literal)):
+        return (lambda row: expression), expression.n3()
+
+    if not isinstance(expression, CompValue):
+        raise ValueError(f'Unsupported expression: {expression}')
+
+    name = expression.name
+
+    if name == 'RelationalExpression':
+        operator = expression['op']
+        left, left_text = _compile_expression(expression['expr'])
+
+        if operator in ('IN', 'NOT IN'):
+            members = [_compile_expression(member) for member in expression['other']]
+            negate = operator == 'NOT IN'
+
+            def evaluate_in(row: Bindings) -> _Value:
+                value = left(row)
+                if value is None:
+                    return None
+                found = any(value == member(row) for member, _ in members)
+                return rdflib.Literal(found != negate)
+
+            return evaluate_in, f'{left_text} {operator} ({", ".join(text for _, text in members)})'
+
+        if operator not in _COMPARISONS:
+            raise ValueError(f'Unsupported operator: {operator}')
+
+        right, right_text = _compile_expression(expression['other'])
+
+        return (lambda row: _compare(operator, left(row), right(row))), f'{left_text} {operator} {right_text}'
+
+    if name in ('ConditionalAndExpression', 'ConditionalOrExpression'):
+        operands = [_compile_expression(expression['expr'])]
+        operands.extend(_compile_expression(other) for other in _get_argument(expression, 'other') or [])
+
+        is_and = name == 'ConditionalAndExpression'
+
+        def evaluate_logical(row: Bindings) -> _Value:
+            values = [_get_boolean(operand(row)) for operand, _ in operands]
+            if is_and:
+                if False in values:
+                    return rdflib.Literal(False)
+                return _to_boolean(None if None in values else True)
+            if True in values:
+                return rdflib.Literal(True)
+            return _to_boolean(None if None in values else False)
+
+        separator = ' && ' if is_and else ' || '
+        return evaluate_logical, f'({separator.join(text for _, text in operands)})'
+
+    if name == 'UnaryNot':
+        operand, text = _compile_expression(expression['expr'])
+
+        def evaluate_not(row: Bindings) -> _Value:
+            value = _get_boolean(operand(row))
+            return _to_boolean(None if value is None else not value)
+
+        return evaluate_not, f'!{text}'
+
+    if name == 'Builtin_BOUND':
+        variable = _get_variable_name(expression['arg'])
+        return (lambda row: rdflib.Literal(variable in row)), f'BOUND({variable})'
+
+    if name in ('Builtin_STR', 'Builtin_LCASE', 'Builtin_UCASE'):
+        operand, text = _compile_expression(expression['arg'])
+        function = name[len('Builtin_'):]
+
+        def evaluate_string(row: Bindings) -> _Value:
+            value = operand(row)
+            if value is None:
+                return None
+            if function == 'LCASE':
+                return rdflib.Literal(str(value).lower())
+            if function == 'UCASE':
+                return rdflib.Literal(str(value).upper())
+            return rdflib.Literal(str(value))
+
+        return evaluate_string, f'{function}({text})'
+
+    if name in ('Builtin_STRSTARTS', 'Builtin_STRENDS', 'Builtin_CONTAINS'):
+        first, first_text = _compile_expression(expression['arg1'])
+        second, second_text = _compile_expression(expression['arg2'])
+        function = name[len('Builtin_'):]
+
+        def evaluate_match(row: Bindings) -> _Value:
+            text, search = first(row), second(row)
+            if not isinstance(text, rdflib.Literal) or not isinstance(search, rdflib.Literal):
+                return None
+            if function == 'STRSTARTS':
+                return rdflib.Literal(str(text).startswith(str(search)))
+            if function == 'STRENDS':
+                return rdflib.Literal(str(text).endswith(str(search)))
+            return rdflib.Literal(str(search) in str(text))
+
+        return evaluate_match, f'{function}({first_text}, {second_text})'
+
+    if name == 'Builtin_REGEX':
+        operand, text = _compile_expression(expression['text'])
+
+        pattern = expression['pattern']
+        flags = _get_argument(expression, 'flags')
+        if not isinstance(pattern, rdflib.Literal) or (flags is not None and not isinstance(flags, rdflib.Literal)):
+            raise ValueError('REGEX patterns and flags must be literals')
+
+        regex = re.compile(str(pattern), re.IGNORECASE if flags is not None and 'i' in str(flags) else 0)
+
+        def evaluate_regex(row: Bindings) -> _Value:
+            value = operand(row)
+            if not isinstance(value, rdflib.Literal):
+                return None
+            return rdflib.Literal(regex.search(str(value)) is not None)
+
+        return evaluate_regex, f'REGEX({text}, {pattern.n3()})'
+
+    raise ValueError(f'Unsupported expression: {name}')
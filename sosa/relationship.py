@@ -8,4 +8,505 @@
 #
 ################################################################################
 
-# TODO
+"""
+Relationships between the entities of the SOSA and SSN ontologies, such as
+Platforms hosting Sensors and Sensors making Observations.
+
+This module introduces the following classes:
+
+  * RelationshipStore
+  * LoadReport
+
+Reference:
+
+    https://www.w3.org/TR/vocab-ssn/
+
+"""
+
+from sosa.ontology.inverse_properties import Statement
+from sosa.ontology.inverse_properties import find_unpaired_statements
+from sosa.ontology.inverse_properties import get_canonical_property
+from sosa.ontology.inverse_properties import remove_inverse_statements
+from sosa.ontology.sosa import SOSA
+from sosa.ontology.ssn import SSN
+
+import rdflib
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+
+# Type definitions
+Listener = Callable[[int, str, int, bool], None]
+
+
+# The object properties of SOSA and SSN relating two entities
+OBJECT_PROPERTIES: List[str] = [
+    # Observation module
+    SOSA.OBSERVED_PROPERTY,
+    SOSA.OBSERVES,
+    SOSA.IS_OBSERVED_BY,
+    SOSA.MADE_OBSERVATION,
+    SOSA.MADE_BY_SENSOR,
+    SOSA.HAS_MEMBER,
+
+    # Actuation module
+    SOSA.ACTS_ON_PROPERTY,
+    SOSA.IS_ACTED_ON_BY,
+    SOSA.MADE_ACTUATION,
+    SOSA.MADE_BY_ACTUATOR,
+
+    # Sample module
+    SOSA.HAS_SAMPLE,
+    SOSA.IS_SAMPLE_OF,
+    SOSA.MADE_SAMPLING,
+    SOSA.MADE_BY_SAMPLER,
+    SOSA.HAS_ORIGINAL_SAMPLE,
+    SOSA.HAS_SAMPLED_FEATURE,
+
+    # Feature of Interest module
+    SOSA.HAS_FEATURE_OF_INTEREST,
+    SOSA.IS_FEATURE_OF_INTEREST_OF,
+    SOSA.HAS_ULTIMATE_FEATURE_OF_INTEREST,
+
+    # Result module
+    SOSA.HAS_RESULT,
+    SOSA.IS_RESULT_OF,
+
+    # Procedure module
+    SOSA.USED_PROCEDURE,
+    SSN.IMPLEMENTS,
+    SSN.IS_IMPLEMENTED_BY,
+    SSN.HAS_INPUT,
+    SSN.HAS_OUTPUT,
+
+    # System module
+    SOSA.HOSTS,
+    SOSA.IS_HOSTED_BY,
+    SSN.HAS_SUBSYSTEM,
+    SSN.DEPLOYED_SYSTEM,
+    SSN.HAS_DEPLOYMENT,
+    SSN.DEPLOYED_ON_PLATFORM,
+    SSN.IN_DEPLOYMENT,
+]
+
+
+class LoadReport(NamedTuple):
+    """
+    The outcome of loading the relationships of a graph.
+    """
+
+    added: int
+    """
+    The number of relationships added to the store.
+    """
+
+    removed: int
+    """
+    The number of redundant inverse statements removed from the graph.
+    """
+
+    unpaired: List[Statement]
+    """
+    The statements of the graph asserted without their inverse, when others
+    are asserted in both directions.
+    """
+
+
+class RelationshipStore(object):
+    """
+    A store of the relationships between entities, indexed for neighbor
+    queries.
+
+    Entities are identified by dense integer IDs, assigned when they are first
+    seen. For every object property, the store keeps forward adjacency lists
+    from subject to objects and inverse adjacency lists from object to
+    subjects, so that neighbor queries in either direction take time
+    proportional to the number of neighbors instead of scanning the triples.
+
+    A relationship and its inverse, such as sosa:hosts and sosa:isHostedBy,
+    are stored as a single edge of the canonical property, and queries of the
+    inverse property are answered from the opposite adjacency list.
+
+    Listeners are notified of every edge added or removed, so that derived
+    indexes can be maintained incrementally.
+    """
+
+    def __init__(self, predicate_iris: Iterable[str] = OBJECT_PROPERTIES):
+        """
+        Create an empty relationship store.
+
+        :param predicate_iris: The IRIs of the object properties to store
+        """
+        # Entity IRIs by ID, and IDs by IRI
+        self._iris: List[str] = list()
+        self._ids: Dict[str, int] = dict()
+
+        # Stored properties, and the canonical property and direction each is
+        # stored as
+        self._predicates: Dict[str, Tuple[str, bool]] = {
+            iri: get_canonical_property(iri) for iri in predicate_iris
+        }
+        canonical_iris = {canonical_iri for canonical_iri, _ in self._predicates.values()}
+
+        # Adjacency lists of each canonical predicate, keyed by entity ID
+        self._forward: Dict[str, Dict[int, List[int]]] = {iri: dict() for iri in canonical_iris}
+        self._inverse: Dict[str, Dict[int, List[int]]] = {iri: dict() for iri in canonical_iris}
+
+        # Number of edges of each canonical predicate
+        self._counts: Dict[str, int] = {iri: 0 for iri in canonical_iris}
+
+        # Every edge, for detecting duplicates in O(1)
+        self._edges: Set[Tuple[int, str, int]] = set()
+
+        self._listeners: List[Listener] = list()
+
+    def __len__(self) -> int:
+        """
+        Return the number of relationships in the store.
+        """
+        return len(self._edges)
+
+    @property
+    def predicate_iris(self) -> List[str]:
+        """
+        The IRIs of the object properties stored.
+        """
+        return list(self._predicates)
+
+    @property
+    def entity_count(self) -> int:
+        """
+        The number of entities that have been assigned an ID.
+        """
+        return len(self._iris)
+
+    def add_listener(self, listener: Listener) -> None:
+        """
+        Register a callback invoked after an edge is added or removed.
+
+        The callback is given the subject ID, the IRI of the canonical
+        property, the object ID, and True if the edge was added or False if it
+        was removed.
+
+        :param listener: The callback
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Listener) -> None:
+        """
+        Unregister a callback registered by add_listener().
+
+        :param listener: The callback
+        """
+        self._listeners.remove(listener)
+
+    def get_id(self, resource_iri: str) -> int:
+        """
+        Get the ID of an entity, assigning one if it doesn't have an ID yet.
+
+        :param resource_iri: The entity's resource IRI
+        :return: The entity's ID
+        """
+        entity_id = self._ids.get(resource_iri)
+
+        if entity_id is None:
+            entity_id = len(self._iris)
+            self._iris.append(resource_iri)
+            self._ids[resource_iri] = entity_id
+
+        return entity_id
+
+    def find_id(self, resource_iri: str) -> Optional[int]:
+        """
+        Get the ID of an entity without assigning one.
+
+        :param resource_iri: The entity's resource IRI
+        :return: The entity's ID, or None if it has no ID
+        """
+        return self._ids.get(resource_iri)
+
+    def get_iri(self, entity_id: int) -> str:
+        """
+        Get the resource IRI of an entity.
+
+        :param entity_id: The entity's ID
+        :return: The entity's resource IRI
+        """
+        return self._iris[entity_id]
+
+    def count(self, predicate_iri: str) -> int:
+        """
+        Get the number of relationships of an object property.
+
+        :param predicate_iri: The IRI of the object property
+        :return: The number of relationships
+        :raises ValueError: If the object property isn't stored
+        """
+        canonical_iri, _ = self._get_predicate(predicate_iri)
+
+        return self._counts[canonical_iri]
+
+    def count_subjects(self, predicate_iri: str) -> int:
+        """
+        Get the number of distinct subjects of an object property.
+
+        :param predicate_iri: The IRI of the object property
+        :return: The number of entities that are the subject of a relationship
+        :raises ValueError: If the object property isn't stored
+        """
+        canonical_iri, swapped = self._get_predicate(predicate_iri)
+        adjacency = self._inverse if swapped else self._forward
+
+        return len(adjacency[canonical_iri])
+
+    def count_objects(self, predicate_iri: str) -> int:
+        """
+        Get the number of distinct objects of an object property.
+
+        :param predicate_iri: The IRI of the object property
+        :return: The number of entities that are the object of a relationship
+        :raises ValueError: If the object property isn't stored
+        """
+        canonical_iri, swapped = self._get_predicate(predicate_iri)
+        adjacency = self._forward if swapped else self._inverse
+
+        return len(adjacency[canonical_iri])
+
+    def add(self, subject_iri: str, predicate_iri: str, object_iri: str) -> bool:
+        """
+        Add a relationship.
+
+        :param subject_iri: The IRI of the subject entity
+        :param predicate_iri: The IRI of the object property
+        :param object_iri: The IRI of the object entity
+        :return: True if the relationship was added, False if it already
+                 existed
+        :raises ValueError: If the object property isn't stored
+        """
+        self._get_predicate(predicate_iri)
+
+        return self._add_edge(self.get_id(subject_iri), predicate_iri, self.get_id(object_iri))
+
+    def remove(self, subject_iri: str, predicate_iri: str, object_iri: str) -> bool:
+        """
+        Remove a relationship.
+
+        :param subject_iri: The IRI of the subject entity
+        :param predicate_iri: The IRI of the object property
+        :param object_iri: The IRI of the object entity
+        :return: True if the relationship was removed, False if it didn't exist
+        :raises ValueError: If the object property isn't stored
+        """
+        self._get_predicate(predicate_iri)
+
+        subject_id = self._ids.get(subject_iri)
+        object_id = self._ids.get(object_iri)
+        if subject_id is None or object_id is None:
+            return False
+
+        return self._remove_edge(subject_id, predicate_iri, object_id)
+
+    def contains(self, subject_iri: str, predicate_iri: str, object_iri: str) -> bool:
+        """
+        Check if a relationship exists.
+
+        :param subject_iri: The IRI of the subject entity
+        :param predicate_iri: The IRI of the object property
+        :param object_iri: The IRI of the object entity
+        :return: True if the relationship exists, directly or through its
+                 inverse
+        :raises ValueError: If the object property isn't stored
+        """
+        canonical_iri, swapped = self._get_predicate(predicate_iri)
+
+        subject_id = self._ids.get(subject_iri)
+        object_id = self._ids.get(object_iri)
+        if subject_id is None or object_id is None:
+            return False
+
+        if swapped:
+            subject_id, object_id = object_id, subject_id
+
+        return (subject_id, canonical_iri, object_id) in self._edges
+
+    def get_objects(self, subject_iri: str, predicate_iri: str) -> List[str]:
+        """
+        Get the objects related to a subject, such as the Sensors hosted by a
+        Platform.
+
+        :param subject_iri: The IRI of the subject entity
+        :param predicate_iri: The IRI of the object property
+        :return: The IRIs of the objects, in the order they were added
+        """
+        subject_id = self._ids.get(subject_iri)
+        if subject_id is None:
+            return []
+
+        return [self._iris[object_id] for object_id in self.get_object_ids(subject_id, predicate_iri)]
+
+    def get_subjects(self, predicate_iri: str, object_iri: str) -> List[str]:
+        """
+        Get the subjects related to an object, such as the Platforms hosting a
+        Sensor.
+
+        :param predicate_iri: The IRI of the object property
+        :param object_iri: The IRI of the object entity
+        :return: The IRIs of the subjects, in the order they were added
+        """
+        object_id = self._ids.get(object_iri)
+        if object_id is None:
+            return []
+
+        return [self._iris[subject_id] for subject_id in self.get_subject_ids(predicate_iri, object_id)]
+
+    def get_object_ids(self, subject_id: int, predicate_iri: str) -> List[int]:
+        """
+        Get the IDs of the objects related to a subject.
+
+        :param subject_id: The ID of the subject entity
+        :param predicate_iri: The IRI of the object property
+        :return: The IDs of the objects, in the order they were added
+        :raises ValueError: If the object property isn't stored
+        """
+        canonical_iri, swapped = self._get_predicate(predicate_iri)
+        adjacency = self._inverse if swapped else self._forward
+
+        return list(adjacency[canonical_iri].get(subject_id, ()))
+
+    def get_subject_ids(self, predicate_iri: str, object_id: int) -> List[int]:
+        """
+        Get the IDs of the subjects related to an object.
+
+        :param predicate_iri: The IRI of the object property
+        :param object_id: The ID of the object entity
+        :return: The IDs of the subjects, in the order they were added
+        :raises ValueError: If the object property isn't stored
+        """
+        canonical_iri, swapped = self._get_predicate(predicate_iri)
+        adjacency = self._forward if swapped else self._inverse
+
+        return list(adjacency[canonical_iri].get(object_id, ()))
+
+    def get_edge_ids(self, predicate_iri: str) -> Iterator[Tuple[int, int]]:
+        """
+        Iterate over every relationship of an object property.
+
+        :param predicate_iri: The IRI of the object property
+        :return: The IDs of the subject and object of each relationship
+        :raises ValueError: If the object property isn't stored
+        """
+        canonical_iri, swapped = self._get_predicate(predicate_iri)
+        adjacency = self._inverse if swapped else self._forward
+
+        return (
+            (subject_id, object_id)
+            for subject_id, object_ids in adjacency[canonical_iri].items()
+            for object_id in object_ids
+        )
+
+    def load_graph(self, graph: rdflib.Graph, remove_inverses: bool = False) -> LoadReport:
+        """
+        Add the relationships asserted by a graph.
+
+        Statements whose predicate isn't stored, or whose object is a literal,
+        are ignored. A relationship asserted in both directions is only added
+        once.
+
+        :param graph: The graph
+        :param remove_inverses: True to remove the statements of the graph
+                                that are implied by their inverse, to save
+                                memory
+        :return: The number of relationships added and inverse statements
+                 removed, and the relationships asserted in only one direction
+        """
+        unpaired = find_unpaired_statements(graph)
+
+        added = 0
+
+        for (subject, predicate, obj) in graph:
+            predicate_iri = str(predicate)
+            if predicate_iri in self._predicates and not isinstance(obj, rdflib.Literal):
+                if self._add_edge(self.get_id(str(subject)), predicate_iri, self.get_id(str(obj))):
+                    added += 1
+
+        removed = remove_inverse_statements(graph) if remove_inverses else 0
+
+        return LoadReport(added=added, removed=removed, unpaired=unpaired)
+
+    def _add_edge(self, subject_id: int, predicate_iri: str, object_id: int) -> bool:
+        """
+        Add an edge to the adjacency lists, unless it already exists.
+        """
+        canonical_iri, swapped = self._get_predicate(predicate_iri)
+        if swapped:
+            subject_id, object_id = object_id, subject_id
+
+        edge = (subject_id, canonical_iri, object_id)
+        if edge in self._edges:
+            return False
+
+        self._edges.add(edge)
+        self._forward[canonical_iri].setdefault(subject_id, list()).append(object_id)
+        self._inverse[canonical_iri].setdefault(object_id, list()).append(subject_id)
+        self._counts[canonical_iri] += 1
+
+        for listener in self._listeners:
+            listener(subject_id, canonical_iri, object_id, True)
+
+        return True
+
+    def _remove_edge(self, subject_id: int, predicate_iri: str, object_id: int) -> bool:
+        """
+        Remove an edge from the adjacency lists, if it exists.
+        """
+        canonical_iri, swapped = self._get_predicate(predicate_iri)
+        if swapped:
+            subject_id, object_id = object_id, subject_id
+
+        edge = (subject_id, canonical_iri, object_id)
+        if edge not in self._edges:
+            return False
+
+        self._edges.remove(edge)
+        self._remove_adjacent(self._forward[canonical_iri], subject_id, object_id)
+        self._remove_adjacent(self._inverse[canonical_iri], object_id, subject_id)
+        self._counts[canonical_iri] -= 1
+
+        for listener in self._listeners:
+            listener(subject_id, canonical_iri, object_id, False)
+
+        return True
+
+    def _get_predicate(self, predicate_iri: str) -> Tuple[str, bool]:
+        """
+        Get the canonical property that an object property is stored as.
+
+        :return: The IRI of the canonical property, and True if the subject
+                 and object are swapped
+        :raises ValueError: If the object property isn't stored
+        """
+        predicate = self._predicates.get(predicate_iri)
+
+        if predicate is None:
+            raise ValueError(f'Unsupported object property: {predicate_iri}')
+
+        return predicate
+
+    @staticmethod
+    def _remove_adjacent(adjacency: Dict[int, List[int]], entity_id: int, neighbor_id: int) -> None:
+        """
+        Helper function to remove a neighbor from an adjacency list, dropping
+        the list when it becomes empty so that it isn't counted
+        """
+        neighbor_ids = adjacency[entity_id]
+        neighbor_ids.remove(neighbor_id)
+
+        if not neighbor_ids:
+            del adjacency[entity_id]
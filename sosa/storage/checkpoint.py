@@ -0,0 +1,147 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.storage.chunk import Chunk
+from sosa.storage.series import SeriesKey
+from sosa.storage.write_ahead_log import sync_directory
+
+import dataclasses
+import numpy
+import os
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+
+# Checkpoint file name within the store directory
+CHECKPOINT_NAME = 'checkpoint.npz'
+
+
+class SeriesSnapshot(NamedTuple):
+    """
+    The contents of a series in a checkpoint.
+    """
+
+    key: SeriesKey
+    """
+    The series key.
+    """
+
+    procedure_iri: str
+    """
+    The IRI of the Procedure used by the series.
+    """
+
+    cold_chunks: List[Tuple[int, int]]
+    """
+    The segment ID and entry index of each cold chunk, oldest first.
+    """
+
+    hot: Chunk
+    """
+    The observations held in memory.
+    """
+
+    retained_from: int
+    """
+    The time before which observations have been discarded, in nanoseconds
+    since the epoch.
+    """
+
+
+@dataclasses.dataclass
+class Checkpoint:
+    """
+    A snapshot of the contents of an observation store, taken at a position in
+    its write-ahead log.
+    """
+
+    lsn: int
+    """
+    The LSN of the latest log record included in the snapshot.
+    """
+
+    segment_ids: List[int] = dataclasses.field(default_factory=list)
+    """
+    The IDs of the segments referenced by the snapshot.
+    """
+
+    series: List[SeriesSnapshot] = dataclasses.field(default_factory=list)
+    """
+    The contents of each series.
+    """
+
+    def save(self, directory: str) -> None:
+        """
+        Atomically replace the checkpoint in a directory.
+
+        :param directory: The store directory
+        """
+        arrays = {
+            'lsn': numpy.array(self.lsn, dtype=numpy.int64),
+            'segment_ids': numpy.array(self.segment_ids, dtype=numpy.int64),
+            'keys': numpy.array(
+                [[*snapshot.key, snapshot.procedure_iri] for snapshot in self.series],
+                dtype=numpy.str_,
+            ).reshape(-1, 4),
+        }
+
+        for index, snapshot in enumerate(self.series):
+            arrays[f'cold_chunks_{index}'] = numpy.array(snapshot.cold_chunks, dtype=numpy.int64).reshape(-1, 2)
+            arrays[f'phenomenon_times_{index}'] = snapshot.hot.phenomenon_times
+            arrays[f'result_times_{index}'] = snapshot.hot.result_times
+            arrays[f'results_{index}'] = snapshot.hot.results
+            arrays[f'retained_from_{index}'] = numpy.array(snapshot.retained_from, dtype=numpy.int64)
+
+        path = os.path.join(directory, CHECKPOINT_NAME)
+        temp_path = path + '.tmp'
+
+        with open(temp_path, 'wb') as file:
+            numpy.savez(file, **arrays)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temp_path, path)
+        sync_directory(directory)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional['Checkpoint']:
+        """
+        Load the checkpoint in a directory.
+
+        :param directory: The store directory
+        :return: The checkpoint, or None if the directory has no checkpoint
+        """
+        path = os.path.join(directory, CHECKPOINT_NAME)
+
+        if not os.path.exists(path):
+            return None
+
+        with numpy.load(path, allow_pickle=False) as arrays:
+            checkpoint = cls(
+                lsn=int(arrays['lsn']),
+                segment_ids=[int(segment_id) for segment_id in arrays['segment_ids']],
+            )
+
+            for index, row in enumerate(arrays['keys']):
+                checkpoint.series.append(SeriesSnapshot(
+                    key=SeriesKey(str(row[0]), str(row[1]), str(row[2])),
+                    procedure_iri=str(row[3]),
+                    cold_chunks=[(int(segment_id), int(entry)) for segment_id, entry in arrays[f'cold_chunks_{index}']],
+                    hot=Chunk(
+                        phenomenon_times=arrays[f'phenomenon_times_{index}'],
+                        result_times=arrays[f'result_times_{index}'],
+                        results=arrays[f'results_{index}'],
+                    ),
+                    retained_from=int(arrays[f'retained_from_{index}']),
+                ))
+
+        return checkpoint
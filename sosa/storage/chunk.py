@@ -0,0 +1,250 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.storage.compression import decode_floats
+from sosa.storage.compression import decode_timestamps
+from sosa.storage.compression import encode_floats
+from sosa.storage.compression import encode_timestamps
+
+import dataclasses
+import numpy
+import struct
+from typing import List
+from typing import Union
+
+
+# Header of an encoded chunk: observation count
+_ENCODED_HEADER = struct.Struct('<I')
+
+
+@dataclasses.dataclass
+class Chunk:
+    """
+    An immutable, time-sorted block of observations from a single series.
+    """
+
+    phenomenon_times: numpy.ndarray
+    """
+    The phenomenon time of each observation, as sorted UTC datetime64[ns]
+    values.
+    """
+
+    result_times: numpy.ndarray
+    """
+    The result time of each observation, as UTC datetime64[ns] values.
+    """
+
+    results: numpy.ndarray
+    """
+    The simple result of each observation, as float64 values.
+    """
+
+    def __len__(self) -> int:
+        """
+        Return the number of observations in the chunk.
+        """
+        return len(self.results)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The memory used by the chunk's columns, in bytes.
+        """
+        return self.phenomenon_times.nbytes + self.result_times.nbytes + self.results.nbytes
+
+    @property
+    def start_time(self) -> int:
+        """
+        The earliest phenomenon time in the chunk, in nanoseconds since the
+        epoch.
+        """
+        return int(self.phenomenon_times[0].astype(numpy.int64))
+
+    @property
+    def end_time(self) -> int:
+        """
+        The latest phenomenon time in the chunk, in nanoseconds since the
+        epoch.
+        """
+        return int(self.phenomenon_times[-1].astype(numpy.int64))
+
+    def slice(self, start_time: int, end_time: int) -> 'Chunk':
+        """
+        Get the observations with a phenomenon time in the half-open interval
+        [start_time, end_time).
+
+        :param start_time: The inclusive start, in nanoseconds since the epoch
+        :param end_time: The exclusive end, in nanoseconds since the epoch
+        :return: A chunk viewing the selected rows
+        """
+        times = self.phenomenon_times.view(numpy.int64)
+
+        begin = numpy.searchsorted(times, start_time, side='left')
+        end = numpy.searchsorted(times, end_time, side='left')
+
+        return Chunk(
+            phenomenon_times=self.phenomenon_times[begin:end],
+            result_times=self.result_times[begin:end],
+            results=self.results[begin:end],
+        )
+
+    @staticmethod
+    def concatenate(chunks: List['Chunk']) -> 'Chunk':
+        """
+        Concatenate chunks of the same series, in order.
+
+        :param chunks: The chunks
+        :return: The combined chunk
+        """
+        return Chunk(
+            phenomenon_times=numpy.concatenate(
+                [chunk.phenomenon_times for chunk in chunks] or [numpy.empty(0, 'datetime64[ns]')]
+            ),
+            result_times=numpy.concatenate(
+                [chunk.result_times for chunk in chunks] or [numpy.empty(0, 'datetime64[ns]')]
+            ),
+            results=numpy.concatenate(
+                [chunk.results for chunk in chunks] or [numpy.empty(0, numpy.float64)]
+            ),
+        )
+
+    @staticmethod
+    def merge(first: 'Chunk', second: 'Chunk') -> 'Chunk':
+        """
+        Merge two time-sorted chunks of the same series.
+
+        The chunks are merged by inserting the second chunk at its search
+        positions in the first, without sorting the combined observations.
+        Observations of the second chunk follow those of the first with the
+        same time.
+
+        :param first: The first chunk
+        :param second: The second chunk
+        :return: The merged chunk, in time order
+        """
+        if not len(second):
+            return first
+        if not len(first):
+            return second
+
+        positions = numpy.searchsorted(
+            first.phenomenon_times.view(numpy.int64),
+            second.phenomenon_times.view(numpy.int64),
+            side='right',
+        )
+
+        return Chunk(
+            phenomenon_times=numpy.insert(first.phenomenon_times, positions, second.phenomenon_times),
+            result_times=numpy.insert(first.result_times, positions, second.result_times),
+            results=numpy.insert(first.results, positions, second.results),
+        )
+
+    def take(self, start: int, stop: int) -> 'Chunk':
+        """
+        Get the observations in a range of positions.
+
+        :param start: The position of the first observation
+        :param stop: The position after the last observation
+        :return: The observations
+        """
+        return Chunk(
+            phenomenon_times=self.phenomenon_times[start:stop],
+            result_times=self.result_times[start:stop],
+            results=self.results[start:stop],
+        )
+
+    def encode(self) -> 'EncodedChunk':
+        """
+        Compress the chunk.
+
+        Times are encoded as delta-of-deltas and results are XOR-encoded, see
+        sosa.storage.compression.
+
+        :return: The encoded chunk
+        """
+        data = b''.join([
+            _ENCODED_HEADER.pack(len(self)),
+            encode_timestamps(self.phenomenon_times),
+            encode_timestamps(self.result_times),
+            encode_floats(self.results),
+        ])
+
+        return EncodedChunk(
+            data=data,
+            start_time=self.start_time,
+            end_time=self.end_time,
+        )
+
+
+@dataclasses.dataclass
+class EncodedChunk:
+    """
+    A compressed chunk, which is decoded when it is read.
+    """
+
+    data: Union[bytes, memoryview]
+    """
+    The encoded observations.
+    """
+
+    start_time: int
+    """
+    The earliest phenomenon time in the chunk, in nanoseconds since the epoch.
+    """
+
+    end_time: int
+    """
+    The latest phenomenon time in the chunk, in nanoseconds since the epoch.
+    """
+
+    def __len__(self) -> int:
+        """
+        Return the number of observations in the chunk.
+        """
+        (count,) = _ENCODED_HEADER.unpack_from(self.data, 0)
+
+        return count
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The size of the encoded chunk, in bytes.
+        """
+        return len(self.data)
+
+    def decode(self) -> Chunk:
+        """
+        Decompress the chunk.
+
+        :return: The decoded chunk
+        """
+        count = len(self)
+        offset = _ENCODED_HEADER.size
+
+        phenomenon_times, offset = decode_timestamps(self.data, count, offset)
+        result_times, offset = decode_timestamps(self.data, count, offset)
+        results, offset = decode_floats(self.data, count, offset)
+
+        return Chunk(
+            phenomenon_times=phenomenon_times,
+            result_times=result_times,
+            results=results,
+        )
+
+    def slice(self, start_time: int, end_time: int) -> Chunk:
+        """
+        Get the observations with a phenomenon time in the half-open interval
+        [start_time, end_time).
+
+        :param start_time: The inclusive start, in nanoseconds since the epoch
+        :param end_time: The exclusive end, in nanoseconds since the epoch
+        :return: The selected rows
+        """
+        return self.decode().slice(start_time, end_time)
@@ -0,0 +1,83 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.storage.observation_store import ObservationStore
+
+import logging
+import threading
+from typing import Optional
+
+
+# Default number of seconds between compaction passes
+DEFAULT_INTERVAL = 60.0
+
+
+class Compactor(object):
+    """
+    Background maintenance of an observation store.
+
+    Each pass rolls up old raw observations according to the store's
+    retention policies, moves chunks from the hot tier to the cold tier and
+    then merges small segments.
+    """
+
+    def __init__(self, store: ObservationStore, interval: float = DEFAULT_INTERVAL):
+        """
+        Create a compactor for a store. The compactor doesn't run until it is
+        started.
+
+        :param store: The observation store
+        :param interval: The number of seconds between passes
+        """
+        self._store = store
+        self._interval = interval
+
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Start running passes in a background thread.
+        """
+        if self._thread is not None:
+            return
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='Compactor', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background thread, waiting for a pass in progress to finish.
+        """
+        if self._thread is None:
+            return
+
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+
+    def run_once(self) -> None:
+        """
+        Run a single pass in the calling thread.
+        """
+        self._store.downsample()
+        self._store.tier()
+        self._store.compact()
+
+    def _run(self) -> None:
+        """
+        Run passes until stopped.
+        """
+        while not self._stopped.wait(self._interval):
+            try:
+                self.run_once()
+            except Exception:
+                logging.exception('Observation store compaction failed')
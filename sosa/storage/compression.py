@@ -0,0 +1,286 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+"""
+Gorilla-style compression of observation columns.
+
+Timestamps are encoded as the delta of their deltas, which is zero for
+regularly sampled series. Floats are encoded as the XOR with the previous
+value, which is zero for repeated values and has many leading and trailing
+zero bits for slowly changing values.
+
+Unlike the original Gorilla format, where the width of each value is only
+known after decoding the previous one, each column is split into three
+sections so that it can be encoded and decoded with vectorized NumPy
+operations:
+
+  * A flag bit per value, set if the value differs from the prediction
+  * A fixed-width header per changed value, describing its bit width
+  * The significant bits of each changed value, concatenated
+
+Reference:
+
+    Pelkonen et al., "Gorilla: A Fast, Scalable, In-Memory Time Series
+    Database", VLDB 2015
+
+"""
+
+import numpy
+import struct
+from typing import Tuple
+
+
+# Bit positions within a 64-bit word, most significant first
+_BIT_POSITIONS = numpy.arange(64)
+
+# Widths of zigzag-encoded delta-of-deltas, selected by a 3-bit header
+_TIMESTAMP_WIDTHS = numpy.array([8, 12, 16, 24, 32, 40, 48, 64])
+_TIMESTAMP_HEADER_WIDTH = 3
+
+# XOR header: 6 bits of leading zeros, 6 bits of significant length minus one
+_FLOAT_HEADER_WIDTH = 12
+
+# The first value of a column is stored verbatim
+_FIRST_VALUE = struct.Struct('<Q')
+
+
+def pack_bits(values: numpy.ndarray, widths: numpy.ndarray) -> bytes:
+    """
+    Concatenate the low bits of each value into a bit stream.
+
+    :param values: The values, as uint64
+    :param widths: The number of low bits to keep of each value, 0 to 64
+    :return: The bit stream, most significant bit first, padded to a byte
+    """
+    if not len(values):
+        return b''
+
+    bits = numpy.unpackbits(values.astype('>u8').view(numpy.uint8)).reshape(-1, 64)
+    mask = _BIT_POSITIONS >= (64 - widths)[:, numpy.newaxis]
+
+    return numpy.packbits(bits[mask]).tobytes()
+
+
+def unpack_bits(data: bytes, offset: int, widths: numpy.ndarray) -> Tuple[numpy.ndarray, int]:
+    """
+    Split a bit stream into values.
+
+    :param data: The buffer containing the bit stream
+    :param offset: The byte offset of the bit stream in the buffer
+    :param widths: The number of bits of each value, 0 to 64
+    :return: The values as uint64, and the byte offset after the bit stream
+    """
+    total = int(widths.sum())
+    size = (total + 7) // 8
+
+    if not len(widths):
+        return numpy.empty(0, dtype=numpy.uint64), offset
+
+    stream = numpy.unpackbits(numpy.frombuffer(data, dtype=numpy.uint8, count=size, offset=offset))
+
+    bits = numpy.zeros((len(widths), 64), dtype=numpy.uint8)
+    bits[_BIT_POSITIONS >= (64 - widths)[:, numpy.newaxis]] = stream[:total]
+
+    values = numpy.packbits(bits, axis=1).view('>u8').reshape(-1).astype(numpy.uint64)
+
+    return values, offset + size
+
+
+def encode_timestamps(values: numpy.ndarray) -> bytes:
+    """
+    Encode timestamps as the delta of their deltas.
+
+    :param values: The timestamps, as int64 or datetime64[ns]
+    :return: The encoded column
+    """
+    values = numpy.ascontiguousarray(values).view(numpy.uint64)
+
+    if not len(values):
+        return b''
+
+    # Wrapping arithmetic keeps the encoding lossless for any int64 value,
+    # including NaT
+    deltas = numpy.diff(values)
+    deltas_of_deltas = numpy.diff(deltas, prepend=numpy.uint64(0)).view(numpy.int64)
+
+    # Zigzag encoding maps small negative values to small positive values
+    zigzag = ((deltas_of_deltas << 1) ^ (deltas_of_deltas >> 63)).view(numpy.uint64)
+
+    changed = zigzag != 0
+    zigzag = zigzag[changed]
+
+    headers = numpy.searchsorted(_TIMESTAMP_WIDTHS, _bit_length(zigzag))
+
+    return _encode_sections(
+        int(values[0]),
+        changed,
+        headers.astype(numpy.uint64),
+        _TIMESTAMP_HEADER_WIDTH,
+        zigzag,
+        _TIMESTAMP_WIDTHS[headers],
+    )
+
+
+def decode_timestamps(data: bytes, count: int, offset: int = 0) -> Tuple[numpy.ndarray, int]:
+    """
+    Decode timestamps encoded by encode_timestamps().
+
+    :param data: The buffer containing the encoded column
+    :param count: The number of timestamps
+    :param offset: The byte offset of the encoded column in the buffer
+    :return: The timestamps as datetime64[ns], and the byte offset after the
+             encoded column
+    """
+    if not count:
+        return numpy.empty(0, dtype='datetime64[ns]'), offset
+
+    first, changed, headers, offset = _decode_sections(data, count, offset, _TIMESTAMP_HEADER_WIDTH)
+
+    zigzag, offset = unpack_bits(data, offset, _TIMESTAMP_WIDTHS[headers])
+
+    deltas_of_deltas = numpy.zeros(count - 1, dtype=numpy.uint64)
+    deltas_of_deltas[changed] = (zigzag >> numpy.uint64(1)) ^ (numpy.uint64(0) - (zigzag & numpy.uint64(1)))
+
+    values = numpy.empty(count, dtype=numpy.uint64)
+    values[0] = first
+    values[1:] = numpy.cumsum(numpy.cumsum(deltas_of_deltas, dtype=numpy.uint64), dtype=numpy.uint64)
+    values[1:] += numpy.uint64(first)
+
+    return values.view('datetime64[ns]'), offset
+
+
+def encode_floats(values: numpy.ndarray) -> bytes:
+    """
+    Encode floats as the XOR with their previous value.
+
+    :param values: The values, as float64
+    :return: The encoded column
+    """
+    values = numpy.ascontiguousarray(values, dtype=numpy.float64).view(numpy.uint64)
+
+    if not len(values):
+        return b''
+
+    xors = values[1:] ^ values[:-1]
+
+    changed = xors != 0
+    xors = xors[changed]
+
+    leading = 64 - _bit_length(xors)
+    trailing = _bit_length(xors & (~xors + numpy.uint64(1))) - 1
+    lengths = 64 - leading - trailing
+
+    headers = (leading << 6) | (lengths - 1)
+
+    return _encode_sections(
+        int(values[0]),
+        changed,
+        headers.astype(numpy.uint64),
+        _FLOAT_HEADER_WIDTH,
+        xors >> trailing.astype(numpy.uint64),
+        lengths,
+    )
+
+
+def decode_floats(data: bytes, count: int, offset: int = 0) -> Tuple[numpy.ndarray, int]:
+    """
+    Decode floats encoded by encode_floats().
+
+    :param data: The buffer containing the encoded column
+    :param count: The number of values
+    :param offset: The byte offset of the encoded column in the buffer
+    :return: The values as float64, and the byte offset after the encoded
+             column
+    """
+    if not count:
+        return numpy.empty(0, dtype=numpy.float64), offset
+
+    first, changed, headers, offset = _decode_sections(data, count, offset, _FLOAT_HEADER_WIDTH)
+
+    leading = (headers >> 6).astype(numpy.int64)
+    lengths = (headers & 63).astype(numpy.int64) + 1
+    trailing = 64 - leading - lengths
+
+    significant, offset = unpack_bits(data, offset, lengths)
+
+    xors = numpy.zeros(count, dtype=numpy.uint64)
+    xors[0] = first
+    xors[1:][changed] = significant << trailing.astype(numpy.uint64)
+
+    return numpy.bitwise_xor.accumulate(xors).view(numpy.float64), offset
+
+
+def _encode_sections(
+        first: int,
+        changed: numpy.ndarray,
+        headers: numpy.ndarray,
+        header_width: int,
+        payload: numpy.ndarray,
+        payload_widths: numpy.ndarray,
+) -> bytes:
+    """
+    Helper function to write the sections of an encoded column.
+    """
+    return b''.join([
+        _FIRST_VALUE.pack(first),
+        numpy.packbits(changed).tobytes(),
+        pack_bits(headers, numpy.full(len(headers), header_width)),
+        pack_bits(payload, payload_widths),
+    ])
+
+
+def _decode_sections(
+        data: bytes,
+        count: int,
+        offset: int,
+        header_width: int,
+) -> Tuple[int, numpy.ndarray, numpy.ndarray, int]:
+    """
+    Helper function to read the first value, flags and headers of an encoded
+    column.
+
+    :return: The first value, the flags, the headers as int64, and the byte
+             offset of the payload
+    """
+    (first,) = _FIRST_VALUE.unpack_from(data, offset)
+    offset += _FIRST_VALUE.size
+
+    flag_size = (count - 1 + 7) // 8
+    flags = numpy.frombuffer(data, dtype=numpy.uint8, count=flag_size, offset=offset)
+    changed = numpy.unpackbits(flags)[:count - 1].astype(bool)
+    offset += flag_size
+
+    headers, offset = unpack_bits(
+        data,
+        offset,
+        numpy.full(int(changed.sum()), header_width),
+    )
+
+    return first, changed, headers.astype(numpy.int64), offset
+
+
+def _bit_length(values: numpy.ndarray) -> numpy.ndarray:
+    """
+    Helper function to get the number of significant bits of each value.
+
+    :param values: The values, as uint64
+    :return: The bit lengths, 0 to 64, as int64
+    """
+    values = values.copy()
+    lengths = numpy.zeros(len(values), dtype=numpy.int64)
+
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = values >= (numpy.uint64(1) << numpy.uint64(shift))
+        lengths[mask] += shift
+        values[mask] >>= numpy.uint64(shift)
+
+    lengths += (values > 0)
+
+    return lengths
@@ -0,0 +1,226 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.observation import Observation
+from sosa.observation import ObservationBatch
+from sosa.observation import from_timestamp
+from sosa.storage.series import SeriesKey
+
+import numpy
+import threading
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+
+class LatestValue(NamedTuple):
+    """
+    The latest observation of a series.
+    """
+
+    key: SeriesKey
+    """
+    The key of the series.
+    """
+
+    procedure_iri: str
+    """
+    The IRI of the Procedure used by the series.
+    """
+
+    phenomenon_time: int
+    """
+    The phenomenon time, in nanoseconds since the epoch.
+    """
+
+    result_time: int
+    """
+    The result time, in nanoseconds since the epoch.
+    """
+
+    result: float
+    """
+    The simple result.
+    """
+
+
+class LatestValueCache(object):
+    """
+    The latest observation of every series, maintained as observations are
+    appended.
+
+    Each append replaces the latest value of its series in O(1), and of the
+    (observed property, feature of interest) pair if it is the most recent
+    observation of the pair by any sensor. Lookups never read the stored
+    series.
+
+    An observation replaces the latest value if its phenomenon time is not
+    older, so of several observations with the same time the last appended
+    wins.
+    """
+
+    def __init__(self):
+        """
+        Create an empty cache.
+        """
+        # Protects the latest values
+        self._lock = threading.Lock()
+
+        self._values: Dict[SeriesKey, LatestValue] = dict()
+
+        # Latest value of each (observed property, feature of interest) pair
+        self._features: Dict[Tuple[str, str], LatestValue] = dict()
+
+    def __len__(self) -> int:
+        """
+        Return the number of series in the cache.
+        """
+        return len(self._values)
+
+    def update(self, key: SeriesKey, procedure_iri: str, phenomenon_time: int, result_time: int, result: float) -> None:
+        """
+        Record an observation, if it is the latest of its series.
+
+        :param key: The series key
+        :param procedure_iri: The IRI of the Procedure used by the series
+        :param phenomenon_time: The phenomenon time, in nanoseconds since the
+                                epoch
+        :param result_time: The result time, in nanoseconds since the epoch
+        :param result: The simple result
+        """
+        value = LatestValue(key, procedure_iri, phenomenon_time, result_time, result)
+        feature_key = (key.property_iri, key.feature_iri)
+
+        with self._lock:
+            latest = self._values.get(key)
+            if latest is None or phenomenon_time >= latest.phenomenon_time:
+                self._values[key] = value
+
+                latest = self._features.get(feature_key)
+                if latest is None or phenomenon_time >= latest.phenomenon_time:
+                    self._features[feature_key] = value
+
+    def update_batch(
+            self,
+            key: SeriesKey,
+            procedure_iri: str,
+            phenomenon_times: numpy.ndarray,
+            result_times: numpy.ndarray,
+            results: numpy.ndarray,
+    ) -> None:
+        """
+        Record the latest of a batch of observations of a series.
+
+        :param key: The series key
+        :param procedure_iri: The IRI of the Procedure used by the series
+        :param phenomenon_times: The phenomenon times, as datetime64[ns]
+        :param result_times: The result times, as datetime64[ns]
+        :param results: The simple results, as float64
+        """
+        if not len(phenomenon_times):
+            return
+
+        times = phenomenon_times.astype('datetime64[ns]').view(numpy.int64)
+
+        # Last of the observations with the latest time
+        index = len(times) - 1 - int(numpy.argmax(times[::-1]))
+
+        self.update(
+            key,
+            procedure_iri,
+            int(times[index]),
+            int(result_times.astype('datetime64[ns]').view(numpy.int64)[index]),
+            float(results[index]),
+        )
+
+    def get(self, sensor_iri: str, property_iri: str, feature_iri: str) -> Optional[Observation]:
+        """
+        Get the latest observation of a series.
+
+        :param sensor_iri: The IRI of the Sensor
+        :param property_iri: The IRI of the observed property
+        :param feature_iri: The IRI of the Feature of Interest
+        :return: The observation, or None if the series has no observations
+        """
+        value = self._values.get(SeriesKey(sensor_iri, property_iri, feature_iri))
+
+        return self._get_observation(value) if value is not None else None
+
+    def get_current(self, property_iri: str, feature_iri: str) -> Optional[Observation]:
+        """
+        Get the latest observation of a property of a Feature of Interest, by
+        any sensor.
+
+        :param property_iri: The IRI of the observed property
+        :param feature_iri: The IRI of the Feature of Interest
+        :return: The observation, or None if the property hasn't been observed
+        """
+        value = self._features.get((property_iri, feature_iri))
+
+        return self._get_observation(value) if value is not None else None
+
+    def get_batch(self, keys: Iterable[SeriesKey]) -> ObservationBatch:
+        """
+        Get the latest observation of many series.
+
+        :param keys: The series keys
+        :return: The latest observation of each series that has observations,
+                 in the order of the keys
+        """
+        return self._get_batch([self._values.get(key) for key in keys])
+
+    def get_current_batch(self, property_iri: str, feature_iris: Iterable[str]) -> ObservationBatch:
+        """
+        Get the latest observation of a property of many Features of Interest,
+        by any sensor.
+
+        :param property_iri: The IRI of the observed property
+        :param feature_iris: The IRIs of the Features of Interest
+        :return: The latest observation of each feature whose property has
+                 been observed, in the order of the features
+        """
+        return self._get_batch([self._features.get((property_iri, feature_iri)) for feature_iri in feature_iris])
+
+    @staticmethod
+    def _get_observation(value: LatestValue) -> Observation:
+        """
+        Helper function to convert a latest value to an observation
+        """
+        return Observation(
+            resource_iri='',
+            sensor_iri=value.key.sensor_iri,
+            property_iri=value.key.property_iri,
+            feature_iri=value.key.feature_iri,
+            procedure_iri=value.procedure_iri,
+            phenomenon_time=from_timestamp(numpy.datetime64(value.phenomenon_time, 'ns')),
+            result_time=from_timestamp(numpy.datetime64(value.result_time, 'ns')),
+            result=None if numpy.isnan(value.result) else value.result,
+        )
+
+    @staticmethod
+    def _get_batch(values: List[Optional[LatestValue]]) -> ObservationBatch:
+        """
+        Helper function to convert latest values to columns, skipping missing
+        values
+        """
+        found = [value for value in values if value is not None]
+
+        return ObservationBatch(
+            sensor_iris=numpy.array([value.key.sensor_iri for value in found], dtype=object),
+            property_iris=numpy.array([value.key.property_iri for value in found], dtype=object),
+            feature_iris=numpy.array([value.key.feature_iri for value in found], dtype=object),
+            procedure_iris=numpy.array([value.procedure_iri for value in found], dtype=object),
+            phenomenon_times=numpy.array([value.phenomenon_time for value in found], dtype=numpy.int64).view('datetime64[ns]'),
+            result_times=numpy.array([value.result_time for value in found], dtype=numpy.int64).view('datetime64[ns]'),
+            results=numpy.array([value.result for value in found], dtype=numpy.float64),
+        )
@@ -0,0 +1,877 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.observation import Observation
+from sosa.observation import ObservationCollection
+from sosa.observation import to_nanoseconds
+from sosa.observation import to_timestamp
+from sosa.ontology.sosa import SOSA
+from sosa.storage.checkpoint import Checkpoint
+from sosa.storage.checkpoint import SeriesSnapshot
+from sosa.storage.chunk import Chunk
+from sosa.storage.chunk import EncodedChunk
+from sosa.storage.latest_value_cache import LatestValueCache
+from sosa.storage.retention import STATISTICS
+from sosa.storage.retention import RetentionPolicy
+from sosa.storage.retention import roll_up
+from sosa.storage.segment import SEGMENT_PATTERN
+from sosa.storage.segment import Segment
+from sosa.storage.segment import SegmentChunk
+from sosa.storage.segment import get_segment_id
+from sosa.storage.series import Series
+from sosa.storage.series import SeriesKey
+from sosa.storage.write_ahead_log import DEFAULT_GROUP_SIZE
+from sosa.storage.write_ahead_log import WriteAheadLog
+from sosa.storage.write_ahead_log import sync_directory
+
+import datetime
+import functools
+import glob
+import heapq
+import numpy
+import os
+import threading
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+
+# Default number of observations per sealed chunk
+DEFAULT_CHUNK_SIZE = 1024
+
+# Default number of log records between automatic checkpoints
+DEFAULT_CHECKPOINT_INTERVAL = 100000
+
+# Default age, relative to the latest observation of a series, after which
+# chunks are moved to the cold tier
+DEFAULT_HOT_WINDOW = datetime.timedelta(hours=24)
+
+# Default size below which segments are merged by compaction
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+
+# Default number of chunks of each series rolled up per downsampling pass
+DEFAULT_DOWNSAMPLE_CHUNKS = 64
+
+
+class ObservationStore(object):
+    """
+    An embedded, append-only store of observations.
+
+    Observations are grouped into series keyed by (sensor, observed property,
+    feature of interest). Each series is appended to in time order and stored
+    as time-sorted chunks, so that time-range queries only visit the chunks
+    overlapping the range.
+
+    If the store is given a reorder size, observations may arrive out of
+    order. Each series sorts them into place in a bounded reorder buffer, and
+    keeps those arriving after their chunk was sealed in an overflow that
+    queries merge with the chunks. The overflow is merged into the chunks by
+    compact().
+
+    If the store is given a directory, every append is recorded in a
+    write-ahead log, and is durable once the store is committed. The store is
+    checkpointed periodically, so that recovery on startup only replays the
+    log records since the latest checkpoint.
+
+    Persistent stores are tiered. Recent chunks are hot and held in memory,
+    while chunks older than the hot window, or beyond the hot tier's memory
+    budget, are moved to immutable segment files by tier(). Segments are
+    memory-mapped on demand and answer the same queries as the hot tier. Small
+    segments are merged by compact().
+
+    Series can be given a retention policy, and their old raw observations are
+    then rolled up into derived aggregate series by downsample().
+
+    The latest observation of every series is cached as it is appended, so
+    that current values can be looked up through latest_values without
+    reading the series.
+
+    See sosa.storage.compactor for running maintenance in the background.
+    """
+
+    def __init__(
+            self,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            directory: Optional[str] = None,
+            group_size: int = DEFAULT_GROUP_SIZE,
+            checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+            compress: bool = False,
+            hot_window: datetime.timedelta = DEFAULT_HOT_WINDOW,
+            hot_memory_budget: Optional[int] = None,
+            segment_size: int = DEFAULT_SEGMENT_SIZE,
+            reorder_size: Optional[int] = None,
+    ):
+        """
+        Create an observation store, recovering its contents if it is
+        persistent.
+
+        :param chunk_size: The number of observations per sealed chunk
+        :param directory: The directory to persist the store in, or None for a
+                          store that is only held in memory
+        :param group_size: The number of log records that triggers a group
+                           commit
+        :param checkpoint_interval: The number of log records between
+                                    automatic checkpoints
+        :param compress: True to compress chunks when they are sealed, trading
+                         decoding time on queries for memory
+        :param hot_window: The age, relative to the latest observation of a
+                           series, after which chunks are moved to the cold
+                           tier
+        :param hot_memory_budget: The memory, in bytes, above which the oldest
+                                  hot chunks are moved to the cold tier, or None
+                                  for no budget
+        :param segment_size: The size, in bytes, below which segments are
+                             merged by compaction
+        :param reorder_size: The number of observations per series held back
+                             from sealing to sort late observations into place,
+                             or None to require observations in time order.
+                             A persistent store must be reopened with the same
+                             setting.
+        """
+        if chunk_size < 1:
+            raise ValueError(f'Invalid chunk size: {chunk_size}')
+
+        self._chunk_size = chunk_size
+        self._compress = compress
+        self._reorder_size = reorder_size
+
+        self._series: Dict[SeriesKey, Series] = dict()
+        self._latest_values = LatestValueCache()
+
+        # Serializes changes to the series and the order of their log records
+        self._lock = threading.RLock()
+
+        # Serializes tiering and compaction, which run without holding the
+        # store lock while they write segments
+        self._maintenance_lock = threading.Lock()
+
+        # Serializes checkpoints, which are written without holding the store
+        # lock. Never acquired while holding the store lock.
+        self._checkpoint_lock = threading.Lock()
+
+        self._directory = directory
+        self._checkpoint_interval = checkpoint_interval
+        self._checkpoint_lsn = 0
+        self._wal: Optional[WriteAheadLog] = None
+
+        self._hot_window = to_nanoseconds(hot_window)
+        self._hot_memory_budget = hot_memory_budget
+        self._segment_size = segment_size
+        self._segments: Dict[int, Segment] = dict()
+        self._next_segment_id = 1
+
+        self._retention_policies: Dict[SeriesKey, RetentionPolicy] = dict()
+        self._default_retention_policy: Optional[RetentionPolicy] = None
+
+        if directory is not None:
+            self._wal = WriteAheadLog(directory, group_size)
+            self._recover(directory)
+
+    def __len__(self) -> int:
+        """
+        Return the number of observations in the store.
+        """
+        return sum(len(series) for series in self._series.values())
+
+    @property
+    def hot_nbytes(self) -> int:
+        """
+        The approximate memory used by the hot tier, in bytes.
+        """
+        with self._lock:
+            return sum(series.hot_nbytes for series in self._series.values())
+
+    @property
+    def latest_values(self) -> LatestValueCache:
+        """
+        The latest observation of every series, maintained on append.
+        """
+        return self._latest_values
+
+    def get_segments(self) -> List[Segment]:
+        """
+        Get the segments of the cold tier.
+
+        :return: The segments, in order of creation
+        """
+        with self._lock:
+            return [self._segments[segment_id] for segment_id in sorted(self._segments)]
+
+    def get_series_keys(self) -> List[SeriesKey]:
+        """
+        Get the keys of all series in the store.
+
+        :return: The series keys, in order of creation
+        """
+        return list(self._series.keys())
+
+    def append(self, observation: Observation) -> None:
+        """
+        Append an observation to its series.
+
+        :param observation: The observation, which must not be older than the
+                            latest observation of its series unless the store
+                            reorders observations
+        :raises ValueError: If the observation is out of order, has no
+                            phenomenon time, or has a different Procedure
+                            than its series
+        """
+        if observation.phenomenon_time is None:
+            raise ValueError(f'Observation {observation.resource_iri} has no phenomenon time')
+
+        key = SeriesKey(observation.sensor_iri, observation.property_iri, observation.feature_iri)
+
+        phenomenon_time = to_timestamp(observation.phenomenon_time)
+        result_time = to_timestamp(observation.result_time)
+        result = numpy.nan if observation.result is None else float(observation.result)
+
+        with self._lock:
+            series = self._get_series(key, observation.procedure_iri)
+
+            series.append(
+                int(phenomenon_time.astype(numpy.int64)),
+                int(result_time.astype(numpy.int64)),
+                result,
+            )
+
+            self._latest_values.update(
+                key,
+                series.procedure_iri,
+                int(phenomenon_time.astype(numpy.int64)),
+                int(result_time.astype(numpy.int64)),
+                result,
+            )
+
+            if self._wal is not None:
+                self._log(
+                    series,
+                    numpy.array([phenomenon_time]),
+                    numpy.array([result_time]),
+                    numpy.array([result]),
+                )
+
+        self._commit_if_due()
+        self._checkpoint_if_due()
+
+    def extend(self, collection: ObservationCollection) -> None:
+        """
+        Append the members of a collection to their series.
+
+        :param collection: The collection, whose members must be in time
+                           order and not older than the latest observation of
+                           the series unless the store reorders observations
+        :raises ValueError: If the members are out of order, or have a
+                            different Procedure than their series
+        """
+        self._extend(collection)
+
+        self._commit_if_due()
+        self._checkpoint_if_due()
+
+    def set_retention_policy(self, policy: Optional[RetentionPolicy], key: Optional[SeriesKey] = None) -> None:
+        """
+        Set the retention policy of a series.
+
+        :param policy: The retention policy, or None to keep raw observations
+        :param key: The key of the series, or None to set the policy of every
+                    series without its own policy
+        """
+        with self._lock:
+            if key is None:
+                self._default_retention_policy = policy
+            elif policy is None:
+                self._retention_policies.pop(key, None)
+            else:
+                self._retention_policies[key] = policy
+
+    def commit(self) -> None:
+        """
+        Make every appended observation durable.
+
+        Observations appended by other threads while the commit is in progress
+        are made durable by the same fsync when possible.
+        """
+        if self._wal is not None:
+            self._wal.commit()
+
+    def checkpoint(self) -> None:
+        """
+        Snapshot the store and discard the log records it includes, bounding
+        the time needed to recover the store.
+
+        Cold chunks are included in the snapshot by reference to their
+        segments. The store is only locked while the chunks are captured,
+        as sealed chunks are immutable, so appends and queries aren't
+        blocked while the snapshot is written.
+        """
+        if self._wal is None or self._directory is None:
+            return
+
+        with self._checkpoint_lock:
+            self._write_checkpoint()
+
+    def tier(self) -> int:
+        """
+        Move hot chunks to the cold tier.
+
+        Chunks that ended before the hot window of their series are moved, as
+        are the oldest remaining chunks while the hot tier exceeds its memory
+        budget. The chunks are written to a new segment, which replaces them
+        in their series once it is durable.
+
+        :return: The number of chunks moved
+        """
+        if self._directory is None:
+            return 0
+
+        with self._maintenance_lock:
+            with self._lock:
+                selected = self._select_cold_chunks()
+
+                if not selected:
+                    return 0
+
+                segment_id = self._next_segment_id
+                self._next_segment_id += 1
+
+            # Sealed chunks are immutable, so they can be written without
+            # blocking appends and queries
+            entries = [
+                (series.key, series.procedure_iri, chunk if isinstance(chunk, EncodedChunk) else chunk.encode())
+                for series, chunks in selected
+                for chunk in chunks
+            ]
+            segment = Segment.write(self._directory, segment_id, entries)
+
+            cold_chunks = segment.get_chunks()
+
+            with self._lock:
+                position = 0
+                for series, chunks in selected:
+                    series.make_cold(cold_chunks[position:position + len(chunks)])
+                    position += len(chunks)
+
+                self._segments[segment_id] = segment
+
+            self.checkpoint()
+
+            return len(entries)
+
+    def compact(self) -> int:
+        """
+        Rewrite the segments that are smaller than the segment size, or that
+        are mostly chunks discarded by downsampling, into a single segment.
+
+        Only the chunks still referenced by a series are copied. Before that,
+        observations that arrived after their chunk was sealed are merged into
+        the sealed chunks.
+
+        :return: The number of segments rewritten
+        """
+        self.merge_overflow()
+
+        if self._directory is None:
+            return 0
+
+        with self._maintenance_lock:
+            with self._lock:
+                live = {
+                    (chunk.segment.segment_id, chunk.index)
+                    for series in self._series.values()
+                    for chunk in series.get_cold_chunks()
+                }
+
+                selected: List[Segment] = list()
+                has_garbage = False
+                for segment in self.get_segments():
+                    live_size = sum(
+                        entry.length for index, entry in enumerate(segment.entries)
+                        if (segment.segment_id, index) in live
+                    )
+                    if segment.size < self._segment_size or live_size < segment.size // 2:
+                        selected.append(segment)
+                        has_garbage = has_garbage or live_size < segment.size
+
+                if len(selected) < 2 and not has_garbage:
+                    return 0
+
+                segment_id = self._next_segment_id
+                self._next_segment_id += 1
+
+            # Segments are immutable and only closed by maintenance, so they
+            # can be read without blocking appends and queries
+            locations = [
+                (segment, index)
+                for segment in selected
+                for index in range(len(segment.entries))
+                if (segment.segment_id, index) in live
+            ]
+
+            replacements: Dict[Tuple[int, int], SegmentChunk] = dict()
+            merged: Optional[Segment] = None
+
+            if locations:
+                merged = Segment.write(
+                    self._directory,
+                    segment_id,
+                    [
+                        (*segment.series[segment.entries[index].series_index], segment.get_chunk(index))
+                        for segment, index in locations
+                    ],
+                )
+
+                for (segment, index), chunk in zip(locations, merged.get_chunks()):
+                    replacements[(segment.segment_id, index)] = chunk
+
+            with self._lock:
+                for series in self._series.values():
+                    cold_chunks = series.get_cold_chunks()
+                    if any(chunk.segment in selected for chunk in cold_chunks):
+                        series.replace_cold_chunks([
+                            replacements.get((chunk.segment.segment_id, chunk.index), chunk)
+                            for chunk in cold_chunks
+                        ])
+
+                for segment in selected:
+                    del self._segments[segment.segment_id]
+                if merged is not None:
+                    self._segments[segment_id] = merged
+
+            # The rewritten segments are unreferenced once this is durable
+            self.checkpoint()
+
+            for segment in selected:
+                segment.close()
+                os.remove(segment.path)
+            sync_directory(self._directory)
+
+            return len(selected)
+
+    def merge_overflow(self) -> int:
+        """
+        Merge the observations that arrived after their chunk was sealed into
+        the sealed chunks.
+
+        Merged hot chunks replace the old ones in memory, while merged cold
+        chunks are written to a new segment. The old segments are reclaimed by
+        a later compaction.
+
+        :return: The number of observations merged
+        """
+        with self._maintenance_lock:
+            with self._lock:
+                merged = 0
+                for series in self._series.values():
+                    if len(series.get_overflow()):
+                        merged += series.merge_overflow(functools.partial(self._write_cold_chunks, series))
+
+            if merged:
+                self.checkpoint()
+
+            return merged
+
+    def close(self) -> None:
+        """
+        Commit the appended observations and close the store.
+        """
+        if self._wal is not None:
+            self._wal.close()
+
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+
+    def query(
+            self,
+            sensor_iri: str,
+            property_iri: str,
+            feature_iri: str,
+            start_time: Optional[datetime.datetime] = None,
+            end_time: Optional[datetime.datetime] = None,
+    ) -> ObservationCollection:
+        """
+        Get the observations of a series in a time range.
+
+        :param sensor_iri: The IRI of the Sensor
+        :param property_iri: The IRI of the observed property
+        :param feature_iri: The IRI of the Feature of Interest
+        :param start_time: The inclusive start of the phenomenon time range,
+                           or None for no lower bound
+        :param end_time: The exclusive end of the phenomenon time range, or
+                         None for no upper bound
+        :return: The observations, in time order, as an anonymous collection
+        """
+        key = SeriesKey(sensor_iri, property_iri, feature_iri)
+
+        collection = ObservationCollection(
+            resource_iri='',
+            type_iri=SOSA.OBSERVATION_COLLECTION,
+            sensor_iri=sensor_iri,
+            property_iri=property_iri,
+            feature_iri=feature_iri,
+        )
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                return collection
+
+            chunk = series.query(
+                self._get_nanoseconds(start_time, numpy.iinfo(numpy.int64).min),
+                self._get_nanoseconds(end_time, numpy.iinfo(numpy.int64).max),
+            )
+
+        collection.procedure_iri = series.procedure_iri
+        collection.phenomenon_times = chunk.phenomenon_times
+        collection.result_times = chunk.result_times
+        collection.results = chunk.results
+
+        return collection
+
+    def _recover(self, directory: str) -> None:
+        """
+        Load the latest checkpoint and replay the log records made after it.
+
+        Recovery is idempotent, as records already included in the checkpoint
+        are skipped and a torn final record is discarded.
+        """
+        checkpoint = Checkpoint.load(directory)
+
+        segment_ids = checkpoint.segment_ids if checkpoint is not None else []
+
+        for segment_path in sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN))):
+            segment_id = get_segment_id(segment_path)
+            self._next_segment_id = max(self._next_segment_id, segment_id + 1)
+
+            if segment_id in segment_ids:
+                self._segments[segment_id] = Segment.open(segment_path)
+            else:
+                # Written by tiering or compaction that didn't complete, or
+                # merged into another segment
+                os.remove(segment_path)
+
+        if checkpoint is not None:
+            self._checkpoint_lsn = checkpoint.lsn
+
+            segment_chunks = {
+                segment_id: segment.get_chunks()
+                for segment_id, segment in self._segments.items()
+            }
+
+            for snapshot in checkpoint.series:
+                series = self._get_series(snapshot.key, snapshot.procedure_iri)
+                series.attach_cold_chunks([
+                    segment_chunks[segment_id][index]
+                    for segment_id, index in snapshot.cold_chunks
+                ])
+                series.extend(
+                    snapshot.hot.phenomenon_times,
+                    snapshot.hot.result_times,
+                    snapshot.hot.results,
+                )
+                series.truncate(snapshot.retained_from)
+
+        for record in self._wal.recover(self._checkpoint_lsn):
+            self._get_series(record.key, record.procedure_iri).extend(
+                record.phenomenon_times,
+                record.result_times,
+                record.results,
+            )
+
+        # The latest observations are in the newest chunk of each series
+        for key, series in self._series.items():
+            latest = series.query(series.end_time, series.end_time + 1)
+            self._latest_values.update_batch(
+                key,
+                series.procedure_iri,
+                latest.phenomenon_times,
+                latest.result_times,
+                latest.results,
+            )
+
+    def downsample(self, max_chunks: int = DEFAULT_DOWNSAMPLE_CHUNKS) -> int:
+        """
+        Roll up the raw observations that are older than the raw retention of
+        their series' retention policy.
+
+        The observations are aggregated into windows, which are appended to the
+        derived series of the policy, and then discarded. Each pass rolls up at
+        most a limited number of chunks of each series, so that old data is
+        processed incrementally.
+
+        Derived series are never rolled up by the policy that created them.
+
+        :param max_chunks: The number of chunks of each series to roll up
+        :return: The number of raw observations discarded
+        """
+        discarded = 0
+
+        with self._maintenance_lock:
+            with self._lock:
+                for series in list(self._series.values()):
+                    policy = self._retention_policies.get(series.key, self._default_retention_policy)
+                    if policy is None or series.procedure_iri == policy.procedure.resource_iri:
+                        continue
+
+                    discarded += self._downsample_series(series, policy, max_chunks)
+
+            # Discarding observations isn't logged, so it is made durable with
+            # a checkpoint
+            if discarded:
+                self.checkpoint()
+
+        return discarded
+
+    def _downsample_series(self, series: Series, policy: RetentionPolicy, max_chunks: int) -> int:
+        """
+        Roll up the old raw observations of a series.
+
+        :return: The number of raw observations discarded
+        """
+        resolution = to_nanoseconds(policy.resolution)
+
+        # Roll up whole windows, so that no window is split between passes
+        boundary = (series.end_time - to_nanoseconds(policy.raw_retention)) // resolution * resolution
+
+        start_times = series.get_chunk_start_times()
+        if len(start_times) > max_chunks:
+            limit = start_times[max_chunks] // resolution * resolution
+            if limit > series.retained_from:
+                boundary = min(boundary, limit)
+
+        if boundary <= series.retained_from:
+            return 0
+
+        aggregates = roll_up(series.query(series.retained_from, boundary), policy.resolution)
+
+        start_times = aggregates['start_time']
+
+        for statistic in STATISTICS:
+            key = SeriesKey(
+                series.key.sensor_iri,
+                policy.get_property_iri(series.key.property_iri, statistic),
+                series.key.feature_iri,
+            )
+
+            # Windows may already exist if a previous pass didn't complete
+            derived = self._series.get(key)
+            new = start_times.view(numpy.int64) > (derived.end_time if derived is not None else numpy.iinfo(numpy.int64).min)
+
+            if numpy.any(new):
+                self._extend(ObservationCollection(
+                    resource_iri='',
+                    sensor_iri=key.sensor_iri,
+                    property_iri=key.property_iri,
+                    feature_iri=key.feature_iri,
+                    procedure_iri=policy.procedure.resource_iri,
+                    phenomenon_times=start_times[new],
+                    result_times=start_times[new] + numpy.timedelta64(resolution, 'ns'),
+                    results=aggregates[statistic][new],
+                ))
+
+        return series.truncate(boundary)
+
+    def _extend(self, collection: ObservationCollection) -> None:
+        """
+        Internal implementation of extend(), which doesn't checkpoint the
+        store, so it can be called with the store lock held.
+        """
+        key = SeriesKey(collection.sensor_iri, collection.property_iri, collection.feature_iri)
+
+        with self._lock:
+            series = self._get_series(key, collection.procedure_iri)
+
+            series.extend(collection.phenomenon_times, collection.result_times, collection.results)
+
+            self._latest_values.update_batch(
+                key,
+                series.procedure_iri,
+                collection.phenomenon_times,
+                collection.result_times,
+                collection.results,
+            )
+
+            if self._wal is not None and len(collection):
+                self._log(series, collection.phenomenon_times, collection.result_times, collection.results)
+
+    def _select_cold_chunks(self) -> List[Tuple[Series, List[Union[Chunk, EncodedChunk]]]]:
+        """
+        Select the hot chunks to move to the cold tier.
+
+        Only the oldest hot chunks of a series are selected, so that its cold
+        chunks always precede its hot chunks.
+
+        :return: Each series with chunks to move, and the chunks, oldest first
+        """
+        series_list = list(self._series.values())
+
+        hot_chunks = [series.get_hot_chunks() for series in series_list]
+        counts: List[int] = list()
+
+        # Chunks that left the hot window
+        for series, chunks in zip(series_list, hot_chunks):
+            cutoff = series.end_time - self._hot_window
+            count = 0
+            while count < len(chunks) and chunks[count].end_time < cutoff:
+                count += 1
+            counts.append(count)
+
+        # The oldest remaining chunks, while over the memory budget
+        if self._hot_memory_budget is not None:
+            hot_nbytes = sum(series.hot_nbytes for series in series_list)
+            for chunks, count in zip(hot_chunks, counts):
+                hot_nbytes -= sum(chunk.nbytes for chunk in chunks[:count])
+
+            heads = [
+                (chunks[count].end_time, index)
+                for index, (chunks, count) in enumerate(zip(hot_chunks, counts))
+                if count < len(chunks)
+            ]
+            heapq.heapify(heads)
+
+            while hot_nbytes > self._hot_memory_budget and heads:
+                _, index = heapq.heappop(heads)
+
+                hot_nbytes -= hot_chunks[index][counts[index]].nbytes
+                counts[index] += 1
+
+                if counts[index] < len(hot_chunks[index]):
+                    heapq.heappush(heads, (hot_chunks[index][counts[index]].end_time, index))
+
+        return [
+            (series, chunks[:count])
+            for series, chunks, count in zip(series_list, hot_chunks, counts)
+            if count
+        ]
+
+    def _commit_if_due(self) -> None:
+        """
+        Commit the log if enough records are pending to commit them as a group.
+        Called without holding the store lock, so that other threads aren't
+        blocked during the fsync.
+        """
+        if self._wal is not None and self._wal.commit_due:
+            self._wal.commit()
+
+    def _checkpoint_if_due(self) -> None:
+        """
+        Checkpoint the store if the checkpoint interval was reached.
+        """
+        if self._wal is None or self._wal.last_lsn - self._checkpoint_lsn < self._checkpoint_interval:
+            return
+
+        with self._checkpoint_lock:
+            # Another thread may have checkpointed the store while waiting
+            if self._wal.last_lsn - self._checkpoint_lsn >= self._checkpoint_interval:
+                self._write_checkpoint()
+
+    def _write_checkpoint(self) -> None:
+        """
+        Internal implementation of checkpoint(), called with the checkpoint
+        lock held.
+        """
+        with self._lock:
+            lsn = self._wal.last_lsn
+            segment_ids = sorted(self._segments)
+
+            captured = [
+                (
+                    key,
+                    series.procedure_iri,
+                    [(chunk.segment.segment_id, chunk.index) for chunk in series.get_cold_chunks()],
+                    series.get_hot_snapshot(),
+                    series.retained_from,
+                )
+                for key, series in self._series.items()
+            ]
+
+        checkpoint = Checkpoint(lsn=lsn, segment_ids=segment_ids)
+        for key, procedure_iri, cold_chunks, hot, retained_from in captured:
+            checkpoint.series.append(SeriesSnapshot(
+                key=key,
+                procedure_iri=procedure_iri,
+                cold_chunks=cold_chunks,
+                hot=hot.merge(),
+                retained_from=retained_from,
+            ))
+
+        # The log must be durable before the records can be discarded
+        self._wal.commit()
+        checkpoint.save(self._directory)
+        self._wal.truncate(lsn)
+
+        self._checkpoint_lsn = lsn
+
+    def _log(
+            self,
+            series: Series,
+            phenomenon_times: numpy.ndarray,
+            result_times: numpy.ndarray,
+            results: numpy.ndarray,
+    ) -> None:
+        """
+        Record observations that were appended to a series in the log.
+        """
+        self._wal.append(series.key, series.procedure_iri, phenomenon_times, result_times, results)
+
+    def _write_cold_chunks(self, series: Series, chunks: List[Chunk]) -> List[SegmentChunk]:
+        """
+        Write chunks of a series to a new segment.
+
+        :param series: The series
+        :param chunks: The chunks, in time order
+        :return: The cold chunks referencing the segment
+        """
+        if self._directory is None:
+            raise ValueError('Cold chunks require a persistent store')
+
+        segment_id = self._next_segment_id
+        self._next_segment_id += 1
+
+        segment = Segment.write(
+            self._directory,
+            segment_id,
+            [(series.key, series.procedure_iri, chunk.encode()) for chunk in chunks],
+        )
+        self._segments[segment_id] = segment
+
+        return segment.get_chunks()
+
+    def _get_series(self, key: SeriesKey, procedure_iri: str) -> Series:
+        """
+        Get a series, creating it if it doesn't exist.
+
+        :raises ValueError: If the series exists with a different Procedure
+        """
+        series = self._series.get(key)
+
+        if series is None:
+            series = Series(key, procedure_iri, self._chunk_size, self._compress, self._reorder_size)
+            self._series[key] = series
+        elif series.procedure_iri != procedure_iri:
+            raise ValueError(
+                f'Procedure {procedure_iri} does not match procedure '
+                f'{series.procedure_iri} of series {key}'
+            )
+
+        return series
+
+    @staticmethod
+    def _get_nanoseconds(value: Optional[datetime.datetime], default: int) -> int:
+        """
+        Helper function to convert an optional query bound to nanoseconds
+        since the epoch.
+        """
+        if value is None:
+            return default
+
+        return int(to_timestamp(value).astype(numpy.int64))
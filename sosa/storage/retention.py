@@ -0,0 +1,82 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.aggregation.window import TumblingWindow
+from sosa.aggregation.window_aggregator import aggregate
+from sosa.procedure import Procedure
+from sosa.storage.chunk import Chunk
+
+import dataclasses
+import datetime
+import numpy
+from typing import Dict
+
+
+# Statistics computed when rolling up raw observations
+STATISTICS = ['min', 'max', 'mean', 'count']
+
+
+@dataclasses.dataclass
+class RetentionPolicy:
+    """
+    A policy for rolling up old raw observations of a series into aggregates.
+
+    Raw observations older than the raw retention, relative to the latest
+    observation of the series, are aggregated into windows of the given
+    resolution and then discarded. Each statistic is stored as a derived
+    series of the same Sensor and Feature of Interest, observing an aggregate
+    property and using the downsampling Procedure.
+    """
+
+    procedure: Procedure
+    """
+    The downsampling Procedure, used by the derived observations.
+    """
+
+    raw_retention: datetime.timedelta = datetime.timedelta(days=30)
+    """
+    The age after which raw observations are rolled up.
+    """
+
+    resolution: datetime.timedelta = datetime.timedelta(minutes=1)
+    """
+    The length of the aggregation windows.
+    """
+
+    property_iris: Dict[str, str] = dataclasses.field(default_factory=dict)
+    """
+    The IRI of the aggregate property of each statistic. Statistics without an
+    IRI use the IRI of the raw property with the statistic appended as a path
+    segment.
+    """
+
+    def get_property_iri(self, property_iri: str, statistic: str) -> str:
+        """
+        Get the IRI of the aggregate property of a statistic.
+
+        :param property_iri: The IRI of the raw property
+        :param statistic: The statistic, one of STATISTICS
+        :return: The IRI of the aggregate property
+        """
+        return self.property_iris.get(statistic, f'{property_iri}/{statistic}')
+
+
+def roll_up(chunk: Chunk, resolution: datetime.timedelta) -> Dict[str, numpy.ndarray]:
+    """
+    Aggregate observations into windows aligned to the epoch.
+
+    Observations without a result (NaN) are ignored.
+
+    :param chunk: The observations, in time order
+    :param resolution: The window length
+    :return: The start time of each non-empty window as datetime64[ns], under
+             the key 'start_time', and the value of each statistic
+    """
+    return aggregate(chunk.phenomenon_times, chunk.results, TumblingWindow(resolution), STATISTICS)
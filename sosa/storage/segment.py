@@ -0,0 +1,319 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.storage.chunk import Chunk
+from sosa.storage.chunk import EncodedChunk
+from sosa.storage.series import SeriesKey
+from sosa.storage.write_ahead_log import sync_directory
+
+import dataclasses
+import json
+import mmap
+import os
+import struct
+import threading
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+
+# Segment file names, ordered by segment ID
+SEGMENT_PATTERN = 'segment-*.seg'
+SEGMENT_NAME = 'segment-{:08d}.seg'
+
+# Footer: index offset, index length, magic
+_FOOTER = struct.Struct('<QQ8s')
+_MAGIC = b'SOSASEG1'
+
+
+class SegmentEntry(NamedTuple):
+    """
+    The location of an encoded chunk in a segment file.
+    """
+
+    series_index: int
+    """
+    The index of the chunk's series in the segment's series list.
+    """
+
+    offset: int
+    """
+    The byte offset of the encoded chunk.
+    """
+
+    length: int
+    """
+    The length of the encoded chunk in bytes.
+    """
+
+    start_time: int
+    """
+    The earliest phenomenon time in the chunk, in nanoseconds since the epoch.
+    """
+
+    end_time: int
+    """
+    The latest phenomenon time in the chunk, in nanoseconds since the epoch.
+    """
+
+    count: int
+    """
+    The number of observations in the chunk.
+    """
+
+
+class Segment(object):
+    """
+    An immutable file of encoded chunks, possibly from many series.
+
+    Only the segment's index is read when it is opened. The chunk data is
+    memory-mapped the first time a chunk is read, so cold data only occupies
+    memory while the OS keeps its pages cached.
+
+    File layout:
+
+      * Encoded chunks, back to back
+      * Index, as JSON, listing the series and the location of every chunk
+      * Footer, holding the index offset and length and a magic number
+    """
+
+    def __init__(self, path: str, segment_id: int, series: List[Tuple[SeriesKey, str]], entries: List[SegmentEntry]):
+        """
+        Create a segment for an existing segment file. Use write() or open()
+        instead.
+        """
+        self.path = path
+        self.segment_id = segment_id
+        self.series = series
+        self.entries = entries
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+
+    @property
+    def size(self) -> int:
+        """
+        The size of the segment's chunk data in bytes.
+        """
+        return sum(entry.length for entry in self.entries)
+
+    @classmethod
+    def write(
+            cls,
+            directory: str,
+            segment_id: int,
+            chunks: List[Tuple[SeriesKey, str, EncodedChunk]],
+    ) -> 'Segment':
+        """
+        Write a new segment file.
+
+        :param directory: The directory to write the segment in
+        :param segment_id: The unique ID of the segment
+        :param chunks: The series key, Procedure IRI and encoded chunk of every
+                       chunk, in time order for each series
+        :return: The segment
+        """
+        path = os.path.join(directory, SEGMENT_NAME.format(segment_id))
+
+        series: List[Tuple[SeriesKey, str]] = list()
+        series_indexes = dict()
+        entries: List[SegmentEntry] = list()
+
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            offset = 0
+            for key, procedure_iri, chunk in chunks:
+                if key not in series_indexes:
+                    series_indexes[key] = len(series)
+                    series.append((key, procedure_iri))
+
+                file.write(chunk.data)
+
+                entries.append(SegmentEntry(
+                    series_index=series_indexes[key],
+                    offset=offset,
+                    length=len(chunk.data),
+                    start_time=chunk.start_time,
+                    end_time=chunk.end_time,
+                    count=len(chunk),
+                ))
+
+                offset += len(chunk.data)
+
+            index = json.dumps({
+                'series': [[*key, procedure_iri] for key, procedure_iri in series],
+                'entries': [list(entry) for entry in entries],
+            }).encode('utf-8')
+
+            file.write(index)
+            file.write(_FOOTER.pack(offset, len(index), _MAGIC))
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(temp_path, path)
+        sync_directory(directory)
+
+        return cls(path, segment_id, series, entries)
+
+    @classmethod
+    def open(cls, path: str) -> 'Segment':
+        """
+        Open an existing segment file, reading only its index.
+
+        :param path: The path to the segment file
+        :return: The segment
+        :raises ValueError: If the file isn't a valid segment
+        """
+        with open(path, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            size = file.tell()
+
+            if size < _FOOTER.size:
+                raise ValueError(f'Invalid segment file: {path}')
+
+            file.seek(size - _FOOTER.size)
+            index_offset, index_length, magic = _FOOTER.unpack(file.read(_FOOTER.size))
+            if magic != _MAGIC:
+                raise ValueError(f'Invalid segment file: {path}')
+
+            file.seek(index_offset)
+            index = json.loads(file.read(index_length).decode('utf-8'))
+
+        series = [
+            (SeriesKey(row[0], row[1], row[2]), row[3])
+            for row in index['series']
+        ]
+        entries = [SegmentEntry(*row) for row in index['entries']]
+
+        return cls(path, get_segment_id(path), series, entries)
+
+    def get_chunk(self, index: int) -> EncodedChunk:
+        """
+        Get an encoded chunk, memory-mapping the segment file if needed.
+
+        :param index: The index of the chunk's entry
+        :return: The encoded chunk, viewing the mapped file
+        """
+        entry = self.entries[index]
+
+        return EncodedChunk(
+            data=memoryview(self._map())[entry.offset:entry.offset + entry.length],
+            start_time=entry.start_time,
+            end_time=entry.end_time,
+        )
+
+    def get_chunks(self) -> List['SegmentChunk']:
+        """
+        Get references to every chunk of the segment, in file order.
+        """
+        return [
+            SegmentChunk(self, index, entry.start_time, entry.end_time, entry.count)
+            for index, entry in enumerate(self.entries)
+        ]
+
+    def close(self) -> None:
+        """
+        Unmap the segment file.
+        """
+        with self._lock:
+            if self._mmap is not None:
+                try:
+                    self._mmap.close()
+                except BufferError:
+                    # A decoded view is still referenced; the mapping is
+                    # released when it is garbage collected
+                    pass
+                self._mmap = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _map(self) -> mmap.mmap:
+        """
+        Map the segment file into memory on first use.
+        """
+        with self._lock:
+            if self._mmap is None:
+                self._file = open(self.path, 'rb')
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            return self._mmap
+
+
+@dataclasses.dataclass
+class SegmentChunk:
+    """
+    A reference to a chunk stored in a segment file.
+    """
+
+    segment: Segment
+    """
+    The segment holding the chunk.
+    """
+
+    index: int
+    """
+    The index of the chunk's entry in the segment.
+    """
+
+    start_time: int
+    """
+    The earliest phenomenon time in the chunk, in nanoseconds since the epoch.
+    """
+
+    end_time: int
+    """
+    The latest phenomenon time in the chunk, in nanoseconds since the epoch.
+    """
+
+    count: int
+    """
+    The number of observations in the chunk.
+    """
+
+    def __len__(self) -> int:
+        """
+        Return the number of observations in the chunk.
+        """
+        return self.count
+
+    def encode(self) -> EncodedChunk:
+        """
+        Get the encoded chunk, viewing the mapped segment file.
+        """
+        return self.segment.get_chunk(self.index)
+
+    def decode(self) -> Chunk:
+        """
+        Read and decompress the chunk.
+        """
+        return self.encode().decode()
+
+    def slice(self, start_time: int, end_time: int) -> Chunk:
+        """
+        Get the observations with a phenomenon time in the half-open interval
+        [start_time, end_time).
+
+        :param start_time: The inclusive start, in nanoseconds since the epoch
+        :param end_time: The exclusive end, in nanoseconds since the epoch
+        :return: The selected rows
+        """
+        return self.decode().slice(start_time, end_time)
+
+
+def get_segment_id(path: str) -> int:
+    """
+    Helper function to get the ID of a segment from its file name.
+    """
+    name = os.path.basename(path)
+
+    return int(name[len('segment-'):-len('.seg')])
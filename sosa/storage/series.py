@@ -0,0 +1,601 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.storage.chunk import Chunk
+from sosa.storage.chunk import EncodedChunk
+
+import bisect
+import numpy
+from typing import Callable
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import TYPE_CHECKING
+from typing import Union
+
+
+if TYPE_CHECKING:
+    from sosa.storage.segment import SegmentChunk
+
+
+class SeriesKey(NamedTuple):
+    """
+    The key identifying a series of observations.
+    """
+
+    sensor_iri: str
+    """
+    The IRI of the Sensor making the observations.
+    """
+
+    property_iri: str
+    """
+    The IRI of the observed property.
+    """
+
+    feature_iri: str
+    """
+    The IRI of the Feature of Interest.
+    """
+
+
+class HotSnapshot(NamedTuple):
+    """
+    The observations held in memory by a series at a point in time.
+    """
+
+    chunks: List[Union[Chunk, EncodedChunk]]
+    """
+    The sealed hot chunks, oldest first.
+    """
+
+    buffer: Chunk
+    """
+    A copy of the active buffer.
+    """
+
+    overflow: Chunk
+    """
+    The observations that arrived after their chunk was sealed.
+    """
+
+    def merge(self) -> Chunk:
+        """
+        Merge the observations into a single chunk, in time order.
+        """
+        chunks = [chunk.decode() if isinstance(chunk, EncodedChunk) else chunk for chunk in self.chunks]
+
+        return Chunk.merge(Chunk.concatenate(chunks + [self.buffer]), self.overflow)
+
+
+class Series(object):
+    """
+    The observations of a single series, stored as time-sorted chunks.
+
+    Observations are appended to an active buffer, which is sealed into an
+    immutable chunk when it reaches the chunk size. The start and end time of
+    every sealed chunk is kept in a sorted list, so that a time-range query can
+    locate its chunks with a binary search.
+
+    The oldest sealed chunks may be cold, meaning that they are references to
+    chunks in segment files rather than held in memory. Cold chunks always
+    precede the hot chunks.
+
+    If the series accepts out-of-order observations, the active buffer is a
+    reorder buffer: it's kept sorted, and holds the newest observations
+    beyond a full chunk, so that late observations can be sorted into place
+    before their chunk is sealed. Observations older than the sealed chunks
+    go to a sorted overflow chunk, which queries merge with the sealed chunks
+    and compaction merges into them.
+    """
+
+    def __init__(self, key: SeriesKey, procedure_iri: str, chunk_size: int, compress: bool = False, reorder_size: Optional[int] = None):
+        """
+        Create an empty series.
+
+        :param key: The series key
+        :param procedure_iri: The IRI of the Procedure used by the series
+        :param chunk_size: The number of observations per sealed chunk
+        :param compress: True to compress chunks when they are sealed
+        :param reorder_size: The number of observations held back from
+                             sealing to sort late observations into place, or
+                             None to require observations in time order
+        """
+        self.key = key
+        self.procedure_iri = procedure_iri
+
+        self._chunk_size = chunk_size
+        self._compress = compress
+        self._reorder_size = reorder_size
+
+        # Sealed chunks and their time boundaries, in nanoseconds
+        self._chunks: List[Union[Chunk, EncodedChunk, 'SegmentChunk']] = list()
+        self._chunk_start_times: List[int] = list()
+        self._chunk_end_times: List[int] = list()
+
+        # Number of leading sealed chunks that are cold
+        self._cold_count = 0
+
+        # Observations before this time, in nanoseconds, have been discarded
+        self._retained_from = numpy.iinfo(numpy.int64).min
+
+        # Active buffer, in nanoseconds since the epoch
+        self._phenomenon_times: List[int] = list()
+        self._result_times: List[int] = list()
+        self._results: List[float] = list()
+
+        # Observations older than the sealed chunks, in time order
+        self._overflow = Chunk(
+            phenomenon_times=numpy.empty(0, dtype='datetime64[ns]'),
+            result_times=numpy.empty(0, dtype='datetime64[ns]'),
+            results=numpy.empty(0, dtype=numpy.float64),
+        )
+
+        self._size = 0
+
+    def __len__(self) -> int:
+        """
+        Return the number of observations in the series.
+        """
+        return self._size
+
+    @property
+    def hot_nbytes(self) -> int:
+        """
+        The approximate memory used by the hot chunks and the active buffer, in
+        bytes.
+        """
+        return (
+            sum(chunk.nbytes for chunk in self.get_hot_chunks()) +
+            24 * len(self._phenomenon_times) +
+            self._overflow.nbytes
+        )
+
+    @property
+    def end_time(self) -> int:
+        """
+        The latest phenomenon time in the series, in nanoseconds since the
+        epoch, or the time the series is retained from if it is empty.
+        """
+        if self._phenomenon_times:
+            return self._phenomenon_times[-1]
+        if self._chunk_end_times:
+            return self._chunk_end_times[-1]
+        return self._retained_from
+
+    @property
+    def retained_from(self) -> int:
+        """
+        The time before which observations have been discarded, in nanoseconds
+        since the epoch.
+        """
+        return self._retained_from
+
+    def get_chunk_start_times(self) -> List[int]:
+        """
+        Get the start time of each sealed chunk, oldest first, in nanoseconds
+        since the epoch.
+        """
+        return list(self._chunk_start_times)
+
+    def append(self, phenomenon_time: int, result_time: int, result: float) -> None:
+        """
+        Append a single observation to the series.
+
+        :param phenomenon_time: The phenomenon time, in nanoseconds since the
+                                epoch
+        :param result_time: The result time, in nanoseconds since the epoch
+        :param result: The simple result
+        :raises ValueError: If the observation is out of order and the series
+                            doesn't reorder observations
+        """
+        if phenomenon_time >= self.end_time:
+            index = len(self._phenomenon_times)
+        elif self._reorder_size is None:
+            raise ValueError(f'Observations must be appended in time order for series {self.key}')
+        elif phenomenon_time < self._retained_from:
+            # Already discarded by the retention policy
+            return
+        elif phenomenon_time >= self._get_sealed_end_time():
+            # Sort the late observation into the reorder buffer
+            index = bisect.bisect_right(self._phenomenon_times, phenomenon_time)
+        else:
+            self._add_overflow(
+                numpy.array([phenomenon_time], dtype=numpy.int64),
+                numpy.array([result_time], dtype=numpy.int64),
+                numpy.array([result], dtype=numpy.float64),
+            )
+            index = None
+
+        if index is not None:
+            self._phenomenon_times.insert(index, phenomenon_time)
+            self._result_times.insert(index, result_time)
+            self._results.insert(index, result)
+
+        self._size += 1
+
+        if len(self._phenomenon_times) >= self._get_buffer_limit():
+            self._seal(self._chunk_size)
+
+    def extend(
+            self,
+            phenomenon_times: numpy.ndarray,
+            result_times: numpy.ndarray,
+            results: numpy.ndarray,
+    ) -> None:
+        """
+        Append observations to the series.
+
+        :param phenomenon_times: The phenomenon times, as datetime64[ns], sorted
+                                 unless the series reorders observations
+        :param result_times: The result times, as datetime64[ns]
+        :param results: The simple results, as float64
+        :raises ValueError: If the observations lack a phenomenon time, or
+                            aren't in time order and the series doesn't
+                            reorder observations
+        """
+        if not len(phenomenon_times):
+            return
+
+        phenomenon_times = phenomenon_times.astype('datetime64[ns]')
+        if numpy.any(numpy.isnat(phenomenon_times)):
+            raise ValueError(f'Observations must have a phenomenon time for series {self.key}')
+
+        times = phenomenon_times.view(numpy.int64)
+        result_times = result_times.astype('datetime64[ns]').view(numpy.int64)
+        results = results.astype(numpy.float64)
+
+        if times[0] < self.end_time or numpy.any(times[1:] < times[:-1]):
+            if self._reorder_size is None:
+                raise ValueError(f'Observations must be appended in time order for series {self.key}')
+
+            self._size += self._extend_unordered(times, result_times, results)
+            return
+
+        limit = self._get_buffer_limit()
+
+        offset = 0
+        while offset < len(times):
+            # Fill the active buffer, sealing it when it's full
+            count = min(limit - len(self._phenomenon_times), len(times) - offset)
+
+            self._phenomenon_times.extend(times[offset:offset + count].tolist())
+            self._result_times.extend(result_times[offset:offset + count].tolist())
+            self._results.extend(results[offset:offset + count].tolist())
+
+            offset += count
+
+            if len(self._phenomenon_times) >= limit:
+                self._seal(self._chunk_size)
+
+        self._size += len(times)
+
+    def seal(self) -> None:
+        """
+        Seal the active buffer into an immutable chunk.
+        """
+        self._seal(len(self._phenomenon_times))
+
+    def get_overflow(self) -> Chunk:
+        """
+        Get the observations that arrived after their chunk was sealed, in time
+        order.
+        """
+        return self._overflow
+
+    def merge_overflow(self, write_cold: Callable[[List[Chunk]], List['SegmentChunk']]) -> int:
+        """
+        Merge the overflow into the sealed chunks it belongs to.
+
+        The chunks overlapping the overflow are decoded, merged with it and
+        sealed again. Hot chunks are replaced in memory, and cold chunks are
+        replaced by chunks written by a callback, such as to a new segment.
+
+        :param write_cold: Callback to write the merged cold chunks, returning
+                           a cold chunk for each of them
+        :return: The number of observations merged
+        """
+        overflow = self._overflow
+        if not len(overflow):
+            return 0
+
+        self._overflow = overflow.take(0, 0)
+
+        times = overflow.phenomenon_times.view(numpy.int64)
+
+        # Chunks overlapping the overflow, or the nearest chunk to it
+        first = min(bisect.bisect_left(self._chunk_end_times, times[0]), len(self._chunks) - 1)
+        last = max(bisect.bisect_right(self._chunk_start_times, times[-1]), first + 1)
+
+        # Observations older than the first hot chunk belong to the cold chunks
+        split = len(times)
+        if first < self._cold_count < last:
+            split = int(numpy.searchsorted(times, self._chunk_start_times[self._cold_count], side='left'))
+        elif self._cold_count <= first:
+            split = 0
+
+        # Merge the hot chunks first, as they follow the cold chunks
+        hot_first = max(first, self._cold_count)
+        if hot_first < last:
+            chunks = self._merge_chunks(hot_first, last, overflow.take(split, len(times)))
+            self._replace_chunks(hot_first, last, [chunk.encode() if self._compress else chunk for chunk in chunks])
+
+        cold_last = min(last, self._cold_count)
+        if first < cold_last:
+            chunks = write_cold(self._merge_chunks(first, cold_last, overflow.take(0, split)))
+            self._replace_chunks(first, cold_last, chunks)
+            self._cold_count += len(chunks) - (cold_last - first)
+
+        return len(overflow)
+
+    def get_cold_chunks(self) -> List['SegmentChunk']:
+        """
+        Get the cold chunks, oldest first.
+        """
+        return self._chunks[:self._cold_count]
+
+    def get_hot_chunks(self) -> List[Union[Chunk, EncodedChunk]]:
+        """
+        Get the sealed chunks held in memory, oldest first.
+        """
+        return self._chunks[self._cold_count:]
+
+    def get_hot_snapshot(self) -> 'HotSnapshot':
+        """
+        Capture the observations held in memory. Sealed chunks are immutable,
+        so only the active buffer is copied.
+        """
+        return HotSnapshot(
+            chunks=self.get_hot_chunks(),
+            buffer=Chunk(
+                phenomenon_times=numpy.array(self._phenomenon_times, dtype=numpy.int64).view('datetime64[ns]'),
+                result_times=numpy.array(self._result_times, dtype=numpy.int64).view('datetime64[ns]'),
+                results=numpy.array(self._results, dtype=numpy.float64),
+            ),
+            overflow=self._overflow,
+        )
+
+    def attach_cold_chunks(self, chunks: List['SegmentChunk']) -> None:
+        """
+        Append cold chunks to a series that doesn't have any hot data yet, when
+        recovering a store.
+
+        :param chunks: The cold chunks, in time order
+        """
+        if self._cold_count != len(self._chunks) or self._phenomenon_times:
+            raise ValueError(f'Cold chunks must precede hot data in series {self.key}')
+
+        for chunk in chunks:
+            self._chunks.append(chunk)
+            self._chunk_start_times.append(chunk.start_time)
+            self._chunk_end_times.append(chunk.end_time)
+            self._size += len(chunk)
+
+        self._cold_count = len(self._chunks)
+
+    def make_cold(self, chunks: List['SegmentChunk']) -> None:
+        """
+        Replace the oldest hot chunks with cold chunks holding the same
+        observations.
+
+        :param chunks: The cold chunks, one for each replaced hot chunk
+        """
+        self._chunks[self._cold_count:self._cold_count + len(chunks)] = chunks
+        self._cold_count += len(chunks)
+
+    def replace_cold_chunks(self, chunks: List['SegmentChunk']) -> None:
+        """
+        Replace the cold chunks with chunks holding the same observations, such
+        as after their segments were merged.
+
+        :param chunks: The new cold chunks, one for each existing cold chunk
+        """
+        if len(chunks) != self._cold_count:
+            raise ValueError(f'Cold chunks must be replaced one for one in series {self.key}')
+
+        self._chunks[:self._cold_count] = chunks
+
+    def truncate(self, start_time: int) -> int:
+        """
+        Discard the observations before a time.
+
+        Chunks that end before the time are dropped. A chunk straddling the
+        time is kept, but its older observations are hidden from queries, and
+        it is dropped by a later truncation once it ends before the time.
+
+        :param start_time: The time to retain observations from, in
+                           nanoseconds since the epoch
+        :return: The number of observations discarded
+        """
+        if start_time <= self._retained_from:
+            return 0
+
+        discarded = len(self.query(self._retained_from, start_time))
+
+        self._overflow = self._overflow.slice(start_time, numpy.iinfo(numpy.int64).max)
+
+        count = bisect.bisect_left(self._chunk_end_times, start_time)
+
+        del self._chunks[:count]
+        del self._chunk_start_times[:count]
+        del self._chunk_end_times[:count]
+        self._cold_count = max(self._cold_count - count, 0)
+
+        # The active buffer is only older than the time if every chunk was
+        # dropped
+        index = bisect.bisect_left(self._phenomenon_times, start_time)
+        del self._phenomenon_times[:index]
+        del self._result_times[:index]
+        del self._results[:index]
+
+        self._size -= discarded
+        self._retained_from = start_time
+
+        return discarded
+
+    def query(self, start_time: int, end_time: int) -> Chunk:
+        """
+        Get the observations with a phenomenon time in the half-open interval
+        [start_time, end_time).
+
+        :param start_time: The inclusive start, in nanoseconds since the epoch
+        :param end_time: The exclusive end, in nanoseconds since the epoch
+        :return: The observations, in time order
+        """
+        start_time = max(start_time, self._retained_from)
+
+        # First chunk that ends at or after the start time
+        first = bisect.bisect_left(self._chunk_end_times, start_time)
+
+        # First chunk that starts at or after the end time
+        last = bisect.bisect_left(self._chunk_start_times, end_time)
+
+        chunks = [self._chunks[index].slice(start_time, end_time) for index in range(first, last)]
+
+        # Active buffer
+        begin = bisect.bisect_left(self._phenomenon_times, start_time)
+        stop = bisect.bisect_left(self._phenomenon_times, end_time)
+        if begin < stop:
+            chunks.append(Chunk(
+                phenomenon_times=numpy.array(self._phenomenon_times[begin:stop], dtype=numpy.int64).view('datetime64[ns]'),
+                result_times=numpy.array(self._result_times[begin:stop], dtype=numpy.int64).view('datetime64[ns]'),
+                results=numpy.array(self._results[begin:stop], dtype=numpy.float64),
+            ))
+
+        # Late observations are merged into the sorted result linearly
+        return Chunk.merge(Chunk.concatenate(chunks), self._overflow.slice(start_time, end_time))
+
+    def _get_sealed_end_time(self) -> int:
+        """
+        Get the end time of the sealed chunks, before which observations go to
+        the overflow.
+        """
+        if self._chunk_end_times:
+            return self._chunk_end_times[-1]
+        return self._retained_from
+
+    def _get_buffer_limit(self) -> int:
+        """
+        Get the size at which the active buffer is sealed.
+        """
+        return self._chunk_size + (self._reorder_size or 0)
+
+    def _add_overflow(self, phenomenon_times: numpy.ndarray, result_times: numpy.ndarray, results: numpy.ndarray) -> None:
+        """
+        Add observations older than the sealed chunks to the overflow.
+
+        :param phenomenon_times: The sorted phenomenon times, in nanoseconds
+        :param result_times: The result times, in nanoseconds
+        :param results: The simple results
+        """
+        self._overflow = Chunk.merge(self._overflow, Chunk(
+            phenomenon_times=phenomenon_times.view('datetime64[ns]'),
+            result_times=result_times.view('datetime64[ns]'),
+            results=results,
+        ))
+
+    def _extend_unordered(self, times: numpy.ndarray, result_times: numpy.ndarray, results: numpy.ndarray) -> int:
+        """
+        Sort observations that aren't in time order into the series.
+
+        :param times: The phenomenon times, in nanoseconds
+        :param result_times: The result times, in nanoseconds
+        :param results: The simple results
+        :return: The number of observations added, excluding those already
+                 discarded by the retention policy
+        """
+        order = numpy.argsort(times, kind='stable')
+        retained = int(numpy.searchsorted(times[order], self._retained_from, side='left'))
+        order = order[retained:]
+
+        times = times[order]
+        result_times = result_times[order]
+        results = results[order]
+
+        # Observations older than the sealed chunks go to the overflow
+        split = int(numpy.searchsorted(times, self._get_sealed_end_time(), side='left'))
+        if split:
+            self._add_overflow(times[:split], result_times[:split], results[:split])
+
+        # Merge the rest with the active buffer
+        merged = Chunk.merge(
+            Chunk(
+                phenomenon_times=numpy.array(self._phenomenon_times, dtype=numpy.int64).view('datetime64[ns]'),
+                result_times=numpy.array(self._result_times, dtype=numpy.int64).view('datetime64[ns]'),
+                results=numpy.array(self._results, dtype=numpy.float64),
+            ),
+            Chunk(
+                phenomenon_times=times[split:].view('datetime64[ns]'),
+                result_times=result_times[split:].view('datetime64[ns]'),
+                results=results[split:],
+            ),
+        )
+
+        self._phenomenon_times = merged.phenomenon_times.view(numpy.int64).tolist()
+        self._result_times = merged.result_times.view(numpy.int64).tolist()
+        self._results = merged.results.tolist()
+
+        limit = self._get_buffer_limit()
+        while len(self._phenomenon_times) >= limit:
+            self._seal(self._chunk_size)
+
+        return len(times)
+
+    def _seal(self, count: int) -> None:
+        """
+        Seal the oldest observations of the active buffer into an immutable
+        chunk.
+
+        :param count: The number of observations to seal
+        """
+        if not count:
+            return
+
+        chunk = Chunk(
+            phenomenon_times=numpy.array(self._phenomenon_times[:count], dtype=numpy.int64).view('datetime64[ns]'),
+            result_times=numpy.array(self._result_times[:count], dtype=numpy.int64).view('datetime64[ns]'),
+            results=numpy.array(self._results[:count], dtype=numpy.float64),
+        )
+
+        self._chunks.append(chunk.encode() if self._compress else chunk)
+        self._chunk_start_times.append(chunk.start_time)
+        self._chunk_end_times.append(chunk.end_time)
+
+        del self._phenomenon_times[:count]
+        del self._result_times[:count]
+        del self._results[:count]
+
+    def _merge_chunks(self, first: int, last: int, overflow: Chunk) -> List[Chunk]:
+        """
+        Merge observations into a range of sealed chunks.
+
+        :param first: The index of the first chunk
+        :param last: The index after the last chunk
+        :param overflow: The observations, in time order
+        :return: The merged chunks, of the chunk size except for the last
+        """
+        chunks = [self._chunks[index] for index in range(first, last)]
+        decoded = [chunk if isinstance(chunk, Chunk) else chunk.decode() for chunk in chunks]
+
+        merged = Chunk.merge(Chunk.concatenate(decoded), overflow)
+
+        return [merged.take(start, start + self._chunk_size) for start in range(0, len(merged), self._chunk_size)]
+
+    def _replace_chunks(self, first: int, last: int, chunks: List[Union[Chunk, EncodedChunk, 'SegmentChunk']]) -> None:
+        """
+        Replace a range of sealed chunks.
+
+        :param first: The index of the first chunk
+        :param last: The index after the last chunk
+        :param chunks: The new chunks, in time order
+        """
+        self._chunks[first:last] = chunks
+        self._chunk_start_times[first:last] = [chunk.start_time for chunk in chunks]
+        self._chunk_end_times[first:last] = [chunk.end_time for chunk in chunks]
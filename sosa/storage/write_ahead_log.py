@@ -0,0 +1,407 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.storage.series import SeriesKey
+
+import dataclasses
+import glob
+import numpy
+import os
+import struct
+import threading
+import zlib
+from typing import BinaryIO
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+
+# Default number of pending records that triggers a group commit
+DEFAULT_GROUP_SIZE = 256
+
+# Frame header: body length, CRC-32 of the body
+_FRAME_HEADER = struct.Struct('<II')
+
+# Record header: log sequence number, observation count
+_RECORD_HEADER = struct.Struct('<QI')
+
+# String length prefix
+_STRING_LENGTH = struct.Struct('<H')
+
+# Log segment file names, ordered by the first LSN they may contain
+_SEGMENT_PATTERN = 'wal-*.log'
+_SEGMENT_NAME = 'wal-{:020d}.log'
+
+
+@dataclasses.dataclass
+class LogRecord:
+    """
+    A batch of observations of a single series, as written to the log.
+    """
+
+    lsn: int
+    """
+    The log sequence number, increasing by one per record.
+    """
+
+    key: SeriesKey
+    """
+    The key of the series the observations belong to.
+    """
+
+    procedure_iri: str
+    """
+    The IRI of the Procedure used by the series.
+    """
+
+    phenomenon_times: numpy.ndarray
+    """
+    The phenomenon times, as UTC datetime64[ns] values.
+    """
+
+    result_times: numpy.ndarray
+    """
+    The result times, as UTC datetime64[ns] values.
+    """
+
+    results: numpy.ndarray
+    """
+    The simple results, as float64 values.
+    """
+
+
+class WriteAheadLog(object):
+    """
+    A write-ahead log of observations with group commit.
+
+    Records are buffered in memory when they are appended and made durable
+    when the log is committed. A commit writes every pending record with a
+    single fsync. Appending never commits, so callers can append while
+    holding their own locks, and commit once they are released. Threads that commit while another thread is syncing wait for
+    it and usually find their records already durable, so many records share
+    each fsync.
+
+    Every record is framed with its length and a CRC-32 checksum. On recovery,
+    reading stops at the first torn or corrupt record, which is truncated so
+    that new records aren't appended after garbage.
+
+    The log is stored as a sequence of segment files. A checkpoint starts a
+    new segment, and segments older than the checkpoint are deleted.
+    """
+
+    def __init__(self, directory: str, group_size: int = DEFAULT_GROUP_SIZE):
+        """
+        Open the log, creating it if it doesn't exist.
+
+        :param directory: The directory containing the log segments
+        :param group_size: The number of pending records that makes a commit
+                           due
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        self._directory = directory
+        self._group_size = group_size
+
+        # Protects the pending buffer and sequence numbers
+        self._lock = threading.Lock()
+
+        # Serializes writes and fsyncs to the active segment
+        self._commit_lock = threading.Lock()
+
+        self._pending: List[bytes] = list()
+        self._next_lsn = 1
+        self._durable_lsn = 0
+
+        # The active segment, opened once the existing records are recovered
+        self._segment_path = ''
+        self._file: Optional[BinaryIO] = None
+
+    @property
+    def last_lsn(self) -> int:
+        """
+        The LSN of the latest record appended to the log.
+        """
+        return self._next_lsn - 1
+
+    @property
+    def commit_due(self) -> bool:
+        """
+        True if enough records are pending to commit them as a group.
+        """
+        return len(self._pending) >= self._group_size
+
+    @property
+    def durable_lsn(self) -> int:
+        """
+        The LSN of the latest record that has been made durable.
+        """
+        return self._durable_lsn
+
+    def append(
+            self,
+            key: SeriesKey,
+            procedure_iri: str,
+            phenomenon_times: numpy.ndarray,
+            result_times: numpy.ndarray,
+            results: numpy.ndarray,
+    ) -> int:
+        """
+        Append a record to the log.
+
+        The record isn't durable until the log is committed. Once enough
+        records are pending, commit_due is set.
+
+        :return: The LSN of the record
+        """
+        if self._file is None:
+            with self._commit_lock:
+                self._open()
+
+        count = len(results)
+
+        body = bytearray()
+        for text in (*key, procedure_iri):
+            encoded = text.encode('utf-8')
+            body += _STRING_LENGTH.pack(len(encoded))
+            body += encoded
+        body += numpy.ascontiguousarray(phenomenon_times, dtype='datetime64[ns]').tobytes()
+        body += numpy.ascontiguousarray(result_times, dtype='datetime64[ns]').tobytes()
+        body += numpy.ascontiguousarray(results, dtype='<f8').tobytes()
+
+        with self._lock:
+            lsn = self._next_lsn
+            self._next_lsn += 1
+
+            record = _RECORD_HEADER.pack(lsn, count) + bytes(body)
+            self._pending.append(_FRAME_HEADER.pack(len(record), zlib.crc32(record)) + record)
+
+        return lsn
+
+    def commit(self, lsn: int = 0) -> None:
+        """
+        Make records durable. If the log was closed, it is opened again.
+
+        :param lsn: The LSN that must be durable on return, or 0 to commit
+                    every pending record
+        """
+        with self._commit_lock:
+            with self._lock:
+                if lsn and lsn <= self._durable_lsn:
+                    # Another thread's commit already covered this record
+                    return
+
+                pending = self._pending
+                self._pending = list()
+                latest_lsn = self._next_lsn - 1
+
+            if pending:
+                # Records appended while the log was being closed are written
+                # to the reopened log, rather than dropped
+                self._open()
+
+                self._file.write(b''.join(pending))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+
+            self._durable_lsn = latest_lsn
+
+    def recover(self, after_lsn: int) -> Iterator[LogRecord]:
+        """
+        Read the durable records of the log, and open it for appending once
+        they have all been read.
+
+        A torn or corrupt record ends the log, and is truncated from its
+        segment. Recovering again returns the same records.
+
+        :param after_lsn: Only records with a greater LSN are returned, and new
+                          records are numbered after it
+        :return: The records, in LSN order
+        """
+        if self._file is not None:
+            raise ValueError('The log has already been opened for appending')
+
+        segments = self._get_segments()
+
+        # Records up to the checkpoint and before the newest segment may have
+        # been discarded, so new records must be numbered after them even if
+        # no records remain to be read
+        first_lsn = self._get_first_lsn(segments[-1]) if segments else 1
+        self._next_lsn = max(self._next_lsn, first_lsn, after_lsn + 1)
+        self._durable_lsn = max(self._durable_lsn, self._next_lsn - 1)
+
+        for segment_path in segments:
+            with open(segment_path, 'rb') as file:
+                data = file.read()
+
+            offset = 0
+            while offset < len(data):
+                record, size = self._parse_record(data, offset)
+
+                if record is None:
+                    # Drop the partial record and everything after it
+                    with open(segment_path, 'r+b') as file:
+                        file.truncate(offset)
+                        os.fsync(file.fileno())
+                    break
+
+                offset += size
+
+                self._next_lsn = max(self._next_lsn, record.lsn + 1)
+                self._durable_lsn = max(self._durable_lsn, record.lsn)
+
+                if record.lsn > after_lsn:
+                    yield record
+
+        if segments:
+            self._segment_path = segments[-1]
+        else:
+            self._segment_path = self._create_segment(self._next_lsn)
+
+        self._file = open(self._segment_path, 'ab')
+
+    def truncate(self, lsn: int) -> None:
+        """
+        Discard the records up to and including an LSN, after they have been
+        checkpointed.
+
+        Pending records are committed and a new segment is started, after
+        which the older segments are deleted.
+
+        :param lsn: The LSN of the latest checkpointed record
+        """
+        self.commit()
+
+        with self._commit_lock:
+            if self._file is not None:
+                self._file.close()
+
+            self._segment_path = self._create_segment(self._next_lsn)
+            self._file = open(self._segment_path, 'ab')
+
+            # A segment only holds records older than the next segment's first
+            # LSN, so it can be removed once those are all checkpointed
+            segments = self._get_segments()
+            for segment_path, next_path in zip(segments, segments[1:]):
+                if self._get_first_lsn(next_path) <= lsn + 1:
+                    os.remove(segment_path)
+
+            sync_directory(self._directory)
+
+    def close(self) -> None:
+        """
+        Commit the pending records and close the log.
+        """
+        self.commit()
+
+        with self._commit_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open(self) -> None:
+        """
+        Open the log for appending, after the existing records, if it isn't
+        open. Must be called with the commit lock held, so that concurrent
+        appends only open the log once.
+        """
+        if self._file is None:
+            for _ in self.recover(0):
+                pass
+
+    def _get_segments(self) -> List[str]:
+        """
+        Get the paths of the log segments, in LSN order.
+        """
+        return sorted(glob.glob(os.path.join(self._directory, _SEGMENT_PATTERN)))
+
+    def _create_segment(self, first_lsn: int) -> str:
+        """
+        Create an empty log segment.
+        """
+        segment_path = os.path.join(self._directory, _SEGMENT_NAME.format(first_lsn))
+
+        with open(segment_path, 'ab') as file:
+            os.fsync(file.fileno())
+
+        sync_directory(self._directory)
+
+        return segment_path
+
+    @staticmethod
+    def _get_first_lsn(segment_path: str) -> int:
+        """
+        Get the first LSN that a log segment may contain, from its name.
+        """
+        name = os.path.basename(segment_path)
+
+        return int(name[len('wal-'):-len('.log')])
+
+    @staticmethod
+    def _parse_record(data: bytes, offset: int) -> Tuple[Optional[LogRecord], int]:
+        """
+        Parse the record at an offset.
+
+        :return: The record, or None if it is torn or corrupt, and its size in
+                 bytes
+        """
+        if offset + _FRAME_HEADER.size > len(data):
+            return None, 0
+
+        length, checksum = _FRAME_HEADER.unpack_from(data, offset)
+
+        start = offset + _FRAME_HEADER.size
+        end = start + length
+        if end > len(data) or zlib.crc32(data[start:end]) != checksum:
+            return None, 0
+
+        lsn, count = _RECORD_HEADER.unpack_from(data, start)
+
+        position = start + _RECORD_HEADER.size
+        texts: List[str] = list()
+        for _ in range(4):
+            (size,) = _STRING_LENGTH.unpack_from(data, position)
+            position += _STRING_LENGTH.size
+            texts.append(data[position:position + size].decode('utf-8'))
+            position += size
+
+        columns: List[numpy.ndarray] = list()
+        for dtype in ('datetime64[ns]', 'datetime64[ns]', '<f8'):
+            columns.append(numpy.frombuffer(data, dtype=dtype, count=count, offset=position).copy())
+            position += 8 * count
+
+        record = LogRecord(
+            lsn=lsn,
+            key=SeriesKey(texts[0], texts[1], texts[2]),
+            procedure_iri=texts[3],
+            phenomenon_times=columns[0],
+            result_times=columns[1],
+            results=columns[2].astype(numpy.float64),
+        )
+
+        return record, end - offset
+
+
+def sync_directory(directory: str) -> None:
+    """
+    Helper function to make the creation, renaming and removal of files in a
+    directory durable.
+
+    :param directory: The directory
+    """
+    if not hasattr(os, 'O_DIRECTORY'):
+        # Not supported on this platform
+        return
+
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
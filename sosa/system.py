@@ -28,6 +28,9 @@ from sosa.ontology.sosa import SOSA
 from sosa.ontology.ssn import SSN
 
 import dataclasses
+import datetime
+from typing import List
+from typing import Optional
 
 
 @dataclasses.dataclass
@@ -111,3 +114,24 @@ class Deployment:
     """
     Additional information describing the resource in US English.
     """
+
+    system_iris: List[str] = dataclasses.field(default_factory=list)
+    """
+    The IRIs of the Systems deployed (ssn:deployedSystem).
+    """
+
+    platform_iri: str = dataclasses.field(default_factory=str)
+    """
+    The IRI of the Platform the Systems are deployed on
+    (ssn:deployedOnPlatform).
+    """
+
+    start_time: Optional[datetime.datetime] = None
+    """
+    The time the deployment started, or None if it is unknown.
+    """
+
+    end_time: Optional[datetime.datetime] = None
+    """
+    The time the deployment ended, or None if it is ongoing.
+    """
@@ -0,0 +1,103 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+"""
+Conversion of observation results between units of measurement.
+
+Results are converted in bulk, with the scale and offset between each pair of
+units computed once and cached.
+"""
+
+import numpy
+from qudt.unit import Unit
+import threading
+from typing import Dict
+from typing import NamedTuple
+from typing import Tuple
+
+
+class ConversionFactors(NamedTuple):
+    """
+    The linear conversion from one unit to another, where a value in the
+    target unit is the value in the source unit times the scale plus the
+    offset.
+    """
+
+    scale: float
+    """
+    The factor applied to source values.
+    """
+
+    offset: float
+    """
+    The offset added to scaled values.
+    """
+
+
+# Factors of compatible unit pairs, keyed by source and target unit IRIs
+_factors: Dict[Tuple[str, str], ConversionFactors] = dict()
+_factors_lock = threading.Lock()
+
+
+def get_conversion_factors(source: Unit, target: Unit) -> ConversionFactors:
+    """
+    Get the factors converting values from one unit to another.
+
+    :param source: The unit of the values
+    :param target: The unit to convert to
+    :return: The conversion factors
+    :raises ValueError: If the units don't have the same type
+    """
+    key = (source.resource_iri, target.resource_iri)
+
+    factors = _factors.get(key)
+    if factors is not None:
+        return factors
+
+    if source.type_iri != target.type_iri:
+        raise ValueError(
+            f'The new unit does not have the same parent type '
+            f'(source: {source.type_iri}; target: {target.type_iri})'
+        )
+
+    if source.resource_iri == target.resource_iri:
+        factors = ConversionFactors(1.0, 0.0)
+    else:
+        # Convert through the base unit:
+        #   base = value * source.multiplier + source.offset
+        #   converted = (base - target.offset) / target.multiplier
+        factors = ConversionFactors(
+            source.multiplier.multiplier / target.multiplier.multiplier,
+            (source.multiplier.offset - target.multiplier.offset) / target.multiplier.multiplier,
+        )
+
+    with _factors_lock:
+        _factors[key] = factors
+
+    return factors
+
+
+def convert_results(results: numpy.ndarray, source: Unit, target: Unit) -> numpy.ndarray:
+    """
+    Convert an array of results from one unit to another.
+
+    :param results: The results, as float64 values
+    :param source: The unit of the results
+    :param target: The unit to convert to
+    :return: A new array of converted results
+    :raises ValueError: If the units don't have the same type
+    """
+    scale, offset = get_conversion_factors(source, target)
+
+    converted = numpy.multiply(results, scale, dtype=numpy.float64)
+    if offset:
+        converted += offset
+
+    return converted
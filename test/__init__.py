@@ -0,0 +1,13 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from .observation_test import ObservationCollectionTest
+from .unit_converter_test import UnitConverterTest
+from .relationship_test import RelationshipStoreTest
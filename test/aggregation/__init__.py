@@ -0,0 +1,13 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+
+from .window_aggregator_test import WindowAggregatorTest
+from .stream_aggregator_test import StreamAggregatorTest
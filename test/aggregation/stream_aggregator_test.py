@@ -0,0 +1,161 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.aggregation.stream_aggregator import StreamAggregator
+from sosa.aggregation.window import SessionWindow
+from sosa.aggregation.window import SlidingWindow
+from sosa.aggregation.window import TumblingWindow
+from sosa.aggregation.window_aggregator import WindowAggregator
+from sosa.observation import ObservationCollection
+
+import dataclasses
+import datetime
+import numpy
+import unittest
+from typing import Dict
+from typing import List
+
+
+START = numpy.datetime64('2020-01-01T00:00:00', 'ns')
+
+
+def create_collection(seconds: numpy.ndarray, results: numpy.ndarray) -> ObservationCollection:
+    times = START + numpy.asarray(seconds, dtype=numpy.int64) * numpy.timedelta64(1, 's')
+
+    return ObservationCollection(
+        resource_iri='',
+        sensor_iri='http://example.org/sensor/1',
+        property_iri='http://example.org/property/NitricOxide',
+        feature_iri='http://example.org/feature/Oakland',
+        phenomenon_times=times,
+        result_times=times,
+        results=numpy.asarray(results, dtype=numpy.float64),
+    )
+
+
+def collect(emitted: List[ObservationCollection], statistic: str) -> Dict[numpy.datetime64, float]:
+    # Later emissions of a window replace earlier ones
+    values: Dict[numpy.datetime64, float] = dict()
+    for collection in emitted:
+        if collection.property_iri.endswith('/' + statistic):
+            values.update(zip(collection.phenomenon_times, collection.results))
+
+    return values
+
+
+class StreamAggregatorTest(unittest.TestCase):
+    def test_in_order(self) -> None:
+        aggregator = StreamAggregator(WindowAggregator(TumblingWindow(datetime.timedelta(minutes=1)), ['mean', 'count']))
+
+        emitted: List[ObservationCollection] = list()
+        for second in range(0, 300, 10):
+            emitted += aggregator.process(create_collection(numpy.arange(second, second + 10), numpy.arange(second, second + 10)))
+
+        # The last window is still open
+        self.assertEqual(4, len(collect(emitted, 'mean')))
+
+        emitted += aggregator.flush()
+
+        numpy.testing.assert_array_equal([29.5, 89.5, 149.5, 209.5, 269.5], list(collect(emitted, 'mean').values()))
+        numpy.testing.assert_array_equal([60.0] * 5, list(collect(emitted, 'count').values()))
+
+    def test_out_of_order(self) -> None:
+        rng = numpy.random.default_rng(0)
+
+        # Delay each observation by up to 30 seconds
+        seconds = numpy.arange(3600)
+        arrivals = numpy.argsort(seconds + rng.integers(0, 30, len(seconds)), kind='stable')
+        results = rng.normal(size=len(seconds))
+
+        window = SlidingWindow(datetime.timedelta(minutes=5), datetime.timedelta(minutes=1))
+        expected = WindowAggregator(window, ['mean', 'p90']).aggregate(create_collection(seconds, results))
+
+        aggregator = StreamAggregator(WindowAggregator(window, ['mean', 'p90']), max_delay=datetime.timedelta(seconds=30))
+
+        emitted: List[ObservationCollection] = list()
+        for batch in numpy.array_split(arrivals, 360):
+            emitted += aggregator.process(create_collection(seconds[batch], results[batch]))
+
+        self.assertEqual(0, aggregator.dropped)
+        self.assertLessEqual(aggregator.buffered, 400)
+
+        emitted += aggregator.flush()
+
+        for statistic in ('mean', 'p90'):
+            values = collect(emitted, statistic)
+            self.assertEqual(list(expected[statistic].phenomenon_times), list(values))
+            numpy.testing.assert_allclose(expected[statistic].results, list(values.values()))
+
+    def test_late(self) -> None:
+        aggregator = StreamAggregator(
+            WindowAggregator(TumblingWindow(datetime.timedelta(minutes=1)), ['sum']),
+            allowed_lateness=datetime.timedelta(minutes=2),
+        )
+
+        aggregator.process(create_collection([0, 30], [1.0, 2.0]))
+        emitted = aggregator.process(create_collection([90], [4.0]))
+
+        self.assertEqual({START: 3.0}, collect(emitted, 'sum'))
+
+        # A late observation within the allowed lateness corrects the window
+        emitted = aggregator.process(create_collection([45], [8.0]))
+
+        self.assertEqual({START: 11.0}, collect(emitted, 'sum'))
+        self.assertEqual(START + numpy.timedelta64(90, 's'), emitted[0].result_times[0])
+
+        # Once the watermark has passed by more than the allowed lateness, late
+        # observations are dropped
+        aggregator.process(create_collection([200], [16.0]))
+        emitted = aggregator.process(create_collection([50], [32.0]))
+
+        self.assertEqual([], emitted)
+        self.assertEqual(1, aggregator.dropped)
+
+    def test_multiple_series(self) -> None:
+        aggregator = StreamAggregator(
+            WindowAggregator(TumblingWindow(datetime.timedelta(minutes=1)), ['sum']),
+            allowed_lateness=datetime.timedelta(minutes=2),
+        )
+
+        other = dataclasses.replace(create_collection([0, 10], [1.0, 2.0]), sensor_iri='http://example.org/sensor/2')
+        aggregator.process(other)
+        aggregator.process(create_collection([20], [4.0]))
+
+        # Observations of one series close the windows of another
+        emitted = aggregator.process(create_collection([130], [8.0]))
+
+        sums = {(collection.sensor_iri, time): result for collection in emitted for time, result in zip(collection.phenomenon_times, collection.results)}
+        self.assertEqual({
+            ('http://example.org/sensor/2', START): 3.0,
+            ('http://example.org/sensor/1', START): 4.0,
+        }, sums)
+
+        # Windows of each series are discarded once they are final
+        self.assertEqual(4, aggregator.buffered)
+        aggregator.advance_watermark(datetime.datetime(2020, 1, 1, 0, 4, tzinfo=datetime.timezone.utc))
+        self.assertEqual(1, aggregator.buffered)
+
+    def test_advance_watermark(self) -> None:
+        aggregator = StreamAggregator(WindowAggregator(TumblingWindow(datetime.timedelta(minutes=1)), ['count']))
+
+        aggregator.process(create_collection([0, 10], [1.0, 2.0]))
+        emitted = aggregator.advance_watermark(datetime.datetime(2020, 1, 1, 0, 5, tzinfo=datetime.timezone.utc))
+
+        self.assertEqual({START: 2.0}, collect(emitted, 'count'))
+        self.assertEqual(datetime.datetime(2020, 1, 1, 0, 5, tzinfo=datetime.timezone.utc), aggregator.watermark)
+        self.assertEqual(0, aggregator.buffered)
+
+    def test_session(self) -> None:
+        with self.assertRaises(ValueError):
+            StreamAggregator(WindowAggregator(SessionWindow(datetime.timedelta(minutes=1)), ['count']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.aggregation.window import SessionWindow
+from sosa.aggregation.window import SlidingWindow
+from sosa.aggregation.window import TumblingWindow
+from sosa.aggregation.window_aggregator import WindowAggregator
+from sosa.aggregation.window_aggregator import aggregate
+from sosa.observation import ObservationCollection
+from sosa.procedure import Procedure
+
+import datetime
+import numpy
+import unittest
+
+
+START = numpy.datetime64('2020-01-01T00:00:00', 'ns')
+
+
+def create_times(seconds: list) -> numpy.ndarray:
+    return START + numpy.array(seconds, dtype=numpy.int64) * numpy.timedelta64(1, 's')
+
+
+class WindowAggregatorTest(unittest.TestCase):
+    def test_tumbling(self) -> None:
+        times = create_times([0, 10, 70, 80, 90, 200])
+        results = numpy.array([1.0, 3.0, 2.0, numpy.nan, 4.0, 7.0])
+
+        aggregates = aggregate(times, results, TumblingWindow(datetime.timedelta(minutes=1)), ['mean', 'sum', 'count', 'min', 'max'])
+
+        numpy.testing.assert_array_equal(create_times([0, 60, 180]), aggregates['start_time'])
+        numpy.testing.assert_array_equal(create_times([60, 120, 240]), aggregates['end_time'])
+        numpy.testing.assert_array_equal([2.0, 3.0, 7.0], aggregates['mean'])
+        numpy.testing.assert_array_equal([4.0, 6.0, 7.0], aggregates['sum'])
+        numpy.testing.assert_array_equal([2.0, 2.0, 1.0], aggregates['count'])
+        numpy.testing.assert_array_equal([1.0, 2.0, 7.0], aggregates['min'])
+        numpy.testing.assert_array_equal([3.0, 4.0, 7.0], aggregates['max'])
+
+    def test_sliding(self) -> None:
+        rng = numpy.random.default_rng(0)
+        seconds = numpy.sort(rng.integers(0, 3600, 500))
+        times = create_times(seconds)
+        results = rng.normal(size=500)
+
+        window = SlidingWindow(datetime.timedelta(minutes=5), datetime.timedelta(minutes=1))
+        aggregates = aggregate(times, results, window, ['mean', 'max', 'stddev', 'p50', 'p90'])
+
+        # Windows starting before the first observation overlap it
+        self.assertEqual(START - numpy.timedelta64(4, 'm'), aggregates['start_time'][0])
+
+        for i, start in enumerate(aggregates['start_time']):
+            values = results[(times >= start) & (times < start + numpy.timedelta64(5, 'm'))]
+
+            self.assertAlmostEqual(numpy.mean(values), aggregates['mean'][i])
+            self.assertEqual(numpy.max(values), aggregates['max'][i])
+            self.assertAlmostEqual(numpy.std(values), aggregates['stddev'][i])
+            self.assertAlmostEqual(numpy.percentile(values, 50), aggregates['p50'][i])
+            self.assertAlmostEqual(numpy.percentile(values, 90), aggregates['p90'][i])
+
+    def test_session(self) -> None:
+        times = create_times([0, 10, 20, 100, 110, 300])
+        results = numpy.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+
+        aggregates = aggregate(times, results, SessionWindow(datetime.timedelta(seconds=30)), ['count', 'mean'])
+
+        numpy.testing.assert_array_equal(create_times([0, 100, 300]), aggregates['start_time'])
+        numpy.testing.assert_array_equal(create_times([50, 140, 330]), aggregates['end_time'])
+        numpy.testing.assert_array_equal([3.0, 2.0, 1.0], aggregates['count'])
+        numpy.testing.assert_array_equal([2.0, 4.5, 6.0], aggregates['mean'])
+
+    def test_empty(self) -> None:
+        aggregates = aggregate(create_times([]), numpy.empty(0), SessionWindow(datetime.timedelta(seconds=30)), ['mean', 'p50'])
+
+        self.assertEqual(0, len(aggregates['start_time']))
+        self.assertEqual(0, len(aggregates['p50']))
+
+    def test_aggregator(self) -> None:
+        collection = ObservationCollection(
+            resource_iri='',
+            sensor_iri='http://example.org/sensor/1',
+            property_iri='http://aclima.io/schema/1.0/Raw',
+            feature_iri='http://example.org/feature/Oakland',
+            phenomenon_times=create_times(numpy.arange(600)),
+            result_times=create_times(numpy.arange(600)),
+            results=numpy.arange(600, dtype=numpy.float64),
+        )
+
+        aggregator = WindowAggregator(
+            TumblingWindow(datetime.timedelta(minutes=1)),
+            ['mean', 'p99'],
+            procedure=Procedure('http://example.org/procedure/Average'),
+            property_iris={'mean': 'http://aclima.io/schema/1.0/RawAverage'},
+        )
+
+        aggregates = aggregator.aggregate(collection)
+
+        mean = aggregates['mean']
+        self.assertEqual('http://aclima.io/schema/1.0/RawAverage', mean.property_iri)
+        self.assertEqual('http://example.org/procedure/Average', mean.procedure_iri)
+        self.assertEqual(collection.sensor_iri, mean.sensor_iri)
+        self.assertEqual(10, len(mean))
+        self.assertEqual(29.5, mean.results[0])
+        self.assertEqual(create_times([60]), mean.result_times[0])
+
+        self.assertEqual('http://aclima.io/schema/1.0/Raw/p99', aggregates['p99'].property_iri)
+
+        with self.assertRaises(ValueError):
+            WindowAggregator(TumblingWindow(datetime.timedelta(minutes=1)), ['median'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.relationship import RelationshipStore
+
+from typing import Iterable
+from typing import Tuple
+
+
+def create_relationships(edges: Iterable[Tuple[str, str, str]]) -> RelationshipStore:
+    """
+    Create a relationship store holding a set of edges.
+
+    :param edges: The edges, as subject, predicate and object IRIs, in the
+                  order they are added
+    """
+    relationships = RelationshipStore()
+
+    for subject_iri, predicate_iri, object_iri in edges:
+        relationships.add(subject_iri, predicate_iri, object_iri)
+
+    return relationships
@@ -0,0 +1,16 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from .hierarchy_index_test import HierarchyIndexTest
+from .deployment_index_test import DeploymentIndexTest
+from .lineage_index_test import LineageIndexTest
+from .ultimate_feature_index_test import UltimateFeatureIndexTest
+from .text_index_test import TextIndexTest
+from .autocomplete_test import AutocompleteTest
@@ -0,0 +1,120 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.index.autocomplete import Autocomplete
+from sosa.index.autocomplete import normalize
+from sosa.ontology.schema import SCHEMA
+
+from qudt.ontology.qudt import QUDT
+from qudt.ontology.rdfs import RDFS
+import rdflib
+from typing import List
+from typing import Tuple
+import unittest
+
+
+NITRIC_OXIDE_IRI = 'http://aclima.io/schema/1.0/NitricOxide'
+NITROGEN_DIOXIDE_IRI = 'http://aclima.io/schema/1.0/NitrogenDioxide'
+OZONE_IRI = 'http://aclima.io/schema/1.0/Ozone'
+
+
+def create_graph(texts: List[Tuple[str, str, str]]) -> rdflib.Graph:
+    graph = rdflib.Graph()
+
+    for resource_iri, property_iri, text in texts:
+        graph.add((rdflib.URIRef(resource_iri), rdflib.URIRef(property_iri), rdflib.Literal(text)))
+
+    return graph
+
+
+FEATURE_TEXTS = [
+    (NITRIC_OXIDE_IRI, RDFS.LABEL, 'Nitric oxide'),
+    (NITRIC_OXIDE_IRI, QUDT.ABBREVIATION, 'NO'),
+    (NITRIC_OXIDE_IRI, SCHEMA.DESCRIPTION, 'Nitrogen oxide or nitrogen monoxide'),
+    (NITROGEN_DIOXIDE_IRI, RDFS.LABEL, 'Nitrogen  dioxide'),
+    (NITROGEN_DIOXIDE_IRI, QUDT.ABBREVIATION, 'NO2'),
+    (OZONE_IRI, RDFS.LABEL, 'Ozone'),
+    (OZONE_IRI, QUDT.ABBREVIATION, 'O3'),
+]
+
+
+class AutocompleteTest(unittest.TestCase):
+    def test_normalize(self) -> None:
+        self.assertEqual('nitrogen dioxide', normalize(' Nitrogen\tdioxide'))
+        self.assertEqual('nitric ', normalize('Nitric  '))
+        self.assertEqual('', normalize('  '))
+
+    def test_complete(self) -> None:
+        autocomplete = Autocomplete()
+        self.assertEqual((6, 0), autocomplete.load_graph('features.ttl', create_graph(FEATURE_TEXTS)))
+
+        def complete(prefix: str, limit: int = 10) -> List[Tuple[str, str]]:
+            return [(completion.resource_iri, completion.text) for completion in autocomplete.complete(prefix, limit)]
+
+        # Alphabetical, one completion per entity
+        self.assertEqual([(NITRIC_OXIDE_IRI, 'Nitric oxide'), (NITROGEN_DIOXIDE_IRI, 'Nitrogen  dioxide')], complete('Nit'))
+        self.assertEqual([(NITRIC_OXIDE_IRI, 'NO'), (NITROGEN_DIOXIDE_IRI, 'NO2')], complete('no'))
+        self.assertEqual([(NITROGEN_DIOXIDE_IRI, 'Nitrogen  dioxide')], complete('nitrogen d'))
+        self.assertEqual([(NITRIC_OXIDE_IRI, 'Nitric oxide')], complete('nitric '))
+        self.assertEqual([(NITRIC_OXIDE_IRI, 'Nitric oxide')], complete('n', limit=1))
+
+        # Descriptions aren't completed
+        self.assertEqual([], complete('nitrogen o'))
+        self.assertEqual([], complete('x'))
+        self.assertEqual([], complete(''))
+
+    def test_weight(self) -> None:
+        weights = {NITRIC_OXIDE_IRI: 1.0, NITROGEN_DIOXIDE_IRI: 5.0, OZONE_IRI: 3.0}
+
+        autocomplete = Autocomplete(lambda resource_iri, property_iri, text: weights[resource_iri])
+        autocomplete.load_graph('features.ttl', create_graph(FEATURE_TEXTS))
+
+        completions = autocomplete.complete('o')
+        self.assertEqual([OZONE_IRI], [completion.resource_iri for completion in completions])
+        self.assertEqual(3.0, completions[0].weight)
+
+        completions = autocomplete.complete('n')
+        self.assertEqual([NITROGEN_DIOXIDE_IRI, NITRIC_OXIDE_IRI], [completion.resource_iri for completion in completions])
+
+    def test_reload(self) -> None:
+        autocomplete = Autocomplete()
+        autocomplete.load_graph('features.ttl', create_graph(FEATURE_TEXTS))
+        autocomplete.load_graph('extra.ttl', create_graph([(OZONE_IRI, RDFS.LABEL, 'Trioxygen')]))
+
+        # Only the difference is applied
+        texts = FEATURE_TEXTS[:-2] + [(OZONE_IRI, RDFS.LABEL, 'Ozone (O3)')]
+        self.assertEqual((1, 2), autocomplete.load_graph('features.ttl', create_graph(texts)))
+        self.assertEqual(6, len(autocomplete))
+
+        self.assertEqual(['Ozone (O3)'], [completion.text for completion in autocomplete.complete('oz')])
+        self.assertEqual([], autocomplete.complete('o3'))
+        self.assertEqual(['Trioxygen'], [completion.text for completion in autocomplete.complete('tri')])
+
+        self.assertEqual(1, autocomplete.unload('extra.ttl'))
+        self.assertEqual([], autocomplete.complete('tri'))
+
+    def test_many(self) -> None:
+        autocomplete = Autocomplete(lambda resource_iri, property_iri, text: float(len(text) % 7))
+        autocomplete.load_graph('features.ttl', create_graph([
+            (f'http://example.org/Feature{index}', RDFS.LABEL, f'Feature {index}')
+            for index in range(1000)
+        ]))
+
+        completions = autocomplete.complete('feature 1', limit=5)
+
+        expected = sorted(
+            (-float(len(f'Feature {index}') % 7), f'Feature {index}')
+            for index in range(1000) if str(index).startswith('1')
+        )[:5]
+        self.assertEqual([text for _, text in expected], [completion.text for completion in completions])
+
+
+if __name__ == '__main__':
+    unittest.main()
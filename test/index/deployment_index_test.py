@@ -0,0 +1,108 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.index.deployment_index import DeploymentIndex
+from sosa.observation import ObservationBatch
+from sosa.system import Deployment
+
+import datetime
+import numpy
+import unittest
+
+
+SENSOR_IRIS = [f'http://example.org/sensor/{index}' for index in range(3)]
+
+START_TIME = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def create_deployment(name: str, platform: str, start_day: int, end_day: int = None, sensor_iris: list = None) -> Deployment:
+    return Deployment(
+        resource_iri=f'http://example.org/deployment/{name}',
+        system_iris=sensor_iris or SENSOR_IRIS[:1],
+        platform_iri=f'http://example.org/platform/{platform}',
+        start_time=START_TIME + datetime.timedelta(days=start_day),
+        end_time=None if end_day is None else START_TIME + datetime.timedelta(days=end_day),
+    )
+
+
+class DeploymentIndexTest(unittest.TestCase):
+    def create_index(self) -> DeploymentIndex:
+        index = DeploymentIndex()
+
+        index.add(create_deployment('Oakland', 'Van', 0, 10, SENSOR_IRIS[:2]))
+        index.add(create_deployment('Berkeley', 'Bus', 20))
+
+        # A temporary deployment during the Berkeley deployment
+        index.add(create_deployment('Calibration', 'Lab', 30, 35))
+
+        return index
+
+    def get_active_name(self, index: DeploymentIndex, sensor_iri: str, day: float) -> str:
+        deployment = index.get_active(sensor_iri, START_TIME + datetime.timedelta(days=day))
+        return deployment.resource_iri.rsplit('/', 1)[-1] if deployment is not None else ''
+
+    def test_get_active(self) -> None:
+        index = self.create_index()
+
+        self.assertEqual('', self.get_active_name(index, SENSOR_IRIS[0], -1))
+        self.assertEqual('Oakland', self.get_active_name(index, SENSOR_IRIS[0], 0))
+        self.assertEqual('Oakland', self.get_active_name(index, SENSOR_IRIS[0], 9.5))
+        self.assertEqual('', self.get_active_name(index, SENSOR_IRIS[0], 10))
+        self.assertEqual('Berkeley', self.get_active_name(index, SENSOR_IRIS[0], 25))
+        self.assertEqual('Calibration', self.get_active_name(index, SENSOR_IRIS[0], 31))
+        self.assertEqual('Berkeley', self.get_active_name(index, SENSOR_IRIS[0], 35))
+        self.assertEqual('Berkeley', self.get_active_name(index, SENSOR_IRIS[0], 1000))
+
+        self.assertEqual('Oakland', self.get_active_name(index, SENSOR_IRIS[1], 5))
+        self.assertEqual('', self.get_active_name(index, SENSOR_IRIS[1], 25))
+        self.assertEqual('', self.get_active_name(index, SENSOR_IRIS[2], 5))
+
+    def test_update(self) -> None:
+        index = self.create_index()
+
+        self.assertTrue(index.remove('http://example.org/deployment/Calibration'))
+        self.assertEqual('Berkeley', self.get_active_name(index, SENSOR_IRIS[0], 31))
+
+        # Replace the Berkeley deployment with one that ended
+        index.add(create_deployment('Berkeley', 'Bus', 20, 40))
+        self.assertEqual('', self.get_active_name(index, SENSOR_IRIS[0], 50))
+        self.assertEqual(2, len(index))
+
+        with self.assertRaises(ValueError):
+            index.add(create_deployment('Backwards', 'Bus', 20, 10))
+
+    def test_join(self) -> None:
+        index = self.create_index()
+
+        days = numpy.array([5, 31, 25, 5, 5, 50])
+        batch = ObservationBatch(
+            sensor_iris=numpy.array([SENSOR_IRIS[0], SENSOR_IRIS[0], SENSOR_IRIS[0], SENSOR_IRIS[1], SENSOR_IRIS[2], SENSOR_IRIS[1]], dtype=object),
+            property_iris=numpy.full(6, 'http://example.org/property/NitricOxide', dtype=object),
+            feature_iris=numpy.full(6, 'http://example.org/feature/Oakland', dtype=object),
+            procedure_iris=numpy.full(6, '', dtype=object),
+            phenomenon_times=numpy.datetime64('2020-01-01T00:00:00', 'ns') + days * numpy.timedelta64(1, 'D'),
+            result_times=numpy.full(6, numpy.datetime64('NaT'), dtype='datetime64[ns]'),
+            results=numpy.arange(6.0),
+        )
+
+        columns = index.join(batch)
+
+        numpy.testing.assert_array_equal(
+            ['Oakland', 'Calibration', 'Berkeley', 'Oakland', '', ''],
+            [iri.rsplit('/', 1)[-1] for iri in columns.deployment_iris],
+        )
+        numpy.testing.assert_array_equal(
+            ['Van', 'Lab', 'Bus', 'Van', '', ''],
+            [iri.rsplit('/', 1)[-1] for iri in columns.platform_iris],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.index.hierarchy_index import HierarchyIndex
+from sosa.ontology.sosa import SOSA
+from sosa.ontology.ssn import SSN
+from sosa.relationship import RelationshipStore
+
+from ..fixtures import create_relationships
+
+import random
+from typing import Dict
+from typing import List
+from typing import Set
+from typing import Tuple
+import unittest
+
+
+VEHICLE_IRI = 'http://example.org/platform/Vehicle'
+RACK_IRI = 'http://example.org/platform/Rack'
+SYSTEM_IRI = 'http://example.org/system/AirQuality'
+SENSOR_IRIS = [f'http://example.org/sensor/{index}' for index in range(3)]
+
+
+# Vehicle -> Rack -> AirQuality -> Sensors
+EDGES = [
+    (VEHICLE_IRI, SOSA.HOSTS, RACK_IRI),
+    (SYSTEM_IRI, SOSA.IS_HOSTED_BY, RACK_IRI),
+    (SYSTEM_IRI, SSN.HAS_SUBSYSTEM, SENSOR_IRIS[0]),
+    (SYSTEM_IRI, SSN.HAS_SUBSYSTEM, SENSOR_IRIS[1]),
+]
+
+
+class HierarchyIndexTest(unittest.TestCase):
+    def test_closure(self) -> None:
+        index = HierarchyIndex(create_relationships(EDGES))
+
+        self.assertTrue(index.is_ancestor(VEHICLE_IRI, SENSOR_IRIS[1]))
+        self.assertTrue(index.is_ancestor(RACK_IRI, SYSTEM_IRI))
+        self.assertFalse(index.is_ancestor(SENSOR_IRIS[1], VEHICLE_IRI))
+        self.assertFalse(index.is_ancestor(VEHICLE_IRI, SENSOR_IRIS[2]))
+
+        self.assertEqual({RACK_IRI, SYSTEM_IRI, *SENSOR_IRIS[:2]}, set(index.get_descendants(VEHICLE_IRI)))
+        self.assertEqual({VEHICLE_IRI, RACK_IRI, SYSTEM_IRI}, set(index.get_ancestors(SENSOR_IRIS[0])))
+        self.assertEqual([], index.get_descendants(SENSOR_IRIS[0]))
+
+    def test_incremental(self) -> None:
+        relationships = create_relationships(EDGES)
+        index = HierarchyIndex(relationships)
+
+        relationships.add(SYSTEM_IRI, SSN.HAS_SUBSYSTEM, SENSOR_IRIS[2])
+        self.assertTrue(index.is_ancestor(VEHICLE_IRI, SENSOR_IRIS[2]))
+
+        # Move the rack to another vehicle
+        relationships.remove(VEHICLE_IRI, SOSA.HOSTS, RACK_IRI)
+        relationships.add('http://example.org/platform/Truck', SOSA.HOSTS, RACK_IRI)
+
+        self.assertEqual([], index.get_descendants(VEHICLE_IRI))
+        self.assertEqual(5, len(index.get_descendants('http://example.org/platform/Truck')))
+        self.assertTrue(index.is_ancestor('http://example.org/platform/Truck', SENSOR_IRIS[0]))
+        self.assertFalse(index.is_ancestor(VEHICLE_IRI, SENSOR_IRIS[0]))
+
+        # Unrelated properties don't change the closure
+        relationships.add(SENSOR_IRIS[0], SOSA.OBSERVES, 'http://example.org/property/NitricOxide')
+        self.assertEqual(5, len(index.get_descendants('http://example.org/platform/Truck')))
+
+    def test_multiple_parents(self) -> None:
+        relationships = create_relationships(EDGES)
+        index = HierarchyIndex(relationships)
+
+        relationships.add('http://example.org/system/Backup', SSN.HAS_SUBSYSTEM, SENSOR_IRIS[0])
+
+        self.assertTrue(index.is_ancestor('http://example.org/system/Backup', SENSOR_IRIS[0]))
+        self.assertTrue(index.is_ancestor(VEHICLE_IRI, SENSOR_IRIS[0]))
+
+        relationships.remove(SYSTEM_IRI, SSN.HAS_SUBSYSTEM, SENSOR_IRIS[0])
+
+        self.assertTrue(index.is_ancestor('http://example.org/system/Backup', SENSOR_IRIS[0]))
+        self.assertFalse(index.is_ancestor(VEHICLE_IRI, SENSOR_IRIS[0]))
+
+    def test_cycle(self) -> None:
+        relationships = create_relationships(EDGES)
+        index = HierarchyIndex(relationships)
+
+        relationships.add(SENSOR_IRIS[0], SOSA.HOSTS, VEHICLE_IRI)
+
+        self.assertFalse(index.is_ancestor(SENSOR_IRIS[0], VEHICLE_IRI))
+        self.assertFalse(index.is_ancestor(VEHICLE_IRI, VEHICLE_IRI))
+        self.assertTrue(index.is_ancestor(VEHICLE_IRI, SENSOR_IRIS[0]))
+
+
+    def test_cycle_removed(self) -> None:
+        relationships = create_relationships(EDGES)
+        index = HierarchyIndex(relationships)
+
+        # The ignored edge is valid once the cycle is broken
+        relationships.add(SENSOR_IRIS[0], SOSA.HOSTS, VEHICLE_IRI)
+        relationships.remove(VEHICLE_IRI, SOSA.HOSTS, RACK_IRI)
+
+        self.assertTrue(index.is_ancestor(SENSOR_IRIS[0], VEHICLE_IRI))
+        self.assertIn(VEHICLE_IRI, index.get_descendants(SYSTEM_IRI))
+        self.assertFalse(index.is_ancestor(VEHICLE_IRI, SENSOR_IRIS[0]))
+
+    def test_incremental_matches_rebuild(self) -> None:
+        rng = random.Random(0)
+
+        entity_iris = [f'http://example.org/Entity{index}' for index in range(6)]
+        predicate_iris = [SOSA.HOSTS, SSN.HAS_SUBSYSTEM]
+
+        for _ in range(50):
+            relationships = RelationshipStore()
+            index = HierarchyIndex(relationships)
+            edges = list()
+
+            for _ in range(30):
+                if edges and rng.random() < 0.4:
+                    relationships.remove(*edges.pop(rng.randrange(len(edges))))
+                else:
+                    edge = (rng.choice(entity_iris), rng.choice(predicate_iris), rng.choice(entity_iris))
+                    if edge not in edges:
+                        relationships.add(*edge)
+                        edges.append(edge)
+
+                # While there is a cycle, the ignored edge depends on the order
+                # the edges were added
+                if self._has_cycle(edges):
+                    continue
+
+                rebuilt = HierarchyIndex(relationships)
+                for entity_iri in entity_iris:
+                    self.assertCountEqual(rebuilt.get_descendants(entity_iri), index.get_descendants(entity_iri))
+                    self.assertCountEqual(rebuilt.get_ancestors(entity_iri), index.get_ancestors(entity_iri))
+                rebuilt.close()
+
+    @staticmethod
+    def _has_cycle(edges: List[Tuple[str, str, str]]) -> bool:
+        children: Dict[str, Set[str]] = dict()
+        for parent_iri, _, child_iri in edges:
+            children.setdefault(parent_iri, set()).add(child_iri)
+
+        # Repeatedly remove the entities without children
+        while children:
+            leaves = {parent_iri for parent_iri, child_iris in children.items() if not child_iris & children.keys()}
+            if not leaves:
+                return True
+            for leaf_iri in leaves:
+                del children[leaf_iri]
+
+        return False
+
+
+if __name__ == '__main__':
+    unittest.main()
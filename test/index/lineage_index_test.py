@@ -0,0 +1,110 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.index.lineage_index import LineageIndex
+from sosa.ontology.sosa import SOSA
+
+from ..fixtures import create_relationships
+
+import unittest
+
+
+LAKE_IRI = 'http://example.org/feature/Lake'
+CORE_IRI = 'http://example.org/sample/Core'
+SLICE_IRIS = [f'http://example.org/sample/Slice{index}' for index in range(2)]
+ALIQUOT_IRIS = [f'http://example.org/sample/Aliquot{index}' for index in range(4)]
+
+
+# Lake <- Core <- Slices <- Aliquots
+EDGES = [
+    (CORE_IRI, SOSA.IS_SAMPLE_OF, LAKE_IRI),
+    (SLICE_IRIS[0], SOSA.IS_SAMPLE_OF, CORE_IRI),
+    (ALIQUOT_IRIS[0], SOSA.HAS_ORIGINAL_SAMPLE, SLICE_IRIS[0]),
+    (SLICE_IRIS[0], SOSA.HAS_SAMPLE, ALIQUOT_IRIS[1]),
+    (SLICE_IRIS[1], SOSA.IS_SAMPLE_OF, CORE_IRI),
+    (ALIQUOT_IRIS[2], SOSA.HAS_ORIGINAL_SAMPLE, SLICE_IRIS[1]),
+    (SLICE_IRIS[1], SOSA.HAS_SAMPLE, ALIQUOT_IRIS[3]),
+]
+
+
+class LineageIndexTest(unittest.TestCase):
+    def test_lineage(self) -> None:
+        index = LineageIndex(create_relationships(EDGES))
+
+        self.assertEqual(CORE_IRI, index.get_root(ALIQUOT_IRIS[3]))
+        self.assertEqual(CORE_IRI, index.get_root(ALIQUOT_IRIS[0]))
+        self.assertEqual(CORE_IRI, index.get_root(CORE_IRI))
+        self.assertIsNone(index.get_root(LAKE_IRI))
+
+        self.assertEqual([SLICE_IRIS[1], CORE_IRI], index.get_ancestors(ALIQUOT_IRIS[2]))
+        self.assertEqual([], index.get_ancestors(CORE_IRI))
+
+        self.assertEqual([*SLICE_IRIS, *ALIQUOT_IRIS], index.get_descendants(CORE_IRI))
+        self.assertEqual(ALIQUOT_IRIS[2:], index.get_descendants(SLICE_IRIS[1]))
+        self.assertEqual([], index.get_descendants(LAKE_IRI))
+
+    def test_incremental(self) -> None:
+        relationships = create_relationships(EDGES)
+        index = LineageIndex(relationships)
+
+        self.assertEqual(CORE_IRI, index.get_root(ALIQUOT_IRIS[0]))
+
+        # New leaves
+        relationships.add('http://example.org/sample/Aliquot4', SOSA.HAS_ORIGINAL_SAMPLE, ALIQUOT_IRIS[0])
+        self.assertEqual(CORE_IRI, index.get_root('http://example.org/sample/Aliquot4'))
+        self.assertEqual(
+            [ALIQUOT_IRIS[0], SLICE_IRIS[0], CORE_IRI],
+            index.get_ancestors('http://example.org/sample/Aliquot4'),
+        )
+
+        # The core turns out to be a slice of a larger core
+        relationships.remove(CORE_IRI, SOSA.IS_SAMPLE_OF, LAKE_IRI)
+        relationships.add(CORE_IRI, SOSA.HAS_ORIGINAL_SAMPLE, 'http://example.org/sample/LongCore')
+
+        self.assertEqual('http://example.org/sample/LongCore', index.get_root(ALIQUOT_IRIS[0]))
+        self.assertEqual('http://example.org/sample/LongCore', index.get_root('http://example.org/sample/Aliquot4'))
+
+        # A sample of the lake becomes an original sample
+        relationships.add('http://example.org/sample/Grab', SOSA.IS_SAMPLE_OF, LAKE_IRI)
+        self.assertEqual('http://example.org/sample/Grab', index.get_root('http://example.org/sample/Grab'))
+
+        relationships.add('http://example.org/sample/Split', SOSA.HAS_ORIGINAL_SAMPLE, 'http://example.org/sample/Other')
+        self.assertEqual('http://example.org/sample/Other', index.get_root('http://example.org/sample/Split'))
+
+    def test_cycle(self) -> None:
+        cycle_edges = [
+            ('http://example.org/sample/7', SOSA.IS_SAMPLE_OF, 'http://example.org/sample/6'),
+            ('http://example.org/sample/6', SOSA.HAS_ORIGINAL_SAMPLE, 'http://example.org/sample/7'),
+            ('http://example.org/sample/8', SOSA.HAS_ORIGINAL_SAMPLE, 'http://example.org/sample/7'),
+        ]
+
+        relationships = create_relationships(cycle_edges[:1])
+        index = LineageIndex(relationships)
+
+        # Memoize the lookups before the cycle is closed
+        self.assertEqual('http://example.org/sample/7', index.get_root('http://example.org/sample/7'))
+
+        for edge in cycle_edges[1:]:
+            relationships.add(*edge)
+
+        # The root doesn't depend on the order of lookups
+        for sample_iri in ['http://example.org/sample/6', 'http://example.org/sample/7', 'http://example.org/sample/8']:
+            for first_iri in ['http://example.org/sample/6', 'http://example.org/sample/7', 'http://example.org/sample/8']:
+                rebuilt = LineageIndex(relationships)
+                rebuilt.get_root(first_iri)
+                self.assertEqual('http://example.org/sample/7', rebuilt.get_root(sample_iri))
+
+            self.assertEqual('http://example.org/sample/7', index.get_root(sample_iri))
+
+        self.assertEqual(['http://example.org/sample/7', 'http://example.org/sample/6'], index.get_ancestors('http://example.org/sample/8'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.index.text_index import TextIndex
+from sosa.index.text_index import tokenize
+from sosa.ontology.schema import SCHEMA
+
+from qudt.ontology.qudt import QUDT
+from qudt.ontology.rdfs import RDFS
+import rdflib
+import unittest
+
+
+NITRIC_OXIDE_IRI = 'http://aclima.io/schema/1.0/NitricOxide'
+NITROGEN_DIOXIDE_IRI = 'http://aclima.io/schema/1.0/NitrogenDioxide'
+OZONE_IRI = 'http://aclima.io/schema/1.0/Ozone'
+
+
+def create_graph() -> rdflib.Graph:
+    graph = rdflib.Graph()
+
+    for resource_iri, label, description, abbreviation in [
+        (NITRIC_OXIDE_IRI, 'Nitric oxide', 'Nitrogen oxide or nitrogen monoxide', 'NO'),
+        (NITROGEN_DIOXIDE_IRI, 'Nitrogen dioxide', 'A reddish-brown toxic gas', 'NO2'),
+        (OZONE_IRI, 'Ozone', 'An inorganic molecule, also known as trioxygen', 'O3'),
+    ]:
+        subject = rdflib.URIRef(resource_iri)
+        graph.add((subject, rdflib.URIRef(RDFS.LABEL), rdflib.Literal(label)))
+        graph.add((subject, rdflib.URIRef(SCHEMA.DESCRIPTION), rdflib.Literal(description)))
+        graph.add((subject, rdflib.URIRef(QUDT.ABBREVIATION), rdflib.Literal(abbreviation)))
+
+    return graph
+
+
+class TextIndexTest(unittest.TestCase):
+    def test_tokenize(self) -> None:
+        self.assertEqual(['reddish', 'brown', 'no2'], tokenize('Reddish-brown NO2'))
+        self.assertEqual([], tokenize('  - '))
+
+    def test_search(self) -> None:
+        index = TextIndex()
+        self.assertEqual(9, index.add_graph(create_graph()))
+        self.assertEqual(3, len(index))
+
+        def search(query: str, **kwargs) -> list:
+            return [result.resource_iri for result in index.search(query, **kwargs)]
+
+        # Case-insensitive, with labels ranked above descriptions
+        self.assertEqual([NITROGEN_DIOXIDE_IRI, NITRIC_OXIDE_IRI], search('NITROGEN'))
+        self.assertEqual([NITRIC_OXIDE_IRI], search('nitric oxide'))
+        self.assertEqual([OZONE_IRI], search('o3'))
+
+        # The last token is a prefix
+        self.assertEqual([NITRIC_OXIDE_IRI, NITROGEN_DIOXIDE_IRI], search('nit'))
+        self.assertEqual([NITRIC_OXIDE_IRI], search('nitrogen mono'))
+        self.assertEqual([], search('nit', prefix=False))
+        self.assertEqual([NITRIC_OXIDE_IRI, NITROGEN_DIOXIDE_IRI], search('no'))
+
+        self.assertEqual([], search('nitrogen ozone'))
+        self.assertEqual([], search(''))
+        self.assertEqual(1, len(search('o', limit=1)))
+
+        scores = [result.score for result in index.search('o')]
+        self.assertEqual(sorted(scores, reverse=True), scores)
+
+    def test_remove(self) -> None:
+        index = TextIndex()
+        index.add_graph(create_graph())
+
+        self.assertTrue(index.remove(NITRIC_OXIDE_IRI))
+        self.assertFalse(index.remove(NITRIC_OXIDE_IRI))
+        self.assertEqual([NITROGEN_DIOXIDE_IRI], [result.resource_iri for result in index.search('nitr')])
+
+        index.add(NITRIC_OXIDE_IRI, RDFS.LABEL, 'Nitric oxide')
+        self.assertEqual([NITRIC_OXIDE_IRI], [result.resource_iri for result in index.search('nitri')])
+
+        with self.assertRaises(ValueError):
+            index.add(OZONE_IRI, 'http://example.org/comment', 'Ozone')
+
+
+if __name__ == '__main__':
+    unittest.main()
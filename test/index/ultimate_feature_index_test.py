@@ -0,0 +1,169 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.index.ultimate_feature_index import UltimateFeatureIndex
+from sosa.observation import ObservationBatch
+from sosa.ontology.sosa import SOSA
+from sosa.relationship import RelationshipStore
+
+from ..fixtures import create_relationships
+
+import numpy
+import random
+import unittest
+
+
+LAKE_IRI = 'http://example.org/feature/Lake'
+RIVER_IRI = 'http://example.org/feature/River'
+CORE_IRI = 'http://example.org/sample/Core'
+SLICE_IRI = 'http://example.org/sample/Slice'
+ALIQUOT_IRI = 'http://example.org/sample/Aliquot'
+OBSERVATION_IRIS = [f'http://example.org/observation/{index}' for index in range(3)]
+
+
+EDGES = [
+    # Lake <- Core <- Slice <- Aliquot
+    (CORE_IRI, SOSA.IS_SAMPLE_OF, LAKE_IRI),
+    (SLICE_IRI, SOSA.IS_SAMPLE_OF, CORE_IRI),
+    (ALIQUOT_IRI, SOSA.HAS_ORIGINAL_SAMPLE, SLICE_IRI),
+
+    (OBSERVATION_IRIS[0], SOSA.HAS_FEATURE_OF_INTEREST, ALIQUOT_IRI),
+    (OBSERVATION_IRIS[1], SOSA.HAS_FEATURE_OF_INTEREST, RIVER_IRI),
+]
+
+
+class UltimateFeatureIndexTest(unittest.TestCase):
+    def test_resolve(self) -> None:
+        index = UltimateFeatureIndex(create_relationships(EDGES))
+
+        for resource_iri in [CORE_IRI, SLICE_IRI, ALIQUOT_IRI, OBSERVATION_IRIS[0]]:
+            self.assertEqual(LAKE_IRI, index.get_ultimate_feature(resource_iri))
+
+        self.assertEqual(RIVER_IRI, index.get_ultimate_feature(OBSERVATION_IRIS[1]))
+        self.assertIsNone(index.get_ultimate_feature(LAKE_IRI))
+        self.assertIsNone(index.get_ultimate_feature('http://example.org/Unknown'))
+
+    def test_incremental(self) -> None:
+        relationships = create_relationships(EDGES)
+        index = UltimateFeatureIndex(relationships)
+
+        # A new sample and an observation of it
+        relationships.add('http://example.org/sample/Split', SOSA.HAS_ORIGINAL_SAMPLE, ALIQUOT_IRI)
+        relationships.add(OBSERVATION_IRIS[2], SOSA.HAS_FEATURE_OF_INTEREST, 'http://example.org/sample/Split')
+        self.assertEqual(LAKE_IRI, index.get_ultimate_feature('http://example.org/sample/Split'))
+        self.assertEqual(LAKE_IRI, index.get_ultimate_feature(OBSERVATION_IRIS[2]))
+
+        # The core was sampled from the river
+        relationships.add(CORE_IRI, SOSA.HAS_SAMPLED_FEATURE, RIVER_IRI)
+        self.assertEqual(RIVER_IRI, index.get_ultimate_feature(OBSERVATION_IRIS[0]))
+        self.assertEqual(RIVER_IRI, index.get_ultimate_feature(OBSERVATION_IRIS[2]))
+
+        # The slice is re-parented to a sample of the lake
+        relationships.remove(SLICE_IRI, SOSA.IS_SAMPLE_OF, CORE_IRI)
+        relationships.add(SLICE_IRI, SOSA.IS_SAMPLE_OF, 'http://example.org/sample/Grab')
+        relationships.add('http://example.org/sample/Grab', SOSA.IS_SAMPLE_OF, LAKE_IRI)
+        self.assertEqual(LAKE_IRI, index.get_ultimate_feature(OBSERVATION_IRIS[0]))
+        self.assertEqual(RIVER_IRI, index.get_ultimate_feature(CORE_IRI))
+
+        # An explicit ultimate feature takes precedence
+        relationships.add(OBSERVATION_IRIS[0], SOSA.HAS_ULTIMATE_FEATURE_OF_INTEREST, RIVER_IRI)
+        self.assertEqual(RIVER_IRI, index.get_ultimate_feature(OBSERVATION_IRIS[0]))
+
+    def test_incremental_remove(self) -> None:
+        relationships = create_relationships(EDGES)
+        index = UltimateFeatureIndex(relationships)
+
+        # The grab is a Sample only because it is the original sample of the
+        # split, so the slice is its sample
+        grab_iri = 'http://example.org/sample/Grab'
+        split_iri = 'http://example.org/sample/Split'
+        relationships.add(split_iri, SOSA.HAS_ORIGINAL_SAMPLE, grab_iri)
+        relationships.add(SLICE_IRI, SOSA.HAS_ORIGINAL_SAMPLE, grab_iri)
+        relationships.remove(SLICE_IRI, SOSA.IS_SAMPLE_OF, CORE_IRI)
+        relationships.add(SLICE_IRI, SOSA.IS_SAMPLE_OF, grab_iri)
+        relationships.remove(SLICE_IRI, SOSA.HAS_ORIGINAL_SAMPLE, grab_iri)
+        self.assertIsNone(index.get_ultimate_feature(ALIQUOT_IRI))
+
+        # Once the grab isn't a Sample, the slice is a sample of it
+        relationships.remove(split_iri, SOSA.HAS_ORIGINAL_SAMPLE, grab_iri)
+        self.assertIsNone(index.get_ultimate_feature(split_iri))
+        self.assertEqual(grab_iri, index.get_ultimate_feature(SLICE_IRI))
+        self.assertEqual(grab_iri, index.get_ultimate_feature(ALIQUOT_IRI))
+        self.assertEqual(grab_iri, index.get_ultimate_feature(OBSERVATION_IRIS[0]))
+
+        # Once the core isn't a sample of the lake, it isn't a Sample either
+        relationships.add(SLICE_IRI, SOSA.IS_SAMPLE_OF, CORE_IRI)
+        relationships.remove(SLICE_IRI, SOSA.IS_SAMPLE_OF, grab_iri)
+        self.assertEqual(LAKE_IRI, index.get_ultimate_feature(ALIQUOT_IRI))
+        relationships.remove(CORE_IRI, SOSA.IS_SAMPLE_OF, LAKE_IRI)
+        self.assertIsNone(index.get_ultimate_feature(CORE_IRI))
+        self.assertEqual(CORE_IRI, index.get_ultimate_feature(SLICE_IRI))
+        self.assertEqual(CORE_IRI, index.get_ultimate_feature(OBSERVATION_IRIS[0]))
+
+    def test_incremental_matches_rebuild(self) -> None:
+        rng = random.Random(0)
+
+        entity_iris = [f'http://example.org/Entity{index}' for index in range(7)]
+        predicate_iris = [
+            SOSA.IS_SAMPLE_OF,
+            SOSA.HAS_ORIGINAL_SAMPLE,
+            SOSA.HAS_SAMPLED_FEATURE,
+            SOSA.HAS_FEATURE_OF_INTEREST,
+            SOSA.HAS_ULTIMATE_FEATURE_OF_INTEREST,
+        ]
+
+        for _ in range(50):
+            relationships = RelationshipStore()
+            index = UltimateFeatureIndex(relationships)
+            edges = list()
+
+            for _ in range(30):
+                if edges and rng.random() < 0.4:
+                    relationships.remove(*edges.pop(rng.randrange(len(edges))))
+                else:
+                    first, second = sorted(rng.sample(range(len(entity_iris)), 2), reverse=True)
+
+                    # Samples are derived from entities with lower indexes, so
+                    # that the lineage has no cycles
+                    edge = (entity_iris[first], rng.choice(predicate_iris), entity_iris[second])
+                    if edge not in edges:
+                        relationships.add(*edge)
+                        edges.append(edge)
+
+                rebuilt = UltimateFeatureIndex(relationships)
+                for entity_iri in entity_iris:
+                    self.assertEqual(rebuilt.get_ultimate_feature(entity_iri), index.get_ultimate_feature(entity_iri))
+                rebuilt.close()
+
+    def test_join(self) -> None:
+        relationships = create_relationships(EDGES)
+        relationships.add(OBSERVATION_IRIS[1], SOSA.HAS_ULTIMATE_FEATURE_OF_INTEREST, LAKE_IRI)
+        index = UltimateFeatureIndex(relationships)
+
+        batch = ObservationBatch(
+            sensor_iris=numpy.array(['http://example.org/Sensor'] * 4, dtype=object),
+            property_iris=numpy.array(['http://example.org/Property'] * 4, dtype=object),
+            feature_iris=numpy.array([ALIQUOT_IRI, RIVER_IRI, SLICE_IRI, 'http://example.org/sample/Orphan'], dtype=object),
+            procedure_iris=numpy.array([''] * 4, dtype=object),
+            phenomenon_times=numpy.array(['2020-01-01'] * 4, dtype='datetime64[ns]'),
+            result_times=numpy.array(['NaT'] * 4, dtype='datetime64[ns]'),
+            results=numpy.arange(4, dtype=numpy.float64),
+        )
+
+        relationships.add('http://example.org/sample/Orphan', SOSA.HAS_ORIGINAL_SAMPLE, 'http://example.org/sample/Lost')
+
+        self.assertEqual([LAKE_IRI, RIVER_IRI, LAKE_IRI, ''], index.join(batch).tolist())
+
+        batch.member_iris = numpy.array(['', OBSERVATION_IRIS[1], '', ''], dtype=object)
+        self.assertEqual([LAKE_IRI, LAKE_IRI, LAKE_IRI, ''], index.join(batch).tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
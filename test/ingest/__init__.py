@@ -0,0 +1,15 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+
+from .observation_reader_test import ObservationReaderTest
+from .async_ingest_test import AsyncIngestTest
+from .parallel_ingest_test import ParallelIngestTest
+from .deduplicator_test import DeduplicatorTest
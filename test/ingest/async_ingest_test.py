@@ -0,0 +1,215 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.ingest.async_ingest import AsyncObservationIngest
+from sosa.ingest.deduplicator import Deduplicator
+from sosa.observation import Observation
+from sosa.observation import ObservationCollection
+from sosa.storage.observation_store import ObservationStore
+
+import asyncio
+import datetime
+import threading
+import unittest
+
+
+SENSOR_IRI = 'http://example.org/sensor/1'
+PROPERTY_IRI = 'http://example.org/property/NitricOxide'
+FEATURE_IRI = 'http://example.org/feature/Oakland'
+OTHER_FEATURE_IRI = 'http://example.org/feature/Berkeley'
+
+START = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def create_observation(second: int, feature_iri: str = FEATURE_IRI) -> Observation:
+    return Observation(
+        resource_iri='',
+        sensor_iri=SENSOR_IRI,
+        property_iri=PROPERTY_IRI,
+        feature_iri=feature_iri,
+        phenomenon_time=START + datetime.timedelta(seconds=second),
+        result=float(second),
+    )
+
+
+class BlockingStore(ObservationStore):
+    """
+    A store whose writes wait until released.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.released = threading.Event()
+
+    def extend(self, collection: ObservationCollection) -> None:
+        self.released.wait()
+        super().extend(collection)
+
+
+class FailingStore(ObservationStore):
+    """
+    A store that rejects the observations of a feature, and fails to commit
+    afterwards.
+    """
+
+    def __init__(self, feature_iri: str) -> None:
+        super().__init__()
+        self.feature_iri = feature_iri
+        self.failed = False
+
+    def extend(self, collection: ObservationCollection) -> None:
+        if collection.feature_iri == self.feature_iri:
+            self.failed = True
+            raise ValueError(f'Rejected {self.feature_iri}')
+        super().extend(collection)
+
+    def commit(self) -> None:
+        if self.failed:
+            raise OSError('Commit failed')
+        super().commit()
+
+
+class AsyncIngestTest(unittest.IsolatedAsyncioTestCase):
+    async def test_flush_by_size(self) -> None:
+        store = ObservationStore()
+
+        async with AsyncObservationIngest(store, flush_size=10, flush_interval=datetime.timedelta(minutes=1)) as ingest:
+            for second in range(5):
+                await ingest.put(create_observation(second))
+
+            await asyncio.sleep(0.1)
+
+            self.assertEqual(0, len(store.query(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI)))
+
+            for second in range(5, 10):
+                await ingest.put(create_observation(second))
+
+            await asyncio.sleep(0.1)
+
+            # Flushed without waiting for the interval
+            self.assertEqual(10, len(store.query(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI)))
+
+    async def test_flush_by_time(self) -> None:
+        store = ObservationStore()
+
+        async with AsyncObservationIngest(store, flush_interval=datetime.timedelta(milliseconds=20)) as ingest:
+            await ingest.put(create_observation(0))
+            await asyncio.sleep(0.2)
+
+            self.assertEqual(1, len(store.query(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI)))
+            self.assertEqual(0, ingest.in_flight)
+
+    async def test_backpressure(self) -> None:
+        store = BlockingStore()
+
+        async with AsyncObservationIngest(store, max_in_flight=4, flush_size=2) as ingest:
+            for second in range(4):
+                await ingest.put(create_observation(second))
+
+            # The store is blocked, so the next observation must wait
+            put = asyncio.ensure_future(ingest.put(create_observation(4)))
+            await asyncio.sleep(0.1)
+
+            self.assertFalse(put.done())
+            self.assertEqual(4, ingest.in_flight)
+
+            store.released.set()
+            await asyncio.wait_for(put, 1.0)
+
+        self.assertEqual(5, len(store.query(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI)))
+
+    async def test_deduplicator(self) -> None:
+        store = ObservationStore()
+
+        async with AsyncObservationIngest(store, deduplicator=Deduplicator()) as ingest:
+            for second in (0, 1, 0, 1, 2):
+                await ingest.put(create_observation(second))
+
+        self.assertEqual(3, len(store.query(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI)))
+
+    async def test_error(self) -> None:
+        store = ObservationStore()
+        ingest = AsyncObservationIngest(store)
+        ingest.start()
+
+        await ingest.put(create_observation(1))
+        await ingest.flush()
+
+        # Out of order for the series, while another series can be stored
+        await ingest.put(create_observation(0))
+        await ingest.put(create_observation(0, OTHER_FEATURE_IRI))
+
+        with self.assertRaises(ValueError):
+            await ingest.flush()
+
+        self.assertEqual(0, ingest.in_flight)
+        self.assertEqual(1, len(store.query(SENSOR_IRI, PROPERTY_IRI, OTHER_FEATURE_IRI)))
+
+        # The unwritten observation is kept until it is taken
+        unwritten = ingest.take_unwritten()
+        self.assertEqual([FEATURE_IRI], unwritten.feature_iris.tolist())
+        self.assertEqual([0.0], unwritten.results.tolist())
+        self.assertEqual(0, len(ingest.take_unwritten()))
+
+        # The error was reported, so later observations are accepted
+        await ingest.put(create_observation(2))
+        await ingest.close()
+
+        self.assertEqual([1.0, 2.0], store.query(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI).results.tolist())
+
+    async def test_commit_error(self) -> None:
+        store = FailingStore(FEATURE_IRI)
+        ingest = AsyncObservationIngest(store)
+        ingest.start()
+
+        await ingest.put(create_observation(0))
+        await ingest.put(create_observation(1, OTHER_FEATURE_IRI))
+
+        # The first error is raised, and the rejected series is kept even
+        # though the commit failed too
+        with self.assertRaises(ValueError):
+            await ingest.flush()
+
+        self.assertEqual([FEATURE_IRI], ingest.take_unwritten().feature_iris.tolist())
+        self.assertEqual(1, len(store.query(SENSOR_IRI, PROPERTY_IRI, OTHER_FEATURE_IRI)))
+
+        store.failed = False
+        await ingest.close()
+
+    async def test_background_error(self) -> None:
+        store = ObservationStore()
+        ingest = AsyncObservationIngest(store, flush_size=1)
+        ingest.start()
+
+        await ingest.put(create_observation(1))
+        await asyncio.sleep(0.1)
+        await ingest.put(create_observation(0))
+        await asyncio.sleep(0.1)
+
+        # A background flush failed, so the error is raised to the next caller
+        # once
+        with self.assertRaises(ValueError):
+            await ingest.put(create_observation(2))
+
+        await ingest.put(create_observation(3))
+        await ingest.close()
+
+        self.assertEqual([0.0], ingest.take_unwritten().results.tolist())
+        self.assertEqual([1.0, 3.0], store.query(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI).results.tolist())
+
+    async def test_get_properties(self) -> None:
+        async with AsyncObservationIngest(ObservationStore()) as ingest:
+            properties = await ingest.get_properties([PROPERTY_IRI])
+
+            self.assertEqual(PROPERTY_IRI, properties[PROPERTY_IRI].resource_iri)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.ingest.deduplicator import Deduplicator
+from sosa.observation import ObservationBatch
+from sosa.storage.observation_store import ObservationStore
+
+import datetime
+import numpy
+import unittest
+from typing import List
+
+
+START = numpy.datetime64('2020-01-01T00:00:00', 'ns')
+
+
+def create_batch(seconds: List[int], results: List[float], sensor: str = 'http://example.org/sensor/1', member_iris: List[str] = ()) -> ObservationBatch:
+    count = len(seconds)
+
+    return ObservationBatch(
+        sensor_iris=numpy.full(count, sensor, dtype=object),
+        property_iris=numpy.full(count, 'http://example.org/property/NitricOxide', dtype=object),
+        feature_iris=numpy.full(count, 'http://example.org/feature/Oakland', dtype=object),
+        procedure_iris=numpy.full(count, '', dtype=object),
+        phenomenon_times=START + numpy.array(seconds, dtype=numpy.int64) * numpy.timedelta64(1, 's'),
+        result_times=numpy.full(count, numpy.datetime64('NaT', 'ns')),
+        results=numpy.array(results, dtype=numpy.float64),
+        member_iris=numpy.array(member_iris, dtype=object),
+    )
+
+
+class DeduplicatorTest(unittest.TestCase):
+    def test_content(self) -> None:
+        deduplicator = Deduplicator()
+
+        numpy.testing.assert_array_equal([True, True, False], deduplicator.get_unique(create_batch([0, 1, 0], [1.0, 2.0, 1.0])))
+
+        # A retry of the same observations, a new result at the same time, and
+        # the same observation of another sensor
+        batch = create_batch([1, 1, 2], [2.0, 3.0, 4.0])
+        numpy.testing.assert_array_equal([False, True, True], deduplicator.get_unique(batch))
+        numpy.testing.assert_array_equal([True], deduplicator.get_unique(create_batch([1], [2.0], sensor='http://example.org/sensor/2')))
+
+        self.assertEqual(2, deduplicator.duplicates)
+
+        filtered = deduplicator.filter(create_batch([0, 5], [1.0, 5.0]))
+        numpy.testing.assert_array_equal([5.0], filtered.results)
+
+    def test_iri(self) -> None:
+        deduplicator = Deduplicator()
+
+        deduplicator.filter(create_batch([0, 1], [1.0, 2.0], member_iris=['http://example.org/obs/1', '']))
+
+        # Named observations are identified by IRI only
+        unique = deduplicator.get_unique(create_batch([0, 0], [1.0, 1.0], member_iris=['http://example.org/obs/2', 'http://example.org/obs/1']))
+        numpy.testing.assert_array_equal([True, False], unique)
+
+    def test_bounded(self) -> None:
+        deduplicator = Deduplicator(window=datetime.timedelta(minutes=1))
+
+        for start in range(0, 3600, 10):
+            deduplicator.filter(create_batch(list(range(start, start + 10)), [0.0] * 10))
+
+        # One window of observations per second, plus a partial bucket
+        self.assertLessEqual(deduplicator.size, 70)
+
+        # Older observations are no longer detected without a store
+        numpy.testing.assert_array_equal([True, False], deduplicator.get_unique(create_batch([0, 3599], [0.0, 0.0])))
+
+    def test_small_batches(self) -> None:
+        deduplicator = Deduplicator(window=datetime.timedelta(hours=16))
+
+        # Every observation falls in the same bucket
+        for start in range(0, 4000, 4):
+            deduplicator.filter(create_batch(list(range(start, start + 4)), [0.0] * 4))
+
+        self.assertEqual(4000, deduplicator.size)
+
+        # The bucket is held as a logarithmic number of runs
+        for runs in deduplicator._buckets.values():
+            self.assertLessEqual(len(runs), 12)
+
+        # Retries are detected in every run
+        for start in range(0, 4000, 400):
+            unique = deduplicator.get_unique(create_batch(list(range(start, start + 400)) + [4000 + start], [0.0] * 401))
+            numpy.testing.assert_array_equal([False] * 400 + [True], unique)
+
+    def test_store(self) -> None:
+        store = ObservationStore()
+        deduplicator = Deduplicator(window=datetime.timedelta(minutes=1), store=store)
+
+        batch = deduplicator.filter(create_batch(list(range(0, 600, 10)), list(range(60))))
+        for collection in batch.collections():
+            store.extend(collection)
+
+        # Older than the window, so checked exactly against the store
+        numpy.testing.assert_array_equal([False, True], deduplicator.get_unique(create_batch([10, 20], [1.0, 7.0])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.ingest.column_mapping import ColumnMapping
+from sosa.ingest.observation_reader import ObservationReader
+
+import json
+import numpy
+import os
+from qudt.units.temperature import TemperatureUnit
+import tempfile
+import unittest
+
+
+CSV = '''time,sensor,pollutant,value
+2020-01-01T00:00:00Z,1,NitricOxide,1.5
+2020-01-01T00:00:01Z,2,NitricOxide,2.5
+2020-01-01T02:00:02+02:00,1,Ozone,
+2020-01-01T00:00:03Z,1,NitricOxide,3.5
+2020-01-01T00:00:04,2,Ozone,4.5
+'''
+
+MAPPING = ColumnMapping(
+    phenomenon_time_column='time',
+    result_column='value',
+    sensor_column='sensor',
+    sensor_iri='http://example.org/sensor/{}',
+    property_column='pollutant',
+    property_iri='http://aclima.io/schema/1.0/{}',
+    feature_iri='http://example.org/feature/Oakland',
+    procedure_iri='http://example.org/procedure/Raw',
+)
+
+
+class ObservationReaderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def _write(self, name: str, contents: str) -> str:
+        path = os.path.join(self._directory.name, name)
+        with open(path, 'w') as file:
+            file.write(contents)
+
+        return path
+
+    def test_read_csv(self) -> None:
+        reader = ObservationReader(MAPPING, batch_size=2)
+
+        batches = list(reader.read_csv(self._write('readings.csv', CSV)))
+
+        self.assertEqual([2, 2, 1], [len(batch) for batch in batches])
+
+        first = batches[0]
+        self.assertEqual(['http://example.org/sensor/1', 'http://example.org/sensor/2'], list(first.sensor_iris))
+        self.assertEqual(['http://aclima.io/schema/1.0/NitricOxide'] * 2, list(first.property_iris))
+        self.assertEqual(['http://example.org/feature/Oakland'] * 2, list(first.feature_iris))
+        self.assertEqual('http://example.org/procedure/Raw', first.procedure_iris[0])
+        numpy.testing.assert_array_equal([1.5, 2.5], first.results)
+        self.assertTrue(numpy.all(numpy.isnat(first.result_times)))
+
+        # UTC offsets are applied, and empty results are missing
+        second = batches[1]
+        numpy.testing.assert_array_equal(
+            numpy.array(['2020-01-01T00:00:02', '2020-01-01T00:00:03'], dtype='datetime64[ns]'),
+            second.phenomenon_times,
+        )
+        self.assertTrue(numpy.isnan(second.results[0]))
+
+    def test_collections(self) -> None:
+        reader = ObservationReader(MAPPING)
+
+        batch = next(reader.read_csv(self._write('readings.csv', CSV)))
+        collections = {(c.sensor_iri, c.property_iri): c for c in batch.collections()}
+
+        self.assertEqual(4, len(collections))
+
+        collection = collections[('http://example.org/sensor/1', 'http://aclima.io/schema/1.0/NitricOxide')]
+        self.assertEqual('http://example.org/procedure/Raw', collection.procedure_iri)
+        numpy.testing.assert_array_equal([1.5, 3.5], collection.results)
+
+    def test_read_ndjson(self) -> None:
+        mapping = ColumnMapping(
+            phenomenon_time_column='t',
+            result_column='v',
+            result_time_column='received',
+            sensor_iri='http://example.org/sensor/1',
+            property_iri='http://aclima.io/schema/1.0/Temperature',
+            time_unit='ms',
+            result_unit=TemperatureUnit.CELSIUS,
+        )
+
+        lines = [
+            {'t': 1577836800000, 'v': 21.5, 'received': 1577836801000},
+            {'t': 1577836800500, 'v': None},
+            {},
+        ]
+        path = self._write('readings.ndjson', '\n'.join(json.dumps(line) for line in lines) + '\n\n')
+
+        batches = list(ObservationReader(mapping).read_ndjson(path))
+
+        self.assertEqual(1, len(batches))
+
+        batch = batches[0]
+        numpy.testing.assert_array_equal(
+            numpy.array(['2020-01-01T00:00:00', '2020-01-01T00:00:00.5', 'NaT'], dtype='datetime64[ns]'),
+            batch.phenomenon_times,
+        )
+        self.assertEqual(numpy.datetime64('2020-01-01T00:00:01', 'ns'), batch.result_times[0])
+
+        # The property has no unit in the ontology, so results are kept
+        self.assertEqual(21.5, batch.results[0])
+        self.assertTrue(numpy.isnan(batch.results[1]))
+
+    def test_epoch_precision(self) -> None:
+        mapping = ColumnMapping(
+            phenomenon_time_column='t',
+            result_column='v',
+            sensor_iri='http://example.org/sensor/1',
+            property_iri='http://aclima.io/schema/1.0/Temperature',
+            time_unit='ms',
+        )
+        reader = ObservationReader(mapping)
+
+        # Integer times are exact, and the integer part of fractional times
+        path = self._write('readings.csv', 't,v\n1600000000123,1\n1600000000125,2\n')
+        numpy.testing.assert_array_equal(
+            numpy.array(['2020-09-13T12:26:40.123', '2020-09-13T12:26:40.125'], dtype='datetime64[ns]'),
+            next(reader.read_csv(path)).phenomenon_times,
+        )
+
+        path = self._write('readings.csv', 't,v\n1600000000123.5,1\n,2\n')
+        numpy.testing.assert_array_equal(
+            numpy.array(['2020-09-13T12:26:40.1235', 'NaT'], dtype='datetime64[ns]'),
+            next(reader.read_csv(path)).phenomenon_times,
+        )
+
+    def test_missing_column(self) -> None:
+        reader = ObservationReader(MAPPING)
+
+        with self.assertRaises(ValueError):
+            list(reader.read_csv(self._write('readings.csv', 'time,value\n')))
+
+    def test_blank_and_short_rows(self) -> None:
+        reader = ObservationReader(MAPPING)
+
+        batches = list(reader.read_csv(self._write('readings.csv', CSV.replace('\n2020-01-01T00:00:03Z', '\n\n2020-01-01T00:00:03Z') + '\n')))
+        self.assertEqual([5], [len(batch) for batch in batches])
+
+        with self.assertRaisesRegex(ValueError, 'line 3'):
+            list(reader.read_csv(self._write('readings.csv', CSV.replace(',2,NitricOxide,2.5', ',2'))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.ingest.parallel_ingest import ParallelIngest
+from sosa.ingest.parallel_ingest import get_shard
+from sosa.ingest.parallel_ingest import get_shard_directory
+from sosa.ingest.ring_buffer import READING_DTYPE
+from sosa.ingest.ring_buffer import RingBuffer
+from sosa.storage.observation_store import ObservationStore
+from sosa.storage.series import SeriesKey
+
+import numpy
+import tempfile
+import threading
+import unittest
+
+
+SENSOR_IRIS = [f'http://example.org/sensor/{index}' for index in range(3)]
+PROPERTY_IRIS = ['http://aclima.io/schema/1.0/NitricOxide', 'http://aclima.io/schema/1.0/Ozone']
+FEATURE_IRIS = ['http://example.org/feature/Oakland']
+
+
+def create_readings(count: int) -> numpy.ndarray:
+    readings = numpy.zeros(count, dtype=READING_DTYPE)
+
+    readings['sensor'] = numpy.arange(count) % len(SENSOR_IRIS)
+    readings['property'] = numpy.arange(count) % len(PROPERTY_IRIS)
+    readings['phenomenon_time'] = numpy.datetime64('2020-01-01T00:00:00', 'ns').astype(numpy.int64) + numpy.arange(count) * 10 ** 9
+    readings['result'] = numpy.arange(count)
+
+    return readings
+
+
+class ParallelIngestTest(unittest.TestCase):
+    def test_ring_buffer(self) -> None:
+        ring = RingBuffer(slot_count=2, slot_size=3)
+
+        received = list()
+
+        def consume() -> None:
+            while True:
+                readings = ring.get()
+                if readings is None:
+                    break
+                received.append(readings)
+
+        # The consumer must free slots for the producer to finish
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+
+        ring.put(create_readings(10))
+        ring.put_stop()
+
+        consumer.join()
+        ring.close()
+
+        self.assertEqual([3, 3, 3, 1], [len(readings) for readings in received])
+        numpy.testing.assert_array_equal(create_readings(10), numpy.concatenate(received))
+
+    def test_parallel_ingest(self) -> None:
+        readings = create_readings(1000)
+
+        with tempfile.TemporaryDirectory() as directory:
+            with ParallelIngest(directory, SENSOR_IRIS, PROPERTY_IRIS, FEATURE_IRIS, worker_count=2, slot_size=64) as ingest:
+                for start in range(0, len(readings), 100):
+                    ingest.put(readings[start:start + 100])
+
+            for sensor in range(len(SENSOR_IRIS)):
+                for prop in range(len(PROPERTY_IRIS)):
+                    key = SeriesKey(SENSOR_IRIS[sensor], PROPERTY_IRIS[prop], FEATURE_IRIS[0])
+
+                    store = ObservationStore(directory=get_shard_directory(directory, get_shard(key, 2)))
+                    collection = store.query(*key)
+                    store.close()
+
+                    expected = readings[(readings['sensor'] == sensor) & (readings['property'] == prop)]
+                    numpy.testing.assert_array_equal(expected['result'], collection.results)
+                    numpy.testing.assert_array_equal(expected['phenomenon_time'], collection.phenomenon_times.view(numpy.int64))
+
+
+if __name__ == '__main__':
+    unittest.main()
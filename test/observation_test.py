@@ -0,0 +1,128 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.observation import Observation
+from sosa.observation import ObservationCollection
+from sosa.ontology.sosa import SOSA
+
+import datetime
+import numpy
+import rdflib
+import unittest
+
+
+SENSOR_IRI = 'http://example.org/sensor/1'
+PROPERTY_IRI = 'http://example.org/property/NitricOxide'
+FEATURE_IRI = 'http://example.org/feature/Oakland'
+PROCEDURE_IRI = 'http://example.org/procedure/Raw'
+
+START_TIME = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def create_observations(count: int) -> list:
+    return [
+        Observation(
+            resource_iri=f'http://example.org/observation/{index}',
+            sensor_iri=SENSOR_IRI,
+            property_iri=PROPERTY_IRI,
+            feature_iri=FEATURE_IRI,
+            procedure_iri=PROCEDURE_IRI,
+            phenomenon_time=START_TIME + datetime.timedelta(seconds=index),
+            result_time=START_TIME + datetime.timedelta(seconds=index, milliseconds=5),
+            result=20.0 + index / 10,
+        )
+        for index in range(count)
+    ]
+
+
+class ObservationCollectionTest(unittest.TestCase):
+    def test_from_observations(self) -> None:
+        collection = ObservationCollection.from_observations(
+            'http://example.org/collection/1',
+            create_observations(10),
+        )
+
+        self.assertEqual(10, len(collection))
+        self.assertEqual(SOSA.OBSERVATION_COLLECTION, collection.type_iri)
+        self.assertEqual(SENSOR_IRI, collection.sensor_iri)
+        self.assertEqual(PROCEDURE_IRI, collection.procedure_iri)
+        self.assertEqual(numpy.dtype('datetime64[ns]'), collection.phenomenon_times.dtype)
+        self.assertAlmostEqual(20.9, collection.results[-1])
+
+    def test_from_observations_not_shared(self) -> None:
+        observations = create_observations(2)
+        observations[1].feature_iri = 'http://example.org/feature/Berkeley'
+
+        with self.assertRaises(ValueError):
+            ObservationCollection.from_observations('http://example.org/collection/1', observations)
+
+    def test_get_observations(self) -> None:
+        observations = create_observations(3)
+
+        collection = ObservationCollection.from_observations(
+            'http://example.org/collection/1',
+            observations,
+        )
+
+        for expected, actual in zip(observations, collection.get_observations()):
+            self.assertEqual(expected.resource_iri, actual.resource_iri)
+            self.assertEqual(expected.feature_iri, actual.feature_iri)
+            self.assertEqual(expected.phenomenon_time, actual.phenomenon_time)
+            self.assertEqual(expected.result_time, actual.result_time)
+            self.assertEqual(expected.result, actual.result)
+
+    def test_missing_result(self) -> None:
+        observations = create_observations(3)
+        observations[1].result = None
+
+        collection = ObservationCollection.from_observations(
+            'http://example.org/collection/1',
+            observations,
+        )
+
+        self.assertTrue(numpy.isnan(collection.results[1]))
+        self.assertEqual([20.0, None, 20.2], [observation.result for observation in collection.get_observations()])
+
+        # The missing result isn't serialized
+        graph = collection.to_graph()
+        self.assertEqual(2, len(list(graph.triples((None, rdflib.URIRef(SOSA.HAS_SIMPLE_RESULT), None)))))
+
+        parsed = ObservationCollection.from_graph(graph, 'http://example.org/collection/1')
+        numpy.testing.assert_array_equal(collection.results, parsed.results)
+
+    def test_graph_round_trip(self) -> None:
+        collection = ObservationCollection.from_observations(
+            'http://example.org/collection/1',
+            create_observations(5),
+        )
+
+        graph = collection.to_graph()
+
+        # Shared properties are stated once, on the collection
+        self.assertEqual(1, len(list(graph.triples((None, rdflib.URIRef(SOSA.MADE_BY_SENSOR), None)))))
+        self.assertEqual(5, len(list(graph.triples((None, rdflib.URIRef(SOSA.HAS_MEMBER), None)))))
+
+        parsed = ObservationCollection.from_graph(
+            rdflib.Graph().parse(data=graph.serialize(format='turtle'), format='turtle'),
+            'http://example.org/collection/1',
+        )
+
+        self.assertEqual(collection.sensor_iri, parsed.sensor_iri)
+        self.assertEqual(collection.property_iri, parsed.property_iri)
+        self.assertEqual(collection.feature_iri, parsed.feature_iri)
+        self.assertEqual(collection.procedure_iri, parsed.procedure_iri)
+        self.assertEqual(collection.member_iris, parsed.member_iris)
+        numpy.testing.assert_array_equal(collection.phenomenon_times, parsed.phenomenon_times)
+        numpy.testing.assert_array_equal(collection.result_times, parsed.result_times)
+        numpy.testing.assert_array_equal(collection.results, parsed.results)
+
+
+if __name__ == '__main__':
+    unittest.main()
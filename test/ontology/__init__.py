@@ -10,3 +10,4 @@
 
 from .ontology_factory_test import OntologyFactoryTest
 from .sosa_test import SOSATest
+from .inverse_properties_test import InversePropertiesTest
@@ -0,0 +1,57 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.ontology.inverse_properties import INVERSE_PROPERTIES
+from sosa.ontology.inverse_properties import find_unpaired_statements
+from sosa.ontology.inverse_properties import get_canonical_property
+from sosa.ontology.inverse_properties import get_inverse_property
+from sosa.ontology.sosa import SOSA
+from sosa.ontology.ssn import SSN
+
+import rdflib
+import unittest
+
+
+class InversePropertiesTest(unittest.TestCase):
+    def test_inverse(self):
+        self.assertEqual(SOSA.IS_OBSERVED_BY, get_inverse_property(SOSA.OBSERVES))
+        self.assertEqual(SOSA.OBSERVES, get_inverse_property(SOSA.IS_OBSERVED_BY))
+        self.assertEqual(SSN.DEPLOYED_SYSTEM, get_inverse_property(SSN.HAS_DEPLOYMENT))
+        self.assertIsNone(get_inverse_property(SSN.HAS_SUBSYSTEM))
+
+        for property_iri, inverse_iri in INVERSE_PROPERTIES.items():
+            self.assertEqual(property_iri, INVERSE_PROPERTIES[inverse_iri])
+
+    def test_canonical(self):
+        self.assertEqual((SOSA.MADE_OBSERVATION, False), get_canonical_property(SOSA.MADE_OBSERVATION))
+        self.assertEqual((SOSA.MADE_OBSERVATION, True), get_canonical_property(SOSA.MADE_BY_SENSOR))
+        self.assertEqual((SSN.HAS_SUBSYSTEM, False), get_canonical_property(SSN.HAS_SUBSYSTEM))
+
+    def test_unpaired(self):
+        sensor = rdflib.URIRef('http://example.org/sensor/1')
+        observations = [rdflib.URIRef(f'http://example.org/observation/{index}') for index in range(2)]
+
+        graph = rdflib.Graph()
+        graph.add((sensor, rdflib.URIRef(SOSA.MADE_OBSERVATION), observations[0]))
+
+        # A graph asserting relationships in one direction is consistent
+        self.assertEqual([], find_unpaired_statements(graph))
+
+        graph.add((observations[0], rdflib.URIRef(SOSA.MADE_BY_SENSOR), sensor))
+        graph.add((observations[1], rdflib.URIRef(SOSA.MADE_BY_SENSOR), sensor))
+
+        self.assertEqual(
+            [(str(observations[1]), SOSA.MADE_BY_SENSOR, str(sensor))],
+            find_unpaired_statements(graph),
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
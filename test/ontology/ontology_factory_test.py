@@ -12,10 +12,23 @@ from sosa.ontology.ontology_factory import OntologyFactory
 from sosa.feature import FeatureOfInterest
 from sosa.feature import Property
 
+import os
+import tempfile
 import unittest
 
 
 class OntologyFactoryTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self._repo_file = os.path.join(self._directory.name, 'repo.ttl')
+
+    def tearDown(self) -> None:
+        # The factory is a singleton, so repos loaded by a test are unloaded
+        OntologyFactory.unload_feature_repo(self._repo_file)
+        OntologyFactory.unload_property_repo(self._repo_file)
+
+        self._directory.cleanup()
+
     def test_get_instance(self) -> None:
         factory = OntologyFactory._get_instance()
 
@@ -41,6 +54,59 @@ class OntologyFactoryTest(unittest.TestCase):
         #self.assertEqual('Nitrogen oxide or nitrogen monoxide', modality.description)
         #self.assertEqual('NO', modality.abbreviation)
 
+    def test_get_properties(self) -> None:
+        properties = OntologyFactory.get_properties([
+            'http://aclima.io/schema/1.0/RawAverage',
+            'http://aclima.io/schema/1.0/NitricOxide',
+        ])
+
+        self.assertEqual(2, len(properties))
+        self.assertEqual('http://aclima.io/schema/1.0/RawAverage', properties['http://aclima.io/schema/1.0/RawAverage'].resource_iri)
+
+    def test_reload(self) -> None:
+        self._write('<http://example.org/Quuxite> rdfs:label "Quuxite" .\n')
+        self.assertEqual(1, OntologyFactory.load_feature_repo(self._repo_file))
+
+        self.assertEqual(['http://example.org/Quuxite'], [result.resource_iri for result in OntologyFactory.search('quux')])
+        self.assertEqual(['Quuxite'], [completion.text for completion in OntologyFactory.complete('quu')])
+
+        self._write('<http://example.org/Quuxite> rdfs:label "Quuxonite" .\n')
+        self.assertEqual(1, OntologyFactory.load_feature_repo(self._repo_file))
+
+        self.assertEqual([], OntologyFactory.search('quuxi'))
+        self.assertEqual(['Quuxonite'], [completion.text for completion in OntologyFactory.complete('quu')])
+        self.assertEqual('Quuxonite', OntologyFactory.get_feature_of_interest('http://example.org/Quuxite').label)
+
+    def test_unload(self) -> None:
+        self._write('<http://example.org/Quuxite> rdfs:label "Quuxite" .\n')
+
+        # The same file is loaded as both kinds of repo
+        self.assertEqual(1, OntologyFactory.load_feature_repo(self._repo_file))
+        self.assertEqual(1, OntologyFactory.load_property_repo(self._repo_file))
+
+        self._write('<http://example.org/Quuxite> rdfs:label "Quuxonite" .\n')
+        self.assertEqual(1, OntologyFactory.load_property_repo(self._repo_file))
+
+        self.assertEqual(['Quuxite'], [completion.text for completion in OntologyFactory.complete('quuxi')])
+        self.assertEqual(['Quuxonite'], [completion.text for completion in OntologyFactory.complete('quuxo')])
+        self.assertEqual('Quuxite', OntologyFactory.get_feature_of_interest('http://example.org/Quuxite').label)
+        self.assertEqual('Quuxonite', OntologyFactory.get_property('http://example.org/Quuxite').label)
+
+        self.assertEqual(1, OntologyFactory.unload_property_repo(self._repo_file))
+        self.assertEqual(0, OntologyFactory.unload_property_repo(self._repo_file))
+
+        self.assertEqual(['Quuxite'], [completion.text for completion in OntologyFactory.complete('quu')])
+        self.assertEqual(['http://example.org/Quuxite'], [result.resource_iri for result in OntologyFactory.search('quuxite')])
+        self.assertFalse(OntologyFactory.get_property('http://example.org/Quuxite').label)
+
+        self.assertEqual(1, OntologyFactory.unload_feature_repo(self._repo_file))
+
+        self.assertEqual([], OntologyFactory.complete('quu'))
+        self.assertEqual([], OntologyFactory.search('quux'))
+
+    def _write(self, statements: str) -> None:
+        with open(self._repo_file, 'w') as file:
+            file.write('@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .\n' + statements)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,12 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from .pattern_query_test import PatternQueryTest
+from .sparql_compiler_test import SparqlCompilerTest
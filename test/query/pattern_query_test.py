@@ -0,0 +1,134 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.ontology.sosa import SOSA
+from sosa.query.pattern_query import JOIN_HASH
+from sosa.query.pattern_query import JOIN_INDEX
+from sosa.query.pattern_query import JOIN_SCAN
+from sosa.query.pattern_query import PatternQuery
+
+from ..fixtures import create_relationships
+
+import unittest
+
+
+PLATFORM_IRIS = [f'http://example.org/Platform{index}' for index in range(2)]
+SENSOR_IRIS = [f'http://example.org/Sensor{index}' for index in range(6)]
+TEMPERATURE_IRI = 'http://example.org/Temperature'
+HUMIDITY_IRI = 'http://example.org/Humidity'
+
+
+# Sensors alternate between the platforms, and the last two observe humidity
+EDGES = [
+    edge
+    for index, sensor_iri in enumerate(SENSOR_IRIS)
+    for edge in [
+        (PLATFORM_IRIS[index % 2], SOSA.HOSTS, sensor_iri),
+        (sensor_iri, SOSA.OBSERVES, TEMPERATURE_IRI if index < 4 else HUMIDITY_IRI),
+    ]
+]
+
+
+class PatternQueryTest(unittest.TestCase):
+    def test_execute(self) -> None:
+        query = PatternQuery(create_relationships(EDGES))
+
+        results = list(query.execute([
+            ('?platform', SOSA.HOSTS, '?sensor'),
+            ('?sensor', SOSA.OBSERVES, HUMIDITY_IRI),
+        ]))
+        self.assertCountEqual([
+            {'?platform': PLATFORM_IRIS[0], '?sensor': SENSOR_IRIS[4]},
+            {'?platform': PLATFORM_IRIS[1], '?sensor': SENSOR_IRIS[5]},
+        ], results)
+
+        # Inverse properties and initial bindings
+        results = list(query.execute(
+            [('?sensor', SOSA.IS_HOSTED_BY, '?platform'), ('?property', SOSA.IS_OBSERVED_BY, '?sensor')],
+            {'?platform': PLATFORM_IRIS[1]},
+        ))
+        self.assertCountEqual([
+            {'?platform': PLATFORM_IRIS[1], '?sensor': SENSOR_IRIS[1], '?property': TEMPERATURE_IRI},
+            {'?platform': PLATFORM_IRIS[1], '?sensor': SENSOR_IRIS[3], '?property': TEMPERATURE_IRI},
+            {'?platform': PLATFORM_IRIS[1], '?sensor': SENSOR_IRIS[5], '?property': HUMIDITY_IRI},
+        ], results)
+
+        # Ground patterns and unknown entities
+        self.assertEqual([{}], list(query.execute([(PLATFORM_IRIS[0], SOSA.HOSTS, SENSOR_IRIS[0])])))
+        self.assertEqual([], list(query.execute([(PLATFORM_IRIS[0], SOSA.HOSTS, SENSOR_IRIS[1])])))
+        self.assertEqual([], list(query.execute([('?sensor', SOSA.OBSERVES, 'http://example.org/Unknown')])))
+
+        # Repeated variables
+        self.assertEqual([], list(query.execute([('?sensor', SOSA.HOSTS, '?sensor')])))
+
+        with self.assertRaises(ValueError):
+            query.execute([('?sensor', '?predicate', TEMPERATURE_IRI)])
+
+    def test_plan(self) -> None:
+        query = PatternQuery(create_relationships(EDGES))
+
+        steps = query.plan([
+            ('?platform', SOSA.HOSTS, '?sensor'),
+            ('?sensor', SOSA.OBSERVES, HUMIDITY_IRI),
+        ])
+
+        # The more selective pattern runs first
+        self.assertEqual(('?sensor', SOSA.OBSERVES, HUMIDITY_IRI), steps[0].pattern)
+        self.assertEqual(JOIN_INDEX, steps[0].method)
+        self.assertEqual(JOIN_INDEX, steps[1].method)
+        self.assertEqual(['?sensor'], steps[1].join_variables)
+
+        steps = query.plan([
+            ('?platform', SOSA.HOSTS, '?sensor'),
+            ('?other', SOSA.HOSTS, '?sensor2'),
+            ('?sensor2', SOSA.OBSERVES, '?property'),
+        ])
+
+        # Without a shared variable, the second pattern is a cross product
+        self.assertEqual([JOIN_SCAN, JOIN_SCAN, JOIN_HASH], [step.method for step in steps])
+        self.assertEqual(['?sensor2'], steps[2].join_variables)
+        self.assertEqual(36.0, steps[1].estimate)
+
+    def test_hash_join(self) -> None:
+        relationships = create_relationships(EDGES)
+        query = PatternQuery(relationships)
+
+        patterns = [
+            ('?platform', SOSA.HOSTS, '?sensor'),
+            ('?other', SOSA.HOSTS, '?sensor2'),
+            ('?sensor', SOSA.OBSERVES, '?property'),
+            ('?sensor2', SOSA.OBSERVES, '?property'),
+        ]
+
+        steps = query.plan(patterns)
+        self.assertIn(JOIN_HASH, [step.method for step in steps])
+
+        # Sensors observing the same property
+        results = list(query.execute(patterns))
+        self.assertEqual(4 * 4 + 2 * 2, len(results))
+
+        expected = 0
+        for result in results:
+            self.assertTrue(relationships.contains(result['?platform'], SOSA.HOSTS, result['?sensor']))
+            self.assertTrue(relationships.contains(result['?sensor2'], SOSA.OBSERVES, result['?property']))
+            expected += result['?sensor'] == result['?sensor2']
+        self.assertEqual(len(SENSOR_IRIS), expected)
+
+    def test_lazy(self) -> None:
+        query = PatternQuery(create_relationships(EDGES))
+
+        results = query.execute([('?platform', SOSA.HOSTS, '?sensor')])
+
+        self.assertEqual(1, len([next(results)]))
+        self.assertEqual(len(SENSOR_IRIS) - 1, len(list(results)))
+
+
+if __name__ == '__main__':
+    unittest.main()
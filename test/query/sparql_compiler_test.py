@@ -0,0 +1,126 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.ontology.sosa import SOSA
+from sosa.query.sparql_compiler import SparqlCompiler
+from sosa.relationship import RelationshipStore
+
+import rdflib
+import unittest
+
+
+EXAMPLE_IRI = 'http://example.org/'
+NAMESPACES = {
+    'sosa': 'http://www.w3.org/ns/sosa/',
+    'ex': EXAMPLE_IRI,
+}
+
+
+def create_graph() -> rdflib.Graph:
+    graph = rdflib.Graph()
+
+    for index in range(6):
+        sensor = rdflib.URIRef(f'{EXAMPLE_IRI}Sensor{index}')
+        graph.add((rdflib.URIRef(f'{EXAMPLE_IRI}Platform{index % 2}'), rdflib.URIRef(SOSA.HOSTS), sensor))
+
+        # Sensor5 doesn't observe anything
+        if index < 5:
+            observed = 'Temperature' if index < 3 else 'Humidity'
+            graph.add((sensor, rdflib.URIRef(SOSA.OBSERVES), rdflib.URIRef(f'{EXAMPLE_IRI}{observed}')))
+
+    return graph
+
+
+class SparqlCompilerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._graph = create_graph()
+
+        relationships = RelationshipStore()
+        relationships.load_graph(self._graph)
+
+        self._compiler = SparqlCompiler(relationships)
+
+    def _check(self, query: str, ordered: bool = False) -> None:
+        compiled = self._compiler.compile(query, NAMESPACES)
+        results = [
+            tuple(row.get(variable) for variable in compiled.variables)
+            for row in compiled.execute()
+        ]
+
+        expected = [
+            tuple(str(value) if value is not None else None for value in row)
+            for row in self._graph.query(query, initNs=NAMESPACES)
+        ]
+
+        if ordered:
+            self.assertEqual(expected, results)
+        else:
+            self.assertCountEqual(expected, results)
+
+    def test_bgp(self) -> None:
+        self._check('SELECT ?platform ?sensor WHERE { ?platform sosa:hosts ?sensor . ?sensor sosa:observes ex:Humidity }')
+        self._check('SELECT DISTINCT ?platform ?property WHERE { ?platform sosa:hosts ?s . ?s sosa:observes ?property }')
+        self._check('SELECT ?platform WHERE { ?platform sosa:hosts ex:Sensor1 }')
+        self._check('SELECT ?sensor WHERE { ?sensor sosa:observes ex:Unknown }')
+
+    def test_filter(self) -> None:
+        self._check('SELECT ?sensor WHERE { ex:Platform0 sosa:hosts ?sensor FILTER(?sensor != ex:Sensor2) }')
+        self._check('SELECT ?sensor WHERE { ?sensor sosa:observes ?p FILTER(STRENDS(STR(?sensor), "3") || ?p IN (ex:Humidity)) }')
+        self._check('SELECT ?sensor WHERE { ?sensor sosa:observes ?p FILTER(REGEX(STR(?p), "^http.*TEMP", "i")) }')
+        self._check('SELECT ?sensor WHERE { ?sensor sosa:observes ?p FILTER(REGEX(STR(?p), "Hum")) }')
+        self._check('SELECT ?sensor WHERE { ?sensor sosa:observes ?p FILTER(STR(?sensor) > "http://example.org/Sensor1" && !CONTAINS(STR(?p), "Hum")) }')
+
+        # IRIs can't be ordered
+        self._check('SELECT ?sensor WHERE { ?sensor sosa:observes ?p FILTER(?sensor > ex:Sensor1) }')
+
+    def test_optional(self) -> None:
+        self._check('SELECT ?sensor ?property WHERE { ?platform sosa:hosts ?sensor OPTIONAL { ?sensor sosa:observes ?property } }')
+        self._check('SELECT ?sensor WHERE { ?platform sosa:hosts ?sensor OPTIONAL { ?sensor sosa:observes ?p } FILTER(!BOUND(?p)) }')
+        self._check(
+            'SELECT ?sensor ?p WHERE { ?platform sosa:hosts ?sensor '
+            'OPTIONAL { ?sensor sosa:observes ?p FILTER(?p = ex:Humidity) } ?platform sosa:hosts ex:Sensor0 }'
+        )
+
+    def test_order_and_slice(self) -> None:
+        self._check('SELECT ?sensor ?p WHERE { ?sensor sosa:observes ?p } ORDER BY DESC(?p) ?sensor', ordered=True)
+        self._check('SELECT ?sensor WHERE { ?sensor sosa:observes ?p } ORDER BY ?sensor LIMIT 2 OFFSET 1', ordered=True)
+        self._check('SELECT ?sensor WHERE { ?sensor sosa:observes ?p } ORDER BY ?sensor OFFSET 1', ordered=True)
+        self._check('SELECT ?sensor WHERE { ?sensor sosa:observes ?p } ORDER BY ?sensor OFFSET 10', ordered=True)
+        self._check(
+            'SELECT ?sensor ?p WHERE { ?x sosa:hosts ?sensor OPTIONAL { ?sensor sosa:observes ?p } } ORDER BY ?p ?sensor',
+            ordered=True,
+        )
+
+    def test_explain(self) -> None:
+        compiled = self._compiler.compile(
+            'SELECT ?sensor WHERE { ?platform sosa:hosts ?sensor . ?sensor sosa:observes ex:Humidity } LIMIT 1',
+            NAMESPACES,
+        )
+
+        lines = compiled.explain().split('\n')
+        self.assertEqual('Slice offset 0 limit 1', lines[0])
+        self.assertIn('BGP', lines[2])
+        self.assertTrue(lines[3].strip().startswith(f'index ?sensor <{SOSA.OBSERVES}> <{EXAMPLE_IRI}Humidity>'))
+        self.assertTrue(lines[4].strip().startswith(f'index ?platform <{SOSA.HOSTS}> ?sensor on ?sensor'))
+
+    def test_unsupported(self) -> None:
+        for query in [
+            'ASK { ?s sosa:hosts ?o }',
+            'SELECT ?s WHERE { ?s ?p ?o }',
+            'SELECT ?s WHERE { ?s sosa:hosts "literal" }',
+            'SELECT ?s WHERE { { ?s sosa:hosts ?o } UNION { ?s sosa:observes ?o } }',
+            'SELECT ?s WHERE { ?s sosa:hosts ?o',
+        ]:
+            with self.assertRaises(ValueError):
+                self._compiler.compile(query, NAMESPACES)
+
+
+if __name__ == '__main__':
+    unittest.main()
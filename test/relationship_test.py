@@ -0,0 +1,141 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.ontology.sosa import SOSA
+from sosa.ontology.ssn import SSN
+from sosa.relationship import RelationshipStore
+
+import rdflib
+import unittest
+
+
+PLATFORM_IRI = 'http://example.org/platform/Vehicle'
+SENSOR_IRIS = [f'http://example.org/sensor/{index}' for index in range(3)]
+PROPERTY_IRI = 'http://example.org/property/NitricOxide'
+
+
+class RelationshipStoreTest(unittest.TestCase):
+    def test_neighbors(self) -> None:
+        store = RelationshipStore()
+
+        for sensor_iri in SENSOR_IRIS:
+            self.assertTrue(store.add(PLATFORM_IRI, SOSA.HOSTS, sensor_iri))
+            store.add(sensor_iri, SOSA.OBSERVES, PROPERTY_IRI)
+
+        # Duplicates are ignored
+        self.assertFalse(store.add(PLATFORM_IRI, SOSA.HOSTS, SENSOR_IRIS[0]))
+
+        self.assertEqual(6, len(store))
+        self.assertEqual(3, store.count(SOSA.HOSTS))
+        self.assertEqual(SENSOR_IRIS, store.get_objects(PLATFORM_IRI, SOSA.HOSTS))
+        self.assertEqual([PLATFORM_IRI], store.get_subjects(SOSA.HOSTS, SENSOR_IRIS[1]))
+        self.assertEqual(SENSOR_IRIS, store.get_subjects(SOSA.OBSERVES, PROPERTY_IRI))
+        self.assertEqual([], store.get_objects(PLATFORM_IRI, SOSA.OBSERVES))
+        self.assertEqual([], store.get_objects('http://example.org/platform/Unknown', SOSA.HOSTS))
+
+        platform_id = store.find_id(PLATFORM_IRI)
+        self.assertEqual(
+            [store.find_id(sensor_iri) for sensor_iri in SENSOR_IRIS],
+            store.get_object_ids(platform_id, SOSA.HOSTS),
+        )
+        self.assertEqual(PLATFORM_IRI, store.get_iri(platform_id))
+
+        self.assertTrue(store.remove(PLATFORM_IRI, SOSA.HOSTS, SENSOR_IRIS[1]))
+        self.assertFalse(store.remove(PLATFORM_IRI, SOSA.HOSTS, SENSOR_IRIS[1]))
+        self.assertFalse(store.contains(PLATFORM_IRI, SOSA.HOSTS, SENSOR_IRIS[1]))
+        self.assertEqual([SENSOR_IRIS[0], SENSOR_IRIS[2]], store.get_objects(PLATFORM_IRI, SOSA.HOSTS))
+        self.assertEqual([], store.get_subjects(SOSA.HOSTS, SENSOR_IRIS[1]))
+        self.assertEqual(2, store.count(SOSA.HOSTS))
+
+    def test_statistics(self) -> None:
+        store = RelationshipStore()
+
+        for sensor_iri in SENSOR_IRIS:
+            store.add(PLATFORM_IRI, SOSA.HOSTS, sensor_iri)
+
+        self.assertEqual(1, store.count_subjects(SOSA.HOSTS))
+        self.assertEqual(3, store.count_objects(SOSA.HOSTS))
+        self.assertEqual(3, store.count_subjects(SOSA.IS_HOSTED_BY))
+
+        platform_id = store.find_id(PLATFORM_IRI)
+        self.assertEqual(
+            [(store.find_id(sensor_iri), platform_id) for sensor_iri in SENSOR_IRIS],
+            list(store.get_edge_ids(SOSA.IS_HOSTED_BY)),
+        )
+
+        # Entities without relationships aren't counted
+        store.remove(PLATFORM_IRI, SOSA.HOSTS, SENSOR_IRIS[0])
+        self.assertEqual(2, store.count_objects(SOSA.HOSTS))
+
+    def test_unsupported_predicate(self) -> None:
+        store = RelationshipStore()
+
+        with self.assertRaises(ValueError):
+            store.add(PLATFORM_IRI, 'http://example.org/relatedTo', SENSOR_IRIS[0])
+
+    def test_load_graph(self) -> None:
+        graph = rdflib.Graph()
+        graph.add((rdflib.URIRef(PLATFORM_IRI), rdflib.URIRef(SOSA.HOSTS), rdflib.URIRef(SENSOR_IRIS[0])))
+        graph.add((rdflib.URIRef(PLATFORM_IRI), rdflib.URIRef(SSN.HAS_SUBSYSTEM), rdflib.URIRef(SENSOR_IRIS[1])))
+        graph.add((rdflib.URIRef(PLATFORM_IRI), rdflib.URIRef(SOSA.HOSTS), rdflib.Literal('Vehicle')))
+        graph.add((rdflib.URIRef(PLATFORM_IRI), rdflib.RDFS.label, rdflib.Literal('Vehicle')))
+
+        store = RelationshipStore()
+
+        self.assertEqual(2, store.load_graph(graph).added)
+        self.assertEqual([SENSOR_IRIS[0]], store.get_objects(PLATFORM_IRI, SOSA.HOSTS))
+        self.assertEqual([SENSOR_IRIS[1]], store.get_objects(PLATFORM_IRI, SSN.HAS_SUBSYSTEM))
+
+    def test_inverse(self) -> None:
+        store = RelationshipStore()
+
+        store.add(PLATFORM_IRI, SOSA.HOSTS, SENSOR_IRIS[0])
+        self.assertTrue(store.add(SENSOR_IRIS[1], SOSA.IS_HOSTED_BY, PLATFORM_IRI))
+
+        # The inverse of a stored relationship is the same edge
+        self.assertFalse(store.add(SENSOR_IRIS[0], SOSA.IS_HOSTED_BY, PLATFORM_IRI))
+
+        self.assertEqual(2, len(store))
+        self.assertEqual(2, store.count(SOSA.IS_HOSTED_BY))
+        self.assertEqual(SENSOR_IRIS[:2], store.get_objects(PLATFORM_IRI, SOSA.HOSTS))
+        self.assertEqual(SENSOR_IRIS[:2], store.get_subjects(SOSA.IS_HOSTED_BY, PLATFORM_IRI))
+        self.assertEqual([PLATFORM_IRI], store.get_objects(SENSOR_IRIS[1], SOSA.IS_HOSTED_BY))
+        self.assertTrue(store.contains(PLATFORM_IRI, SOSA.HOSTS, SENSOR_IRIS[1]))
+
+        self.assertTrue(store.remove(PLATFORM_IRI, SOSA.HOSTS, SENSOR_IRIS[1]))
+        self.assertEqual([], store.get_objects(SENSOR_IRIS[1], SOSA.IS_HOSTED_BY))
+
+    def test_remove_inverses(self) -> None:
+        platform = rdflib.URIRef(PLATFORM_IRI)
+        sensors = [rdflib.URIRef(sensor_iri) for sensor_iri in SENSOR_IRIS]
+
+        graph = rdflib.Graph()
+        for sensor in sensors[:2]:
+            graph.add((platform, rdflib.URIRef(SOSA.HOSTS), sensor))
+            graph.add((sensor, rdflib.URIRef(SOSA.IS_HOSTED_BY), platform))
+
+        # Only asserted in the inverse direction
+        graph.add((sensors[2], rdflib.URIRef(SOSA.IS_HOSTED_BY), platform))
+
+        store = RelationshipStore()
+        report = store.load_graph(graph, remove_inverses=True)
+
+        self.assertEqual(3, report.added)
+        self.assertEqual(2, report.removed)
+        self.assertEqual([(SENSOR_IRIS[2], SOSA.IS_HOSTED_BY, PLATFORM_IRI)], report.unpaired)
+
+        # The graph keeps every relationship in the canonical direction
+        self.assertEqual(3, len(graph))
+        self.assertEqual(set(sensors), set(graph.objects(platform, rdflib.URIRef(SOSA.HOSTS))))
+        self.assertEqual(set(SENSOR_IRIS), set(store.get_objects(PLATFORM_IRI, SOSA.HOSTS)))
+
+
+if __name__ == '__main__':
+    unittest.main()
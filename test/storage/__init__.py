@@ -0,0 +1,17 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from .observation_store_test import ObservationStoreTest
+from .write_ahead_log_test import WriteAheadLogTest
+from .compression_test import CompressionTest
+from .tiering_test import TieringTest
+from .retention_test import RetentionTest
+from .reorder_test import ReorderTest
+from .latest_value_test import LatestValueTest
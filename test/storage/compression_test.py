@@ -0,0 +1,111 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.observation import ObservationCollection
+from sosa.storage.chunk import Chunk
+from sosa.storage.compression import decode_floats
+from sosa.storage.compression import decode_timestamps
+from sosa.storage.compression import encode_floats
+from sosa.storage.compression import encode_timestamps
+from sosa.storage.compression import pack_bits
+from sosa.storage.compression import unpack_bits
+from sosa.storage.observation_store import ObservationStore
+
+import datetime
+import numpy
+import unittest
+
+
+def create_times(count: int) -> numpy.ndarray:
+    return numpy.datetime64('2020-01-01T00:00:00', 'ns') + numpy.arange(count) * numpy.timedelta64(1, 's')
+
+
+class CompressionTest(unittest.TestCase):
+    def test_pack_bits(self) -> None:
+        values = numpy.array([0, 1, 5, 2 ** 64 - 1, 3], dtype=numpy.uint64)
+        widths = numpy.array([0, 1, 3, 64, 2])
+
+        data = pack_bits(values, widths)
+        self.assertEqual(9, len(data))
+
+        unpacked, offset = unpack_bits(b'\xff' + data, 1, widths)
+
+        numpy.testing.assert_array_equal(values, unpacked)
+        self.assertEqual(10, offset)
+
+    def test_timestamps(self) -> None:
+        times = create_times(1000)
+        times[10] += numpy.timedelta64(3, 'ms')
+        times[500:] += numpy.timedelta64(1, 'D')
+        times[::7] = numpy.datetime64('NaT')
+
+        for count in (0, 1, 2, 1000):
+            data = encode_timestamps(times[:count])
+            decoded, offset = decode_timestamps(data, count)
+
+            numpy.testing.assert_array_equal(times[:count].view(numpy.int64), decoded.view(numpy.int64))
+            self.assertEqual(len(data), offset)
+
+    def test_regular_timestamps(self) -> None:
+        data = encode_timestamps(create_times(1000))
+
+        # A flag bit per timestamp, plus the first timestamp and delta
+        self.assertLessEqual(len(data), 8 + 1000 // 8 + 8)
+
+    def test_floats(self) -> None:
+        values = numpy.round(20.0 + numpy.cumsum(numpy.random.default_rng(0).normal(0, 0.02, 1000)), 1)
+        values[:6] = [numpy.nan, numpy.inf, -0.0, 5e-324, -1e300, 0.0]
+
+        for count in (0, 1, 2, 1000):
+            data = encode_floats(values[:count])
+            decoded, offset = decode_floats(data, count)
+
+            numpy.testing.assert_array_equal(values[:count].view(numpy.uint64), decoded.view(numpy.uint64))
+            self.assertEqual(len(data), offset)
+
+    def test_encoded_chunk(self) -> None:
+        times = create_times(100)
+        chunk = Chunk(phenomenon_times=times, result_times=times, results=numpy.arange(100.0))
+
+        encoded = chunk.encode()
+
+        self.assertEqual(100, len(encoded))
+        self.assertEqual(chunk.start_time, encoded.start_time)
+        self.assertEqual(chunk.end_time, encoded.end_time)
+        self.assertLess(len(encoded.data), 24 * 100 // 4)
+
+        sliced = encoded.slice(chunk.start_time + 10 * 10 ** 9, chunk.start_time + 20 * 10 ** 9)
+
+        numpy.testing.assert_array_equal(numpy.arange(10.0, 20.0), sliced.results)
+
+    def test_compressed_store(self) -> None:
+        store = ObservationStore(chunk_size=64, compress=True)
+        store.extend(ObservationCollection(
+            resource_iri='',
+            sensor_iri='http://example.org/sensor/1',
+            phenomenon_times=create_times(1000),
+            result_times=create_times(1000),
+            results=numpy.arange(1000.0),
+        ))
+
+        start = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        collection = store.query(
+            'http://example.org/sensor/1',
+            '',
+            '',
+            start + datetime.timedelta(seconds=100),
+            start + datetime.timedelta(seconds=900),
+        )
+
+        numpy.testing.assert_array_equal(numpy.arange(100.0, 900.0), collection.results)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.observation import ObservationCollection
+from sosa.storage.observation_store import ObservationStore
+
+import datetime
+import numpy
+
+
+SENSOR_IRI = 'http://example.org/sensor/1'
+PROPERTY_IRI = 'http://example.org/property/NitricOxide'
+FEATURE_IRI = 'http://example.org/feature/Oakland'
+PROCEDURE_IRI = 'http://example.org/procedure/Raw'
+
+START_TIME = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def create_collection(start: int, count: int, feature_iri: str = FEATURE_IRI, time_unit: str = 's') -> ObservationCollection:
+    """
+    Create consecutive observations of a series, one per time unit after the
+    start time. Each result is the observation's offset in time units.
+
+    :param start: The offset of the first observation
+    :param count: The number of observations
+    :param feature_iri: The IRI of the Feature of Interest
+    :param time_unit: The numpy time unit between observations
+    """
+    offsets = numpy.arange(start, start + count)
+    times = numpy.datetime64('2020-01-01T00:00:00', 'ns') + offsets * numpy.timedelta64(1, time_unit)
+
+    return ObservationCollection(
+        resource_iri='',
+        sensor_iri=SENSOR_IRI,
+        property_iri=PROPERTY_IRI,
+        feature_iri=feature_iri,
+        procedure_iri=PROCEDURE_IRI,
+        phenomenon_times=times,
+        result_times=times,
+        results=offsets.astype(numpy.float64),
+    )
+
+
+def query_results(store: ObservationStore) -> numpy.ndarray:
+    """
+    Get the results of every observation of the series, in time order.
+    """
+    return store.query(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI).results
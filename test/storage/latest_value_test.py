@@ -0,0 +1,123 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.observation import Observation
+from sosa.observation import ObservationCollection
+from sosa.storage.observation_store import ObservationStore
+from sosa.storage.series import SeriesKey
+
+import datetime
+import numpy
+import tempfile
+import unittest
+
+
+PROPERTY_IRI = 'http://example.org/property/NitricOxide'
+
+START_TIME = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def create_collection(sensor_iri: str, feature_iri: str, start: int, count: int) -> ObservationCollection:
+    times = numpy.datetime64('2020-01-01T00:00:00', 'ns') + numpy.arange(start, start + count) * numpy.timedelta64(1, 'm')
+
+    return ObservationCollection(
+        resource_iri='',
+        sensor_iri=sensor_iri,
+        property_iri=PROPERTY_IRI,
+        feature_iri=feature_iri,
+        procedure_iri='http://example.org/procedure/Raw',
+        phenomenon_times=times,
+        result_times=times + numpy.timedelta64(1, 's'),
+        results=numpy.arange(start, start + count, dtype=numpy.float64),
+    )
+
+
+class LatestValueTest(unittest.TestCase):
+    def test_latest(self) -> None:
+        store = ObservationStore(chunk_size=10)
+        store.extend(create_collection('http://example.org/sensor/1', 'http://example.org/feature/Oakland', 0, 25))
+
+        observation = store.latest_values.get('http://example.org/sensor/1', PROPERTY_IRI, 'http://example.org/feature/Oakland')
+
+        self.assertEqual(24.0, observation.result)
+        self.assertEqual(START_TIME + datetime.timedelta(minutes=24), observation.phenomenon_time)
+        self.assertEqual(START_TIME + datetime.timedelta(minutes=24, seconds=1), observation.result_time)
+        self.assertEqual('http://example.org/procedure/Raw', observation.procedure_iri)
+
+        self.assertIsNone(store.latest_values.get('http://example.org/sensor/2', PROPERTY_IRI, 'http://example.org/feature/Oakland'))
+
+        store.append(Observation(
+            resource_iri='',
+            sensor_iri='http://example.org/sensor/1',
+            property_iri=PROPERTY_IRI,
+            feature_iri='http://example.org/feature/Oakland',
+            procedure_iri='http://example.org/procedure/Raw',
+            phenomenon_time=START_TIME + datetime.timedelta(minutes=30),
+            result=42.0,
+        ))
+
+        observation = store.latest_values.get('http://example.org/sensor/1', PROPERTY_IRI, 'http://example.org/feature/Oakland')
+        self.assertEqual(42.0, observation.result)
+        self.assertIsNone(observation.result_time)
+
+    def test_out_of_order(self) -> None:
+        store = ObservationStore(chunk_size=10, reorder_size=5)
+        store.extend(create_collection('http://example.org/sensor/1', 'http://example.org/feature/Oakland', 10, 10))
+        store.extend(create_collection('http://example.org/sensor/1', 'http://example.org/feature/Oakland', 0, 10))
+
+        observation = store.latest_values.get('http://example.org/sensor/1', PROPERTY_IRI, 'http://example.org/feature/Oakland')
+        self.assertEqual(19.0, observation.result)
+
+    def test_current(self) -> None:
+        store = ObservationStore()
+        store.extend(create_collection('http://example.org/sensor/1', 'http://example.org/feature/Oakland', 0, 10))
+        store.extend(create_collection('http://example.org/sensor/2', 'http://example.org/feature/Oakland', 5, 10))
+        store.extend(create_collection('http://example.org/sensor/1', 'http://example.org/feature/Berkeley', 0, 3))
+
+        # The most recent observation by any sensor
+        observation = store.latest_values.get_current(PROPERTY_IRI, 'http://example.org/feature/Oakland')
+        self.assertEqual('http://example.org/sensor/2', observation.sensor_iri)
+        self.assertEqual(14.0, observation.result)
+
+        batch = store.latest_values.get_current_batch(PROPERTY_IRI, [
+            'http://example.org/feature/Berkeley',
+            'http://example.org/feature/Alameda',
+            'http://example.org/feature/Oakland',
+        ])
+
+        numpy.testing.assert_array_equal(['http://example.org/feature/Berkeley', 'http://example.org/feature/Oakland'], batch.feature_iris)
+        numpy.testing.assert_array_equal([2.0, 14.0], batch.results)
+
+        batch = store.latest_values.get_batch([
+            SeriesKey('http://example.org/sensor/1', PROPERTY_IRI, 'http://example.org/feature/Oakland'),
+            SeriesKey('http://example.org/sensor/2', PROPERTY_IRI, 'http://example.org/feature/Oakland'),
+        ])
+
+        numpy.testing.assert_array_equal([9.0, 14.0], batch.results)
+        numpy.testing.assert_array_equal(
+            numpy.datetime64('2020-01-01T00:00:00', 'ns') + numpy.array([9, 14]) * numpy.timedelta64(1, 'm'),
+            batch.phenomenon_times,
+        )
+
+    def test_recover(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            store = ObservationStore(chunk_size=10, directory=directory, checkpoint_interval=2)
+            for start in range(0, 50, 10):
+                store.extend(create_collection('http://example.org/sensor/1', 'http://example.org/feature/Oakland', start, 10))
+            store.close()
+
+            recovered = ObservationStore(chunk_size=10, directory=directory)
+            observation = recovered.latest_values.get_current(PROPERTY_IRI, 'http://example.org/feature/Oakland')
+            self.assertEqual(49.0, observation.result)
+            recovered.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.observation import Observation
+from sosa.observation import from_timestamp
+from sosa.storage.observation_store import ObservationStore
+from sosa.storage.series import SeriesKey
+
+from .fixtures import FEATURE_IRI
+from .fixtures import PROCEDURE_IRI
+from .fixtures import PROPERTY_IRI
+from .fixtures import SENSOR_IRI
+from .fixtures import START_TIME
+from .fixtures import create_collection
+
+import datetime
+import numpy
+import unittest
+
+
+class ObservationStoreTest(unittest.TestCase):
+    def test_append(self) -> None:
+        store = ObservationStore(chunk_size=4)
+
+        for index in range(10):
+            store.append(Observation(
+                resource_iri='',
+                sensor_iri=SENSOR_IRI,
+                property_iri=PROPERTY_IRI,
+                feature_iri=FEATURE_IRI,
+                phenomenon_time=START_TIME + datetime.timedelta(seconds=index),
+                result=float(index),
+            ))
+
+        self.assertEqual(10, len(store))
+        self.assertEqual([SeriesKey(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI)], store.get_series_keys())
+
+        collection = store.query(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI)
+
+        numpy.testing.assert_array_equal(numpy.arange(10.0), collection.results)
+        self.assertTrue(numpy.all(numpy.isnat(collection.result_times)))
+
+    def test_query_range(self) -> None:
+        store = ObservationStore(chunk_size=16)
+        store.extend(create_collection(0, 100))
+        store.extend(create_collection(100, 5))
+
+        collection = store.query(
+            SENSOR_IRI,
+            PROPERTY_IRI,
+            FEATURE_IRI,
+            START_TIME + datetime.timedelta(seconds=30),
+            START_TIME + datetime.timedelta(seconds=103),
+        )
+
+        numpy.testing.assert_array_equal(numpy.arange(30.0, 103.0), collection.results)
+        self.assertEqual(START_TIME + datetime.timedelta(seconds=30), from_timestamp(collection.phenomenon_times[0]))
+
+    def test_query_unknown_series(self) -> None:
+        store = ObservationStore()
+        store.extend(create_collection(0, 10))
+
+        collection = store.query(SENSOR_IRI, PROPERTY_IRI, 'http://example.org/feature/Berkeley')
+
+        self.assertEqual(0, len(collection))
+
+    def test_out_of_order(self) -> None:
+        store = ObservationStore()
+        store.extend(create_collection(10, 10))
+
+        with self.assertRaises(ValueError):
+            store.extend(create_collection(0, 5))
+
+        self.assertEqual(10, len(store))
+
+    def test_procedure_mismatch(self) -> None:
+        store = ObservationStore()
+        store.extend(create_collection(0, 10))
+
+        with self.assertRaises(ValueError):
+            store.append(Observation(
+                resource_iri='',
+                sensor_iri=SENSOR_IRI,
+                property_iri=PROPERTY_IRI,
+                feature_iri=FEATURE_IRI,
+                procedure_iri='http://example.org/procedure/Smoothed',
+                phenomenon_time=START_TIME + datetime.timedelta(seconds=10),
+                result=10.0,
+            ))
+
+        collection = create_collection(10, 5)
+        collection.procedure_iri = 'http://example.org/procedure/Smoothed'
+
+        with self.assertRaises(ValueError):
+            store.extend(collection)
+
+        self.assertEqual(10, len(store))
+        self.assertEqual(PROCEDURE_IRI, store.query(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI).procedure_iri)
+
+
+if __name__ == '__main__':
+    unittest.main()
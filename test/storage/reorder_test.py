@@ -0,0 +1,153 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.observation import ObservationCollection
+from sosa.storage.observation_store import ObservationStore
+from sosa.storage.series import Series
+from sosa.storage.series import SeriesKey
+
+from .fixtures import FEATURE_IRI
+from .fixtures import PROPERTY_IRI
+from .fixtures import SENSOR_IRI
+from .fixtures import query_results
+
+import datetime
+import numpy
+import tempfile
+import unittest
+
+
+KEY = SeriesKey(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI)
+
+
+def create_collection(minutes: numpy.ndarray) -> ObservationCollection:
+    times = numpy.datetime64('2020-01-01T00:00:00', 'ns') + minutes * numpy.timedelta64(1, 'm')
+
+    return ObservationCollection(
+        resource_iri='',
+        sensor_iri=SENSOR_IRI,
+        property_iri=PROPERTY_IRI,
+        feature_iri=FEATURE_IRI,
+        phenomenon_times=times,
+        result_times=times,
+        results=minutes.astype(numpy.float64),
+    )
+
+
+def shuffle_locally(count: int, distance: int) -> numpy.ndarray:
+    # Delay each observation by up to the distance
+    random = numpy.random.default_rng(5)
+    return numpy.argsort(numpy.arange(count) + random.uniform(0, distance, count), kind='stable')
+
+
+class ReorderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.directory = self._temp_dir.name
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def test_reorder_buffer(self) -> None:
+        series = Series(KEY, '', chunk_size=10, reorder_size=5)
+
+        for minute in shuffle_locally(100, 5):
+            series.append(int(minute), int(minute), float(minute))
+
+        self.assertEqual(100, len(series))
+        self.assertEqual(0, len(series.get_overflow()))
+
+        # Every sealed chunk is sorted and follows the previous chunk
+        times = numpy.concatenate([chunk.phenomenon_times.view(numpy.int64) for chunk in series.get_hot_chunks()])
+        numpy.testing.assert_array_equal(numpy.arange(len(times)), times)
+
+        numpy.testing.assert_array_equal(numpy.arange(100.0), series.query(0, 100).results)
+
+    def test_out_of_order_rejected(self) -> None:
+        store = ObservationStore(chunk_size=10)
+        store.extend(create_collection(numpy.arange(10, 20)))
+
+        with self.assertRaises(ValueError):
+            store.extend(create_collection(numpy.arange(0, 10)))
+
+    def test_overflow(self) -> None:
+        store = ObservationStore(chunk_size=10, reorder_size=5)
+
+        minutes = numpy.arange(100)
+        late = minutes % 20 == 3
+        store.extend(create_collection(minutes[~late]))
+        store.extend(create_collection(minutes[late]))
+
+        series = store._series[KEY]
+        self.assertEqual(5, len(series.get_overflow()))
+        numpy.testing.assert_array_equal(numpy.arange(100.0), query_results(store))
+
+        collection = store.query(
+            SENSOR_IRI,
+            PROPERTY_IRI,
+            FEATURE_IRI,
+            datetime.datetime(2020, 1, 1, 0, 20, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2020, 1, 1, 0, 50, tzinfo=datetime.timezone.utc),
+        )
+        numpy.testing.assert_array_equal(numpy.arange(20.0, 50.0), collection.results)
+
+        # Compaction merges the overflow into the sealed chunks
+        self.assertEqual(5, store.merge_overflow())
+        self.assertEqual(0, len(series.get_overflow()))
+        self.assertEqual(100, len(store))
+        numpy.testing.assert_array_equal(numpy.arange(100.0), query_results(store))
+
+        starts = series.get_chunk_start_times()
+        self.assertEqual(sorted(starts), starts)
+
+    def test_merge_cold_overflow(self) -> None:
+        store = ObservationStore(
+            chunk_size=10,
+            directory=self.directory,
+            hot_window=datetime.timedelta(minutes=30),
+            reorder_size=5,
+        )
+
+        minutes = numpy.arange(100)
+        late = minutes % 20 == 3
+        store.extend(create_collection(minutes[~late]))
+        store.tier()
+        store.extend(create_collection(minutes[late]))
+
+        series = store._series[KEY]
+        cold_count = len(series.get_cold_chunks())
+        self.assertGreater(cold_count, 0)
+
+        store.compact()
+
+        self.assertEqual(0, len(series.get_overflow()))
+        self.assertGreaterEqual(len(series.get_cold_chunks()), cold_count)
+        numpy.testing.assert_array_equal(numpy.arange(100.0), query_results(store))
+        store.close()
+
+        recovered = ObservationStore(chunk_size=10, directory=self.directory, reorder_size=5)
+        numpy.testing.assert_array_equal(numpy.arange(100.0), query_results(recovered))
+        recovered.close()
+
+    def test_recover_overflow(self) -> None:
+        store = ObservationStore(chunk_size=10, directory=self.directory, checkpoint_interval=2, reorder_size=5)
+
+        store.extend(create_collection(numpy.arange(50, 100)))
+        store.extend(create_collection(numpy.arange(0, 50)))
+        store.extend(create_collection(numpy.arange(100, 110)))
+        store.close()
+
+        recovered = ObservationStore(chunk_size=10, directory=self.directory, checkpoint_interval=2, reorder_size=5)
+        numpy.testing.assert_array_equal(numpy.arange(110.0), query_results(recovered))
+        recovered.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.procedure import Procedure
+from sosa.storage.chunk import Chunk
+from sosa.storage.observation_store import ObservationStore
+from sosa.storage.retention import RetentionPolicy
+from sosa.storage.retention import roll_up
+
+from .fixtures import FEATURE_IRI
+from .fixtures import PROPERTY_IRI
+from .fixtures import SENSOR_IRI
+from .fixtures import create_collection
+
+import datetime
+import numpy
+import tempfile
+import unittest
+
+
+POLICY = RetentionPolicy(
+    procedure=Procedure('http://example.org/procedure/Downsample'),
+    raw_retention=datetime.timedelta(hours=1),
+    resolution=datetime.timedelta(minutes=1),
+    property_iris={'mean': 'http://example.org/property/NitricOxideMean'},
+)
+
+
+class RetentionTest(unittest.TestCase):
+    def test_roll_up(self) -> None:
+        times = numpy.datetime64('2020-01-01T00:00:00', 'ns') + numpy.array([0, 10, 70, 80, 200]) * numpy.timedelta64(1, 's')
+        chunk = Chunk(phenomenon_times=times, result_times=times, results=numpy.array([1.0, 3.0, numpy.nan, 5.0, 7.0]))
+
+        aggregates = roll_up(chunk, datetime.timedelta(minutes=1))
+
+        numpy.testing.assert_array_equal(times[[0, 2, 4]] - numpy.array([0, 10, 20], dtype='timedelta64[s]'), aggregates['start_time'])
+        numpy.testing.assert_array_equal([1.0, 5.0, 7.0], aggregates['min'])
+        numpy.testing.assert_array_equal([3.0, 5.0, 7.0], aggregates['max'])
+        numpy.testing.assert_array_equal([2.0, 5.0, 7.0], aggregates['mean'])
+        numpy.testing.assert_array_equal([2.0, 1.0, 1.0], aggregates['count'])
+
+    def test_downsample(self) -> None:
+        store = ObservationStore()
+        store.set_retention_policy(POLICY)
+        store.extend(create_collection(0, 3 * 3600))
+
+        self.assertEqual(7140, store.downsample(max_chunks=1000))
+
+        raw = store.query(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI)
+        self.assertEqual(3660, len(raw))
+        self.assertEqual(7140.0, raw.results[0])
+
+        mean = store.query(SENSOR_IRI, 'http://example.org/property/NitricOxideMean', FEATURE_IRI)
+        self.assertEqual('http://example.org/procedure/Downsample', mean.procedure_iri)
+        self.assertEqual(119, len(mean))
+        self.assertEqual(29.5, mean.results[0])
+
+        count = store.query(SENSOR_IRI, PROPERTY_IRI + '/count', FEATURE_IRI)
+        numpy.testing.assert_array_equal(numpy.full(119, 60.0), count.results)
+
+        # Derived series aren't rolled up again
+        self.assertEqual(0, store.downsample())
+
+    def test_incremental(self) -> None:
+        expected = ObservationStore()
+        expected.set_retention_policy(POLICY)
+        expected.extend(create_collection(0, 3 * 3600))
+        expected.downsample(max_chunks=1000)
+
+        store = ObservationStore(chunk_size=100)
+        store.set_retention_policy(POLICY)
+        store.extend(create_collection(0, 3 * 3600))
+
+        passes = 0
+        while store.downsample(max_chunks=5):
+            passes += 1
+
+        self.assertGreater(passes, 1)
+
+        for property_iri in (PROPERTY_IRI, PROPERTY_IRI + '/min', PROPERTY_IRI + '/max'):
+            numpy.testing.assert_array_equal(
+                expected.query(SENSOR_IRI, property_iri, FEATURE_IRI).results,
+                store.query(SENSOR_IRI, property_iri, FEATURE_IRI).results,
+            )
+
+    def test_persistent(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            store = ObservationStore(chunk_size=600, directory=directory, hot_window=datetime.timedelta(minutes=10))
+            store.set_retention_policy(POLICY)
+            store.extend(create_collection(0, 3 * 3600))
+            store.tier()
+            store.downsample(max_chunks=1000)
+            store.compact()
+            store.close()
+
+            recovered = ObservationStore(chunk_size=600, directory=directory)
+
+            self.assertEqual(3660, len(recovered.query(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI)))
+            self.assertEqual(119, len(recovered.query(SENSOR_IRI, PROPERTY_IRI + '/max', FEATURE_IRI)))
+            self.assertEqual(1, len(recovered.get_segments()))
+
+
+if __name__ == '__main__':
+    unittest.main()
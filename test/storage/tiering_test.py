@@ -0,0 +1,118 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.storage.compactor import Compactor
+from sosa.storage.observation_store import ObservationStore
+
+from .fixtures import FEATURE_IRI
+from .fixtures import PROPERTY_IRI
+from .fixtures import SENSOR_IRI
+from .fixtures import START_TIME
+from .fixtures import create_collection
+from .fixtures import query_results
+
+import datetime
+import glob
+import numpy
+import os
+import tempfile
+import time
+import unittest
+
+
+class TieringTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.directory = self._temp_dir.name
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def create_store(self, **kwargs) -> ObservationStore:
+        kwargs.setdefault('hot_window', datetime.timedelta(hours=2))
+
+        return ObservationStore(chunk_size=60, directory=self.directory, **kwargs)
+
+    def test_hot_window(self) -> None:
+        store = self.create_store()
+        store.extend(create_collection(0, 600, time_unit='m'))
+
+        # Chunks ending more than 2 hours before the latest observation
+        self.assertEqual(7, store.tier())
+        self.assertEqual(1, len(store.get_segments()))
+        self.assertEqual(0, store.tier())
+
+        collection = store.query(
+            SENSOR_IRI,
+            PROPERTY_IRI,
+            FEATURE_IRI,
+            START_TIME + datetime.timedelta(minutes=100),
+            START_TIME + datetime.timedelta(minutes=500),
+        )
+
+        numpy.testing.assert_array_equal(numpy.arange(100.0, 500.0), collection.results)
+
+    def test_memory_budget(self) -> None:
+        store = self.create_store(hot_window=datetime.timedelta(days=365), hot_memory_budget=10000)
+        store.extend(create_collection(0, 600, time_unit='m'))
+        store.extend(create_collection(0, 600, 'http://example.org/feature/Berkeley', time_unit='m'))
+
+        self.assertGreater(store.hot_nbytes, 10000)
+
+        store.tier()
+
+        self.assertLessEqual(store.hot_nbytes, 10000)
+        self.assertEqual(600, len(store.query(SENSOR_IRI, PROPERTY_IRI, 'http://example.org/feature/Berkeley')))
+
+    def test_compact(self) -> None:
+        store = self.create_store()
+        for index in range(5):
+            store.extend(create_collection(index * 200, 200, time_unit='m'))
+            store.tier()
+
+        self.assertEqual(5, len(store.get_segments()))
+
+        self.assertEqual(5, store.compact())
+
+        self.assertEqual(1, len(store.get_segments()))
+        self.assertEqual(1, len(glob.glob(os.path.join(self.directory, 'segment-*.seg'))))
+        numpy.testing.assert_array_equal(numpy.arange(1000.0), query_results(store))
+
+    def test_recover(self) -> None:
+        store = self.create_store()
+        store.extend(create_collection(0, 600, time_unit='m'))
+        store.tier()
+        store.extend(create_collection(600, 10, time_unit='m'))
+        store.close()
+
+        recovered = self.create_store()
+
+        self.assertEqual(1, len(recovered.get_segments()))
+        numpy.testing.assert_array_equal(numpy.arange(610.0), query_results(recovered))
+
+    def test_compactor(self) -> None:
+        store = self.create_store()
+        store.extend(create_collection(0, 600, time_unit='m'))
+
+        compactor = Compactor(store, interval=0.01)
+        compactor.start()
+
+        deadline = time.monotonic() + 5.0
+        while not store.get_segments() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        compactor.stop()
+
+        self.assertEqual(1, len(store.get_segments()))
+        self.assertEqual(600, len(store.query(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI)))
+
+
+if __name__ == '__main__':
+    unittest.main()
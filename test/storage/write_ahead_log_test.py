@@ -0,0 +1,258 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.storage.observation_store import ObservationStore
+from sosa.storage.series import SeriesKey
+from sosa.storage.write_ahead_log import WriteAheadLog
+
+from .fixtures import FEATURE_IRI
+from .fixtures import PROCEDURE_IRI
+from .fixtures import PROPERTY_IRI
+from .fixtures import SENSOR_IRI
+from .fixtures import create_collection
+from .fixtures import query_results
+
+import glob
+import numpy
+import os
+import tempfile
+import threading
+from typing import Callable
+from typing import List
+import unittest
+
+
+class WriteAheadLogTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.directory = self._temp_dir.name
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def test_recover_committed(self) -> None:
+        store = ObservationStore(directory=self.directory)
+        store.extend(create_collection(0, 10))
+        store.extend(create_collection(10, 10))
+        store.commit()
+
+        # Simulate a crash by not closing the store
+        recovered = ObservationStore(directory=self.directory)
+
+        numpy.testing.assert_array_equal(numpy.arange(20.0), query_results(recovered))
+        self.assertEqual(PROCEDURE_IRI, recovered.query(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI).procedure_iri)
+
+    def test_uncommitted_records_are_lost(self) -> None:
+        store = ObservationStore(directory=self.directory)
+        store.extend(create_collection(0, 10))
+        store.commit()
+        store.extend(create_collection(10, 10))
+
+        recovered = ObservationStore(directory=self.directory)
+
+        numpy.testing.assert_array_equal(numpy.arange(10.0), query_results(recovered))
+
+    def test_partial_final_record(self) -> None:
+        store = ObservationStore(directory=self.directory)
+        store.extend(create_collection(0, 10))
+        store.extend(create_collection(10, 10))
+        store.close()
+
+        # Tear the final record
+        segment_path = sorted(glob.glob(os.path.join(self.directory, 'wal-*.log')))[-1]
+        with open(segment_path, 'r+b') as file:
+            file.truncate(os.path.getsize(segment_path) - 7)
+
+        for _ in range(2):
+            recovered = ObservationStore(directory=self.directory)
+            numpy.testing.assert_array_equal(numpy.arange(10.0), query_results(recovered))
+            recovered.close()
+
+        # New records are appended after the last intact record
+        recovered = ObservationStore(directory=self.directory)
+        recovered.extend(create_collection(10, 5))
+        recovered.close()
+
+        numpy.testing.assert_array_equal(numpy.arange(15.0), query_results(ObservationStore(directory=self.directory)))
+
+    def test_commit_due(self) -> None:
+        log = WriteAheadLog(self.directory, group_size=3)
+        for _ in range(2):
+            self._append(log)
+        self.assertFalse(log.commit_due)
+
+        # Appending doesn't commit, even when a commit is due
+        lsn = self._append(log)
+        self.assertTrue(log.commit_due)
+        self.assertLess(log.durable_lsn, lsn)
+
+        log.commit()
+        self.assertFalse(log.commit_due)
+        self.assertEqual(lsn, log.durable_lsn)
+
+        # The store commits once enough records are pending
+        store = ObservationStore(directory=os.path.join(self.directory, 'store'), group_size=3)
+        for index in range(7):
+            store.extend(create_collection(index * 10, 10))
+
+        recovered = ObservationStore(directory=os.path.join(self.directory, 'store'))
+        numpy.testing.assert_array_equal(numpy.arange(60.0), query_results(recovered))
+
+    def test_checkpoint(self) -> None:
+        store = ObservationStore(directory=self.directory, checkpoint_interval=4)
+        for index in range(10):
+            store.extend(create_collection(index * 10, 10))
+        store.close()
+
+        # Only the records since the latest checkpoint remain in the log
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'checkpoint.npz')))
+        self.assertEqual(1, len(glob.glob(os.path.join(self.directory, 'wal-*.log'))))
+
+        log = WriteAheadLog(self.directory)
+        self.assertEqual([9, 10], [record.lsn for record in log.recover(8)])
+        log.close()
+
+        recovered = ObservationStore(directory=self.directory, checkpoint_interval=4)
+        numpy.testing.assert_array_equal(numpy.arange(100.0), query_results(recovered))
+
+    def test_reopen_after_checkpoint(self) -> None:
+        store = ObservationStore(directory=self.directory)
+        store.extend(create_collection(0, 50))
+        store.checkpoint()
+        store.close()
+
+        # The log is empty after the checkpoint, so new records must still be
+        # numbered after it to be recovered
+        store = ObservationStore(directory=self.directory)
+        store.extend(create_collection(50, 30))
+        store.commit()
+
+        recovered = ObservationStore(directory=self.directory)
+        numpy.testing.assert_array_equal(numpy.arange(80.0), query_results(recovered))
+        recovered.close()
+
+        # Checkpoints are still taken automatically
+        store = ObservationStore(directory=self.directory, checkpoint_interval=4)
+        for index in range(8, 18):
+            store.extend(create_collection(index * 10, 10))
+        store.close()
+
+        log = WriteAheadLog(self.directory)
+        self.assertLess(len(list(log.recover(0))), 4)
+        log.close()
+
+        numpy.testing.assert_array_equal(numpy.arange(180.0), query_results(ObservationStore(directory=self.directory)))
+
+    def test_checkpoint_while_appending(self) -> None:
+        store = ObservationStore(directory=self.directory, checkpoint_interval=8)
+
+        def write() -> None:
+            for index in range(200):
+                store.extend(create_collection(index * 5, 5))
+
+        def checkpoint() -> None:
+            for _ in range(50):
+                store.checkpoint()
+
+        self._run_threads(write, 1, checkpoint)
+        store.close()
+
+        # Records appended while a checkpoint was written are kept in the log
+        recovered = ObservationStore(directory=self.directory, checkpoint_interval=8)
+        numpy.testing.assert_array_equal(numpy.arange(1000.0), query_results(recovered))
+
+    def test_group_commit(self) -> None:
+        log = WriteAheadLog(self.directory, group_size=1000)
+
+        def write() -> None:
+            for _ in range(50):
+                lsn = self._append(log)
+                log.commit(lsn)
+                if log.durable_lsn < lsn:
+                    raise AssertionError(f'Record {lsn} is not durable after committing it')
+
+        self._run_threads(write, 4)
+
+        log.close()
+
+        self.assertEqual(200, len(list(WriteAheadLog(self.directory).recover(0))))
+
+    def test_concurrent_first_appends(self) -> None:
+        # Existing records make opening the log slow enough to race
+        log = WriteAheadLog(self.directory)
+        for _ in range(1000):
+            self._append(log)
+        log.close()
+
+        for _ in range(5):
+            log = WriteAheadLog(self.directory)
+            barrier = threading.Barrier(8)
+
+            def write() -> None:
+                barrier.wait()
+                self._append(log)
+
+            self._run_threads(write, 8)
+            log.close()
+
+        self.assertEqual(list(range(1, 1041)), [record.lsn for record in WriteAheadLog(self.directory).recover(0)])
+
+    def test_commit_while_closing(self) -> None:
+        for attempt in range(3):
+            directory = os.path.join(self.directory, str(attempt))
+            log = WriteAheadLog(directory, group_size=1000)
+            committed = list()
+
+            def write() -> None:
+                for _ in range(500):
+                    lsn = self._append(log)
+                    log.commit(lsn)
+                    committed.append(lsn)
+
+            def close() -> None:
+                for _ in range(500):
+                    log.close()
+
+            self._run_threads(write, 2, close)
+            log.close()
+
+            # Every record that was committed is durable, even if the log was
+            # closed between appending and committing it
+            recovered = [record.lsn for record in WriteAheadLog(directory).recover(0)]
+            self.assertEqual(sorted(committed), recovered)
+
+    @staticmethod
+    def _append(log: WriteAheadLog) -> int:
+        collection = create_collection(0, 1)
+
+        return log.append(SeriesKey(SENSOR_IRI, PROPERTY_IRI, FEATURE_IRI), '', collection.phenomenon_times, collection.result_times, collection.results)
+
+    def _run_threads(self, target: Callable[[], None], count: int, *others: Callable[[], None]) -> None:
+        # Failures in the threads are raised from the test's thread
+        errors: List[BaseException] = list()
+
+        def run(function: Callable[[], None]) -> None:
+            try:
+                function()
+            except BaseException as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=run, args=(function,)) for function in [target] * count + list(others)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+################################################################################
+#
+#  Copyright (C) 2020 Garrett Brown
+#  This file is part of pysosa - https://github.com/eigendude/pysosa
+#
+#  SPDX-License-Identifier: BSD-3-Clause
+#  See the file LICENSE for more information.
+#
+################################################################################
+
+from sosa.feature import Property
+from sosa.unit_converter import convert_results
+from sosa.unit_converter import get_conversion_factors
+
+import numpy
+from qudt.quantity import Quantity
+from qudt.units.concentration import ConcentrationUnit
+from qudt.units.temperature import TemperatureUnit
+import unittest
+
+
+class UnitConverterTest(unittest.TestCase):
+    def test_convert_results(self) -> None:
+        results = numpy.array([-40.0, 0.0, 37.5, numpy.nan])
+
+        converted = convert_results(results, TemperatureUnit.CELSIUS, TemperatureUnit.FAHRENHEIT)
+
+        for value, expected in zip(results[:3], converted[:3]):
+            self.assertAlmostEqual(Quantity(value, TemperatureUnit.CELSIUS).convert_to(TemperatureUnit.FAHRENHEIT).value, expected)
+
+        self.assertTrue(numpy.isnan(converted[3]))
+
+        # The input isn't modified
+        self.assertEqual(-40.0, results[0])
+
+    def test_factors(self) -> None:
+        factors = get_conversion_factors(ConcentrationUnit.NANOMOLAR, ConcentrationUnit.MICROMOLAR)
+
+        self.assertAlmostEqual(0.001, factors.scale)
+        self.assertEqual(0.0, factors.offset)
+        self.assertIs(factors, get_conversion_factors(ConcentrationUnit.NANOMOLAR, ConcentrationUnit.MICROMOLAR))
+
+        self.assertEqual((1.0, 0.0), get_conversion_factors(ConcentrationUnit.MOLAR, ConcentrationUnit.MOLAR))
+
+    def test_property(self) -> None:
+        prop = Property('http://example.org/property/Temperature', unit=TemperatureUnit.KELVIN)
+
+        numpy.testing.assert_allclose([0.0, 100.0], prop.convert_results(numpy.array([273.15, 373.15]), TemperatureUnit.CELSIUS))
+
+        with self.assertRaises(ValueError):
+            prop.convert_results(numpy.array([1.0]), ConcentrationUnit.MOLAR)
+
+
+if __name__ == '__main__':
+    unittest.main()